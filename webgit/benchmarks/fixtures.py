@@ -0,0 +1,212 @@
+import hashlib
+import os
+import shutil
+import struct
+import subprocess
+import time
+from typing import Dict, List, NamedTuple
+
+
+class FixtureSize(NamedTuple):
+    remotes: int
+    branches: int
+    tags: int
+    packs: int
+    commits_per_pack: int
+
+
+FIXTURE_SIZES: Dict[str, FixtureSize] = {
+    "small": FixtureSize(remotes=8, branches=200, tags=100, packs=2, commits_per_pack=10),
+    "large": FixtureSize(remotes=300, branches=20000, tags=10000, packs=8, commits_per_pack=250),
+}
+
+
+def _write_file(path: str, text: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def _get_remote_name(i: int) -> str:
+    return "upstream" if i == 0 else "origin" if i == 1 else "remote{:04d}".format(i)
+
+
+def _get_remote_url(i: int) -> str:
+    if i % 2:
+        return "git@github.com:user{:04d}/project.git".format(i)
+    return "https://github.com/org{:04d}/project.git".format(i)
+
+
+def _get_branch_name(i: int) -> str:
+    return "main" if i == 0 else "feature/topic-{:05d}".format(i)
+
+
+def get_remote_output(size: FixtureSize) -> str:
+    """The `git remote -v` output of a repository with size.remotes remotes."""
+    lines: List[str] = []
+    for i in range(size.remotes):
+        for action in ["fetch", "push"]:
+            lines.append("{}\t{} ({})".format(_get_remote_name(i), _get_remote_url(i), action))
+    return "\n".join(lines) + "\n"
+
+
+def get_branch_output(size: FixtureSize) -> str:
+    """The `git branch -vv` output of a repository with size.branches branches, the last one checked out."""
+    lines: List[str] = []
+    for i in range(size.branches):
+        current: str = "*" if i == size.branches - 1 else " "
+        lines.append("{} {} {:07x} [upstream/{}: ahead 1] commit message {}".format(
+            current, _get_branch_name(i), i, _get_branch_name(i), i))
+    return "\n".join(lines) + "\n"
+
+
+def _get_config_text(size: FixtureSize) -> str:
+    lines: List[str] = ["[core]", "\trepositoryformatversion = 0", "\tbare = false"]
+    for i in range(size.remotes):
+        lines.append("[remote \"{}\"]".format(_get_remote_name(i)))
+        lines.append("\turl = {}".format(_get_remote_url(i)))
+        lines.append("\tfetch = +refs/heads/*:refs/remotes/{}/*".format(_get_remote_name(i)))
+    for i in range(size.branches):
+        lines.append("[branch \"{}\"]".format(_get_branch_name(i)))
+        lines.append("\tremote = upstream")
+        lines.append("\tmerge = refs/heads/{}".format(_get_branch_name(i)))
+    return "\n".join(lines) + "\n"
+
+
+def _import_commits(git_dir: str, size: FixtureSize) -> List[str]:
+    # every git fast-import run writes one pack, so running it once per pack gives a multi-pack object store
+    commit_hashes: List[str] = []
+    for pack in range(size.packs):
+        marks_path: str = os.path.join(git_dir, "marks-{}".format(pack))
+        stream: List[str] = []
+        for i in range(size.commits_per_pack):
+            number: int = pack * size.commits_per_pack + i
+            content: str = "line {}\n".format(number) * 20
+            message: str = "Commit {}\n".format(number)
+            stream.append("commit refs/heads/main")
+            stream.append("mark :{}".format(i + 1))
+            stream.append("committer Bench <bench@example.com> {} +0000".format(1600000000 + number))
+            stream.append("data {}".format(len(message.encode("utf-8"))))
+            stream.append(message.rstrip("\n"))
+            if i == 0 and commit_hashes:
+                stream.append("from {}".format(commit_hashes[-1]))
+            stream.append("M 644 inline src/file{}.txt".format(number % 50))
+            stream.append("data {}".format(len(content.encode("utf-8"))))
+            stream.append(content)
+        subprocess.run(
+            ["git", "--git-dir", git_dir, "-c", "fastimport.unpackLimit=0", "fast-import", "--quiet",
+             "--export-marks={}".format(marks_path)],
+            input="\n".join(stream) + "\n",
+            encoding="utf-8",
+            check=True,
+        )
+        with open(marks_path, encoding="utf-8") as f:
+            marks: Dict[int, str] = {int(m[1:]): h for m, h in (line.split() for line in f)}
+        commit_hashes.extend(marks[i + 1] for i in range(size.commits_per_pack))
+        os.remove(marks_path)
+    return commit_hashes
+
+
+def make_repository(path: str, size: FixtureSize) -> str:
+    """
+    Create a repository at path with size.remotes remotes, size.branches branches (each with an upstream in the
+    config) and size.tags tags, all refs in packed-refs, and the commits spread over size.packs packs. Without
+    git installed the object store is left empty. The files are dated an hour back, so caches consider them
+    settled. Returns the work tree.
+    """
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    git_dir: str = os.path.join(path, ".git")
+    for directory in ["objects/info", "objects/pack", "refs/heads", "refs/tags"]:
+        os.makedirs(os.path.join(git_dir, directory))
+    _write_file(os.path.join(git_dir, "config"), _get_config_text(size))
+    _write_file(os.path.join(git_dir, "HEAD"), "ref: refs/heads/{}\n".format(_get_branch_name(size.branches - 1)))
+
+    commit_hashes: List[str] = _import_commits(git_dir, size) if shutil.which("git") else []
+    commit_hashes = commit_hashes or ["0" * 40]
+    packed_refs: Dict[str, str] = {}
+    for i in range(size.branches):
+        packed_refs["refs/heads/{}".format(_get_branch_name(i))] = commit_hashes[i % len(commit_hashes)]
+        packed_refs["refs/remotes/upstream/{}".format(_get_branch_name(i))] = commit_hashes[i % len(commit_hashes)]
+    for i in range(size.tags):
+        packed_refs["refs/tags/v{}.{}.{}".format(i // 1000, i // 10 % 100, i % 10)] = commit_hashes[
+            -1 - i % len(commit_hashes)]
+    packed_refs["refs/heads/main"] = commit_hashes[-1]
+
+    lines: List[str] = ["# pack-refs with: peeled fully-peeled sorted "]
+    lines.extend("{} {}".format(commit_hash, ref) for ref, commit_hash in sorted(packed_refs.items()))
+    _write_file(os.path.join(git_dir, "packed-refs"), "\n".join(lines) + "\n")
+    for directory in ["refs/heads", "refs/tags"]:
+        shutil.rmtree(os.path.join(git_dir, directory))
+        os.makedirs(os.path.join(git_dir, directory))
+
+    old_time: float = time.time() - 3600
+    for directory, _, file_names in os.walk(git_dir):
+        for file_name in file_names:
+            os.utime(os.path.join(directory, file_name), (old_time, old_time))
+    return path
+
+
+def write_commit_graph(objects_dir: str, commits: int):
+    """
+    Write a commit-graph file of commits made-up hashes to objects_dir/info, with only the fanout and lookup chunks
+    that the link export reads, as a stand-in for the history of a large repository.
+    """
+    hashes: List[bytes] = sorted(hashlib.sha1(struct.pack(">I", i)).digest() for i in range(commits))
+    fanout: List[int] = [0] * 256
+    for name in hashes:
+        fanout[name[0]] += 1
+    for i in range(1, 256):
+        fanout[i] += fanout[i - 1]
+    fanout_start: int = 8 + 3 * 12
+    lookup_start: int = fanout_start + 256 * 4
+    path: str = os.path.join(objects_dir, "info", "commit-graph")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"CGPH" + bytes([1, 1, 2, 0]))
+        f.write(b"OIDF" + struct.pack(">Q", fanout_start))
+        f.write(b"OIDL" + struct.pack(">Q", lookup_start))
+        f.write(b"\0\0\0\0" + struct.pack(">Q", lookup_start + commits * 20))
+        f.write(struct.pack(">256I", *fanout))
+        f.write(b"".join(hashes))
+
+
+def write_history_commit_graph(objects_dir: str, commits: int, branch_commits: int) -> List[str]:
+    """
+    Write a commit-graph file with parents and generations to objects_dir/info, for a linear history of made-up
+    commits and a branch forked branch_commits commits below its tip, with as many commits of its own. Returns the
+    hashes of the two tips and of their merge base.
+    """
+    main_commits: int = commits - branch_commits
+    fork: int = main_commits - 1 - branch_commits
+    parents: List[int] = [i - 1 for i in range(main_commits)] + [fork] + list(range(main_commits, commits - 1))
+    generations: List[int] = []
+    for parent in parents:
+        generations.append(generations[parent] + 1 if parent >= 0 else 1)
+    hashes: List[bytes] = [hashlib.sha1(struct.pack(">I", i)).digest() for i in range(commits)]
+    order: List[int] = sorted(range(commits), key=hashes.__getitem__)
+    positions: List[int] = [0] * commits
+    for position, i in enumerate(order):
+        positions[i] = position
+    fanout: List[int] = [0] * 256
+    for name in hashes:
+        fanout[name[0]] += 1
+    for i in range(1, 256):
+        fanout[i] += fanout[i - 1]
+    fanout_start: int = 8 + 4 * 12
+    lookup_start: int = fanout_start + 256 * 4
+    data_start: int = lookup_start + commits * 20
+    path: str = os.path.join(objects_dir, "info", "commit-graph")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"CGPH" + bytes([1, 1, 3, 0]))
+        f.write(b"OIDF" + struct.pack(">Q", fanout_start))
+        f.write(b"OIDL" + struct.pack(">Q", lookup_start))
+        f.write(b"CDAT" + struct.pack(">Q", data_start))
+        f.write(b"\0\0\0\0" + struct.pack(">Q", data_start + commits * 36))
+        f.write(struct.pack(">256I", *fanout))
+        f.write(b"".join(hashes[i] for i in order))
+        for i in order:
+            parent: int = positions[parents[i]] if parents[i] >= 0 else 0x70000000
+            f.write(b"\0" * 20 + struct.pack(">IIII", parent, 0x70000000, generations[i] << 2, 1600000000 + i))
+    return [hashes[main_commits - 1].hex(), hashes[commits - 1].hex(), hashes[fork].hex()]
@@ -0,0 +1,526 @@
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from typing import Callable, Dict, List, Optional
+from unittest.mock import patch
+
+from webgit.benchmarks.fixtures import (
+    FIXTURE_SIZES,
+    FixtureSize,
+    get_branch_output,
+    get_remote_output,
+    make_repository,
+    write_commit_graph,
+    write_history_commit_graph,
+)
+from webgit.webgit_util import command_line
+from webgit.webgit_util.annotate import Annotator
+from webgit.webgit_util.commit_graph import CommitGraph, read_commit_graph
+from webgit.webgit_util.completion import complete
+from webgit.webgit_util.export_links import write_columnar_links, write_text_links
+from webgit.webgit_util.git_config import find_git_directories, read_git_config
+from webgit.webgit_util.hooks import install_hooks
+from webgit.webgit_util.lsp import PermalinkServer
+from webgit.webgit_util.merge_base import CommitWalker
+from webgit.webgit_util.objects import get_object_database, ObjectDatabase
+from webgit.webgit_util.permalink import LocalPermalinks
+from webgit.webgit_util.repository import (
+    get_branch_info_from_output,
+    get_remotes_from_git_remote_output,
+    get_repos_from_git_remote_output,
+    GitRemotes,
+)
+from webgit.webgit_util.resolver import RepoState, resolve_many
+
+# the start-up time webgit may add to the interpreter's own for a single command
+COLD_START_BUDGET_MS: float = 40.0
+
+# the time one shell completion may take once the interpreter is running
+COMPLETION_BUDGET_MS: float = 10.0
+
+# the time webgit's hooks may add to a git command that changes a ref, in a burst of them: the hook runs twice, for
+# the transaction being prepared and committed, and each run costs a shell and a process or two
+HOOK_OVERHEAD_BUDGET_MS: float = 15.0
+
+# the time `webgit lsp` may take to answer a permalink request for a repository it has in memory
+LSP_PERMALINK_BUDGET_MS: float = 0.5
+
+# the time the merge base of two branches that diverged by MERGE_BASE_BRANCH_COMMITS may take, however long the history
+MERGE_BASE_BUDGET_MS: float = 5.0
+
+DEFAULT_REGRESSION_THRESHOLD: float = 0.1
+
+# the permalink requests timed together in the lsp benchmark, as one is answered in microseconds
+LSP_REQUESTS: int = 1000
+
+# the paths given to one `webgit blob` in the bulk permalink benchmark
+BLOB_PATHS: int = 1000
+
+# the number of remotes in the remote registry benchmark, e.g. a repository tracking every fork of a project
+REGISTRY_REMOTES: int = 10000
+
+# the size of the generated CI log in the annotate benchmark
+ANNOTATE_LOG_BYTES: int = 16 * 1024 * 1024
+
+# the number of commits in the commit-graph of the link export benchmark
+EXPORT_LINKS_COMMITS: int = 1000000
+
+# the history of the merge base benchmark, and the commits on each side of the merge base
+MERGE_BASE_COMMITS: int = 1000000
+
+MERGE_BASE_BRANCH_COMMITS: int = 100
+
+ISOLATED_GIT_ENV: Dict[str, str] = {"GIT_CONFIG_NOSYSTEM": "1", "GIT_CONFIG_GLOBAL": os.devnull}
+
+WEBGIT_SCRIPT: str = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "webgit.py")
+
+Metrics = Dict[str, Dict[str, object]]
+
+
+def _metric(value: float, unit: str, better: str, budget: Optional[float] = None) -> Dict[str, object]:
+    metric: Dict[str, object] = {"value": round(value, 3), "unit": unit, "better": better}
+    if budget is not None:
+        metric["budget"] = budget
+    return metric
+
+
+def _time_median(function: Callable[[], object], repeat: int) -> float:
+    durations: List[float] = []
+    for _ in range(repeat):
+        start_time: float = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start_time)
+    return statistics.median(durations)
+
+
+class _CountingPopen(subprocess.Popen):
+    count: int = 0
+
+    def __init__(self, *args, **kwargs):
+        _CountingPopen.count += 1
+        super().__init__(*args, **kwargs)
+
+
+def _run_program(parameters: List[str], stdin_text: str = ""):
+    with contextlib.redirect_stdout(io.StringIO()), patch("sys.stdin", io.StringIO(stdin_text)):
+        command_line.run_program(parameters)
+
+
+def benchmark_run_program(repo_dir: str, cache_dir: str, repeat: int) -> Metrics:
+    """End-to-end latency and git subprocesses per run_program call, with and without the on-disk cache."""
+    batch_input: str = "\n".join(["4501", "issues 370", "tree v0.0.1 src/file1.txt", "642da2f", "prs"] * 200)
+    scenarios: Dict[str, Callable[[], None]] = {
+        "pull_request": lambda: _run_program(["4501", "-a", "-C", repo_dir]),
+        "pr": lambda: _run_program(["pr", "-a", "-C", repo_dir]),
+        "batch_1000": lambda: _run_program(["--batch", "-C", repo_dir], batch_input),
+    }
+    environments: Dict[str, Dict[str, str]] = {
+        "cached": {"XDG_CACHE_HOME": cache_dir},
+        "uncached": {"WEBGIT_NO_CACHE": "1"},
+        # git accepts GIT_CONFIG_COUNT, the native reader does not, so this measures the `git` subprocess path
+        "git_subprocess": {"WEBGIT_NO_CACHE": "1", "GIT_CONFIG_COUNT": "0"},
+    }
+
+    metrics: Metrics = {}
+    for environment_name, environment in environments.items():
+        with patch.dict(os.environ, environment), patch("subprocess.Popen", _CountingPopen):
+            if "WEBGIT_NO_CACHE" not in environment:
+                os.environ.pop("WEBGIT_NO_CACHE", None)
+            for scenario_name, scenario in scenarios.items():
+                scenario()  # warm up, and fill the cache
+                _CountingPopen.count = 0
+                scenario()
+                subprocesses: int = _CountingPopen.count
+                name: str = "run_program.{}.{}".format(scenario_name, environment_name)
+                metrics[name + ".ms"] = _metric(_time_median(scenario, repeat) * 1000, "ms", "lower")
+                metrics[name + ".subprocesses"] = _metric(subprocesses, "count", "lower")
+    return metrics
+
+
+def _lookup_path_uncached(repo_dir: str, revision: str, path: str):
+    object_database: ObjectDatabase = get_object_database(repo_dir)
+    try:
+        object_database.lookup_path(revision, path)
+    finally:
+        object_database.close()
+
+
+def benchmark_parsers(repo_dir: str, size: FixtureSize, repeat: int) -> Metrics:
+    """Throughput of the `git remote -v` and `git branch -vv` parsers, the config reader and resolve_many."""
+    remote_output: str = get_remote_output(size)
+    branch_output: str = get_branch_output(size)
+    git_directories = find_git_directories(repo_dir)
+    config_size: int = os.path.getsize(os.path.join(git_directories.git_dir, "config"))
+    repo_state: RepoState = RepoState(git_dir=repo_dir)
+    commands: List[str] = ["4501", "issues 370", "tree v0.0.1 src/file1.txt", "642da2f", "prs"] * 2000
+
+    remote_seconds: float = _time_median(lambda: get_repos_from_git_remote_output(remote_output), repeat)
+    branch_seconds: float = _time_median(lambda: get_branch_info_from_output(branch_output), repeat)
+    config_seconds: float = _time_median(lambda: read_git_config(git_directories), repeat)
+    resolve_seconds: float = _time_median(lambda: resolve_many(commands, repo_state), repeat)
+    metrics: Metrics = {
+        "parse.remote_output.lines_per_s": _metric(size.remotes * 2 / remote_seconds, "lines/s", "higher"),
+        "parse.branch_output.lines_per_s": _metric(size.branches / branch_seconds, "lines/s", "higher"),
+        "parse.git_config.mb_per_s": _metric(config_size / config_seconds / 1e6, "MB/s", "higher"),
+        "resolve_many.commands_per_s": _metric(len(commands) / resolve_seconds, "commands/s", "higher"),
+    }
+    if repo_state.object_database is not None:
+        # the first lookup decodes the trees on the path, later ones are served by the tree cache
+        lookup_seconds: float = _time_median(
+            lambda: _lookup_path_uncached(repo_dir, "main", "src/file1.txt"), repeat)
+        cached_lookup_seconds: float = _time_median(
+            lambda: repo_state.object_database.lookup_path("main", "src/file1.txt"), repeat)
+        metrics["lookup_path.ms"] = _metric(lookup_seconds * 1000, "ms", "lower")
+        metrics["lookup_path.cached.ms"] = _metric(cached_lookup_seconds * 1000, "ms", "lower")
+    return metrics
+
+
+def benchmark_remote_registry(size: FixtureSize, repeat: int) -> Metrics:
+    """Building the remote registry from `git remote -v` output with REGISTRY_REMOTES remotes, and name lookups."""
+    remote_output: str = get_remote_output(size._replace(remotes=REGISTRY_REMOTES))
+    remotes: GitRemotes = get_remotes_from_git_remote_output(remote_output)
+    names: List[str] = [r.name for r in remotes]
+
+    parse_seconds: float = _time_median(lambda: get_remotes_from_git_remote_output(remote_output), repeat)
+    per_line_seconds: float = _time_median(lambda: get_repos_from_git_remote_output(remote_output), repeat)
+    lookup_seconds: float = _time_median(lambda: [remotes.get(n) for n in names], repeat)
+    return {
+        "remote_registry.parse.ms": _metric(parse_seconds * 1000, "ms", "lower"),
+        "remote_registry.parse_per_line_records.ms": _metric(per_line_seconds * 1000, "ms", "lower"),
+        "remote_registry.lookups_per_s": _metric(len(names) / lookup_seconds, "lookups/s", "higher"),
+    }
+
+
+class _NullOutput(io.RawIOBase):
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: bytes) -> int:
+        return len(data)
+
+
+def _make_log(lines: List[bytes]) -> bytes:
+    repeat: int = ANNOTATE_LOG_BYTES // sum(len(line) + 1 for line in lines) + 1
+    return (b"\n".join(lines) + b"\n") * repeat
+
+
+def benchmark_annotate(repo_dir: str, repeat: int) -> Metrics:
+    """
+    Throughput of `webgit annotate` over a generated CI log, of plain text and of text dense with commit hashes,
+    pull request references and paths.
+    """
+    commits: List[str] = subprocess.run(
+        ["git", "-C", repo_dir, "rev-list", "--max-count=20", "main"],
+        stdout=subprocess.PIPE, encoding="utf-8", check=True).stdout.split()
+    plain_log: bytes = _make_log([
+        b"2024-05-01T12:00:00.000Z [INFO] Running tests in module core with 8 workers, retries=2",
+        b"2024-05-01T12:00:01.250Z [INFO] PASSED test_resolve_commands (0.004s) heap=128MB",
+    ])
+    references_log: bytes = _make_log([
+        "[INFO] HEAD is now at {} Merge pull request #{} from user/topic".format(c[:10], 4000 + i).encode("ascii")
+        for i, c in enumerate(commits)
+    ] + [b"[ERROR] src/file1.txt:12: assertion failed, see apache/kafka#4501 and deadbeef00"])
+
+    def annotate_log(log: bytes):
+        Annotator(RepoState(git_dir=repo_dir)).annotate_stream(io.BytesIO(log), _NullOutput())
+
+    plain_seconds: float = _time_median(lambda: annotate_log(plain_log), repeat)
+    references_seconds: float = _time_median(lambda: annotate_log(references_log), repeat)
+    return {
+        "annotate.plain.mb_per_s": _metric(len(plain_log) / plain_seconds / 1e6, "MB/s", "higher"),
+        "annotate.references.mb_per_s": _metric(len(references_log) / references_seconds / 1e6, "MB/s", "higher"),
+    }
+
+
+def benchmark_completion(repo_dir: str, cache_dir: str, repeat: int) -> Metrics:
+    """Latency of `webgit __complete` for branch names and remotes, with the refs index in the cache."""
+    scenarios: Dict[str, List[str]] = {
+        "refs": ["tree", "feature/topic-123"],
+        "remotes": ["-r", "remote01"],
+    }
+    metrics: Metrics = {}
+    with patch.dict(os.environ, {"XDG_CACHE_HOME": cache_dir}):
+        os.environ.pop("WEBGIT_NO_CACHE", None)
+        for scenario_name, words in scenarios.items():
+            complete(words, repo_dir)  # build the index
+            seconds: float = _time_median(lambda: complete(words, repo_dir), repeat)
+            metrics["completion.{}.ms".format(scenario_name)] = _metric(
+                seconds * 1000, "ms", "lower", budget=COMPLETION_BUDGET_MS)
+    return metrics
+
+
+def benchmark_export_links(work_dir: str, repeat: int) -> Metrics:
+    """Throughput of `webgit export-links` over a generated commit-graph, as text lines and in the columnar format."""
+    objects_dir: str = os.path.join(work_dir, "export_links", "objects")
+    write_commit_graph(objects_dir, EXPORT_LINKS_COMMITS)
+    commit_graph: CommitGraph = read_commit_graph(objects_dir)
+    prefix: str = "https://github.com/org/project/commit/"
+    try:
+        text_seconds: float = _time_median(
+            lambda: write_text_links(commit_graph, prefix, "", _NullOutput()), repeat)
+        columnar_seconds: float = _time_median(
+            lambda: write_columnar_links(commit_graph, prefix, "", _NullOutput()), repeat)
+    finally:
+        commit_graph.close()
+    return {
+        "export_links.text.commits_per_s": _metric(EXPORT_LINKS_COMMITS / text_seconds, "commits/s", "higher"),
+        "export_links.columnar.commits_per_s": _metric(
+            EXPORT_LINKS_COMMITS / columnar_seconds, "commits/s", "higher"),
+    }
+
+
+def benchmark_merge_base(work_dir: str, repeat: int) -> Metrics:
+    """
+    Latency of the merge base of two branches near the tip of a long generated history, as `webgit compare` and the
+    merged check of `webgit pr` find it, and the commits the walk reads, which the generation numbers bound.
+    """
+    objects_dir: str = os.path.join(work_dir, "merge_base", "objects")
+    one, two, merge_base = write_history_commit_graph(objects_dir, MERGE_BASE_COMMITS, MERGE_BASE_BRANCH_COMMITS)
+    commit_graph: CommitGraph = read_commit_graph(objects_dir)
+    walkers: List[CommitWalker] = []
+
+    def find_merge_base():
+        # a new walker each time, so no commit is read from a previous run; all of them are in the commit-graph
+        walkers.append(CommitWalker(None, commit_graph))
+        if walkers[-1].merge_bases(one, two) != [merge_base]:
+            raise AssertionError("wrong merge base")
+
+    try:
+        seconds: float = _time_median(find_merge_base, repeat)
+    finally:
+        commit_graph.close()
+    return {
+        "merge_base.ms": _metric(seconds * 1000, "ms", "lower", budget=MERGE_BASE_BUDGET_MS),
+        "merge_base.commits_read": _metric(walkers[-1].commits_read, "commits", "lower"),
+    }
+
+
+def benchmark_hooks(work_dir: str, cache_dir: str, repeat: int) -> Metrics:
+    """
+    Wall time of `git update-ref`, which runs the reference-transaction hook twice, with and without webgit's hooks
+    installed: the hooks' share of a git command, the warm-up itself running in the background.
+    """
+    if not shutil.which("git"):
+        return {}
+    repo_dir: str = os.path.join(work_dir, "hooks")
+    if os.path.exists(repo_dir):
+        shutil.rmtree(repo_dir)
+    environment: Dict[str, str] = dict(
+        os.environ, XDG_CACHE_HOME=cache_dir, GIT_AUTHOR_NAME="webgit", GIT_AUTHOR_EMAIL="webgit@example.com",
+        GIT_COMMITTER_NAME="webgit", GIT_COMMITTER_EMAIL="webgit@example.com")
+    environment.pop("WEBGIT_NO_CACHE", None)
+
+    def run_git(*arguments: str):
+        subprocess.run(["git", "-C", repo_dir] + list(arguments), env=environment, check=True)
+
+    os.makedirs(repo_dir)
+    run_git("init", "-q")
+    run_git("commit", "-q", "--allow-empty", "-m", "benchmark")
+    run_git("remote", "add", "origin", "git@github.com:org/project.git")
+    update_ref_seconds: float = _time_median(lambda: run_git("update-ref", "refs/heads/benchmark", "HEAD"), repeat)
+    install_hooks(repo_dir)
+    hooked_seconds: float = _time_median(lambda: run_git("update-ref", "refs/heads/benchmark", "HEAD"), repeat)
+    return {
+        "hooks.update_ref.ms": _metric(update_ref_seconds * 1000, "ms", "lower"),
+        "hooks.update_ref.hooked.ms": _metric(hooked_seconds * 1000, "ms", "lower"),
+        "hooks.overhead.ms": _metric(
+            (hooked_seconds - update_ref_seconds) * 1000, "ms", "lower", budget=HOOK_OVERHEAD_BUDGET_MS),
+    }
+
+
+def benchmark_lsp(repo_dir: str, repeat: int) -> Metrics:
+    """
+    Latency of a permalink request to `webgit lsp` for a repository it has read, including the check of the file
+    watcher for changes, and of the first request, which reads the repository.
+    """
+    server: PermalinkServer = PermalinkServer()
+    try:
+        request: Dict[str, object] = {"jsonrpc": "2.0", "id": 1, "method": "webgit/permalink", "params": {
+            "file": os.path.join(repo_dir, "src", "file1.txt"), "startLine": 10, "endLine": 20}}
+        start_time: float = time.perf_counter()
+        response: Optional[Dict[str, object]] = server.handle_message(request)
+        first_seconds: float = time.perf_counter() - start_time
+        if response is None or "result" not in response:
+            return {}  # no commit to link to, e.g. without git to create the fixture's objects
+
+        def answer_requests():
+            for _ in range(LSP_REQUESTS):
+                server.handle_message(request, load=False)
+
+        seconds: float = _time_median(answer_requests, repeat) / LSP_REQUESTS
+    finally:
+        server.watcher.close()
+    return {
+        "lsp.permalink.ms": _metric(seconds * 1000, "ms", "lower", budget=LSP_PERMALINK_BUDGET_MS),
+        "lsp.permalink.first.ms": _metric(first_seconds * 1000, "ms", "lower"),
+    }
+
+
+def benchmark_blob(repo_dir: str, repeat: int) -> Metrics:
+    """Throughput of `webgit blob` over many paths with line ranges, the repository read and HEAD resolved once."""
+    object_database: Optional[ObjectDatabase] = get_object_database(repo_dir)
+    commit: Optional[str] = object_database.resolve_revision("HEAD") if object_database is not None else None
+    if commit is None:
+        return {}  # no objects, e.g. without git to create them
+    paths: List[str] = [
+        path for path in ("src/file{}.txt".format(i) for i in range(50))
+        if object_database.get_path_type(commit, path) == "blob"]
+    object_database.close()
+    targets: List[str] = [
+        "{}:{}-{}".format(os.path.join(repo_dir, paths[i % len(paths)]), i % 20 + 1, i % 20 + 5)
+        for i in range(BLOB_PATHS)]
+    seconds: float = _time_median(lambda: LocalPermalinks().resolve_many(targets), repeat)
+    return {"blob.paths_per_s": _metric(BLOB_PATHS / seconds, "paths/s", "higher")}
+
+
+def benchmark_cold_start(repo_dir: str, cache_dir: str, repeat: int) -> Metrics:
+    """
+    Wall time of `webgit 4501 -a` in a new interpreter, with compiled bytecode and a warm cache as after the first
+    run, against the interpreter starting and doing nothing.
+    """
+    pycache_dir: str = tempfile.mkdtemp()
+    try:
+        environment: Dict[str, str] = dict(os.environ, PYTHONPYCACHEPREFIX=pycache_dir, XDG_CACHE_HOME=cache_dir)
+        environment.pop("PYTHONDONTWRITEBYTECODE", None)
+        environment.pop("WEBGIT_NO_CACHE", None)
+
+        def run(arguments: List[str]):
+            subprocess.run([sys.executable] + arguments, env=environment, stdout=subprocess.DEVNULL, check=True)
+
+        interpreter_arguments: List[str] = ["-c", "pass"]
+        webgit_arguments: List[str] = [WEBGIT_SCRIPT, "4501", "-a", "-C", repo_dir]
+        run(webgit_arguments)  # compile the bytecode and fill the cache
+        interpreter_seconds: float = _time_median(lambda: run(interpreter_arguments), repeat)
+        webgit_seconds: float = _time_median(lambda: run(webgit_arguments), repeat)
+    finally:
+        shutil.rmtree(pycache_dir)
+    return {
+        "cold_start.interpreter.ms": _metric(interpreter_seconds * 1000, "ms", "lower"),
+        "cold_start.webgit.ms": _metric(webgit_seconds * 1000, "ms", "lower"),
+        "cold_start.overhead.ms": _metric(
+            (webgit_seconds - interpreter_seconds) * 1000, "ms", "lower", budget=COLD_START_BUDGET_MS),
+    }
+
+
+def _get_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "-C", os.path.dirname(WEBGIT_SCRIPT), "rev-parse", "HEAD"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, encoding="utf-8", check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(size_name: str, repeat: int, work_dir: str) -> dict:
+    size: FixtureSize = FIXTURE_SIZES[size_name]
+    repo_dir: str = make_repository(os.path.join(work_dir, "repository"), size)
+    cache_dir: str = os.path.join(work_dir, "cache")
+
+    metrics: Metrics = {}
+    with patch.dict(os.environ, ISOLATED_GIT_ENV):
+        metrics.update(benchmark_run_program(repo_dir, cache_dir, repeat))
+        metrics.update(benchmark_parsers(repo_dir, size, repeat))
+        metrics.update(benchmark_remote_registry(size, repeat))
+        metrics.update(benchmark_annotate(repo_dir, repeat))
+        metrics.update(benchmark_export_links(work_dir, repeat))
+        metrics.update(benchmark_merge_base(work_dir, repeat))
+        metrics.update(benchmark_completion(repo_dir, cache_dir, repeat))
+        metrics.update(benchmark_hooks(work_dir, cache_dir, repeat))
+        metrics.update(benchmark_lsp(repo_dir, repeat))
+        metrics.update(benchmark_blob(repo_dir, repeat))
+        metrics.update(benchmark_cold_start(repo_dir, cache_dir, repeat))
+    return {
+        "metadata": {
+            "commit": _get_commit(),
+            "size": size_name,
+            "fixture": size._asdict(),
+            "repeat": repeat,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "metrics": metrics,
+    }
+
+
+def compare_results(baseline: dict, current: dict, threshold: float = DEFAULT_REGRESSION_THRESHOLD) -> List[str]:
+    """
+    The regressions of current against baseline: metrics that got worse by more than threshold (any increase
+    for counts), and metrics over their budget.
+    """
+    regressions: List[str] = []
+    for name, metric in sorted(current["metrics"].items()):
+        value: float = metric["value"]
+        if "budget" in metric and value > metric["budget"]:
+            regressions.append("{}: {} {} is over the {} {} budget".format(
+                name, value, metric["unit"], metric["budget"], metric["unit"]))
+        baseline_metric: Optional[dict] = baseline["metrics"].get(name)
+        if baseline_metric is None:
+            continue
+        baseline_value: float = baseline_metric["value"]
+        allowed: float = 0 if metric["unit"] == "count" else threshold * abs(baseline_value)
+        change: float = value - baseline_value if metric["better"] == "lower" else baseline_value - value
+        if change > allowed:
+            regressions.append("{}: {} -> {} {}".format(name, baseline_value, value, metric["unit"]))
+    return regressions
+
+
+def format_results(results: dict, baseline: Optional[dict] = None) -> str:
+    lines: List[str] = []
+    for name, metric in sorted(results["metrics"].items()):
+        line: str = "{:<50} {:>14.3f} {}".format(name, metric["value"], metric["unit"])
+        baseline_metric: Optional[dict] = baseline["metrics"].get(name) if baseline else None
+        if baseline_metric and baseline_metric["value"]:
+            line += " ({:+.1f}%)".format((metric["value"] / baseline_metric["value"] - 1) * 100)
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main(parameters: List[str]) -> int:
+    parser: ArgumentParser = ArgumentParser(
+        prog="python -m webgit.benchmarks.run",
+        description="Benchmark webgit against generated repositories",
+    )
+    parser.add_argument("--size", choices=sorted(FIXTURE_SIZES), default="large", help="fixture repository size")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement, the median is reported")
+    parser.add_argument("-o", "--output", help="write the results as JSON to this file, e.g. a new baseline")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare with a JSON file written by --output")
+    parser.add_argument(
+        "--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+        help="relative change counted as a regression (default {})".format(DEFAULT_REGRESSION_THRESHOLD))
+    args_namespace = parser.parse_args(parameters)
+
+    work_dir: str = tempfile.mkdtemp(prefix="webgit-benchmarks-")
+    try:
+        results: dict = run_benchmarks(args_namespace.size, args_namespace.repeat, work_dir)
+    finally:
+        shutil.rmtree(work_dir)
+
+    baseline: Optional[dict] = None
+    if args_namespace.compare:
+        with open(args_namespace.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print(format_results(results, baseline))
+    if args_namespace.output:
+        with open(args_namespace.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    regressions: List[str] = compare_results(baseline or {"metrics": {}}, results, args_namespace.threshold)
+    for regression in regressions:
+        print("REGRESSION {}".format(regression), file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
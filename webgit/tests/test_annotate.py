@@ -0,0 +1,118 @@
+import io
+import unittest
+from typing import Dict, List, Optional
+
+from unittest.mock import Mock, patch
+from webgit.tests.test_objects import _FakeObjectDatabase
+from webgit.tests.test_webgit_main import GITHUB_REMOTE_OUTPUT_TEXT, GITLAB_REMOTE_OUTPUT_TEXT
+from webgit.webgit_util import annotate
+from webgit.webgit_util import command_line
+from webgit.webgit_util import repository
+from webgit.webgit_util.annotate import Annotator
+from webgit.webgit_util.repository import get_remotes_from_git_remote_output
+from webgit.webgit_util.resolver import RepoState
+
+HEAD: str = "c0ffee" + "0" * 34
+
+COMMIT: str = "1234abc" + "d" * 33
+
+
+class _FakeTreeObjectDatabase(_FakeObjectDatabase):
+
+    def __init__(self, types_by_name: Dict[str, str], types_by_path: Dict[str, str]):
+        super().__init__(types_by_name)
+        self.types_by_path: Dict[str, str] = types_by_path
+
+    def resolve_revision(self, revision: str) -> Optional[str]:
+        return HEAD if revision == "HEAD" else None
+
+    def get_path_type(self, commit: str, path: str) -> Optional[str]:
+        return self.types_by_path.get(path.strip("/")) if commit == HEAD else None
+
+
+class AnnotatorTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.git_repos = get_remotes_from_git_remote_output(GITHUB_REMOTE_OUTPUT_TEXT)
+        self.object_database: _FakeTreeObjectDatabase = _FakeTreeObjectDatabase(
+            {COMMIT: "commit", "1234abe" + "0" * 33: "blob", "abcdef1" + "0" * 33: "commit",
+             "abcdef1" + "1" * 33: "commit"},
+            {"src/main.py": "blob", "docs/api": "tree", "README.md": "blob"})
+
+    def annotate(self, text: str, output_format: str = "url", with_objects: bool = True) -> str:
+        repo_state: RepoState = RepoState(
+            git_repos=self.git_repos, object_database=self.object_database if with_objects else None)
+        return Annotator(repo_state, output_format=output_format).annotate(text.encode("utf-8")).decode("utf-8")
+
+    def test_references(self):
+        self.assertEqual(
+            "Merge pull request https://github.company.io/org/project/pull/4501 from user/feature",
+            self.annotate("Merge pull request #4501 from user/feature"))
+        self.assertEqual(
+            "fixes https://github.company.io/apache/kafka/pull/12, see https://github.company.io/org/project/pull/1",
+            self.annotate("fixes apache/kafka#12, see https://github.company.io/org/project/pull/1"))
+        self.assertEqual("&#123; x#1 a/b/c#2", self.annotate("&#123; x#1 a/b/c#2"))
+
+    def test_commit_hashes(self):
+        self.assertEqual(
+            "https://github.company.io/org/project/commit/{} 1234abe abcdef1".format(COMMIT),
+            self.annotate("1234abc 1234abe abcdef1"))
+        self.assertEqual("deadbeef00/x.txt", self.annotate("deadbeef00/x.txt"))
+        full_hash: str = "f" * 40
+        self.assertEqual(
+            "1234abc https://github.company.io/org/project/commit/{}".format(full_hash),
+            self.annotate("1234abc " + full_hash, with_objects=False))
+
+    def test_paths(self):
+        self.assertEqual(
+            "  File \"https://github.company.io/org/project/blob/{}/src/main.py\", line 3".format(HEAD),
+            self.annotate("  File \"src/main.py\", line 3"))
+        self.assertEqual(
+            "https://github.company.io/org/project/tree/{}/docs/api src/other.py".format(HEAD),
+            self.annotate("docs/api/ src/other.py"))
+        self.assertEqual("src/main.py", self.annotate("src/main.py", with_objects=False))
+
+    def test_root_paths(self):
+        readme: str = "https://github.company.io/org/project/blob/{}/README.md".format(HEAD)
+        self.assertEqual("see {}.".format(readme), self.annotate("see README.md."))
+        self.assertEqual("({}:3)".format(readme), self.annotate("(README.md:3)"))
+        self.assertEqual("setup.py 2.8.1-rc1 xREADME.md", self.annotate("setup.py 2.8.1-rc1 xREADME.md"))
+
+    def test_formats(self):
+        url: str = "https://github.company.io/org/project/pull/7"
+        self.assertEqual("[#7]({})".format(url), self.annotate("#7", "markdown"))
+        self.assertEqual("\x1b]8;;{}\x1b\\#7\x1b]8;;\x1b\\".format(url), self.annotate("#7", "osc8"))
+
+    def test_gitlab(self):
+        self.git_repos = get_remotes_from_git_remote_output(GITLAB_REMOTE_OUTPUT_TEXT)
+        self.assertEqual("https://gitlab.com/org/project/-/merge_requests/7", self.annotate("#7"))
+
+    def test_stream(self):
+        annotator: Annotator = Annotator(RepoState(git_repos=self.git_repos, object_database=self.object_database))
+        text: bytes = b"".join(
+            "line {} #{} 1234abc src/main.py\n".format(n, n).encode("utf-8") for n in range(2000)) + b"#9 tail"
+        output_stream: io.BytesIO = io.BytesIO()
+        annotator.annotate_stream(io.BytesIO(text), output_stream, block_size=100)
+        self.assertEqual(annotator.annotate(text), output_stream.getvalue())
+        self.assertEqual(2001, output_stream.getvalue().count(b"/pull/"))
+
+    def test_stream_long_line(self):
+        annotator: Annotator = Annotator(RepoState(git_repos=self.git_repos))
+        text: bytes = b" #12345" * 10000
+        output_stream: io.BytesIO = io.BytesIO()
+        with patch.object(annotate, "ANNOTATE_MAX_LINE_BYTES", 1000):
+            annotator.annotate_stream(io.BytesIO(text), output_stream, block_size=333)
+        self.assertEqual(annotator.annotate(text), output_stream.getvalue())
+
+    def test_run_program(self):
+        stdin: io.TextIOWrapper = io.TextIOWrapper(io.BytesIO(b"Merge #4501\n"))
+        stdout: io.TextIOWrapper = io.TextIOWrapper(io.BytesIO())
+        with patch.object(repository, "get_remote_output", Mock(return_value=GITHUB_REMOTE_OUTPUT_TEXT)), \
+                patch("sys.stdin", stdin), patch("sys.stdout", stdout):
+            command_line.run_program(["annotate", "-C", "/nonexistent"])
+            command_line.run_program(["annotate", "-C", "/nonexistent", "--format", "markdown"])
+        self.assertEqual(b"Merge https://github.company.io/org/project/pull/4501\n", stdout.buffer.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
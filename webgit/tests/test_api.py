@@ -0,0 +1,196 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Set, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from unittest.mock import Mock, patch
+from webgit.tests.test_webgit_main import GITHUB_REMOTE_OUTPUT_TEXT, GITLAB_REMOTE_OUTPUT_TEXT
+from webgit.webgit_util import command_line
+from webgit.webgit_util import repository
+from webgit.webgit_util.api import _get_last_page, ApiClient, ApiException, get_api_base_url, list_items
+from webgit.webgit_util.repository import get_remotes_from_git_remote_output
+from webgit.webgit_util.resolver import CommandException, RepoState
+
+
+def github_pull(number: int) -> dict:
+    return {
+        "number": number,
+        "title": "Pull request {}".format(number),
+        "state": "open",
+        "user": {"login": "user{}".format(number % 3)},
+        "html_url": "https://github.company.io/org/project/pull/{}".format(number),
+    }
+
+
+class _ApiStandIn(ThreadingHTTPServer):
+    """Serves JSON pages by path, with ETags and paging headers like GitHub's and GitLab's."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _ApiRequestHandler)
+        self.pages: Dict[str, List[list]] = {}
+        self.total_pages_header: bool = False
+        self.requests: List[Tuple[str, str, Dict[str, str]]] = []
+        self.client_ports: Set[int] = set()
+        self.lock: threading.Lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return "http://127.0.0.1:{}/api".format(self.server_address[1])
+
+
+class _ApiRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server: _ApiStandIn = self.server
+        url_parts = urlsplit(self.path)
+        query: Dict[str, List[str]] = parse_qs(url_parts.query)
+        page_number: int = int(query.get("page", ["1"])[0])
+        pages: List[list] = server.pages.get(url_parts.path, [])
+        with server.lock:
+            server.requests.append((url_parts.path, url_parts.query, dict(self.headers)))
+            server.client_ports.add(self.client_address[1])
+
+        if not pages:
+            self.send_body(404, {}, json.dumps({"message": "Not Found"}).encode("utf-8"))
+            return
+        etag: str = '"{}-{}"'.format(url_parts.path, page_number)
+        headers: Dict[str, str] = {"ETag": etag}
+        if server.total_pages_header:
+            headers["X-Total-Pages"] = str(len(pages))
+        elif len(pages) > 1:
+            headers["Link"] = '<{}?page={}>; rel="last"'.format(url_parts.path, len(pages))
+        if self.headers.get("If-None-Match") == etag:
+            self.send_body(304, headers, b"")
+            return
+        self.send_body(200, headers, json.dumps(pages[page_number - 1]).encode("utf-8"))
+
+    def send_body(self, status: int, headers: Dict[str, str], body: bytes):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class ApiTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.temp_dir: str = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.server: _ApiStandIn = _ApiStandIn()
+        threading.Thread(target=self.server.serve_forever, args=(0.01,), daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        environ_patch = patch.dict(os.environ, {
+            "WEBGIT_API_URL": self.server.base_url,
+            "XDG_CACHE_HOME": os.path.join(self.temp_dir, "cache"),
+        })
+        environ_patch.start()
+        self.addCleanup(environ_patch.stop)
+        for name in ["WEBGIT_NO_CACHE", "GITHUB_TOKEN", "GITLAB_TOKEN"]:
+            os.environ.pop(name, None)
+        self.github_state: RepoState = RepoState(
+            git_repos=get_remotes_from_git_remote_output(GITHUB_REMOTE_OUTPUT_TEXT))
+
+    def test_list_pages(self):
+        self.server.pages["/api/repos/org/project/pulls"] = [
+            [github_pull(n) for n in range(page * 3 + 1, page * 3 + 4)] for page in range(7)]
+        records: List[dict] = list(list_items(["prs"], self.github_state))
+        self.assertEqual(list(range(1, 22)), [r["number"] for r in records])
+        self.assertEqual({
+            "number": 4,
+            "title": "Pull request 4",
+            "state": "open",
+            "author": "user1",
+            "url": "https://github.company.io/org/project/pull/4",
+        }, records[3])
+        self.assertEqual(7, len(self.server.requests))
+        self.assertLessEqual(len(self.server.client_ports), 4)
+        self.assertEqual("state=open&per_page=100&page=1", self.server.requests[0][1])
+
+    def test_etag_cache(self):
+        self.server.pages["/api/repos/org/project/pulls"] = [[github_pull(1)], [github_pull(2)]]
+        self.assertEqual([1, 2], [r["number"] for r in list_items(["prs"], self.github_state)])
+        self.assertNotIn("If-None-Match", self.server.requests[0][2])
+        self.server.requests.clear()
+
+        self.assertEqual([1, 2], [r["number"] for r in list_items(["prs"], self.github_state)])
+        self.assertEqual(['"/api/repos/org/project/pulls-1"', '"/api/repos/org/project/pulls-2"'],
+                         sorted(headers["If-None-Match"] for _, _, headers in self.server.requests))
+
+        self.server.requests.clear()
+        with patch.dict(os.environ, {"GITHUB_TOKEN": "secret"}):
+            list(list_items(["prs"], self.github_state))
+        self.assertEqual("Bearer secret", self.server.requests[0][2]["Authorization"])
+        self.assertNotIn("If-None-Match", self.server.requests[0][2])
+
+    def test_list_gitlab(self):
+        self.server.total_pages_header = True
+        self.server.pages["/api/projects/org%2Fproject/merge_requests"] = [
+            [{"iid": 7, "title": "MR", "state": "opened", "author": {"username": "vbro"}, "web_url": "u7"}],
+            [{"iid": 8, "title": "MR", "state": "merged", "author": {"username": "vbro"}, "web_url": "u8"}],
+        ]
+        repo_state: RepoState = RepoState(git_repos=get_remotes_from_git_remote_output(GITLAB_REMOTE_OUTPUT_TEXT))
+        with patch.dict(os.environ, {"GITLAB_TOKEN": "secret"}):
+            records: List[dict] = list(list_items(["myprs", "vbro"], repo_state))
+        self.assertEqual([7, 8], [r["number"] for r in records])
+        self.assertEqual("merged", records[1]["state"])
+        self.assertEqual("state=all&author_username=vbro&per_page=100&page=1", self.server.requests[0][1])
+        self.assertEqual("secret", self.server.requests[0][2]["PRIVATE-TOKEN"])
+
+    def test_list_issues(self):
+        self.server.pages["/api/repos/org/project/issues"] = [[
+            {"number": 1, "title": "Issue", "state": "open", "user": {"login": "a"}, "html_url": "u1"},
+            dict(github_pull(2), pull_request={}),
+        ]]
+        self.assertEqual([1], [r["number"] for r in list_items(["issues"], self.github_state)])
+
+    def test_errors(self):
+        with self.assertRaisesRegex(ApiException, "HTTP 404 Not Found"):
+            list(list_items(["prs"], self.github_state))
+        with self.assertRaisesRegex(CommandException, "--list requires one of"):
+            list(list_items(["tree"], self.github_state))
+        with self.assertRaisesRegex(ApiException, "Unsupported API url"):
+            ApiClient("ftp://example.com", {})
+
+    def test_api_base_url(self):
+        os.environ.pop("WEBGIT_API_URL")
+        remotes = get_remotes_from_git_remote_output(GITHUB_REMOTE_OUTPUT_TEXT + "\n" + "\n".join([
+            "hub	https://github.com/apache/kafka.git (fetch)",
+            "lab	git@gitlab.company.io:group/sub/project.git (fetch)",
+        ]))
+        self.assertEqual("https://github.company.io/api/v3", get_api_base_url(remotes.get("upstream")))
+        self.assertEqual("https://api.github.com", get_api_base_url(remotes.get("hub")))
+        self.assertEqual("https://gitlab.company.io/api/v4", get_api_base_url(remotes.get("lab")))
+
+    def test_last_page(self):
+        self.assertEqual(1, _get_last_page({}))
+        self.assertEqual(5, _get_last_page({"x-total-pages": "5"}))
+        self.assertEqual(12, _get_last_page({"link": '<https://api.github.com/repos/o/r/pulls?per_page=100&page=2>; '
+                                                     'rel="next", <https://api.github.com/repos/o/r/pulls?per_page='
+                                                     '100&page=12>; rel="last"'}))
+
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_run_program_list(self, mock_stdout: io.StringIO):
+        self.server.pages["/api/repos/org/project/pulls"] = [[github_pull(1), github_pull(2)]]
+        with patch.object(repository, "get_remote_output", Mock(return_value=GITHUB_REMOTE_OUTPUT_TEXT)):
+            command_line.run_program(["prs", "--list", "-C", self.temp_dir])
+        self.assertEqual([1, 2], [json.loads(line)["number"] for line in mock_stdout.getvalue().splitlines()])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from unittest.mock import patch
+from webgit.benchmarks.fixtures import FixtureSize, get_branch_output, get_remote_output, make_repository
+from webgit.benchmarks.run import compare_results
+from webgit.tests.test_git_config import ISOLATED_GIT_ENV
+from webgit.webgit_util.repository import get_branch_info, get_remotes
+
+TINY_FIXTURE: FixtureSize = FixtureSize(remotes=3, branches=5, tags=4, packs=2, commits_per_pack=3)
+
+
+@patch.dict(os.environ, ISOLATED_GIT_ENV)
+class BenchmarkTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.temp_dir: str = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+
+    def test_make_repository(self):
+        repo_dir: str = make_repository(os.path.join(self.temp_dir, "repository"), TINY_FIXTURE)
+        self.assertEqual(
+            sorted(r.name for r in get_remotes(repo_dir)),
+            sorted({line.split("\t")[0] for line in get_remote_output(TINY_FIXTURE).splitlines()}))
+        self.assertEqual("feature/topic-00004", get_branch_info(repo_dir).from_branch)
+        pack_dir: str = os.path.join(repo_dir, ".git", "objects", "pack")
+        if shutil.which("git"):
+            self.assertEqual(2, len([f for f in os.listdir(pack_dir) if f.endswith(".pack")]))
+        self.assertIn("* feature/topic-00004", get_branch_output(TINY_FIXTURE))
+
+    def test_compare_results(self):
+        baseline: dict = {"metrics": {
+            "latency.ms": {"value": 10.0, "unit": "ms", "better": "lower"},
+            "throughput": {"value": 100.0, "unit": "lines/s", "better": "higher"},
+            "subprocesses": {"value": 0, "unit": "count", "better": "lower"},
+        }}
+        current: dict = {"metrics": {
+            "latency.ms": {"value": 10.5, "unit": "ms", "better": "lower"},
+            "throughput": {"value": 80.0, "unit": "lines/s", "better": "higher"},
+            "subprocesses": {"value": 1, "unit": "count", "better": "lower"},
+            "start.ms": {"value": 45.0, "unit": "ms", "better": "lower", "budget": 40.0},
+        }}
+        regressions = compare_results(baseline, current, threshold=0.1)
+        self.assertEqual(["start.ms", "subprocesses", "throughput"], sorted(r.split(":")[0] for r in regressions))
+
+
+if __name__ == '__main__':
+    unittest.main()
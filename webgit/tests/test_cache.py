@@ -0,0 +1,113 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from unittest.mock import Mock, patch
+from webgit.tests.test_git_config import ISOLATED_GIT_ENV, make_git_dir, write_file
+from webgit.webgit_util.cache import FileCache
+from webgit.webgit_util.repository import get_branch_info, get_remotes, GitRemotes
+
+
+def backdate(*paths: str):
+    old_time: float = time.time() - 3600
+    for path in paths:
+        os.utime(path, (old_time, old_time))
+
+
+class FileCacheTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.temp_dir: str = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.source_file: str = os.path.join(self.temp_dir, "source")
+        write_file(self.source_file, "content")
+        backdate(self.source_file)
+        self.cache: FileCache = FileCache("test", cache_dir=os.path.join(self.temp_dir, "cache"))
+
+    def test_store_and_load(self):
+        self.assertIsNone(self.cache.load("key"))
+        self.assertTrue(self.cache.store("key", [self.source_file], {"remotes": [("origin", 1)]}))
+        self.assertEqual({"remotes": [("origin", 1)]}, self.cache.load("key"))
+        self.assertTrue(self.cache.update("key", [self.source_file], branch_info=("a", "b", "c")))
+        self.assertEqual({"remotes": [("origin", 1)], "branch_info": ("a", "b", "c")}, self.cache.load("key"))
+        self.assertEqual(["test"], os.listdir(os.path.join(self.temp_dir, "cache")))
+        self.assertFalse([f for f in os.listdir(self.cache.namespace_dir) if f.endswith(".tmp")])
+
+    def test_invalidated_by_file_change(self):
+        self.cache.store("key", [self.source_file, os.path.join(self.temp_dir, "missing")], {"value": 1})
+        write_file(self.source_file, "changed content")
+        self.assertIsNone(self.cache.load("key"))
+
+        backdate(self.source_file)
+        self.cache.store("key", [self.source_file, os.path.join(self.temp_dir, "missing")], {"value": 2})
+        write_file(os.path.join(self.temp_dir, "missing"), "")
+        self.assertIsNone(self.cache.load("key"))
+
+    def test_recently_modified_files_are_not_stored(self):
+        write_file(self.source_file, "changed content")
+        self.assertFalse(self.cache.store("key", [self.source_file], {"value": 1}))
+        self.assertIsNone(self.cache.load("key"))
+
+    def test_corrupt_entry_is_a_miss(self):
+        self.cache.store("key", [self.source_file], {"value": 1})
+        entry_path: str = os.path.join(self.cache.namespace_dir, os.listdir(self.cache.namespace_dir)[0])
+        write_file(entry_path, "WGC1 not marshal")
+        self.assertIsNone(self.cache.load("key"))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache: FileCache = FileCache("test", cache_dir=os.path.join(self.temp_dir, "cache"), max_size=2000)
+        old_time: float = time.time() - 3600
+        for i in range(10):
+            cache.store("key{}".format(i), [self.source_file], {"value": "x" * 300})
+            # make each earlier entry older than the next
+            os.utime(cache._get_entry_path("key{}".format(i)), (old_time + i, old_time + i))
+        self.assertLessEqual(sum(e.stat().st_size for e in os.scandir(cache.namespace_dir)), 2000)
+        self.assertIsNotNone(cache.load("key9"))
+        self.assertIsNone(cache.load("key0"))
+
+    def test_disabled(self):
+        with patch.dict(os.environ, {"WEBGIT_NO_CACHE": "1"}):
+            cache: FileCache = FileCache("test")
+        self.assertFalse(cache.store("key", [self.source_file], {"value": 1}))
+        self.assertIsNone(cache.load("key"))
+
+
+class RepositoryCacheTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.temp_dir: str = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        patcher = patch.dict(os.environ, dict(ISOLATED_GIT_ENV, XDG_CACHE_HOME=os.path.join(self.temp_dir, "cache")))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        os.environ.pop("WEBGIT_NO_CACHE")
+
+        self.repo_dir: str = os.path.join(self.temp_dir, "repo")
+        self.git_dir: str = make_git_dir(self.repo_dir, "\n".join([
+            "[remote \"upstream\"]",
+            "\turl = https://github.com/apache/kafka.git",
+            "[branch \"main\"]",
+            "\tremote = upstream",
+            "\tmerge = refs/heads/trunk",
+        ]))
+        backdate(os.path.join(self.git_dir, "config"), os.path.join(self.git_dir, "HEAD"))
+
+    def test_cached_remotes_and_branch_info(self):
+        remotes: GitRemotes = get_remotes(self.repo_dir)
+        branch_info = get_branch_info(self.repo_dir)
+
+        with patch("webgit.webgit_util.repository.read_git_config", new=Mock(side_effect=AssertionError)):
+            self.assertEqual(remotes, get_remotes(self.repo_dir))
+            self.assertEqual(branch_info, get_branch_info(self.repo_dir))
+
+        write_file(os.path.join(self.git_dir, "HEAD"), "ref: refs/heads/feature\n")
+        self.assertEqual("feature", get_branch_info(self.repo_dir).from_branch)
+
+        write_file(os.path.join(self.git_dir, "config"), "[remote \"origin\"]\n\turl = git@gitlab.com:user/p.git\n")
+        self.assertEqual("origin", get_remotes(self.repo_dir)[0].name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from typing import List
+
+from unittest.mock import patch
+from webgit.tests.test_git_config import ISOLATED_GIT_ENV, write_file
+from webgit.tests.test_objects import git, GIT_IDENTITY_ENV, make_commits
+from webgit.tests.test_webgit_main import GITHUB_REMOTE_OUTPUT_TEXT
+from webgit.webgit_util import command_line
+from webgit.webgit_util.commit_graph import CommitGraph, CommitGraphException, read_commit_graph
+from webgit.webgit_util.export_links import export_links, LinkExportException, read_columnar_links
+from webgit.webgit_util.repository import get_remotes_from_git_remote_output
+from webgit.webgit_util.resolver import CommandException, RepoState
+
+COMMIT_URL_PREFIX: str = "https://github.company.io/org/project/commit/"
+
+
+class CommitGraphTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        environ_patch = patch.dict(os.environ, dict(ISOLATED_GIT_ENV, **GIT_IDENTITY_ENV))
+        environ_patch.start()
+        self.addCleanup(environ_patch.stop)
+        self.repo_dir: str = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.repo_dir)
+        git(self.repo_dir, "init", "-q")
+        make_commits(self.repo_dir, 1, 3)
+        self.objects_dir: str = os.path.join(self.repo_dir, ".git", "objects")
+        self.repo_state: RepoState = RepoState(
+            self.repo_dir, git_repos=get_remotes_from_git_remote_output(GITHUB_REMOTE_OUTPUT_TEXT))
+
+    def get_commits(self) -> List[str]:
+        return sorted(git(self.repo_dir, "rev-list", "--all").split())
+
+    def read_hashes(self, commit_graph: CommitGraph, block_commits: int = 2) -> List[str]:
+        hex_names: List[str] = []
+        for oids in commit_graph.iter_oid_blocks(block_commits):
+            hex_names.extend(oids[i:i + 20].hex() for i in range(0, len(oids), 20))
+        return hex_names
+
+    def test_single_file(self):
+        self.assertIsNone(read_commit_graph(self.objects_dir))
+        git(self.repo_dir, "commit-graph", "write", "--reachable")
+        commit_graph: CommitGraph = read_commit_graph(self.objects_dir)
+        self.addCleanup(commit_graph.close)
+        self.assertEqual(3, len(commit_graph))
+        self.assertEqual(self.get_commits(), self.read_hashes(commit_graph))
+
+    def test_split_chain(self):
+        git(self.repo_dir, "commit-graph", "write", "--reachable", "--split")
+        make_commits(self.repo_dir, 4, 2)
+        git(self.repo_dir, "commit-graph", "write", "--reachable", "--split=no-merge")
+        commit_graph: CommitGraph = read_commit_graph(self.objects_dir)
+        self.addCleanup(commit_graph.close)
+        self.assertEqual(2, len(commit_graph.layers))
+        self.assertEqual(self.get_commits(), sorted(self.read_hashes(commit_graph)))
+
+    def test_invalid_file(self):
+        write_file(os.path.join(self.objects_dir, "info", "commit-graph"), "")
+        self.assertRaises(CommitGraphException, read_commit_graph, self.objects_dir)
+        write_file(os.path.join(self.objects_dir, "info", "commit-graph"), "CGPH\x02\x01\x00\x00" + "\x00" * 24)
+        self.assertRaises(CommitGraphException, read_commit_graph, self.objects_dir)
+
+    def test_export_text(self):
+        git(self.repo_dir, "commit-graph", "write", "--reachable")
+        output_stream: io.BytesIO = io.BytesIO()
+        self.assertEqual(3, export_links(self.repo_state, output_stream))
+        self.assertEqual(
+            "".join("{0}\t{1}{0}\n".format(commit, COMMIT_URL_PREFIX) for commit in self.get_commits()),
+            output_stream.getvalue().decode("utf-8"))
+
+    def test_export_columnar(self):
+        git(self.repo_dir, "commit-graph", "write", "--reachable")
+        output_stream: io.BytesIO = io.BytesIO()
+        self.assertEqual(3, export_links(self.repo_state, output_stream, columnar=True))
+        self.assertEqual(
+            [(commit, COMMIT_URL_PREFIX + commit) for commit in self.get_commits()],
+            list(read_columnar_links(io.BytesIO(output_stream.getvalue()), block_commits=2)))
+        self.assertRaises(LinkExportException, list, read_columnar_links(io.BytesIO(output_stream.getvalue()[:-1])))
+        self.assertRaises(LinkExportException, list, read_columnar_links(io.BytesIO(b"CGPH" + b"\x00" * 20)))
+
+    def test_export_without_commit_graph(self):
+        self.assertRaises(CommandException, export_links, self.repo_state, io.BytesIO())
+
+    def test_run_program(self):
+        git(self.repo_dir, "commit-graph", "write", "--reachable")
+        git(self.repo_dir, "remote", "add", "upstream", "git@github.company.io:org/project.git")
+        output_path: str = os.path.join(self.repo_dir, "links.tsv")
+        command_line.run_program(["export-links", output_path, "-C", self.repo_dir])
+        with open(output_path, encoding="utf-8") as f:
+            self.assertEqual(self.get_commits(), [line.split("\t")[0] for line in f.read().splitlines()])
+
+
+if __name__ == '__main__':
+    unittest.main()
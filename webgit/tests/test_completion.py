@@ -0,0 +1,119 @@
+import io
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from typing import List
+
+from unittest.mock import patch
+from webgit.tests.test_git_config import ISOLATED_GIT_ENV
+from webgit.tests.test_objects import git, GIT_IDENTITY_ENV, make_commits
+from webgit.webgit_util import command_line
+from webgit.webgit_util import completion
+from webgit.webgit_util.completion import _find_prefix, complete, COMPLETION_OPTIONS, get_refs_index
+
+OLD_MTIME: int = 1000000000
+
+
+class FindPrefixTests(unittest.TestCase):
+
+    def test_matches_linear_search(self):
+        random.seed(7)
+        names: List[bytes] = sorted({
+            "".join(random.choice("ab/") for _ in range(random.randint(1, 6))).encode("ascii") for _ in range(300)})
+        blob: bytes = b"".join(name + b"\n" for name in names)
+        for prefix in [b"", b"a", b"ab", b"b/", b"/", b"bbbbbbb", b"c", b"0"]:
+            self.assertEqual([name for name in names if name.startswith(prefix)], _find_prefix(blob, prefix), prefix)
+        self.assertEqual([], _find_prefix(b"", b"a"))
+
+
+class CompletionTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        environ_patch = patch.dict(os.environ, dict(ISOLATED_GIT_ENV, **GIT_IDENTITY_ENV))
+        environ_patch.start()
+        self.addCleanup(environ_patch.stop)
+        self.temp_dir: str = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        os.environ.pop("WEBGIT_NO_CACHE")
+        os.environ["XDG_CACHE_HOME"] = os.path.join(self.temp_dir, "cache")
+        self.repo_dir: str = os.path.join(self.temp_dir, "repository")
+        os.makedirs(self.repo_dir)
+        git(self.repo_dir, "init", "-q", "-b", "main")
+        make_commits(self.repo_dir, 1, 1)
+        git(self.repo_dir, "remote", "add", "upstream", "git@github.com:org/project.git")
+        git(self.repo_dir, "remote", "add", "origin", "git@github.com:user/project.git")
+        for ref in ["refs/heads/feature/one", "refs/heads/fix", "refs/tags/v1.0", "refs/remotes/upstream/main",
+                    "refs/remotes/upstream/feature/two", "refs/pull/1/head"]:
+            git(self.repo_dir, "update-ref", ref, "HEAD")
+        git(self.repo_dir, "symbolic-ref", "refs/remotes/upstream/HEAD", "refs/remotes/upstream/main")
+        git(self.repo_dir, "pack-refs", "--all")
+        git(self.repo_dir, "update-ref", "refs/heads/feature/three", "HEAD")
+        self.common_dir: str = os.path.join(self.repo_dir, ".git")
+        self.make_old()
+
+    def make_old(self):
+        for directory, _, _ in os.walk(os.path.join(self.common_dir, "refs")):
+            os.utime(directory, (OLD_MTIME, OLD_MTIME))
+        os.utime(os.path.join(self.common_dir, "packed-refs"), (OLD_MTIME, OLD_MTIME))
+
+    def complete(self, line: str) -> List[str]:
+        return complete(line.split(" "), self.repo_dir)
+
+    def test_refs(self):
+        self.assertEqual(["feature/one", "feature/three", "fix", "main", "v1.0", "upstream/feature/two",
+                          "upstream/main"], self.complete("tree "))
+        self.assertEqual(["feature/one", "feature/three"], self.complete("tree fe"))
+        self.assertEqual(["upstream/feature/two", "upstream/main"], self.complete("-a pr up"))
+        self.assertEqual(["main"], self.complete("pr upstream/feature/two m"))
+        self.assertEqual([], self.complete("pr a b "))
+        self.assertEqual(["main...feature/one", "main...feature/three"], self.complete("compare main...fe"))
+        self.assertEqual(["v1.0"], self.complete("compare v"))
+        self.assertEqual(["fix"], complete(["-C", self.repo_dir, "tree", "fi"], "/nonexistent"))
+
+    def test_commands_and_options(self):
+        self.assertEqual(["issue", "issues"], self.complete("iss"))
+        self.assertEqual(["--path", "--port", "--print-address"], self.complete("tree --p"))
+        self.assertEqual(["origin", "upstream"], self.complete("tree -r "))
+        self.assertEqual(["upstream"], self.complete("-C {} --remote u".format(self.repo_dir)))
+        self.assertEqual(["markdown"], self.complete("annotate --format m"))
+        self.assertEqual([], self.complete("-C "))
+        self.assertEqual(["zsh"], self.complete("completion z"))
+
+    def test_options_match_argparse(self):
+        parser = command_line._create_argument_parser()
+        self.assertEqual(
+            sorted(option for action in parser._actions for option in action.option_strings), sorted(COMPLETION_OPTIONS))
+
+    def test_incremental_update(self):
+        self.assertEqual(7, len(get_refs_index(self.common_dir)))
+        with patch.object(completion, "_read_packed_ref_names") as read_packed_mock, \
+                patch.object(completion.os, "scandir") as scandir_mock:
+            self.assertEqual(7, len(get_refs_index(self.common_dir)))
+        read_packed_mock.assert_not_called()
+        scandir_mock.assert_not_called()
+
+        git(self.repo_dir, "update-ref", "refs/heads/feature/four", "HEAD")
+        git(self.repo_dir, "update-ref", "-d", "refs/heads/feature/three")
+        feature_dir: str = os.path.join(self.common_dir, "refs", "heads", "feature")
+        os.utime(feature_dir, (OLD_MTIME + 1, OLD_MTIME + 1))
+        listed: List[str] = []
+        scandir = os.scandir
+        with patch.object(completion.os, "scandir", lambda path: listed.append(path) or scandir(path)):
+            self.assertEqual(["feature/four", "feature/one"], get_refs_index(self.common_dir).find("heads", "feature/"))
+        self.assertEqual([feature_dir], [path for path in listed if path.startswith(self.common_dir)])
+
+    def test_run_program(self):
+        stdout: io.StringIO = io.StringIO()
+        with patch("sys.stdout", stdout), patch("os.getcwd", return_value=self.repo_dir):
+            command_line.run_program(["__complete", "tree", "v"])
+            command_line.run_program(["__complete", "-C"])
+            command_line.run_program(["completion", "bash"])
+        self.assertTrue(stdout.getvalue().startswith("v1.0\n-C\n_webgit() {"))
+        with patch("sys.stderr", io.StringIO()), self.assertRaises(SystemExit):
+            command_line.run_program(["completion", "powershell"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from typing import List
+
+from unittest.mock import patch
+from webgit.webgit_util.git_config import (
+    find_git_directories,
+    get_remote_urls,
+    read_git_config,
+    GitConfigException,
+    GitDirectories,
+)
+from webgit.webgit_util.repository import (
+    get_remotes,
+    get_remotes_from_git_remote_output,
+    get_repos_from_git_remote_output,
+    GitRemoteRepo,
+    GitRemotes,
+)
+
+ISOLATED_GIT_ENV: dict = {
+    "GIT_CONFIG_NOSYSTEM": "1",
+    "GIT_CONFIG_GLOBAL": os.devnull,
+    "WEBGIT_NO_CACHE": "1",
+}
+
+
+def write_file(path: str, text: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def make_git_dir(path: str, config_text: str) -> str:
+    git_dir: str = os.path.join(path, ".git")
+    os.makedirs(os.path.join(git_dir, "objects"))
+    os.makedirs(os.path.join(git_dir, "refs", "heads"))
+    write_file(os.path.join(git_dir, "HEAD"), "ref: refs/heads/main\n")
+    write_file(os.path.join(git_dir, "config"), config_text)
+    return git_dir
+
+
+@patch.dict(os.environ, ISOLATED_GIT_ENV)
+class GitConfigTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.temp_dir: str = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+
+    def test_parse_syntax(self):
+        git_dir: str = make_git_dir(self.temp_dir, "\n".join([
+            "[core]",
+            "\tbare = false ; comment",
+            "[Remote \"Upstream\"]",
+            "\tURL = \"git@github.com:org/pro;ject.git\"  # comment",
+            "\tfetch = +refs/heads/*:refs/remotes/Upstream/*\\",
+            "",
+            "[branch.main]",
+            "\tremote = origin",
+            "\tflag",
+        ]))
+        config = read_git_config(GitDirectories(work_tree=self.temp_dir, git_dir=git_dir, common_dir=git_dir))
+        self.assertEqual("false", config.get("core.bare"))
+        self.assertEqual("git@github.com:org/pro;ject.git", config.get("remote.Upstream.url"))
+        self.assertEqual("+refs/heads/*:refs/remotes/Upstream/*", config.get("remote.Upstream.fetch"))
+        self.assertIsNone(config.get("remote.upstream.url"))
+        self.assertEqual("origin", config.get("branch.main.remote"))
+        self.assertTrue(config.get_bool("branch.main.flag"))
+        self.assertEqual(["Upstream"], config.subsections("remote"))
+
+    def test_bad_syntax(self):
+        git_dir: str = make_git_dir(self.temp_dir, "[remote \"origin\"\n\turl = x\n")
+        with self.assertRaises(GitConfigException):
+            read_git_config(GitDirectories(work_tree=self.temp_dir, git_dir=git_dir, common_dir=git_dir))
+
+    def test_include_and_instead_of(self):
+        write_file(os.path.join(self.temp_dir, "included.cfg"), "\n".join([
+            "[url \"git@github.com:\"]",
+            "\tinsteadOf = gh:",
+            "[url \"git@github.com:mirror/\"]",
+            "\tpushInsteadOf = https://github.com/org/",
+        ]))
+        make_git_dir(self.temp_dir, "\n".join([
+            "[include]",
+            "\tpath = ../included.cfg",
+            "[remote \"origin\"]",
+            "\turl = gh:user/project.git",
+            "[remote \"upstream\"]",
+            "\turl = https://github.com/org/project.git",
+        ]))
+        config = read_git_config(find_git_directories(self.temp_dir))
+        self.assertEqual([
+            ("origin", "git@github.com:user/project.git", "fetch"),
+            ("origin", "git@github.com:user/project.git", "push"),
+            ("upstream", "https://github.com/org/project.git", "fetch"),
+            ("upstream", "git@github.com:mirror/project.git", "push"),
+        ], get_remote_urls(config))
+
+    def test_include_if_gitdir(self):
+        write_file(os.path.join(self.temp_dir, "work.cfg"), "[remote \"work\"]\n\turl = git@gitlab.com:work/project\n")
+        make_git_dir(os.path.join(self.temp_dir, "work", "project"), "\n".join([
+            "[includeIf \"gitdir:{}/work/\"]".format(os.path.realpath(self.temp_dir)),
+            "\tpath = {}".format(os.path.join(self.temp_dir, "work.cfg")),
+            "[includeIf \"onbranch:release/\"]",
+            "\tpath = {}".format(os.path.join(self.temp_dir, "missing.cfg")),
+            "[includeIf \"gitdir:other/\"]",
+            "\tpath = {}".format(os.path.join(self.temp_dir, "work.cfg")),
+        ]))
+        config = read_git_config(find_git_directories(os.path.join(self.temp_dir, "work", "project")))
+        self.assertEqual(["git@gitlab.com:work/project"], config.get_all("remote.work.url"))
+
+    def test_worktree_commondir(self):
+        main_git_dir: str = make_git_dir(
+            os.path.join(self.temp_dir, "main"),
+            "[remote \"origin\"]\n\turl = https://github.com/apache/kafka.git\n",
+        )
+        worktree_git_dir: str = os.path.join(main_git_dir, "worktrees", "feature")
+        write_file(os.path.join(worktree_git_dir, "commondir"), "../..\n")
+        write_file(os.path.join(worktree_git_dir, "HEAD"), "ref: refs/heads/feature\n")
+        write_file(os.path.join(self.temp_dir, "feature", ".git"), "gitdir: {}\n".format(worktree_git_dir))
+        os.makedirs(os.path.join(self.temp_dir, "feature", "src"))
+
+        git_directories = find_git_directories(os.path.join(self.temp_dir, "feature", "src"))
+        self.assertEqual(os.path.join(self.temp_dir, "feature"), git_directories.work_tree)
+        self.assertEqual(worktree_git_dir, git_directories.git_dir)
+        self.assertEqual(main_git_dir, git_directories.common_dir)
+
+        remotes: GitRemotes = get_remotes(os.path.join(self.temp_dir, "feature"))
+        self.assertEqual(["origin"], [r.name for r in remotes])
+        self.assertEqual("github.com/apache/kafka", remotes[0].url)
+
+    def test_no_repository(self):
+        self.assertIsNone(find_git_directories(os.path.join(self.temp_dir, "missing")))
+
+    @patch.dict(os.environ, {"GIT_DIR": "/tmp/elsewhere"})
+    def test_unsupported_environment(self):
+        with self.assertRaises(GitConfigException):
+            find_git_directories(self.temp_dir)
+
+    @unittest.skipUnless(shutil.which("git"), "git is not installed")
+    def test_matches_git_remote_output(self):
+        repo_dir: str = os.path.join(self.temp_dir, "repo")
+        write_file(os.path.join(self.temp_dir, "rewrites.cfg"), "[url \"https://gitlab.com/\"]\n\tinsteadOf = gl:\n")
+        for command in [
+            ["init", "-q", repo_dir],
+            ["-C", repo_dir, "config", "include.path", os.path.join(self.temp_dir, "rewrites.cfg")],
+            ["-C", repo_dir, "remote", "add", "upstream", "git@github.com:Org/Project.git"],
+            ["-C", repo_dir, "remote", "add", "origin", "gl:user/project"],
+            ["-C", repo_dir, "remote", "set-url", "--add", "--push", "origin", "git@gitlab.com:user/a.git"],
+            ["-C", repo_dir, "remote", "set-url", "--add", "--push", "origin", "git@gitlab.com:user/b.git"],
+        ]:
+            subprocess.run(["git"] + command, check=True)
+
+        remote_output: str = subprocess.run(
+            ["git", "-C", repo_dir, "remote", "-v"], check=True, stdout=subprocess.PIPE, encoding="utf-8").stdout
+        git_repos: List[GitRemoteRepo] = get_repos_from_git_remote_output(remote_output)
+        self.assertEqual(get_remotes_from_git_remote_output(remote_output), get_remotes(repo_dir))
+        self.assertEqual(GitRemotes.from_remote_repos(git_repos), get_remotes(repo_dir))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,193 @@
+import fcntl
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from typing import List
+
+from unittest.mock import patch
+from webgit.tests.test_git_config import ISOLATED_GIT_ENV
+from webgit.tests.test_objects import git, GIT_IDENTITY_ENV, make_commits
+from webgit.webgit_util import command_line
+from webgit.webgit_util import hooks
+from webgit.webgit_util.cache import FileCache
+from webgit.webgit_util.constants import PULL_REQUEST_CACHE_NAMESPACE
+from webgit.webgit_util.hooks import (
+    CHAINED_HOOK_SUFFIX,
+    get_warm_targets,
+    HOOK_LOCK_FILE_NAME,
+    HOOK_NAMES,
+    HOOK_PENDING_FILE_NAME,
+    HookException,
+    install_hooks,
+    is_webgit_hook,
+    run_hook,
+    uninstall_hooks,
+)
+
+OLD_MTIME: int = 1000000000
+
+# a hook that records its arguments and input and fails
+CHAINED_HOOK: str = """#!/bin/sh
+echo "$@" > "$0.args"
+cat > "$0.input"
+exit 3
+"""
+
+
+class HooksTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        environ_patch = patch.dict(os.environ, dict(ISOLATED_GIT_ENV, **GIT_IDENTITY_ENV))
+        environ_patch.start()
+        self.addCleanup(environ_patch.stop)
+        self.temp_dir: str = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        os.environ.pop("WEBGIT_NO_CACHE")
+        os.environ["XDG_CACHE_HOME"] = os.path.join(self.temp_dir, "cache")
+        self.repo_dir: str = os.path.join(self.temp_dir, "repository")
+        os.makedirs(self.repo_dir)
+        git(self.repo_dir, "init", "-q", "-b", "main")
+        make_commits(self.repo_dir, 1, 1)
+        git(self.repo_dir, "remote", "add", "origin", "git@github.com:org/project.git")
+        self.hooks_dir: str = os.path.join(self.repo_dir, ".git", "hooks")
+
+    def run_hook_script(self, name: str, args: List[str], input_text: str = "") -> int:
+        return subprocess.run(
+            [os.path.join(self.hooks_dir, name)] + args, input=input_text, encoding="utf-8", cwd=self.repo_dir,
+        ).returncode
+
+    def test_install_chains_existing_hooks(self):
+        for name in ["post-checkout", "reference-transaction"]:
+            with open(os.path.join(self.hooks_dir, name), "w") as f:
+                f.write(CHAINED_HOOK)
+            os.chmod(os.path.join(self.hooks_dir, name), 0o755)
+        messages: List[str] = install_hooks(self.repo_dir, ["true"])
+        self.assertEqual(4, len(messages))
+        self.assertTrue(messages[0].endswith("post-checkout: installed, running the existing hook first"))
+        self.assertTrue(all(is_webgit_hook(os.path.join(self.hooks_dir, name)) for name in HOOK_NAMES))
+        self.assertTrue(install_hooks(self.repo_dir, ["true"])[0].endswith(": updated"))
+
+        chained_path: str = os.path.join(self.hooks_dir, "reference-transaction" + CHAINED_HOOK_SUFFIX)
+        self.assertEqual(3, self.run_hook_script("reference-transaction", ["committed"], "0 1 refs/heads/main\n"))
+        with open(chained_path + ".args") as f:
+            self.assertEqual("committed\n", f.read())
+        with open(chained_path + ".input") as f:
+            self.assertEqual("0 1 refs/heads/main\n", f.read())
+        self.assertEqual(0, self.run_hook_script("post-merge", ["0"]))
+
+        self.assertEqual(4, len(uninstall_hooks(self.repo_dir)))
+        with open(os.path.join(self.hooks_dir, "post-checkout")) as f:
+            self.assertEqual(CHAINED_HOOK, f.read())
+        self.assertFalse(os.path.exists(os.path.join(self.hooks_dir, "post-merge")))
+        self.assertEqual([], uninstall_hooks(self.repo_dir))
+
+    def test_hooks_path(self):
+        git(self.repo_dir, "config", "core.hooksPath", ".git/own-hooks")
+        install_hooks(self.repo_dir, ["true"])
+        self.assertTrue(is_webgit_hook(os.path.join(self.repo_dir, ".git", "own-hooks", "post-rewrite")))
+        self.assertFalse(os.path.exists(os.path.join(self.hooks_dir, "post-rewrite")))
+
+    def test_shared_hooks_path(self):
+        shared_hooks_dir: str = os.path.join(self.temp_dir, "githooks")
+        git(self.repo_dir, "config", "core.hooksPath", shared_hooks_dir)
+        self.assertRaises(HookException, install_hooks, self.repo_dir, ["true"])
+        self.assertFalse(os.path.exists(shared_hooks_dir))
+
+        warnings: List[str] = []
+        install_hooks(self.repo_dir, ["true"], shared=True, warn=warnings.append)
+        self.assertTrue(is_webgit_hook(os.path.join(shared_hooks_dir, "post-rewrite")))
+        self.assertEqual(1, len(warnings))
+        self.assertRaises(HookException, uninstall_hooks, self.repo_dir)
+        self.assertEqual(4, len(uninstall_hooks(self.repo_dir, shared=True)))
+
+        # a hooks directory in the work tree is also outside the git directory
+        git(self.repo_dir, "config", "core.hooksPath", "tools/hooks")
+        self.assertRaises(HookException, install_hooks, self.repo_dir, ["true"])
+        stderr: io.StringIO = io.StringIO()
+        with patch("sys.stdout", io.StringIO()), patch("sys.stderr", stderr), \
+                patch.object(hooks, "get_webgit_command", return_value=["true"]):
+            command_line.run_program(["install-hooks", "--shared-hooks", "-C", self.repo_dir])
+        self.assertIn("webgit: warning: changing the hooks in", stderr.getvalue())
+        self.assertTrue(is_webgit_hook(os.path.join(self.repo_dir, "tools", "hooks", "post-rewrite")))
+
+    def read_pending(self) -> List[str]:
+        with open(os.path.join(self.repo_dir, ".git", HOOK_PENDING_FILE_NAME)) as f:
+            return f.read().splitlines()
+
+    def test_reports(self):
+        install_hooks(self.repo_dir, ["true"])
+        self.run_hook_script("post-checkout", ["a", "b", "0"])
+        self.run_hook_script("reference-transaction", ["prepared"], "0 1 refs/heads/main\n")
+        self.assertFalse(os.path.exists(os.path.join(self.repo_dir, ".git", HOOK_PENDING_FILE_NAME)))
+        self.run_hook_script("post-checkout", ["a", "b", "1"])
+        self.run_hook_script("reference-transaction", ["committed"], "0 1 refs/heads/main\n0 1 HEAD\n")
+        self.run_hook_script("post-rewrite", ["rebase"], "1 2\n")
+        self.assertEqual(["# post-checkout a b 1", "# reference-transaction committed", "0 1 refs/heads/main",
+                          "0 1 HEAD", "# post-rewrite rebase"], self.read_pending())
+        # reports a warm-up did not take for a minute are dropped
+        os.utime(os.path.join(self.repo_dir, ".git", HOOK_PENDING_FILE_NAME), (OLD_MTIME, OLD_MTIME))
+        self.run_hook_script("post-merge", ["0"])
+        self.assertEqual(["# post-merge 0"], self.read_pending())
+
+    def test_warm_targets(self):
+        self.assertEqual({"repository"}, get_warm_targets(["# post-checkout a b 1\n", "# post-rewrite amend\n"]))
+        self.assertEqual({"refs", "pull_requests"}, get_warm_targets([
+            "# reference-transaction committed\n", "0 1 refs/remotes/origin/main\n", "0 1 refs/pull/7/head\n",
+            "0 1 refs/notes/commits\n"]))
+        self.assertEqual({"repository", "refs"}, get_warm_targets(
+            ["# reference-transaction committed\n", "0 1 HEAD\n", "0 1 refs/heads/main\n"]))
+        self.assertEqual(set(), get_warm_targets(["# reference-transaction committed\n"]))
+
+    def age_repository(self):
+        for directory, _, file_names in os.walk(os.path.join(self.repo_dir, ".git")):
+            for name in file_names + ["."]:
+                os.utime(os.path.join(directory, name), (OLD_MTIME, OLD_MTIME))
+
+    def test_run_hook(self):
+        git(self.repo_dir, "update-ref", "refs/pull/7/head", "HEAD")
+        install_hooks(self.repo_dir, ["true"])
+        self.run_hook_script("post-merge", ["0"])
+        self.age_repository()
+        common_dir: str = os.path.join(self.repo_dir, ".git")
+        with patch.object(hooks, "HOOK_SETTLE_SECONDS", 0), patch("os.getcwd", return_value=self.repo_dir):
+            run_hook()
+            self.assertEqual(1, len(os.listdir(os.path.join(os.environ["XDG_CACHE_HOME"], "webgit", "repositories"))))
+            self.assertIsNone(FileCache(PULL_REQUEST_CACHE_NAMESPACE).load(common_dir))
+            self.run_hook_script("reference-transaction", ["committed"], "0 1 refs/pull/7/head\n")
+            run_hook()
+        self.assertIn("refs/pull/7/head", FileCache(PULL_REQUEST_CACHE_NAMESPACE).load(common_dir)["loose"])
+        self.assertFalse(os.path.exists(os.path.join(common_dir, HOOK_PENDING_FILE_NAME)))
+
+    def test_run_hook_while_warming(self):
+        install_hooks(self.repo_dir, ["true"])
+        warmed: List[set] = []
+        with patch.object(hooks, "HOOK_SETTLE_SECONDS", 0), patch("os.getcwd", return_value=self.repo_dir), \
+                patch.object(hooks, "warm_caches", lambda _, targets: warmed.append(targets)):
+            self.run_hook_script("post-merge", ["0"])
+            with open(os.path.join(self.repo_dir, ".git", HOOK_LOCK_FILE_NAME), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                run_hook()
+                self.assertEqual([], warmed)
+                self.run_hook_script("reference-transaction", ["committed"], "0 1 refs/tags/v1\n")
+            run_hook()
+            self.run_hook_script("reference-transaction", ["committed"], "0 1 refs/pull/1/head\n")
+            run_hook()
+        self.assertEqual([{"repository", "refs"}, {"pull_requests"}], warmed)
+
+    def test_run_program(self):
+        stdout: io.StringIO = io.StringIO()
+        with patch("sys.stdout", stdout), patch.object(hooks, "get_webgit_command", return_value=["true"]):
+            command_line.run_program(["install-hooks", "-C", self.repo_dir])
+            command_line.run_program(["uninstall-hooks", "-C", self.repo_dir])
+        self.assertEqual(8, len(stdout.getvalue().splitlines()))
+        with patch("sys.stderr", io.StringIO()), self.assertRaises(SystemExit):
+            command_line.run_program(["install-hooks", "-C", self.temp_dir])
+        with patch("os.getcwd", return_value=self.temp_dir):
+            command_line.run_program(["__hook"])  # never fails, whatever the repository
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from unittest.mock import patch
+from webgit.tests.test_git_config import write_file
+from webgit.webgit_util.hosts import (
+    _load_host_registry,
+    get_host_registry,
+    get_web_host,
+    HostConfigException,
+    HostRegistry,
+    parse_hosts,
+)
+from webgit.webgit_util.repository import BranchInfo, get_remotes_from_git_remote_output
+from webgit.webgit_util.resolver import CommandException, RepoState, resolve
+
+HOSTS_TEXT: str = "\n".join([
+    "# self-hosted forges",
+    "git.example.com    gitea",
+    ".scm.example.com   bitbucket   # every host under scm.example.com",
+    "*.eu.scm.example.com gitlab",
+    "",
+])
+
+REMOTE_OUTPUT_TEXT: str = "\n".join([
+    "origin	git@git.example.com:user/project.git (fetch)",
+    "origin	git@git.example.com:user/project.git (push)",
+    "upstream	https://git.example.com/org/project.git (fetch)",
+    "upstream	https://git.example.com/org/project.git (push)",
+    "bitbucket	https://code.scm.example.com/scm/proj/project.git (fetch)",
+    "bitbucket	https://code.scm.example.com/scm/proj/project.git (push)",
+])
+
+
+class HostRegistryTests(unittest.TestCase):
+
+    def test_get_dialect(self):
+        registry: HostRegistry = parse_hosts(HOSTS_TEXT)
+        self.assertEqual("gitea", registry.get_dialect("git.example.com"))
+        self.assertEqual("bitbucket", registry.get_dialect("code.scm.example.com"))
+        self.assertEqual("bitbucket", registry.get_dialect("a.b.scm.example.com"))
+        self.assertEqual("gitlab", registry.get_dialect("code.eu.scm.example.com"))
+        self.assertIsNone(registry.get_dialect("scm.example.com"))
+        self.assertIsNone(registry.get_dialect("other.example.com"))
+        self.assertIsNone(registry.get_dialect("com"))
+
+    def test_parse_errors(self):
+        with self.assertRaisesRegex(HostConfigException, r"^hosts:2: expected a hostname"):
+            parse_hosts("git.example.com gitea\ngit.example.org\n")
+        with self.assertRaisesRegex(HostConfigException, "got: git.example.org sourcehut"):
+            parse_hosts("git.example.org sourcehut")
+
+    def test_get_web_host(self):
+        registry: HostRegistry = parse_hosts("github.example.com gitlab")
+        self.assertEqual("gitlab", get_web_host("github.example.com/org/project", registry))
+        self.assertEqual("gitlab", get_web_host("git@github.example.com/org/project", registry))
+        self.assertEqual("github", get_web_host("github.company.io/org/project", registry))
+        self.assertEqual("", get_web_host("git.example.com/org/project", registry))
+
+
+class HostsFileTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.temp_dir: str = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.hosts_path: str = os.path.join(self.temp_dir, "config", "webgit", "hosts")
+        environ_patch = patch.dict(os.environ, {
+            "XDG_CONFIG_HOME": os.path.join(self.temp_dir, "config"),
+            "XDG_CACHE_HOME": os.path.join(self.temp_dir, "cache"),
+        })
+        environ_patch.start()
+        self.addCleanup(environ_patch.stop)
+        os.environ.pop("WEBGIT_HOSTS_FILE", None)
+        os.environ.pop("WEBGIT_NO_CACHE", None)
+        _load_host_registry.cache_clear()
+        self.addCleanup(_load_host_registry.cache_clear)
+
+    def test_resolve_dialects(self):
+        write_file(self.hosts_path, HOSTS_TEXT)
+        repo_state: RepoState = RepoState(
+            git_repos=get_remotes_from_git_remote_output(REMOTE_OUTPUT_TEXT),
+            branch_info=BranchInfo(from_branch="feature", to_repo="upstream", to_branch="main"),
+        )
+        self.assertEqual("https://git.example.com/org/project/pulls/4501", resolve("4501", repo_state))
+        self.assertEqual("https://git.example.com/org/project/src/v1.0/README.md",
+                         resolve("tree v1.0 README.md", repo_state))
+        self.assertEqual("https://git.example.com/org/project/compare/main...user:feature", resolve("pr", repo_state))
+        self.assertEqual("https://git.example.com/org/project/issues/370", resolve("issues 370", repo_state))
+        with self.assertRaisesRegex(CommandException, "not supported for gitea remotes: my_prs"):
+            resolve("myprs vbro", repo_state)
+
+        self.assertEqual("https://code.scm.example.com/projects/proj/repos/project/pull-requests/4501",
+                         resolve("4501", repo_state, remote="bitbucket"))
+        self.assertEqual("https://code.scm.example.com/projects/proj/repos/project/browse/src?at=main",
+                         resolve("tree main src", repo_state, remote="bitbucket"))
+        with self.assertRaisesRegex(CommandException, "not supported for bitbucket remotes: issues"):
+            resolve("issues", repo_state, remote="bitbucket")
+
+    def test_hosts_file_cache(self):
+        self.assertEqual({}, get_host_registry().exact)
+        write_file(self.hosts_path, HOSTS_TEXT)
+        os.utime(self.hosts_path, (1, 1))  # old enough to be cached
+        registry: HostRegistry = get_host_registry()
+        self.assertEqual("gitea", registry.get_dialect("git.example.com"))
+        self.assertIs(registry, get_host_registry())
+
+        _load_host_registry.cache_clear()
+        with patch("webgit.webgit_util.hosts.parse_hosts") as parse_hosts_mock:
+            cached_registry: HostRegistry = get_host_registry()
+        parse_hosts_mock.assert_not_called()
+        self.assertEqual(registry.exact, cached_registry.exact)
+        self.assertEqual("bitbucket", cached_registry.get_dialect("code.scm.example.com"))
+
+        write_file(self.hosts_path, "git.example.com gitlab\n")
+        self.assertEqual("gitlab", get_host_registry().get_dialect("git.example.com"))
+
+    def test_hosts_file_env(self):
+        hosts_path: str = os.path.join(self.temp_dir, "hosts")
+        write_file(hosts_path, "git.example.com github\n")
+        with patch.dict(os.environ, {"WEBGIT_HOSTS_FILE": hosts_path}):
+            self.assertEqual("github", get_web_host("git.example.com/org/project"))
+        write_file(hosts_path, "git.example.com\n")
+        with patch.dict(os.environ, {"WEBGIT_HOSTS_FILE": hosts_path}):
+            with self.assertRaisesRegex(HostConfigException, "hosts:1:"):
+                get_web_host("git.example.com/org/project")
+
+
+if __name__ == '__main__':
+    unittest.main()
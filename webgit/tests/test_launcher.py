@@ -0,0 +1,41 @@
+import os
+import unittest
+
+from unittest.mock import patch
+from webgit.webgit_util import launcher
+from webgit.webgit_util.launcher import get_launch_argv, LauncherException
+
+URLS = ["https://github.com/apache/kafka/pull/4501", "https://github.com/apache/kafka/issues/370"]
+
+
+def find_executable(name: str) -> str:
+    return None if name == "missing-browser" else "/usr/bin/" + name
+
+
+@patch.object(launcher, "find_executable", find_executable)
+class LauncherTests(unittest.TestCase):
+
+    @patch.dict(os.environ, {"BROWSER": "missing-browser" + os.pathsep + "firefox --new-tab"})
+    def test_browser(self):
+        self.assertEqual(["firefox", "--new-tab"] + URLS, get_launch_argv(URLS))
+
+    @patch.dict(os.environ, {"BROWSER": "lynx %s"})
+    def test_browser_template(self):
+        self.assertEqual(["lynx", URLS[0]], get_launch_argv(URLS[:1]))
+        self.assertEqual(["sh", "-c", 'for url; do lynx "$url"; done', "webgit"] + URLS, get_launch_argv(URLS))
+
+    @patch.dict(os.environ, {"BROWSER": ""})
+    def test_platform_default(self):
+        with patch("sys.platform", "darwin"):
+            self.assertEqual(["open"] + URLS, get_launch_argv(URLS))
+        with patch("sys.platform", "linux"):
+            self.assertEqual(["xdg-open", URLS[0]], get_launch_argv(URLS[:1]))
+            self.assertEqual(
+                ["sh", "-c", 'for url; do xdg-open "$url"; done', "webgit"] + URLS, get_launch_argv(URLS))
+            with patch.object(launcher, "find_executable", lambda name: None):
+                with self.assertRaises(LauncherException):
+                    get_launch_argv(URLS)
+
+
+if __name__ == '__main__':
+    unittest.main()
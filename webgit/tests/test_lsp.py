@@ -0,0 +1,224 @@
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from typing import Any, Dict, List
+
+from unittest.mock import patch
+from webgit.tests.test_git_config import ISOLATED_GIT_ENV
+from webgit.tests.test_objects import git, GIT_IDENTITY_ENV, make_commits
+from webgit.webgit_util import command_line
+from webgit.webgit_util.lsp import (
+    get_line_range,
+    INVALID_PARAMS,
+    METHOD_NOT_FOUND,
+    PARSE_ERROR,
+    PermalinkServer,
+    read_message,
+    REQUEST_FAILED,
+    write_message,
+)
+from webgit.webgit_util.permalink import format_line_anchor, get_repository_path
+from webgit.webgit_util.resolver import CommandException
+from webgit.webgit_util.watch import InotifyWatcher, StatWatcher
+
+
+def frame(*messages: Any) -> io.BytesIO:
+    output: io.BytesIO = io.BytesIO()
+    for message in messages:
+        if isinstance(message, bytes):
+            output.write(b"Content-Length: " + str(len(message)).encode() + b"\r\n\r\n" + message)
+        else:
+            write_message(output, message)
+    output.seek(0)
+    return output
+
+
+def read_responses(output: io.BytesIO) -> Dict[Any, Dict[str, Any]]:
+    output.seek(0)
+    responses: Dict[Any, Dict[str, Any]] = {}
+    while True:
+        body = read_message(output)
+        if body is None:
+            return responses
+        response: Dict[str, Any] = json.loads(body)
+        responses[response["id"]] = response
+
+
+class PermalinkTests(unittest.TestCase):
+
+    def test_line_anchor(self):
+        self.assertEqual("#L10-L20", format_line_anchor("github", 10, 20))
+        self.assertEqual("#L10", format_line_anchor("github", 10, 10))
+        self.assertEqual("#L10-20", format_line_anchor("gitlab", 10, 20))
+        self.assertEqual("#10-20", format_line_anchor("bitbucket", 10, 20))
+        self.assertEqual("", format_line_anchor("github", None))
+        self.assertRaises(CommandException, format_line_anchor, "github", 20, 10)
+        self.assertRaises(CommandException, format_line_anchor, "github", 0)
+
+    def test_line_range(self):
+        self.assertEqual((10, 20), get_line_range({"startLine": 10, "endLine": 20}))
+        self.assertEqual((None, None), get_line_range({}))
+        selection: Dict[str, Any] = {"start": {"line": 9, "character": 4}, "end": {"line": 20, "character": 0}}
+        self.assertEqual((10, 20), get_line_range({"selection": selection}))
+        selection["end"]["character"] = 1
+        self.assertEqual((10, 21), get_line_range({"selection": selection}))
+        self.assertEqual((10, 10), get_line_range({"selection": {"start": {"line": 9, "character": 0}}}))
+
+    def test_repository_path(self):
+        self.assertEqual("src/a.py", get_repository_path("/work", "/work/src/a.py"))
+        self.assertEqual("", get_repository_path("/work", "/work"))
+        self.assertRaises(CommandException, get_repository_path, "/work", "/other/a.py")
+
+
+class WatcherTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.temp_dir: str = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+
+    def check_watcher(self, watcher):
+        self.addCleanup(watcher.close)
+        config_path: str = os.path.join(self.temp_dir, "config")
+        ref_path: str = os.path.join(self.temp_dir, "refs", "heads", "feature", "x")
+        with open(config_path, "w") as f:
+            f.write("a\n")
+        watcher.watch("repository", [config_path, ref_path])
+        watcher.watch("other", [os.path.join(self.temp_dir, "other")])
+        self.assertEqual(set(), watcher.poll())
+        with open(os.path.join(self.temp_dir, "config.lock"), "w") as f:
+            f.write("bb\n")
+        os.replace(os.path.join(self.temp_dir, "config.lock"), config_path)
+        self.assertEqual({"repository"}, watcher.poll())
+        watcher.watch("repository", [config_path, ref_path])
+        os.makedirs(os.path.dirname(ref_path))
+        with open(ref_path, "w") as f:
+            f.write("0" * 40 + "\n")
+        self.assertEqual({"repository"}, watcher.poll())
+        watcher.unwatch("repository")
+        os.unlink(config_path)
+        self.assertEqual(set(), watcher.poll())
+
+    def test_inotify_watcher(self):
+        if not sys.platform.startswith("linux"):
+            self.skipTest("inotify is only on Linux")
+        self.check_watcher(InotifyWatcher())
+
+    def test_stat_watcher(self):
+        self.check_watcher(StatWatcher())
+
+
+class PermalinkServerTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        environ_patch = patch.dict(os.environ, dict(ISOLATED_GIT_ENV, **GIT_IDENTITY_ENV))
+        environ_patch.start()
+        self.addCleanup(environ_patch.stop)
+        self.temp_dir: str = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.repo_dir: str = os.path.join(self.temp_dir, "kafka")
+        os.makedirs(self.repo_dir)
+        git(self.repo_dir, "init", "-q", "-b", "main")
+        make_commits(self.repo_dir, 1, 2)
+        git(self.repo_dir, "remote", "add", "upstream", "git@github.com:apache/kafka.git")
+        git(self.repo_dir, "remote", "add", "origin", "git@gitlab.com:me/kafka.git")
+        self.server: PermalinkServer = PermalinkServer()
+        self.addCleanup(self.server.watcher.close)
+
+    def request(self, method: str, params: Dict[str, Any], load: bool = True) -> Dict[str, Any]:
+        return self.server.handle_message({"jsonrpc": "2.0", "id": 1, "method": method, "params": params}, load)
+
+    def test_permalink(self):
+        commit: str = git(self.repo_dir, "rev-parse", "HEAD").strip()
+        file_path: str = os.path.join(self.repo_dir, "file2.txt")
+        self.assertEqual({
+            "url": "https://github.com/apache/kafka/blob/{}/file2.txt#L1-L2".format(commit),
+            "commit": commit,
+            "path": "file2.txt",
+        }, self.request("webgit/permalink", {"file": file_path, "startLine": 1, "endLine": 2})["result"])
+        self.assertEqual(
+            "https://gitlab.com/me/kafka/-/blob/{}/file2.txt#L2".format(commit),
+            self.request("workspace/executeCommand", {"command": "webgit.permalink", "arguments": [
+                {"file": "file://" + file_path, "remote": "origin", "selection": {"start": {"line": 1}}}]},
+            )["result"]["url"])
+
+        # a new commit is picked up from the watched branch ref, without reading the repository on every request
+        make_commits(self.repo_dir, 3, 1)
+        self.assertRaises(Exception, self.request, "webgit/permalink", {"file": file_path}, False)
+        new_commit: str = git(self.repo_dir, "rev-parse", "HEAD").strip()
+        self.assertEqual(new_commit, self.request("webgit/permalink", {"file": file_path})["result"]["commit"])
+        self.assertEqual(new_commit, self.request("webgit/permalink", {"file": file_path}, False)["result"]["commit"])
+        git(self.repo_dir, "checkout", "-q", "-b", "feature", "HEAD~1")
+        self.assertEqual(commit, self.request("webgit/permalink", {"file": file_path})["result"]["commit"])
+
+        stats: Dict[str, Any] = self.request("webgit/stats", {})["result"]
+        self.assertEqual(5, stats["requests"])
+        self.assertEqual(2, stats["refreshes"])
+
+    def test_errors(self):
+        self.assertEqual(INVALID_PARAMS, self.request("webgit/permalink", {})["error"]["code"])
+        self.assertEqual(INVALID_PARAMS, self.request("webgit/permalink", {
+            "file": os.path.join(self.repo_dir, "a"), "startLine": "1"})["error"]["code"])
+        self.assertEqual(REQUEST_FAILED, self.request("webgit/permalink", {
+            "file": os.path.join(self.temp_dir, "a")})["error"]["code"])
+        untracked_path: str = os.path.join(self.repo_dir, "new.txt")
+        open(untracked_path, "w").close()
+        error: Dict[str, Any] = self.request("webgit/permalink", {"file": untracked_path})["error"]
+        self.assertEqual(REQUEST_FAILED, error["code"])
+        self.assertTrue(error["message"].startswith("new.txt is not in the commit at HEAD"))
+        self.assertIn("/tree/", self.request("webgit/permalink", {"file": self.repo_dir + "/"})["result"]["url"])
+        self.assertEqual(METHOD_NOT_FOUND, self.request("textDocument/hover", {})["error"]["code"])
+        self.assertIsNone(self.server.handle_message({"jsonrpc": "2.0", "method": "initialized"}))
+
+        git(self.repo_dir, "remote", "remove", "upstream")
+        git(self.repo_dir, "remote", "remove", "origin")
+        self.assertEqual(REQUEST_FAILED, self.request("webgit/permalink", {
+            "file": os.path.join(self.repo_dir, "a")})["error"]["code"])
+
+    def test_serve(self):
+        output: io.BytesIO = io.BytesIO()
+        status: int = self.server.serve(frame(
+            {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {"rootUri": "file://" + self.repo_dir}},
+            {"jsonrpc": "2.0", "method": "initialized", "params": {}},
+            {"jsonrpc": "2.0", "id": 2, "method": "webgit/permalink", "params": {"file": "file1.txt", "startLine": 1}},
+            b"{not json",
+            {"jsonrpc": "2.0", "id": 3, "method": "shutdown"},
+            {"jsonrpc": "2.0", "method": "exit"},
+        ), output)
+        self.assertEqual(0, status)
+        responses: Dict[Any, Dict[str, Any]] = read_responses(output)
+        self.assertEqual(
+            ["webgit.permalink"], responses[1]["result"]["capabilities"]["executeCommandProvider"]["commands"])
+        self.assertTrue(responses[2]["result"]["url"].endswith("/file1.txt#L1"))
+        self.assertEqual(PARSE_ERROR, responses[None]["error"]["code"])
+        self.assertIsNone(responses[3]["result"])
+
+    def test_malformed_content_length(self):
+        input_stream: io.BytesIO = frame({"jsonrpc": "2.0", "id": 2, "method": "shutdown"})
+        output: io.BytesIO = io.BytesIO()
+        status: int = self.server.serve(io.BytesIO(
+            b"Content-Length: 1x\r\n\r\n" + json.dumps({"jsonrpc": "2.0", "id": 1, "method": "shutdown"}).encode()
+            + input_stream.getvalue()), output)
+        self.assertEqual(0, status)
+        responses: Dict[Any, Dict[str, Any]] = read_responses(output)
+        self.assertEqual(PARSE_ERROR, responses[None]["error"]["code"])
+        self.assertEqual("Invalid Content-Length: 1x", responses[None]["error"]["message"])
+        self.assertNotIn(1, responses)  # its body could not be told apart from the next headers
+        self.assertIsNone(responses[2]["result"])
+
+    def test_run_program(self):
+        requests: List[Dict[str, Any]] = [
+            {"jsonrpc": "2.0", "id": 1, "method": "webgit/permalink", "params": {"file": "file1.txt"}}]
+        stdout: io.TextIOWrapper = io.TextIOWrapper(io.BytesIO())
+        with patch("sys.stdin", io.TextIOWrapper(frame(*requests))), patch("sys.stdout", stdout), \
+                self.assertRaises(SystemExit):
+            command_line.run_program(["lsp", "-C", self.repo_dir, "-r", "origin"])  # no shutdown before the end
+        url: str = read_responses(stdout.buffer)[1]["result"]["url"]
+        self.assertTrue(url.startswith("https://gitlab.com/me/kafka/-/blob/"))
+
+
+if __name__ == '__main__':
+    unittest.main()
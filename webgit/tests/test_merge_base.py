@@ -0,0 +1,194 @@
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from typing import List
+
+from unittest.mock import patch
+from webgit.tests.test_git_config import ISOLATED_GIT_ENV
+from webgit.tests.test_objects import git, GIT_IDENTITY_ENV
+from webgit.webgit_util import command_line
+from webgit.webgit_util.commit_graph import CommitGraph, read_commit_graph
+from webgit.webgit_util.merge_base import CommitWalker, GENERATION_NUMBER_INFINITY, open_commit_walker
+from webgit.webgit_util.objects import get_object_database, ObjectDatabase
+from webgit.webgit_util.resolver import CommandException, RepoState, resolve
+
+
+def commit(repo_dir: str, message: str, *parents: str) -> str:
+    """A commit of the empty tree with the given parents, without touching the work tree."""
+    tree: str = subprocess.run(
+        ["git", "-C", repo_dir, "mktree"], input="", check=True, stdout=subprocess.PIPE,
+        universal_newlines=True).stdout.strip()
+    argv: List[str] = ["commit-tree", tree, "-m", message]
+    for parent in parents:
+        argv += ["-p", parent]
+    return git(repo_dir, *argv).strip()
+
+
+class CommitWalkerTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        environ_patch = patch.dict(os.environ, dict(ISOLATED_GIT_ENV, **GIT_IDENTITY_ENV))
+        environ_patch.start()
+        self.addCleanup(environ_patch.stop)
+        self.repo_dir: str = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.repo_dir)
+        git(self.repo_dir, "init", "-q", "-b", "main")
+        # root - a1 - a2 - merge - octopus on main, with b1 - b2 on a side branch and a criss-cross between x and y
+        self.root: str = commit(self.repo_dir, "root")
+        self.a1: str = commit(self.repo_dir, "a1", self.root)
+        self.a2: str = commit(self.repo_dir, "a2", self.a1)
+        self.b1: str = commit(self.repo_dir, "b1", self.a1)
+        self.b2: str = commit(self.repo_dir, "b2", self.b1)
+        self.merge: str = commit(self.repo_dir, "merge", self.a2, self.b2)
+        self.c1: str = commit(self.repo_dir, "c1", self.root)
+        self.octopus: str = commit(self.repo_dir, "octopus", self.merge, self.c1, self.b1)
+        self.x: str = commit(self.repo_dir, "x", self.a2, self.b2)
+        self.y: str = commit(self.repo_dir, "y", self.b2, self.a2)
+        self.unrelated: str = commit(self.repo_dir, "unrelated")
+        for name, hex_name in [("main", self.octopus), ("x", self.x), ("y", self.y), ("unrelated", self.unrelated)]:
+            git(self.repo_dir, "update-ref", "refs/heads/" + name, hex_name)
+        self.object_database: ObjectDatabase = get_object_database(self.repo_dir)
+        self.addCleanup(self.object_database.close)
+
+    def check_walker(self, walker: CommitWalker):
+        self.addCleanup(walker.close)
+        self.assertEqual([self.a1], walker.merge_bases(self.a2, self.b2))
+        self.assertEqual([self.a2], walker.merge_bases(self.a2, self.merge))
+        self.assertEqual([self.root], walker.merge_bases(self.c1, self.b2))
+        self.assertEqual([self.x], walker.merge_bases(self.x, self.x))
+        self.assertEqual(sorted([self.a2, self.b2]), sorted(walker.merge_bases(self.x, self.y)))
+        self.assertEqual([], walker.merge_bases(self.unrelated, self.octopus))
+        self.assertTrue(walker.is_ancestor(self.c1, self.octopus))
+        self.assertTrue(walker.is_ancestor(self.b1, self.octopus))
+        self.assertFalse(walker.is_ancestor(self.octopus, self.c1))
+        self.assertFalse(walker.is_ancestor(self.x, self.y))
+        self.assertFalse(walker.is_ancestor(self.unrelated, self.octopus))
+
+    def test_objects(self):
+        walker: CommitWalker = open_commit_walker(self.object_database)
+        self.assertIsNone(walker.commit_graph)
+        self.check_walker(walker)
+
+    def test_commit_graph(self):
+        git(self.repo_dir, "commit-graph", "write", "--reachable")
+        walker: CommitWalker = open_commit_walker(self.object_database)
+        self.assertIsNotNone(walker.commit_graph)
+        self.check_walker(walker)
+
+    def test_split_commit_graph(self):
+        # the older commits in a base layer, the rest in a layer on top, as written after a fetch
+        for name in ["main", "x", "y"]:
+            git(self.repo_dir, "update-ref", "refs/heads/" + name, self.b2)
+        git(self.repo_dir, "commit-graph", "write", "--reachable", "--split")
+        for name, hex_name in [("main", self.octopus), ("x", self.x), ("y", self.y)]:
+            git(self.repo_dir, "update-ref", "refs/heads/" + name, hex_name)
+        git(self.repo_dir, "commit-graph", "write", "--reachable", "--split=no-merge")
+        self.check_walker(open_commit_walker(self.object_database))
+
+    def test_commits_after_commit_graph(self):
+        git(self.repo_dir, "commit-graph", "write", "--reachable")
+        new_commit: str = commit(self.repo_dir, "new", self.b2)
+        walker: CommitWalker = open_commit_walker(self.object_database)
+        self.addCleanup(walker.close)
+        self.assertEqual([self.b2], walker.merge_bases(new_commit, self.octopus))
+        self.assertTrue(walker.is_ancestor(self.a1, new_commit))
+
+    def test_commit_data(self):
+        git(self.repo_dir, "commit-graph", "write", "--reachable")
+        commit_graph: CommitGraph = read_commit_graph(os.path.join(self.repo_dir, ".git", "objects"))
+        self.addCleanup(commit_graph.close)
+        self.assertTrue(commit_graph.has_commit_data)
+        generation, _, parents = commit_graph.get_commit(commit_graph.find_position(self.octopus))
+        self.assertEqual(6, generation)
+        self.assertEqual([self.merge, self.c1, self.b1], [commit_graph.get_hex_name(p) for p in parents])
+        self.assertEqual((1, []), commit_graph.get_commit(commit_graph.find_position(self.root))[::2])
+        self.assertIsNone(commit_graph.find_position("0" * 40))
+
+    def test_walk_follows_divergence(self):
+        # a long history with two short branches off its tip: the walk stops at the merge base
+        tip: str = self.root
+        for number in range(300):
+            tip = commit(self.repo_dir, str(number), tip)
+        ahead: str = commit(self.repo_dir, "ahead", commit(self.repo_dir, "ahead 1", tip))
+        behind: str = commit(self.repo_dir, "behind", tip)
+        git(self.repo_dir, "update-ref", "refs/heads/main", ahead)
+        git(self.repo_dir, "update-ref", "refs/heads/x", behind)
+        git(self.repo_dir, "commit-graph", "write", "--reachable")
+        walker: CommitWalker = open_commit_walker(self.object_database)
+        self.addCleanup(walker.close)
+        self.assertEqual([tip], walker.merge_bases(ahead, behind))
+        self.assertFalse(walker.is_ancestor(behind, ahead))
+        self.assertLess(walker.commits_read, 10)
+
+        # without generation numbers the walk cannot stop early, but still finds the answer
+        walker = CommitWalker(self.object_database)
+        self.addCleanup(walker.close)
+        self.assertEqual([tip], walker.merge_bases(ahead, behind))
+        self.assertEqual(GENERATION_NUMBER_INFINITY, walker._get_commit(tip)[0])
+
+
+class CompareTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        environ_patch = patch.dict(os.environ, dict(ISOLATED_GIT_ENV, **GIT_IDENTITY_ENV))
+        environ_patch.start()
+        self.addCleanup(environ_patch.stop)
+        self.repo_dir: str = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.repo_dir)
+        git(self.repo_dir, "init", "-q", "-b", "feature")
+        git(self.repo_dir, "remote", "add", "upstream", "git@github.com:apache/kafka.git")
+        git(self.repo_dir, "remote", "add", "origin", "git@github.com:me/kafka.git")
+        self.base: str = commit(self.repo_dir, "base")
+        self.trunk: str = commit(self.repo_dir, "trunk", self.base)
+        git(self.repo_dir, "update-ref", "refs/remotes/upstream/trunk", self.trunk)
+        git(self.repo_dir, "update-ref", "refs/heads/feature", self.base)
+        git(self.repo_dir, "config", "branch.feature.remote", "upstream")
+        git(self.repo_dir, "config", "branch.feature.merge", "refs/heads/trunk")
+        git(self.repo_dir, "commit-graph", "write", "--reachable")
+        self.warnings: List[str] = []
+
+    def resolve(self, command: str, **options: str) -> str:
+        return resolve(command, RepoState(self.repo_dir), warn=self.warnings.append, **options)
+
+    def test_compare(self):
+        self.assertEqual("https://github.com/apache/kafka/compare/trunk...feature", self.resolve("compare trunk..."))
+        self.assertEqual(["feature has no commits that are not in trunk, there is nothing to compare"], self.warnings)
+        self.assertEqual("https://github.com/apache/kafka/compare/feature...trunk", self.resolve("compare ...trunk"))
+        self.assertEqual("https://github.com/apache/kafka/compare/3.0..trunk", self.resolve("compare 3.0..trunk"))
+        git(self.repo_dir, "remote", "add", "mirror", "git@gitlab.com:apache/kafka.git")
+        self.assertEqual(
+            "https://gitlab.com/apache/kafka/-/compare/3.0...trunk?straight=true",
+            self.resolve("compare 3.0..trunk", remote="mirror"))
+        self.assertEqual(1, len(self.warnings))
+        self.assertRaises(CommandException, self.resolve, "compare trunk")
+        self.assertRaises(CommandException, self.resolve, "compare ..")
+
+        git(self.repo_dir, "update-ref", "refs/heads/unrelated", commit(self.repo_dir, "unrelated"))
+        self.resolve("compare trunk...unrelated")
+        self.assertEqual("trunk and unrelated have no history in common", self.warnings[-1])
+
+    def test_pr_merged(self):
+        self.assertTrue(self.resolve("pr").startswith("https://github.com/apache/kafka/compare/trunk...me:feature"))
+        self.assertEqual(["feature has no commits that are not in upstream/trunk, it may already be merged"],
+                         self.warnings)
+        self.resolve("pr feature upstream/3.0")  # not fetched, so nothing is known about it
+        git(self.repo_dir, "update-ref", "refs/heads/feature", commit(self.repo_dir, "feature", self.base))
+        self.resolve("pr")
+        self.assertEqual(1, len(self.warnings))
+
+    def test_run_program(self):
+        stdout: io.StringIO = io.StringIO()
+        stderr: io.StringIO = io.StringIO()
+        with patch("sys.stdout", stdout), patch("sys.stderr", stderr):
+            command_line.run_program(["compare", "trunk...feature", "-a", "-C", self.repo_dir])
+        self.assertEqual("https://github.com/apache/kafka/compare/trunk...feature\n", stdout.getvalue())
+        self.assertEqual(
+            "webgit: warning: feature has no commits that are not in trunk, there is nothing to compare\n",
+            stderr.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,246 @@
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+import zlib
+from typing import Dict, List
+
+from unittest.mock import patch
+from webgit.tests.test_git_config import ISOLATED_GIT_ENV
+from webgit.tests.test_webgit_main import GITHUB_REMOTE_OUTPUT_TEXT
+from webgit.webgit_util.objects import get_object_database, ObjectDatabase, PathLookup
+from webgit.webgit_util.repository import get_repos_from_git_remote_output
+from webgit.webgit_util.resolver import CommandException, RepoState, resolve
+
+GIT_IDENTITY_ENV: dict = {
+    "GIT_AUTHOR_NAME": "Test",
+    "GIT_AUTHOR_EMAIL": "test@example.com",
+    "GIT_COMMITTER_NAME": "Test",
+    "GIT_COMMITTER_EMAIL": "test@example.com",
+}
+
+
+def git(repo_dir: str, *argv: str) -> str:
+    return subprocess.run(
+        ["git", "-C", repo_dir] + list(argv), check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+
+
+def make_commits(repo_dir: str, first: int, count: int):
+    for number in range(first, first + count):
+        with open(os.path.join(repo_dir, "file{}.txt".format(number)), "w") as f:
+            f.write("line {}\n".format(number) * number)
+        git(repo_dir, "add", ".")
+        git(repo_dir, "commit", "-q", "-m", "commit {}".format(number))
+
+
+class _FakeObjectDatabase:
+
+    def __init__(self, types_by_name: Dict[str, str]):
+        self.types_by_name: Dict[str, str] = types_by_name
+
+    def find_objects(self, hex_prefix: str, limit: int = 16) -> List[str]:
+        return sorted(n for n in self.types_by_name if n.startswith(hex_prefix))[:limit]
+
+    def get_object_type(self, hex_name: str) -> str:
+        return self.types_by_name.get(hex_name)
+
+
+@unittest.skipUnless(shutil.which("git"), "git not installed")
+class ObjectDatabaseTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        environ_patch = patch.dict(os.environ, dict(ISOLATED_GIT_ENV, **GIT_IDENTITY_ENV))
+        environ_patch.start()
+        self.addCleanup(environ_patch.stop)
+        self.temp_dir: str = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.repo_dir: str = os.path.join(self.temp_dir, "repository")
+        os.makedirs(self.repo_dir)
+        git(self.repo_dir, "init", "-q")
+        make_commits(self.repo_dir, 1, 12)
+        os.makedirs(os.path.join(self.repo_dir, "config", "kraft"))
+        for path in ["config/zookeeper.properties", "config/kraft/server.properties"]:
+            with open(os.path.join(self.repo_dir, path), "w") as f:
+                f.write("key=value\n")
+        git(self.repo_dir, "add", ".")
+        git(self.repo_dir, "commit", "-q", "-m", "add config")
+        git(self.repo_dir, "tag", "-a", "-m", "release", "2.8.1-rc1")
+        git(self.repo_dir, "gc", "-q")
+        make_commits(self.repo_dir, 13, 3)  # loose
+        git(self.repo_dir, "branch", "feature", "HEAD~1")
+
+    def get_all_objects(self, repo_dir: str) -> Dict[str, str]:
+        output: str = git(repo_dir, "cat-file", "--batch-all-objects", "--batch-check=%(objectname) %(objecttype)")
+        return dict(line.split() for line in output.splitlines())
+
+    def test_find_objects(self):
+        object_database: ObjectDatabase = get_object_database(self.repo_dir)
+        self.addCleanup(object_database.close)
+        self.assertEqual(1, len(object_database.packs))
+        types_by_name: Dict[str, str] = self.get_all_objects(self.repo_dir)
+        for name, object_type in types_by_name.items():
+            self.assertEqual([name], object_database.find_objects(name[:12].upper()))
+            self.assertEqual(object_type, object_database.get_object_type(name))
+        for prefix in {n[:3] for n in types_by_name}:
+            self.assertEqual(sorted(n for n in types_by_name if n.startswith(prefix)),
+                             object_database.find_objects(prefix, limit=100))
+        self.assertEqual([], object_database.find_objects("0" * 40 if "0" * 40 not in types_by_name else "f" * 40))
+        self.assertEqual([], object_database.find_objects("xyz1234"))
+        self.assertIsNone(object_database.get_object_type("0" * 40))
+
+    def test_find_objects_after_repack(self):
+        object_database: ObjectDatabase = get_object_database(self.repo_dir)
+        self.addCleanup(object_database.close)
+        head: str = git(self.repo_dir, "rev-parse", "HEAD").strip()
+        git(self.repo_dir, "repack", "-a", "-d", "-q")
+        git(self.repo_dir, "prune-packed")
+        self.assertEqual([head], object_database.find_objects(head[:7]))
+        self.assertEqual("commit", object_database.get_object_type(head))
+
+    def test_read_after_gc(self):
+        object_database: ObjectDatabase = get_object_database(self.repo_dir)
+        self.addCleanup(object_database.close)
+        head: str = git(self.repo_dir, "rev-parse", "HEAD").strip()
+        git(self.repo_dir, "gc", "-q", "--prune=now")
+        self.assertEqual("commit", object_database.read_object(head)[0])
+        self.assertEqual(head, object_database.resolve_revision(head))
+
+    def test_short_hash_reads_no_blobs(self):
+        head: str = git(self.repo_dir, "rev-parse", "HEAD").strip()
+        # a blob sharing the first four digits of HEAD's hash, so both are candidates for the short hash
+        number: int = 0
+        while True:
+            content: bytes = str(number).encode("ascii") * 1000
+            if hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest().startswith(head[:4]):
+                break
+            number += 1
+        blob: str = subprocess.run(
+            ["git", "-C", self.repo_dir, "hash-object", "-w", "--stdin"], input=content, check=True,
+            stdout=subprocess.PIPE).stdout.decode("ascii").strip()
+        object_database: ObjectDatabase = get_object_database(self.repo_dir)
+        self.addCleanup(object_database.close)
+        self.assertIn(blob, object_database.find_objects(head[:4]))
+        with patch.object(object_database, "read_object", wraps=object_database.read_object) as read_object:
+            self.assertEqual(head, object_database.resolve_revision(head[:4]))
+        read_object.assert_not_called()
+
+    def test_loose_header_across_reads(self):
+        # a header longer than one bounded inflate, spread over several reads by empty deflate blocks
+        compressor = zlib.compressobj()
+        compressed: bytes = b""
+        for byte in b"blob " + b"0" * 40 + b"5\0hello":
+            compressed += compressor.compress(bytes([byte])) + b"".join(
+                compressor.flush(zlib.Z_SYNC_FLUSH) for _ in range(10))
+        compressed += compressor.flush()
+        names: List[str] = ["ab" + "0" * 38, "ab" + "1" * 38]
+        os.makedirs(os.path.join(self.repo_dir, ".git", "objects", "ab"), exist_ok=True)
+        for name, data in zip(names, [compressed, zlib.compress(b"blob " + b"1" * 100)]):
+            with open(os.path.join(self.repo_dir, ".git", "objects", "ab", name[2:]), "wb") as f:
+                f.write(data)
+        object_database: ObjectDatabase = get_object_database(self.repo_dir)
+        self.addCleanup(object_database.close)
+        self.assertEqual("blob", object_database.get_object_type(names[0]))
+        self.assertIsNone(object_database.get_object_type(names[1]))
+
+    def test_alternates(self):
+        clone_dir: str = os.path.join(self.temp_dir, "clone")
+        subprocess.run(["git", "clone", "-q", "--shared", self.repo_dir, clone_dir], check=True)
+        make_commits(clone_dir, 16, 1)
+        object_database: ObjectDatabase = get_object_database(clone_dir)
+        self.addCleanup(object_database.close)
+        for name, object_type in self.get_all_objects(clone_dir).items():
+            self.assertEqual([name], object_database.find_objects(name[:10]))
+            self.assertEqual(object_type, object_database.get_object_type(name))
+
+    def test_resolve_commit_hash(self):
+        repo_state: RepoState = RepoState(
+            self.repo_dir, git_repos=get_repos_from_git_remote_output(GITHUB_REMOTE_OUTPUT_TEXT))
+        packed_commit: str = git(self.repo_dir, "rev-parse", "HEAD~5").strip()
+        loose_commit: str = git(self.repo_dir, "rev-parse", "HEAD").strip()
+        self.assertEqual(
+            "https://github.company.io/org/project/commit/{}".format(packed_commit),
+            resolve(packed_commit[:7], repo_state))
+        self.assertEqual(
+            "https://github.company.io/org/project/blob/{}/file15.txt".format(loose_commit),
+            resolve([loose_commit[:8], "file15.txt"], repo_state))
+        tree: str = git(self.repo_dir, "rev-parse", "HEAD^{tree}").strip()
+        self.assertEqual(
+            "https://github.company.io/org/project/commit/{}".format(tree), resolve(tree, repo_state))
+
+    def test_lookup_path(self):
+        object_database: ObjectDatabase = get_object_database(self.repo_dir)
+        self.addCleanup(object_database.close)
+        self.assertEqual(git(self.repo_dir, "rev-parse", "2.8.1-rc1^{commit}").strip(),
+                         object_database.resolve_revision("2.8.1-rc1"))
+        self.assertEqual(git(self.repo_dir, "rev-parse", "feature").strip(),
+                         object_database.resolve_revision("feature"))
+        self.assertEqual(git(self.repo_dir, "rev-parse", "HEAD").strip(), object_database.resolve_revision("HEAD"))
+        self.assertIsNone(object_database.resolve_revision("missing"))
+        self.assertIsNone(object_database.resolve_revision("config"))
+        self.assertIsNone(object_database.lookup_path("missing", "file1.txt"))
+
+        self.assertEqual(PathLookup("blob", None, None), object_database.lookup_path("2.8.1-rc1", "file1.txt"))
+        self.assertEqual(PathLookup("tree", None, None), object_database.lookup_path("master", "config/kraft/"))
+        self.assertEqual(PathLookup(None, None, None), object_database.lookup_path("2.8.1-rc1", "LICENSE"))
+        self.assertEqual(PathLookup(None, "config/zookeeper.properties", "blob"),
+                         object_database.lookup_path("HEAD", "confg/zookeper.properties"))
+        self.assertEqual(PathLookup(None, None, None), object_database.lookup_path("HEAD", "file1.txt/x"))
+
+        tree: str = git(self.repo_dir, "rev-parse", "HEAD:config").strip()
+        object_database.read_tree(tree)
+        self.assertIs(object_database.read_tree(tree), object_database.read_tree(tree))
+
+    def test_resolve_path(self):
+        repo_state: RepoState = RepoState(
+            self.repo_dir, git_repos=get_repos_from_git_remote_output(GITHUB_REMOTE_OUTPUT_TEXT))
+        self.assertEqual(
+            "https://github.company.io/org/project/blob/2.8.1-rc1/config/zookeeper.properties",
+            resolve("tree 2.8.1-rc1 config/zookeeper.properties", repo_state))
+        self.assertEqual(
+            "https://github.company.io/org/project/tree/2.8.1-rc1/config/kraft",
+            resolve("tree 2.8.1-rc1 config/kraft/", repo_state))
+        self.assertEqual(
+            "https://github.company.io/org/project/blob/unfetched/any/path",
+            resolve("tree unfetched any/path", repo_state))
+        with self.assertRaisesRegex(CommandException, "did you mean the directory config/kraft"):
+            resolve("tree 2.8.1-rc1 config/kraf", repo_state)
+        with self.assertRaisesRegex(CommandException, "Path nothing/here not found in feature$"):
+            resolve("tree feature nothing/here", repo_state)
+
+    def test_get_object_database_unsupported(self):
+        with patch.dict(os.environ, {"GIT_OBJECT_DIRECTORY": os.path.join(self.repo_dir, ".git", "objects")}):
+            self.assertIsNone(get_object_database(self.repo_dir))
+        self.assertIsNone(get_object_database(os.path.join(self.temp_dir, "missing")))
+
+
+class ResolveCommitHashTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.git_repos = get_repos_from_git_remote_output(GITHUB_REMOTE_OUTPUT_TEXT)
+
+    def get_repo_state(self, types_by_name: Dict[str, str]) -> RepoState:
+        return RepoState(git_repos=self.git_repos, object_database=_FakeObjectDatabase(types_by_name))
+
+    def test_pull_request_or_commit(self):
+        commit: str = "12345678" + "a" * 32
+        repo_state: RepoState = self.get_repo_state({commit: "commit", "98765432" + "b" * 32: "blob"})
+        self.assertEqual(
+            "https://github.company.io/org/project/commit/{}".format(commit), resolve("12345678", repo_state))
+        self.assertEqual("https://github.company.io/org/project/pull/98765432", resolve("98765432", repo_state))
+        self.assertEqual("https://github.company.io/org/project/pull/12345678", resolve("#12345678", repo_state))
+        self.assertEqual("https://github.company.io/org/project/commit/abcdef1", resolve("abcdef1", repo_state))
+
+    def test_ambiguous(self):
+        repo_state: RepoState = self.get_repo_state(
+            {"abcdef1" + "0" * 33: "commit", "abcdef1" + "1" * 33: "commit", "abcdef1" + "2" * 33: "tree"})
+        with self.assertRaisesRegex(CommandException, "Ambiguous commit hash abcdef1"):
+            resolve("abcdef1", repo_state)
+        self.assertEqual(
+            "https://github.company.io/org/project/commit/{}".format("abcdef1" + "1" * 33),
+            resolve("abcdef11", repo_state))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from typing import List
+
+from unittest.mock import patch
+from webgit.tests.test_git_config import ISOLATED_GIT_ENV
+from webgit.tests.test_objects import git, GIT_IDENTITY_ENV, make_commits
+from webgit.webgit_util import command_line
+from webgit.webgit_util.permalink import LocalPermalinks, split_line_range
+from webgit.webgit_util.resolver import CommandException, ResolveResult
+
+
+class LocalPermalinksTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        environ_patch = patch.dict(os.environ, dict(ISOLATED_GIT_ENV, **GIT_IDENTITY_ENV))
+        environ_patch.start()
+        self.addCleanup(environ_patch.stop)
+        self.temp_dir: str = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.repo_dir: str = os.path.join(self.temp_dir, "kafka")
+        os.makedirs(os.path.join(self.repo_dir, "docs"))
+        git(self.repo_dir, "init", "-q", "-b", "main")
+        make_commits(self.repo_dir, 1, 2)
+        git(self.repo_dir, "mv", "file2.txt", "docs")
+        git(self.repo_dir, "commit", "-q", "-m", "move")
+        git(self.repo_dir, "remote", "add", "upstream", "git@github.com:apache/kafka.git")
+        git(self.repo_dir, "pack-refs", "--all")
+        self.commit: str = git(self.repo_dir, "rev-parse", "HEAD").strip()
+        self.other_dir: str = os.path.join(self.temp_dir, "other")
+        os.makedirs(self.other_dir)
+        git(self.other_dir, "init", "-q", "-b", "main")
+        make_commits(self.other_dir, 1, 1)
+        git(self.other_dir, "remote", "add", "origin", "git@gitlab.com:me/other.git")
+
+    def test_split_line_range(self):
+        self.assertEqual(("a.py", None, None), split_line_range("a.py"))
+        self.assertEqual(("a.py", 10, None), split_line_range("a.py:10"))
+        self.assertEqual(("a.py", 10, 20), split_line_range("a.py:10-20"))
+        self.assertEqual(("dir:1/a.py", 3, None), split_line_range("dir:1/a.py:3"))
+        self.assertEqual((":10", None, None), split_line_range(":10"))
+
+    def test_resolve_many(self):
+        permalinks: LocalPermalinks = LocalPermalinks(base_dir=os.path.join(self.repo_dir, "docs"))
+        results: List[ResolveResult] = permalinks.resolve_many([
+            "file2.txt:1-2", "../file1.txt:1", os.path.join(self.other_dir, "file1.txt"), ".", "new.txt",
+            "file2.txt:2-1"])
+        blob: str = "https://github.com/apache/kafka/blob/" + self.commit
+        other_commit: str = git(self.other_dir, "rev-parse", "HEAD").strip()
+        self.assertEqual([
+            ResolveResult(["file2.txt:1-2"], blob + "/docs/file2.txt#L1-L2", None),
+            ResolveResult(["../file1.txt:1"], blob + "/file1.txt#L1", None),
+            ResolveResult([os.path.join(self.other_dir, "file1.txt")],
+                          "https://gitlab.com/me/other/-/blob/{}/file1.txt".format(other_commit), None),
+            ResolveResult(["."], "https://github.com/apache/kafka/tree/{}/docs".format(self.commit), None),
+            ResolveResult(["new.txt"], None, "docs/new.txt is not in the commit at HEAD, {}".format(self.commit)),
+            ResolveResult(["file2.txt:2-1"], None, "Line range 2-1 ends before it starts"),
+        ], results)
+        self.assertEqual(2, len(permalinks.repositories))
+
+    def test_encoded_path(self):
+        with open(os.path.join(self.repo_dir, "docs", "my file#1.py"), "w") as f:
+            f.write("print(1)\n")
+        git(self.repo_dir, "add", ".")
+        git(self.repo_dir, "commit", "-q", "-m", "encoded")
+        commit: str = git(self.repo_dir, "rev-parse", "HEAD").strip()
+        self.assertEqual(
+            "https://github.com/apache/kafka/blob/{}/docs/my%20file%231.py#L1".format(commit),
+            LocalPermalinks(base_dir=self.repo_dir).get_permalink("docs/my file#1.py:1"))
+
+    def test_head_without_git(self):
+        # HEAD, the packed branch it names and the commit are read in-process
+        with patch("subprocess.Popen", side_effect=AssertionError("git was run")):
+            self.assertTrue(LocalPermalinks(base_dir=self.repo_dir).get_permalink("file1.txt").endswith(
+                "/blob/{}/file1.txt".format(self.commit)))
+
+    def test_unborn_head_without_git(self):
+        empty_dir: str = os.path.join(self.temp_dir, "empty")
+        os.makedirs(empty_dir)
+        git(empty_dir, "init", "-q", "-b", "main")
+        git(empty_dir, "remote", "add", "origin", "git@gitlab.com:me/empty.git")
+        with patch("subprocess.Popen", side_effect=AssertionError("git was run")):
+            with self.assertRaisesRegex(CommandException, "No commit at HEAD"):
+                LocalPermalinks(base_dir=empty_dir).get_permalink("file1.txt")
+
+    def test_run_program(self):
+        stdout: io.StringIO = io.StringIO()
+        stderr: io.StringIO = io.StringIO()
+        with patch("sys.stdout", stdout), patch("sys.stderr", stderr), self.assertRaises(SystemExit):
+            command_line.run_program(["blob", "file1.txt:3", "missing.txt", "-a", "-C", self.repo_dir])
+        self.assertEqual(
+            "https://github.com/apache/kafka/blob/{}/file1.txt#L3\n".format(self.commit), stdout.getvalue())
+        self.assertIn("missing.txt: missing.txt is not in the commit at HEAD", stderr.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+import os
+import shutil
+import tempfile
+import unittest
+from typing import Dict, List
+
+from unittest.mock import patch
+from webgit.tests.test_git_config import ISOLATED_GIT_ENV, write_file
+from webgit.tests.test_objects import git, GIT_IDENTITY_ENV, make_commits
+from webgit.tests.test_webgit_main import GITHUB_REMOTE_OUTPUT_TEXT
+from webgit.webgit_util import pull_refs
+from webgit.webgit_util.pull_refs import get_pull_request_index, PullRequestIndex, read_packed_pull_refs
+from webgit.webgit_util.repository import BranchInfo, get_remotes_from_git_remote_output
+from webgit.webgit_util.resolver import RepoState, resolve
+
+OLD_MTIME: int = 1000000000
+
+
+def packed_refs_text(refs: Dict[str, str], header: str) -> str:
+    lines: List[str] = [header] if header else []
+    for ref in sorted(refs):
+        lines.append("{} {}".format(refs[ref], ref))
+        if ref.startswith("refs/tags/"):
+            lines.append("^" + "f" * 40)
+    return "\n".join(lines) + "\n"
+
+
+class PackedPullRefsTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.temp_dir: str = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.path: str = os.path.join(self.temp_dir, "packed-refs")
+        self.refs: Dict[str, str] = {}
+        for number in range(300):
+            self.refs["refs/heads/branch{:03d}".format(number)] = "{:040x}".format(number)
+            self.refs["refs/tags/v{:03d}".format(number)] = "{:040x}".format(number + 1000)
+            self.refs["refs/remotes/upstream/branch{:03d}".format(number)] = "{:040x}".format(number + 2000)
+        for number in range(1, 60):
+            self.refs["refs/pull/{}/head".format(number)] = "{:040x}".format(number + 3000)
+            self.refs["refs/pull/{}/merge".format(number)] = "{:040x}".format(number + 4000)
+        self.refs["refs/merge-requests/7/head"] = "{:040x}".format(7)
+        self.expected: Dict[str, str] = {
+            ref: hex_name for ref, hex_name in self.refs.items()
+            if ref.startswith("refs/merge-requests/") or ref.startswith("refs/pull/")}
+
+    def test_sorted(self):
+        write_file(self.path, packed_refs_text(self.refs, "# pack-refs with: peeled fully-peeled sorted "))
+        self.assertEqual(self.expected, read_packed_pull_refs(self.path))
+
+    def test_unsorted(self):
+        text: str = packed_refs_text(self.refs, "# pack-refs with: peeled")
+        lines: List[str] = text.splitlines()
+        write_file(self.path, "\n".join(lines[:1] + list(reversed(lines[1:]))).replace("^" + "f" * 40 + "\n", ""))
+        self.assertEqual(self.expected, read_packed_pull_refs(self.path))
+
+    def test_edge_cases(self):
+        write_file(self.path, "")
+        self.assertEqual({}, read_packed_pull_refs(self.path))
+        self.assertEqual({}, read_packed_pull_refs(os.path.join(self.temp_dir, "missing")))
+        header: str = "# pack-refs with: peeled fully-peeled sorted "
+        for refs in [{"refs/tags/v1": "1" * 40}, {"refs/pull/1/head": "2" * 40}, {"refs/zzz": "3" * 40}]:
+            write_file(self.path, packed_refs_text(refs, header))
+            self.assertEqual({r: h for r, h in refs.items() if r.startswith("refs/pull/")},
+                             read_packed_pull_refs(self.path))
+
+    def test_index(self):
+        heads: Dict[str, str] = dict(self.expected, **{"refs/pull/70/head": "{:040x}".format(3001)})
+        index: PullRequestIndex = PullRequestIndex(heads)
+        self.assertEqual(61, len(index))
+        self.assertEqual(70, index.find("{:040x}".format(3001)))
+        self.assertEqual(7, index.find("{:040x}".format(7)))
+        self.assertIsNone(index.find("{:040x}".format(4001)))
+
+
+class PullRequestIndexTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        environ_patch = patch.dict(os.environ, dict(ISOLATED_GIT_ENV, **GIT_IDENTITY_ENV))
+        environ_patch.start()
+        self.addCleanup(environ_patch.stop)
+        self.temp_dir: str = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        os.environ.pop("WEBGIT_NO_CACHE")
+        os.environ["XDG_CACHE_HOME"] = os.path.join(self.temp_dir, "cache")
+        self.repo_dir: str = os.path.join(self.temp_dir, "repository")
+        os.makedirs(self.repo_dir)
+        git(self.repo_dir, "init", "-q")
+        make_commits(self.repo_dir, 1, 3)
+        self.commits: List[str] = git(self.repo_dir, "rev-list", "HEAD").split()
+        self.common_dir: str = os.path.join(self.repo_dir, ".git")
+
+    def make_old(self, *refs: str):
+        for ref in refs:
+            os.utime(os.path.join(self.common_dir, ref), (OLD_MTIME, OLD_MTIME))
+
+    def test_incremental_update(self):
+        git(self.repo_dir, "update-ref", "refs/pull/5/head", self.commits[2])
+        git(self.repo_dir, "update-ref", "refs/merge-requests/6/head", self.commits[1])
+        git(self.repo_dir, "pack-refs", "--all")
+        git(self.repo_dir, "update-ref", "refs/pull/8/head", self.commits[0])
+        self.make_old("packed-refs", "refs/pull/8/head")
+
+        index: PullRequestIndex = get_pull_request_index(self.common_dir)
+        self.assertEqual(5, index.find(self.commits[2]))
+        self.assertEqual(6, index.find(self.commits[1]))
+        self.assertEqual(8, index.find(self.commits[0]))
+
+        with patch.object(pull_refs, "read_packed_pull_refs") as read_packed_mock:
+            self.assertEqual(3, len(get_pull_request_index(self.common_dir)))
+        read_packed_mock.assert_not_called()
+
+        git(self.repo_dir, "update-ref", "refs/pull/5/head", self.commits[0])  # a loose ref shadows the packed one
+        git(self.repo_dir, "update-ref", "-d", "refs/pull/8/head")
+        index = get_pull_request_index(self.common_dir)
+        self.assertEqual(5, index.find(self.commits[0]))
+        self.assertIsNone(index.find(self.commits[2]))
+        self.assertEqual(2, len(index))
+
+    def test_loose_refs_read_once(self):
+        git(self.repo_dir, "update-ref", "refs/pull/1/head", self.commits[0])
+        self.make_old("refs/pull/1/head")
+        self.assertEqual(1, get_pull_request_index(self.common_dir).find(self.commits[0]))
+        # an unchanged mtime and size mean the cached hash is used without reading the ref
+        write_file(os.path.join(self.common_dir, "refs/pull/1/head"), self.commits[1] + "\n")
+        self.make_old("refs/pull/1/head")
+        self.assertEqual(1, get_pull_request_index(self.common_dir).find(self.commits[0]))
+        loose, refs_read = pull_refs._scan_loose_pull_refs(self.common_dir, {})
+        self.assertEqual(1, refs_read)
+        self.assertEqual([OLD_MTIME * 1000000000, 41, self.commits[1]], loose["refs/pull/1/head"])
+
+    def test_resolve_existing_pr(self):
+        git(self.repo_dir, "checkout", "-q", "-b", "feature")
+        make_commits(self.repo_dir, 4, 1)
+        head: str = git(self.repo_dir, "rev-parse", "HEAD").strip()
+        repo_state: RepoState = RepoState(
+            self.repo_dir,
+            git_repos=get_remotes_from_git_remote_output(GITHUB_REMOTE_OUTPUT_TEXT),
+            branch_info=BranchInfo(from_branch="feature", to_repo="upstream", to_branch="main"),
+        )
+        self.assertEqual(
+            "https://github.company.io/org/project/compare/main...user:feature?expand=1", resolve("pr", repo_state))
+
+        git(self.repo_dir, "update-ref", "refs/pull/4501/head", head)
+        self.assertEqual("https://github.company.io/org/project/pull/4501", resolve("pr", repo_state))
+
+        git(self.repo_dir, "update-ref", "refs/remotes/origin/feature", self.commits[0])
+        self.assertEqual(
+            "https://github.company.io/org/project/compare/main...user:feature?expand=1", resolve("pr", repo_state))
+        git(self.repo_dir, "update-ref", "refs/pull/4502/head", self.commits[0])
+        self.assertEqual("https://github.company.io/org/project/pull/4502", resolve("pr", repo_state))
+
+        # once the target branch has the request's head, the branch is not that request: it was merged, or the
+        # branch was started where it ended
+        git(self.repo_dir, "update-ref", "refs/remotes/upstream/main", head)
+        warnings: List[str] = []
+        self.assertEqual(
+            "https://github.company.io/org/project/compare/main...user:feature?expand=1",
+            resolve("pr", repo_state, warn=warnings.append))
+        self.assertEqual(["feature has no commits that are not in upstream/main, it may already be merged"], warnings)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,18 @@
+import os
+import shutil
+import tempfile
 import unittest
 from typing import List
+from unittest.mock import Mock, patch
+from webgit.tests.test_git_config import ISOLATED_GIT_ENV, make_git_dir, write_file
 from webgit.webgit_util.repository import (
+    get_branch_info,
     get_branch_info_from_output,
+    get_remotes_from_git_remote_output,
     get_repos_from_git_remote_output,
+    GitRemote,
     GitRemoteRepo,
+    GitRemotes,
     GitRemoteRepoConnectionType,
     GitRemoteRepoActionType,
     GitException,
@@ -38,6 +47,26 @@ class RepositoryTests(unittest.TestCase):
         self.assertEqual(GitRemoteRepoConnectionType.HTTPS, repo_1.repo_connection_type)
         self.assertEqual(GitRemoteRepoActionType.PUSH, repo_1.repo_action_type)
 
+    def test_parse_remotes(self):
+        remote_text: str = "\n".join([
+            "origin	git@gitlab.com:user/project.git (fetch)",
+            "origin	git@gitlab.com:user/project.git (push)",
+            "origin	https://gitlab.com/user/mirror.git (push)",
+            "upstream	https://gitlab.com/user/project (fetch)",
+            "upstream	https://gitlab.com/user/project (push)",
+        ])
+        remotes: GitRemotes = get_remotes_from_git_remote_output(remote_text)
+        self.assertEqual(["origin", "upstream"], [r.name for r in remotes])
+        origin: GitRemote = remotes.get("origin")
+        self.assertEqual("gitlab.com/user/project", origin.url)
+        self.assertEqual(("gitlab.com/user/project", "gitlab.com/user/mirror"), origin.push_urls)
+        self.assertEqual(GitRemoteRepoConnectionType.SSH, origin.repo_connection_type)
+        self.assertEqual(GitRemoteRepoConnectionType.HTTPS, remotes.get("upstream").repo_connection_type)
+        self.assertIs(origin.org_or_user, remotes.get("upstream").org_or_user)
+        self.assertIsNone(remotes.get("missing"))
+        self.assertFalse(hasattr(origin, "__dict__"))
+        self.assertEqual(remotes, GitRemotes.from_remote_repos(get_repos_from_git_remote_output(remote_text)))
+
     def test_parse_remote_text_origin_upstream(self):
         remote_text: str = "\n".join([
             "origin	git@gitlab.com:user/project.git (fetch)",
@@ -126,6 +155,52 @@ class RepositoryTests(unittest.TestCase):
         self.assertEqual("main", branch_info.to_branch)
         print(branch_info)
 
+    @patch.dict(os.environ, ISOLATED_GIT_ENV)
+    @patch("webgit.webgit_util.repository.get_branch_output", new=Mock(side_effect=AssertionError("git was run")))
+    def test_get_branch_info_from_head_and_config(self):
+        temp_dir: str = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        git_dir: str = make_git_dir(temp_dir, "\n".join([
+            "[remote \"origin\"]",
+            "\turl = git@github.com:user/project.git",
+            "[branch \"local/branch\"]",
+            "\tremote = origin",
+            "\tmerge = refs/heads/main/branch",
+            "[branch \"local_only\"]",
+            "\tremote = .",
+            "\tmerge = refs/heads/main",
+        ]))
+
+        write_file(os.path.join(git_dir, "HEAD"), "ref: refs/heads/local/branch\n")
+        branch_info = get_branch_info(temp_dir)
+        self.assertEqual("local/branch", branch_info.from_branch)
+        self.assertEqual("origin", branch_info.to_repo)
+        self.assertEqual("main/branch", branch_info.to_branch)
+
+        write_file(os.path.join(git_dir, "HEAD"), "ref: refs/heads/local_only\n")
+        branch_info = get_branch_info(temp_dir)
+        self.assertEqual("local_only", branch_info.from_branch)
+        self.assertEqual("upstream", branch_info.to_repo)
+        self.assertEqual("local_only", branch_info.to_branch)
+
+        write_file(os.path.join(git_dir, "HEAD"), "ref: refs/heads/no_tracking\n")
+        branch_info = get_branch_info(temp_dir)
+        self.assertEqual("no_tracking", branch_info.from_branch)
+        self.assertEqual("upstream", branch_info.to_repo)
+        self.assertEqual("no_tracking", branch_info.to_branch)
+
+    @patch.dict(os.environ, ISOLATED_GIT_ENV)
+    def test_get_branch_info_detached_head_runs_git(self):
+        temp_dir: str = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        git_dir: str = make_git_dir(temp_dir, "")
+        write_file(os.path.join(git_dir, "HEAD"), "a11bce2a11bce2a11bce2a11bce2a11bce2a11b\n")
+        branch_output = Mock(return_value="* main 7882f1f commit message")
+        with patch("webgit.webgit_util.repository.get_branch_output", new=branch_output):
+            branch_info = get_branch_info(temp_dir)
+        branch_output.assert_called_once_with(temp_dir)
+        self.assertEqual("main", branch_info.from_branch)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+
+from unittest.mock import patch
+from webgit.tests.test_webgit_main import GITHUB_REMOTE_OUTPUT_TEXT, GITLAB_REMOTE_OUTPUT_TEXT
+from webgit.webgit_util import resolver
+from webgit.webgit_util.repository import BranchInfo, get_repos_from_git_remote_output
+from webgit.webgit_util.resolver import (
+    CommandException,
+    get_url_formatter,
+    RepoState,
+    resolve,
+    resolve_many,
+    ResolveResult,
+    split_targets,
+    UnrecognizedCommandException,
+)
+
+
+class ResolverTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.repo_state: RepoState = RepoState(
+            git_repos=get_repos_from_git_remote_output(GITHUB_REMOTE_OUTPUT_TEXT),
+            branch_info=BranchInfo(from_branch="feature", to_repo="upstream", to_branch="main"),
+        )
+
+    def test_resolve(self):
+        self.assertEqual("https://github.company.io/org/project", resolve("repo", self.repo_state))
+        self.assertEqual("https://github.company.io/org/project", resolve([], self.repo_state))
+        self.assertEqual("https://github.company.io/org/project/pull/4501", resolve("#4501", self.repo_state))
+        self.assertEqual(
+            "https://github.company.io/org/project/blob/642da2f/README.md",
+            resolve(["642da2f"], self.repo_state, file="README.md"))
+        self.assertEqual(
+            "https://github.company.io/user/project/tree/2.8.1-rc1",
+            resolve("tree 2.8.1-rc1", self.repo_state, remote="origin"))
+        self.assertEqual(
+            "https://github.company.io/org/project/compare/main...user:feature?expand=1",
+            resolve("pr", self.repo_state))
+        self.assertEqual("https://github.com/apache", resolve("org", self.repo_state, org="apache"))
+
+    def test_resolve_gitlab(self):
+        repo_state: RepoState = RepoState(git_repos=get_repos_from_git_remote_output(GITLAB_REMOTE_OUTPUT_TEXT))
+        self.assertEqual("https://gitlab.com/org/project/-/issues/370", resolve("issues 370", repo_state))
+        self.assertEqual(
+            "https://gitlab.com/org/project/-/compare?from=feature&to=main", resolve("pr feature main", repo_state))
+
+    def test_resolve_errors(self):
+        with self.assertRaises(UnrecognizedCommandException):
+            resolve("unknown", self.repo_state)
+        with self.assertRaises(CommandException):
+            resolve("tree", self.repo_state)
+        repo_state: RepoState = RepoState(git_repos=self.repo_state.git_repos)
+        with self.assertRaises(CommandException):
+            resolve("pr", repo_state)  # no branch info and no repository to read it from
+
+    def test_resolve_many(self):
+        self.assertEqual([
+            ResolveResult(["12ab45c"], "https://github.company.io/org/project/commit/12ab45c", None),
+            ResolveResult(["unknown"], None, "Unrecognized command: unknown"),
+            ResolveResult(["issues"], "https://github.company.io/org/project/issues", None),
+        ], resolve_many(["12ab45c", "unknown", ["issues"]], self.repo_state))
+
+    def test_load(self):
+        repo_state: RepoState = RepoState("/work/project", git_repos=self.repo_state.git_repos)
+        with patch.object(resolver, "get_branch_info", side_effect=CommandException("No branch")) as get_branch_info, \
+                patch("webgit.webgit_util.objects.get_object_database", return_value=None) as get_object_database:
+            self.assertIs(repo_state, repo_state.load())
+            self.assertRaises(CommandException, resolve, "pr", repo_state)
+            self.assertEqual("https://github.company.io/org/project/pull/4501", resolve("4501", repo_state))
+        get_branch_info.assert_called_once_with("/work/project")
+        get_object_database.assert_called_once_with("/work/project")
+
+    def test_get_url_formatter(self):
+        self.assertEqual(
+            "https://github.company.io/user/project/commit/642da2f",
+            get_url_formatter(self.repo_state, "origin").format("commit", commit="642da2f"))
+        repo_state: RepoState = RepoState(
+            git_repos=get_repos_from_git_remote_output("upstream\tgit@git.example.org:org/project.git (fetch)"))
+        with self.assertRaisesRegex(CommandException, "Unsupported web host: git.example.org/org/project"):
+            get_url_formatter(repo_state)
+
+    def test_split_targets(self):
+        self.assertEqual([["4501"], ["#4502"], ["issues", "370"], ["issues"], ["prs"]],
+                         split_targets("4501 #4502 issues 370 issues prs"))
+        self.assertEqual([["tree", "2.8.1-rc1", "README.md"], ["642da2f", "config/a.properties"], ["tree", "4501"]],
+                         split_targets("tree 2.8.1-rc1 README.md 642da2f config/a.properties tree 4501"))
+        self.assertEqual([["pr", "origin/feature", "upstream/main"], ["myprs", "vbro"], ["org"]],
+                         split_targets(["pr", "origin/feature", "upstream/main", "myprs", "vbro", "org"]))
+        self.assertEqual([["repo"]], split_targets([]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from typing import Dict, List
+
+from unittest.mock import patch
+from webgit.tests.test_git_config import ISOLATED_GIT_ENV, make_git_dir, write_file
+from webgit.webgit_util import command_line
+from webgit.webgit_util.scan import find_repositories, scan_repositories
+
+
+def remote_config(url: str) -> str:
+    return "[remote \"upstream\"]\n\turl = {}\n".format(url)
+
+
+@patch.dict(os.environ, ISOLATED_GIT_ENV)
+class ScanTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.temp_dir: str = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.root: str = os.path.join(self.temp_dir, "workspace")
+
+        kafka_git_dir: str = make_git_dir(
+            os.path.join(self.root, "kafka"), remote_config("https://github.com/apache/kafka.git"))
+        make_git_dir(os.path.join(self.root, "group", "project"), remote_config("git@gitlab.com:group/project.git"))
+        os.makedirs(os.path.join(self.root, "not_a_repo", "src"))
+
+        submodule_git_dir: str = os.path.join(kafka_git_dir, "modules", "sub")
+        make_git_dir(submodule_git_dir, remote_config("https://github.com/apache/sub.git"))
+        write_file(os.path.join(self.root, "kafka", "sub", ".git"), "gitdir: ../.git/modules/sub/.git\n")
+
+        worktree_git_dir: str = os.path.join(kafka_git_dir, "worktrees", "kafka-feature")
+        write_file(os.path.join(worktree_git_dir, "commondir"), "../..\n")
+        write_file(os.path.join(worktree_git_dir, "HEAD"), "ref: refs/heads/feature\n")
+        write_file(os.path.join(worktree_git_dir, "gitdir"), os.path.join(self.temp_dir, "kafka-feature", ".git"))
+        write_file(os.path.join(self.temp_dir, "kafka-feature", ".git"), "gitdir: {}\n".format(worktree_git_dir))
+
+    def test_find_repositories(self):
+        self.assertEqual(sorted([
+            os.path.join(self.root, "group", "project"),
+            os.path.join(self.root, "kafka"),
+            os.path.join(self.root, "kafka", "sub"),
+            os.path.join(self.temp_dir, "kafka-feature"),
+        ]), sorted(find_repositories(self.root)))
+
+    def test_scan_repositories_skips_resolved_paths(self):
+        records: List[Dict[str, str]] = list(scan_repositories(
+            self.root,
+            lambda path: path.upper(),
+            max_workers=2,
+            skip_paths={os.path.realpath(os.path.join(self.root, "kafka"))},
+        ))
+        self.assertEqual(3, len(records))
+        self.assertNotIn(os.path.join(self.root, "kafka"), [r["path"] for r in records])
+
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_scan_command(self, mock_stdout: io.StringIO):
+        command_line.run_program("scan {} issues 370 -j 2".format(self.root).split())
+        records: Dict[str, dict] = {}
+        for line in mock_stdout.getvalue().splitlines():
+            record: dict = json.loads(line)
+            records[record["path"]] = record
+
+        self.assertEqual({
+            os.path.join(self.root, "group", "project"): "https://gitlab.com/group/project/-/issues/370",
+            os.path.join(self.root, "kafka"): "https://github.com/apache/kafka/issues/370",
+            os.path.join(self.root, "kafka", "sub"): "https://github.com/apache/sub/issues/370",
+            os.path.join(self.temp_dir, "kafka-feature"): "https://github.com/apache/kafka/issues/370",
+        }, {path: record["url"] for path, record in records.items()})
+
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_scan_command_resume(self, mock_stdout: io.StringIO):
+        results_file: str = os.path.join(self.temp_dir, "results.jsonl")
+        write_file(results_file, "\n".join([
+            json.dumps({"path": os.path.join(self.root, "kafka"), "url": "https://github.com/apache/kafka"}),
+            json.dumps({"path": os.path.join(self.root, "group", "project"), "error": "failed"}),
+        ]))
+        command_line.run_program("scan {} --resume {}".format(self.root, results_file).split())
+        paths: List[str] = [json.loads(line)["path"] for line in mock_stdout.getvalue().splitlines()]
+        self.assertEqual(3, len(paths))
+        self.assertNotIn(os.path.join(self.root, "kafka"), paths)
+        self.assertIn(os.path.join(self.root, "group", "project"), paths)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+import asyncio
+import http.client
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from typing import Dict, List
+
+from unittest.mock import patch
+from webgit.tests.test_git_config import ISOLATED_GIT_ENV, make_git_dir, write_file
+from webgit.webgit_util.repository import get_remotes, GitRemotes
+from webgit.webgit_util.server import GoLinkServer, ServedRepository, split_link_path
+
+
+def resolve(commands: List[str], options: Dict[str, str], repo_state: GitRemotes) -> str:
+    if commands[0] == "fail":
+        raise ValueError("Unrecognized command: fail")
+    return "https://{}/{}?{}".format(repo_state[0].url, "/".join(commands), options.get("remote", ""))
+
+
+@patch.dict(os.environ, ISOLATED_GIT_ENV)
+class GoLinkServerTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.temp_dir: str = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.repo_dir: str = os.path.join(self.temp_dir, "kafka")
+        self.git_dir: str = make_git_dir(self.repo_dir, "[remote \"upstream\"]\n\turl = git@github.com:apache/kafka\n")
+        self.server: GoLinkServer = GoLinkServer({"kafka": self.repo_dir}, get_remotes, resolve, 0.05)
+
+    def test_split_link_path(self):
+        self.assertEqual(["4501"], split_link_path(["4501"]))
+        self.assertEqual(["642da2f", "config/a.properties"], split_link_path(["642da2f", "config", "a.properties"]))
+        self.assertEqual(["tree", "2.8.1-rc1", "config/a"], split_link_path(["tree", "2.8.1-rc1", "config", "a"]))
+        self.assertEqual(["issues", "370"], split_link_path(["issues", "370"]))
+
+    def test_handle_request(self):
+        status, headers, _ = self.server.handle_request("/kafka/tree/2.8.1-rc1/README.md?remote=origin")
+        self.assertEqual(302, status)
+        self.assertEqual("https://github.com/apache/kafka/tree/2.8.1-rc1/README.md?origin", headers["Location"])
+
+        status, headers, _ = self.server.handle_request("/kafka")
+        self.assertEqual("https://github.com/apache/kafka/repo?", headers["Location"])
+
+        self.assertEqual(404, self.server.handle_request("/other/4501")[0])
+        status, _, body = self.server.handle_request("/kafka/fail")
+        self.assertEqual((404, b"Unrecognized command: fail\n"), (status, body))
+
+        stats: dict = json.loads(self.server.handle_request("/_stats")[2])
+        self.assertEqual(4, stats["requests"])
+        self.assertEqual(2, stats["errors"])
+        self.assertIn("p99_us", stats)
+
+    def test_refresh_after_fetch(self):
+        served_repository: ServedRepository = ServedRepository("kafka", self.repo_dir, get_remotes)
+        self.assertFalse(served_repository.refresh())
+        # a fetch writes loose refs, in directories that may be new, and packs; the sleeps step past the mtime tick
+        for file_path in [
+                os.path.join("refs", "remotes", "upstream", "trunk"),
+                os.path.join("refs", "remotes", "upstream", "3.0"),
+                os.path.join("refs", "heads", "main"),
+                os.path.join("objects", "pack", "pack-1.idx")]:
+            time.sleep(0.05)
+            os.makedirs(os.path.dirname(os.path.join(self.git_dir, file_path)), exist_ok=True)
+            write_file(os.path.join(self.git_dir, file_path), "0" * 40 + "\n")
+            self.assertTrue(served_repository.refresh(), file_path)
+            self.assertFalse(served_repository.refresh(), file_path)
+
+        # the directory of each pull request is not watched, only the new requests
+        time.sleep(0.05)
+        os.makedirs(os.path.join(self.git_dir, "refs", "pull", "4501"))
+        self.assertTrue(served_repository.refresh())
+        write_file(os.path.join(self.git_dir, "refs", "pull", "4501", "head"), "0" * 40 + "\n")
+        self.assertNotIn(os.path.join(self.git_dir, "refs", "pull", "4501"), served_repository.file_paths)
+
+    def test_reserved_name(self):
+        self.assertRaises(ValueError, GoLinkServer, {"_stats": self.repo_dir}, get_remotes, resolve)
+
+    def test_serve_and_refresh(self):
+        resolve_threads: List[threading.Thread] = []
+
+        def record_resolve(commands: List[str], options: Dict[str, str], repo_state: GitRemotes) -> str:
+            resolve_threads.append(threading.current_thread())
+            return resolve(commands, options, repo_state)
+
+        self.server.resolve = record_resolve
+        loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        server: asyncio.AbstractServer = loop.run_until_complete(self.server.start("127.0.0.1", 0))
+        port: int = server.sockets[0].getsockname()[1]
+        thread: threading.Thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+
+        async def shutdown():
+            server.close()
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        def stop():
+            asyncio.run_coroutine_threadsafe(shutdown(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+        self.addCleanup(stop)
+
+        connection: http.client.HTTPConnection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        connection.request("GET", "/kafka/4501")
+        response: http.client.HTTPResponse = connection.getresponse()
+        response.read()
+        self.assertEqual(302, response.status)
+        self.assertEqual("https://github.com/apache/kafka/4501?", response.getheader("Location"))
+        self.assertIsNot(thread, resolve_threads[0])  # resolved on a worker thread, not on the event loop
+
+        write_file(os.path.join(self.git_dir, "config"), "[remote \"upstream\"]\n\turl = git@gitlab.com:org/kafka\n")
+        deadline: float = time.time() + 5
+        location: str = ""
+        while time.time() < deadline and "gitlab" not in location:
+            time.sleep(0.05)
+            connection.request("HEAD", "/kafka/4501")  # same keep-alive connection
+            response = connection.getresponse()
+            response.read()
+            location = response.getheader("Location")
+        self.assertEqual("https://gitlab.com/org/kafka/4501?", location)
+        connection.close()
+
+    def test_refresh_off_event_loop(self):
+        threads: List[threading.Thread] = []
+
+        def create_repo_state(path: str) -> GitRemotes:
+            threads.append(threading.current_thread())
+            return get_remotes(path)
+
+        server: GoLinkServer = GoLinkServer({"kafka": self.repo_dir}, create_repo_state, resolve, 0.01)
+        write_file(os.path.join(self.git_dir, "config"), "[remote \"upstream\"]\n\turl = git@gitlab.com:org/kafka\n")
+
+        async def refresh_once():
+            refresh_task: asyncio.Task = asyncio.get_running_loop().create_task(server.refresh_repositories())
+            while server.stats.refreshes == 0:
+                await asyncio.sleep(0.01)
+            refresh_task.cancel()
+            return threading.current_thread()
+
+        loop_thread: threading.Thread = asyncio.run(asyncio.wait_for(refresh_once(), 5))
+        self.assertEqual(2, len(threads))
+        self.assertIsNot(loop_thread, threads[1])
+        self.assertEqual("https://gitlab.com/org/kafka/4501?", server.handle_request("/kafka/4501")[1]["Location"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from typing import List
+
+from unittest.mock import patch
+from webgit.tests.test_git_config import ISOLATED_GIT_ENV, make_git_dir
+from webgit.webgit_util import command_line, trace
+
+
+@patch.dict(os.environ, ISOLATED_GIT_ENV)
+class TraceTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.temp_dir: str = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.repo_dir: str = os.path.join(self.temp_dir, "kafka")
+        make_git_dir(self.repo_dir, "[remote \"upstream\"]\n\turl = https://github.com/apache/kafka.git\n")
+        self.trace_path: str = os.path.join(self.temp_dir, "trace.json")
+
+    def read_events(self) -> List[dict]:
+        with open(self.trace_path, encoding="utf-8") as f:
+            return json.load(f)["traceEvents"]
+
+    def test_disabled(self):
+        self.assertFalse(trace.is_enabled())
+        with trace.span("phase", size=1) as span_args:
+            span_args["bytes"] = 10
+        trace.instant("event")
+        self.assertEqual([], trace.get_trace()["traceEvents"])
+
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_trace_git_subprocess(self, mock_stdout: io.StringIO):
+        # git accepts GIT_CONFIG_COUNT while the config reader does not, so this runs `git remote -v`
+        with patch.dict(os.environ, {"GIT_CONFIG_COUNT": "0"}):
+            command_line.run_program(["4501", "-a", "-C", self.repo_dir, "--trace", self.trace_path])
+        self.assertEqual("https://github.com/apache/kafka/pull/4501\n", mock_stdout.getvalue())
+        self.assertFalse(trace.is_enabled())
+
+        events: List[dict] = self.read_events()
+        self.assertEqual(
+            ["parse_arguments", "read_repository", "git", "parse_remote_output", "resolve"],
+            [e["name"] for e in events if e["ph"] == "X"])
+        git_event: dict = [e for e in events if e["name"] == "git"][0]
+        self.assertEqual(["git", "-C", self.repo_dir, "remote", "-v"], git_event["args"]["argv"])
+        self.assertGreater(git_event["args"]["bytes"], 0)
+        self.assertTrue(all(e["dur"] >= 0 for e in events if e["ph"] == "X"))
+
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_trace_cache(self, mock_stdout: io.StringIO):
+        cache_env = {"XDG_CACHE_HOME": os.path.join(self.temp_dir, "cache"), "WEBGIT_TRACE": "-"}
+        with patch.dict(os.environ, cache_env), patch("sys.stderr", new_callable=io.StringIO) as mock_stderr:
+            os.environ.pop("WEBGIT_NO_CACHE")
+            command_line.run_program(["issues", "-a", "-C", self.repo_dir])
+        events: List[dict] = json.loads(mock_stderr.getvalue())["traceEvents"]
+        self.assertIn("cache_miss", [e["name"] for e in events if e["ph"] == "i"])
+
+
+if __name__ == '__main__':
+    unittest.main()
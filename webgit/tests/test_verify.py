@@ -0,0 +1,185 @@
+import asyncio
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Set
+
+from unittest.mock import patch
+from webgit.webgit_util import command_line
+from webgit.webgit_util.verify import format_result, UrlVerifier, verify_urls, VerifyResult
+
+
+class _WebHostStandIn(ThreadingHTTPServer):
+    """Answers like a web host: pages that exist, missing pages, redirects, GET-only pages and slow pages."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _WebHostRequestHandler)
+        self.requests: List[str] = []
+        self.client_ports: Set[int] = set()
+        self.in_flight: int = 0
+        self.max_in_flight: int = 0
+        self.lock: threading.Lock = threading.Lock()
+
+    def url(self, path: str) -> str:
+        return "http://127.0.0.1:{}{}".format(self.server_address[1], path)
+
+
+class _WebHostRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self.respond(send_body=False)
+
+    def do_GET(self):
+        self.respond(send_body=True)
+
+    def respond(self, send_body: bool):
+        server: _WebHostStandIn = self.server
+        with server.lock:
+            server.requests.append("{} {}".format(self.command, self.path))
+            server.client_ports.add(self.client_address[1])
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            path: str = self.path
+            if path.startswith("/slow"):
+                time.sleep(float(path.rsplit("/", 1)[1]))
+                path = "/page"
+            if path == "/page" or path.startswith("/page/"):
+                self.send_body(200, {}, b"page\n", send_body)
+            elif path == "/moved":
+                self.send_body(301, {"Location": "/page/new"}, b"", send_body)
+            elif path == "/loop":
+                self.send_body(302, {"Location": "/loop"}, b"", send_body)
+            elif path == "/get-only":
+                self.send_body(200 if send_body else 405, {}, b"page\n" * 1000, send_body)
+            elif path == "/error":
+                self.send_body(500, {}, b"error\n", send_body)
+            else:
+                self.send_body(404, {}, b"missing\n", send_body)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def send_body(self, status: int, headers: dict, body: bytes, send_body: bool):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+
+class VerifyTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.server: _WebHostStandIn = _WebHostStandIn()
+        threading.Thread(target=self.server.serve_forever, args=(0.01,), daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        environ_patch = patch.dict(os.environ, {"WEBGIT_NO_CACHE": "1"})
+        environ_patch.start()
+        self.addCleanup(environ_patch.stop)
+
+    def verify(self, urls: List[str], verifier: UrlVerifier) -> List[VerifyResult]:
+
+        async def run() -> List[VerifyResult]:
+            try:
+                return await verifier.verify_many(urls)
+            finally:
+                await verifier.close()
+
+        return asyncio.run(run())
+
+    def test_statuses(self):
+        results: List[VerifyResult] = verify_urls([
+            self.server.url(path) for path in ["/page", "/missing", "/moved", "/get-only", "/error", "/loop"]])
+        self.assertEqual(
+            ["ok", "missing", "redirected", "ok", "error", "error"], [result.status for result in results])
+        self.assertEqual(self.server.url("/page/new"), results[2].location)
+        self.assertEqual("Too many redirects", results[5].error)
+        self.assertEqual("{}\tredirected\t{}".format(self.server.url("/moved"), self.server.url("/page/new")),
+                         format_result(results[2]))
+        self.assertEqual("{}\tmissing\t404".format(self.server.url("/missing")), format_result(results[1]))
+        self.assertIn("HEAD /get-only", self.server.requests)
+        self.assertIn("GET /get-only", self.server.requests)
+
+    def test_connections_per_host(self):
+        verifier: UrlVerifier = UrlVerifier(max_connections=2)
+        urls: List[str] = [self.server.url("/slow/{}/0.02".format(i)) for i in range(20)]
+        results: List[VerifyResult] = self.verify(urls + urls[:5], verifier)
+        self.assertEqual(["ok"] * 25, [result.status for result in results])
+        self.assertEqual(20, len(self.server.requests))  # checks of one url share a request
+        self.assertLessEqual(self.server.max_in_flight, 2)
+        self.assertEqual(2, verifier.connections_opened)
+        self.assertEqual(2, len(self.server.client_ports))
+
+    def test_timeout(self):
+        results: List[VerifyResult] = self.verify(
+            [self.server.url("/slow/0.5"), self.server.url("/page")], UrlVerifier(timeout=0.1))
+        self.assertEqual(["error", "ok"], [result.status for result in results])
+        self.assertEqual("Timed out after 0.1s", results[0].error)
+        self.assertEqual("error", verify_urls(["ftp://127.0.0.1/page"])[0].status)
+
+    def test_cache_ttl(self):
+        cache_dir: str = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        os.environ.pop("WEBGIT_NO_CACHE")
+        os.environ["XDG_CACHE_HOME"] = cache_dir
+        urls: List[str] = [self.server.url("/page"), self.server.url("/error")]
+        self.verify(urls, UrlVerifier())
+        results: List[VerifyResult] = self.verify(urls, UrlVerifier())
+        self.assertEqual(["ok", "error"], [result.status for result in results])
+        self.assertEqual(1, self.server.requests.count("HEAD /page"))
+        self.assertEqual(2, self.server.requests.count("HEAD /error"))  # failed checks are not cached
+        self.verify(urls[:1], UrlVerifier(ttl=0))
+        self.assertEqual(2, self.server.requests.count("HEAD /page"))
+
+    def patch_addresses(self, urls: List[str]):
+        # commands "0", "1", ... resolve to urls[0], urls[1], ...
+        for patcher in [
+                patch.object(command_line, "_get_web_address", lambda _, command, __: urls[int(command[0])]),
+                patch.object(command_line, "split_targets", lambda command: [[c] for c in command]),
+                patch.object(command_line, "RepoState")]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_run_program(self, mock_stdout: io.StringIO):
+        self.patch_addresses([self.server.url("/page"), self.server.url("/moved"), self.server.url("/missing")])
+        command_line.run_program(["0", "1", "--verify"])
+        self.assertEqual(
+            ["{}\tok".format(self.server.url("/page")),
+             "{}\tredirected\t{}".format(self.server.url("/moved"), self.server.url("/page/new"))],
+            mock_stdout.getvalue().splitlines())
+        with self.assertRaises(SystemExit):
+            command_line.run_program(["2", "--verify"])
+
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_batch(self, mock_stdout: io.StringIO):
+        urls: List[str] = [self.server.url("/slow/0.05"), self.server.url("/missing"), self.server.url("/moved")]
+        self.patch_addresses(urls)
+        with patch.object(command_line, "VERIFY_MAX_PENDING", 2), patch("sys.stdin", io.StringIO("0\n1\n--bad\n2\n")):
+            command_line.run_program(["--batch", "--json", "--verify", "-C", "/nonexistent"])
+        records: List[dict] = [json.loads(line) for line in mock_stdout.getvalue().splitlines()]
+        self.assertEqual(["0", "1", "--bad", "2"], [record["command"] for record in records])
+        self.assertEqual({"status": "ok", "code": 200, "location": urls[0]}, records[0]["verify"])
+        self.assertEqual("missing", records[1]["verify"]["status"])
+        self.assertNotIn("verify", records[2])
+        self.assertEqual(self.server.url("/page/new"), records[3]["verify"]["location"])
+
+
+if __name__ == '__main__':
+    unittest.main()
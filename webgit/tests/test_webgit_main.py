@@ -1,9 +1,18 @@
 import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
 import unittest
+from typing import List
 
 from unittest.mock import Mock, patch
 from webgit.webgit_util import command_line
 from webgit.webgit_util import repository
+from webgit.webgit_util.launcher import DryRunLauncher
+from webgit.tests.test_git_config import ISOLATED_GIT_ENV, make_git_dir
 
 GITLAB_REMOTE_OUTPUT_TEXT: str = "\n".join([
     "origin	git@gitlab.com:user/project.git (fetch)",
@@ -57,6 +66,34 @@ class WebGitMainTests(unittest.TestCase):
         std_out: str = mock_stdout.getvalue()
         self.assertEqual("https://github.company.io/org/project/commit/12345678\n", std_out)
 
+    @patch("os.getcwd", new_callable=mock_getcwd_function)
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_multiple_targets(self, mock_stdout: io.StringIO, mock_getcwd):
+        command_line.run_program("4501 4502 issues 370 12ab45c README.md -a".split())
+        repository.get_remote_output.assert_called_once_with(GIT_DIR)
+        self.assertEqual([
+            "https://github.company.io/org/project/pull/4501",
+            "https://github.company.io/org/project/pull/4502",
+            "https://github.company.io/org/project/issues/370",
+            "https://github.company.io/org/project/blob/12ab45c/README.md",
+        ], mock_stdout.getvalue().splitlines())
+
+    @patch("os.getcwd", new_callable=mock_getcwd_function)
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_launch_multiple_targets(self, mock_stdout: io.StringIO, mock_getcwd):
+        launcher: DryRunLauncher = DryRunLauncher()
+        command_line.run_program("4501 4502 prs".split(), launcher=launcher)
+        self.assertEqual([[
+            "https://github.company.io/org/project/pull/4501",
+            "https://github.company.io/org/project/pull/4502",
+            "https://github.company.io/org/project/pulls",
+        ]], launcher.launches)
+        self.assertEqual("", mock_stdout.getvalue())
+
+        command_line.run_program("4501 tree".split(), launcher=launcher)
+        self.assertEqual(1, len(launcher.launches))  # nothing is opened when a target fails
+        self.assertEqual("Git commit, branch or tag required after \"tree\"\n", mock_stdout.getvalue())
+
     @patch('sys.stdout', new_callable=io.StringIO)
     def test_commit_c_dir(self, mock_stdout: io.StringIO):
         project_2_dir: str = "/Users/user/org2/project2"
@@ -174,3 +211,83 @@ class WebGitMainTests(unittest.TestCase):
         repository.get_remote_output.assert_called_once_with(GIT_DIR)
         std_out: str = mock_stdout.getvalue()
         self.assertEqual("https://github.company.io/user/project/compare/dev...user:feature_branch?expand=1\n", std_out)
+
+    @patch("webgit.webgit_util.repository.get_branch_output", new_callable=mock_branch_output_function)
+    @patch("os.getcwd", new_callable=mock_getcwd_function)
+    @patch("sys.stderr", new_callable=io.StringIO)
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_batch(self, mock_stdout: io.StringIO, mock_stderr: io.StringIO, mock_getcwd, mock_branch_output):
+        batch_input: str = "\n".join(["12ab45c", "#4501", "", "tree", "issues 370", "pr", "unknown", "pr 4501 4502"])
+        with patch("sys.stdin", io.StringIO(batch_input)):
+            command_line.run_program("--batch".split())
+        repository.get_remote_output.assert_called_once_with(GIT_DIR)
+        self.assertEqual("\n".join([
+            "https://github.company.io/org/project/commit/12ab45c",
+            "https://github.company.io/org/project/pull/4501",
+            "",
+            "https://github.company.io/org/project/issues/370",
+            "https://github.company.io/org/project/compare/main02...user:local_branch02?expand=1",
+            "",
+            "",
+        ]) + "\n", mock_stdout.getvalue())
+        self.assertEqual(3, len(mock_stderr.getvalue().splitlines()))
+        self.assertIn(
+            "webgit: pr 4501 4502: One target per batch record, got 3: pr, 4501, 4502", mock_stderr.getvalue())
+
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_batch_json_null_separated(self, mock_stdout: io.StringIO):
+        project_2_dir: str = "/Users/user/org2/project2"
+        with patch("sys.stdin", io.StringIO("prs\0commits -r origin\0--bad-option")):
+            command_line.run_program(f"--batch --json -z -C {project_2_dir}".split())
+        repository.get_remote_output.assert_called_once_with(project_2_dir)
+        records = [json.loads(r) for r in mock_stdout.getvalue().split("\0") if r]
+        self.assertEqual([
+            {"command": "prs", "url": "https://github.company.io/org/project/pulls"},
+            {"command": "commits -r origin", "url": "https://github.company.io/user/project/commits"},
+        ], records[:2])
+        self.assertIn("error", records[2])
+
+
+class FastStartTests(unittest.TestCase):
+
+    def test_fast_path_matches_argparse(self):
+        parser = command_line._create_argument_parser()
+        for parameters in [
+            "",
+            "4501 -a",
+            "-a -C /tmp/project pr",
+            "tree 2.8.1-rc1 --path=/tmp/project -r origin",
+            "--file README.md 642da2f -o org -u user",
+            "myprs --git-user user --org org --remote upstream",
+            "--trace - 4501",
+        ]:
+            fast_path_namespace = command_line._parse_fast_path(parameters.split())
+            self.assertIsNotNone(fast_path_namespace, parameters)
+            self.assertEqual(vars(parser.parse_args(parameters.split())), vars(fast_path_namespace), parameters)
+
+    def test_fast_path_falls_back_to_argparse(self):
+        for parameters in ["-h", "--batch", "4501 -C", "-C -a", "pr -a 4501", "-Cproject", "--print", "scan -j 2"]:
+            self.assertIsNone(command_line._parse_fast_path(parameters.split()), parameters)
+
+    def test_resolving_does_not_import_unused_modules(self):
+        temp_dir: str = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        make_git_dir(temp_dir, "[remote \"upstream\"]\n\turl = https://github.com/apache/kafka.git\n")
+        script: str = "\n".join([
+            "import sys",
+            "from webgit.webgit_util import command_line",
+            "command_line.run_program(['4501', '-a', '-C', sys.argv[1]])",
+            "print(' '.join(sorted(sys.modules)))",
+        ])
+        output: List[str] = subprocess.run(
+            [sys.executable, "-c", script, temp_dir],
+            check=True,
+            stdout=subprocess.PIPE,
+            encoding="utf-8",
+            env=dict(os.environ, **ISOLATED_GIT_ENV),
+            cwd=os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+        ).stdout.splitlines()
+        self.assertEqual("https://github.com/apache/kafka/pull/4501", output[0])
+        for module in ["argparse", "subprocess", "asyncio", "json", "shlex", "getpass", "concurrent.futures",
+                       "dataclasses", "inspect", "tempfile", "hashlib", "shutil", "mmap", "difflib"]:
+            self.assertNotIn(module, output[1].split(), module)
@@ -0,0 +1,148 @@
+import re
+from typing import BinaryIO, Callable, Dict, List, Optional, TYPE_CHECKING
+
+from .constants import (
+    ANNOTATE_BLOCK_SIZE,
+    ANNOTATE_LINK_CACHE_SIZE,
+    ANNOTATE_MAX_LINE_BYTES,
+    MAX_AMBIGUOUS_OBJECTS,
+)
+from .repository import GitRemote
+from .resolver import CommandException, get_url_formatter, RepoState, UrlFormatter
+
+if TYPE_CHECKING:
+    from .objects import ObjectDatabase
+
+# One pattern for every kind of reference, so each byte of input is scanned once. The alternatives share one
+# lookbehind for the start of a token, so positions inside words fail on their first test. Existing urls are matched
+# first and left alone, so the hashes and numbers inside them are not linked again. Paths are files with an extension
+# or directories with a trailing slash. A file at the root, such as README.md, needs an extension starting with a
+# letter and a word boundary after it, so numbers such as 2.8.1 are not looked up.
+_REGEX_REFERENCE: re.Pattern = re.compile(rb"""
+    (?<![\w/.\#&-])(?:
+        (?P<url>[a-z][a-z0-9+.-]*://\S+)
+      | (?P<org>[\w.-]+)/(?P<repo>[\w.-]+)\#(?P<cross_number>\d+)\b
+      | \#(?P<number>\d+)\b
+      | (?P<hash>[0-9a-f]{7,64})\b(?!/)
+      | (?P<path>(?:[\w.-]+/)+(?:[\w.-]+\.\w+\b|(?![\w.-]))|[\w-][\w.-]*\.[a-zA-Z]\w*\b(?![\w-]|\.\w))
+    )
+""", re.VERBOSE)
+
+_FULL_HASH_LENGTHS: List[int] = [40, 64]
+
+
+def _render_url(text: bytes, url: bytes) -> bytes:
+    return url
+
+
+def _render_osc8(text: bytes, url: bytes) -> bytes:
+    return b"\x1b]8;;" + url + b"\x1b\\" + text + b"\x1b]8;;\x1b\\"
+
+
+def _render_markdown(text: bytes, url: bytes) -> bytes:
+    return b"[" + text + b"](" + url + b")"
+
+
+_RENDERERS: Dict[str, Callable[[bytes, bytes], bytes]] = {
+    "url": _render_url,
+    "osc8": _render_osc8,
+    "markdown": _render_markdown,
+}
+
+
+class Annotator:
+    """
+    Rewrites the commit hashes, #1234 and org/repo#1234 references and repository paths in text into links to the
+    upstream remote's web pages. Hashes and paths are linked only when the local objects show they exist; without
+    readable objects, only full hashes are linked and paths are left alone.
+    """
+
+    def __init__(self, repo_state: RepoState, remote: Optional[str] = None, output_format: str = "url"):
+        self.url_formatter: UrlFormatter = get_url_formatter(repo_state, remote)
+        self.render: Callable[[bytes, bytes], bytes] = _RENDERERS[output_format]
+        self.object_database: Optional["ObjectDatabase"] = repo_state.object_database
+        self.head: Optional[str] = (
+            self.object_database.resolve_revision("HEAD") if self.object_database is not None else None)
+        self.host: str = self.url_formatter.remote_url.split("/", 1)[0]
+        # the link of every reference seen, or None for references that are not linked
+        self.links: Dict[bytes, Optional[bytes]] = {}
+
+    def _format(self, template_name: str, remote: Optional[GitRemote] = None, **fields: str) -> Optional[str]:
+        try:
+            return self.url_formatter.format(template_name, remote, **fields)
+        except CommandException:
+            return None  # the dialect has no page for this kind of reference
+
+    def _get_commit(self, hex_prefix: str) -> Optional[str]:
+        if self.object_database is None:
+            return hex_prefix if len(hex_prefix) in _FULL_HASH_LENGTHS else None
+        commits: List[str] = [
+            h for h in self.object_database.find_objects(hex_prefix, MAX_AMBIGUOUS_OBJECTS)
+            if self.object_database.get_object_type(h) == "commit"
+        ]
+        return commits[0] if len(commits) == 1 else None
+
+    def _get_url(self, match: "re.Match") -> Optional[str]:
+        kind: str = match.lastgroup
+        if kind == "number":
+            return self._format("view_pr", number=match.group("number").decode("ascii"))
+        if kind == "cross_number":
+            org: str = match.group("org").decode("utf-8", "replace")
+            repo: str = match.group("repo").decode("utf-8", "replace")
+            remote: GitRemote = GitRemote(
+                "", "{}/{}/{}".format(self.host, org, repo), web_host=self.url_formatter.upstream_remote.web_host,
+                org_or_user=org, repo=repo)
+            return self._format("view_pr", remote, number=match.group("cross_number").decode("ascii"))
+        if kind == "hash":
+            commit: Optional[str] = self._get_commit(match.group("hash").decode("ascii"))
+            return self._format("commit", commit=commit) if commit else None
+        if kind == "path" and self.head is not None:
+            path: str = match.group("path").decode("utf-8", "replace")
+            object_type: Optional[str] = self.object_database.get_path_type(self.head, path)
+            if object_type == "blob":
+                return self._format("tree_file", ref=self.head, path=path)
+            if object_type == "tree":
+                return self._format("tree_directory", ref=self.head, path=path.strip("/"))
+        return None
+
+    def _replace(self, match: "re.Match") -> bytes:
+        text: bytes = match.group(0)
+        if match.lastgroup == "url":
+            return text
+        if text in self.links:
+            link: Optional[bytes] = self.links[text]
+        else:
+            if len(self.links) >= ANNOTATE_LINK_CACHE_SIZE:
+                self.links.clear()
+            url: Optional[str] = self._get_url(match)
+            link = url.encode("utf-8") if url else None
+            self.links[text] = link
+        return self.render(text, link) if link is not None else text
+
+    def annotate(self, data: bytes) -> bytes:
+        return _REGEX_REFERENCE.sub(self._replace, data)
+
+    def annotate_stream(self, input_stream: BinaryIO, output_stream: BinaryIO, block_size: int = ANNOTATE_BLOCK_SIZE):
+        """
+        Annotate input_stream into output_stream a block of whole lines at a time, so memory use does not grow with
+        the input. Blocks are written as soon as they are read, for following a log as it is written.
+        """
+        read: Callable[[int], bytes] = getattr(input_stream, "read1", input_stream.read)
+        pending: bytes = b""
+        while True:
+            block: bytes = read(block_size)
+            if not block:
+                break
+            data: bytes = pending + block if pending else block
+            cut: int = data.rfind(b"\n") + 1
+            if cut == 0:
+                if len(data) < ANNOTATE_MAX_LINE_BYTES:
+                    pending = data
+                    continue
+                cut = max(data.rfind(b" "), data.rfind(b"\t")) + 1 or len(data)
+            output_stream.write(self.annotate(data[:cut]))
+            output_stream.flush()
+            pending = data[cut:]
+        if pending:
+            output_stream.write(self.annotate(pending))
+        output_stream.flush()
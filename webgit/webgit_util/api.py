@@ -0,0 +1,252 @@
+import http.client
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, quote, urlsplit
+
+from . import trace
+from .cache import FileCache
+from .constants import (
+    API_BASE_URLS,
+    API_CACHE_NAMESPACE,
+    API_HOST_BASE_URLS,
+    API_LIST_PATHS,
+    API_MAX_CONNECTIONS,
+    API_PAGE_SIZE,
+    API_TIMEOUT_SECONDS,
+    ENV_API_TOKENS,
+    ENV_API_URL,
+)
+from .repository import GitRemote
+from .resolver import CommandException, get_my_prs_user, get_upstream_repo, RepoState
+
+_REGEX_LAST_PAGE_LINK: re.Pattern = re.compile(r'<([^>]*)>\s*;\s*rel="last"')
+
+# the response headers kept with a cached body, so a 304 answer still tells how many pages there are
+_CACHED_HEADERS: List[str] = ["link", "x-total-pages"]
+
+
+class ApiException(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Keep-alive HTTP(S) connections to one server, shared by the threads fetching pages."""
+
+    def __init__(self, base_url: str, max_connections: int = API_MAX_CONNECTIONS):
+        url_parts = urlsplit(base_url)
+        if url_parts.scheme not in ["http", "https"]:
+            raise ApiException("Unsupported API url: {}".format(base_url))
+        self.base_url: str = base_url.rstrip("/")
+        self.base_path: str = url_parts.path.rstrip("/")
+        self.connection_class: type = (
+            http.client.HTTPSConnection if url_parts.scheme == "https" else http.client.HTTPConnection)
+        self.netloc: str = url_parts.netloc
+        self.max_connections: int = max_connections
+        self.idle_connections: List[http.client.HTTPConnection] = []
+        self.lock: threading.Lock = threading.Lock()
+        self.connections_opened: int = 0
+
+    def _acquire(self) -> Tuple[http.client.HTTPConnection, bool]:
+        with self.lock:
+            if self.idle_connections:
+                return self.idle_connections.pop(), True
+            self.connections_opened += 1
+        return self.connection_class(self.netloc, timeout=API_TIMEOUT_SECONDS), False
+
+    def _release(self, connection: http.client.HTTPConnection):
+        with self.lock:
+            if len(self.idle_connections) < self.max_connections:
+                self.idle_connections.append(connection)
+                return
+        connection.close()
+
+    def get(self, path: str, headers: Dict[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+        """(status, headers with lowercase names, body) of a GET request for path below the base url."""
+        while True:
+            connection, reused = self._acquire()
+            try:
+                connection.request("GET", self.base_path + path, headers=headers)
+                response: http.client.HTTPResponse = connection.getresponse()
+                body: bytes = response.read()
+            except (http.client.HTTPException, OSError) as e:
+                connection.close()
+                if reused:
+                    continue  # the server closed an idle keep-alive connection, open a new one
+                raise ApiException("GET {}{}: {}".format(self.base_url, path, e))
+            if response.will_close:
+                connection.close()
+            else:
+                self._release(connection)
+            return response.status, {name.lower(): value for name, value in response.getheaders()}, body
+
+    def close(self):
+        with self.lock:
+            idle_connections, self.idle_connections = self.idle_connections, []
+        for connection in idle_connections:
+            connection.close()
+
+
+class ApiClient:
+    """
+    Reads JSON from a REST API through a ConnectionPool. Responses with an ETag are kept in the on-disk cache and
+    requested again with If-None-Match, so unchanged pages cost a 304 answer without a body.
+    """
+
+    def __init__(self, base_url: str, headers: Dict[str, str], cache_key_prefix: str = ""):
+        self.pool: ConnectionPool = ConnectionPool(base_url)
+        self.headers: Dict[str, str] = headers
+        self.cache: FileCache = FileCache(API_CACHE_NAMESPACE)
+        self.cache_key_prefix: str = cache_key_prefix
+
+    def get(self, path: str) -> Tuple[Dict[str, str], Any]:
+        """The response headers and the decoded JSON body of path."""
+        cache_key: str = self.cache_key_prefix + self.pool.base_url + path
+        cached: Optional[dict] = self.cache.load(cache_key)
+        headers: Dict[str, str] = dict(self.headers)
+        if cached is not None:
+            headers["If-None-Match"] = cached["etag"]
+
+        with trace.span("api_request", path=path) as span_args:
+            status, response_headers, body = self.pool.get(path, headers)
+            span_args["status"] = status
+            span_args["bytes"] = len(body)
+
+        if status == 304 and cached is not None:
+            return cached["headers"], json.loads(cached["body"])
+        if status != 200:
+            raise ApiException("GET {}{}: HTTP {}{}".format(
+                self.pool.base_url, path, status, _get_error_message(body)))
+        try:
+            value: Any = json.loads(body)
+        except ValueError as e:
+            raise ApiException("GET {}{}: invalid JSON: {}".format(self.pool.base_url, path, e))
+        if "etag" in response_headers:
+            self.cache.store(cache_key, [], {
+                "etag": response_headers["etag"],
+                "headers": {name: response_headers[name] for name in _CACHED_HEADERS if name in response_headers},
+                "body": body,
+            })
+        return response_headers, value
+
+    def get_pages(self, path: str) -> Iterator[Any]:
+        """
+        The JSON body of every page of path, in order. The first page tells the number of pages, and the rest are
+        fetched concurrently over the pooled connections.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        separator: str = "&" if "?" in path else "?"
+        page_path: str = "{}{}per_page={}&page={{}}".format(path, separator, API_PAGE_SIZE)
+        headers, first_page = self.get(page_path.format(1))
+        yield first_page
+        last_page: int = _get_last_page(headers)
+        if last_page < 2:
+            return
+        with ThreadPoolExecutor(max_workers=self.pool.max_connections) as executor:
+            for _, page in executor.map(self.get, [page_path.format(n) for n in range(2, last_page + 1)]):
+                yield page
+
+    def close(self):
+        self.pool.close()
+
+
+def _get_error_message(body: bytes) -> str:
+    try:
+        message: Any = json.loads(body).get("message")
+    except (ValueError, AttributeError):
+        return ""
+    return " {}".format(message) if message else ""
+
+
+def _get_last_page(headers: Dict[str, str]) -> int:
+    """The number of pages from GitLab's X-Total-Pages header, or the rel="last" link of the Link header."""
+    if headers.get("x-total-pages", "").isdigit():
+        return int(headers["x-total-pages"])
+    match = _REGEX_LAST_PAGE_LINK.search(headers.get("link", ""))
+    if match:
+        pages: List[str] = parse_qs(urlsplit(match.group(1)).query).get("page", [])
+        if pages and pages[0].isdigit():
+            return int(pages[0])
+    return 1
+
+
+def get_api_base_url(remote: GitRemote) -> str:
+    """$WEBGIT_API_URL, or the API root of the remote's host."""
+    if os.environ.get(ENV_API_URL):
+        return os.environ[ENV_API_URL]
+    host: str = remote.url.split("/", 1)[0]
+    return API_HOST_BASE_URLS.get(host) or API_BASE_URLS[remote.web_host].format(host=host)
+
+
+def _get_api_headers(web_host: str) -> Tuple[Dict[str, str], str]:
+    # the request headers, and a cache key prefix that keeps the responses of different tokens apart
+    headers: Dict[str, str] = {"User-Agent": "webgit", "Accept": "application/json"}
+    if web_host == "github":
+        headers["Accept"] = "application/vnd.github+json"
+    token: Optional[str] = os.environ.get(ENV_API_TOKENS[web_host])
+    if not token:
+        return headers, ""
+    import hashlib
+    if web_host == "github":
+        headers["Authorization"] = "Bearer {}".format(token)
+    else:
+        headers["PRIVATE-TOKEN"] = token
+    return headers, hashlib.sha256(token.encode("utf-8")).hexdigest()[:16] + " "
+
+
+def _to_record(web_host: str, item: Dict[str, Any]) -> Dict[str, Any]:
+    if web_host == "gitlab":
+        return {
+            "number": item.get("iid"),
+            "title": item.get("title"),
+            "state": item.get("state"),
+            "author": (item.get("author") or {}).get("username"),
+            "url": item.get("web_url"),
+        }
+    return {
+        "number": item.get("number"),
+        "title": item.get("title"),
+        "state": item.get("state"),
+        "author": (item.get("user") or {}).get("login"),
+        "url": item.get("html_url"),
+    }
+
+
+def list_items(
+        command: List[str],
+        repo_state: RepoState,
+        remote: Optional[str] = None,
+        git_user: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    The pull requests or issues of the upstream remote for "prs", "myprs [user]" or "issues", fetched from the
+    GitHub or GitLab REST API, as records of number, title, state, author and url.
+    """
+    list_command: str = command[0] if command else ""
+    if list_command not in API_LIST_PATHS:
+        raise CommandException("--list requires one of: {}".format(", ".join(API_LIST_PATHS)))
+    upstream_remote: GitRemote = get_upstream_repo(repo_state.git_repos, default_remote_name=remote)
+    web_host: str = upstream_remote.web_host
+    if web_host not in API_LIST_PATHS[list_command]:
+        raise CommandException("--list not supported for {} remotes: {}".format(web_host or "unknown", list_command))
+
+    repo_path: str = upstream_remote.url.split("/", 1)[1]
+    user: str = ""
+    if list_command == "myprs":
+        user = get_my_prs_user(git_user or (command[1] if len(command) > 1 else None), repo_state.git_repos)
+    path: str = API_LIST_PATHS[list_command][web_host].format(
+        path=repo_path, project=quote(repo_path, safe=""), user=quote(user or "", safe=""))
+
+    headers, cache_key_prefix = _get_api_headers(web_host)
+    client: ApiClient = ApiClient(get_api_base_url(upstream_remote), headers, cache_key_prefix)
+    try:
+        for page in client.get_pages(path):
+            items: List[Dict[str, Any]] = page.get("items", []) if isinstance(page, dict) else page
+            for item in items:
+                if list_command == "issues" and "pull_request" in item:
+                    continue  # GitHub lists pull requests as issues too
+                yield _to_record(web_host, item)
+    finally:
+        client.close()
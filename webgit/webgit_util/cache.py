@@ -0,0 +1,156 @@
+import marshal
+import os
+import time
+import zlib
+from typing import List, Optional, Tuple
+
+from . import trace
+from .constants import (
+    CACHE_MAX_SIZE_BYTES,
+    CACHE_RACY_MTIME_SECONDS,
+    ENV_NO_CACHE,
+)
+
+CACHE_MAGIC: bytes = b"WGC1"
+
+FileSignature = Tuple[str, int, int, int]
+
+
+def get_cache_dir() -> Optional[str]:
+    """$XDG_CACHE_HOME/webgit, or None when caching is disabled with WEBGIT_NO_CACHE."""
+    if os.environ.get(ENV_NO_CACHE):
+        return None
+    cache_home: str = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "webgit")
+
+
+def get_file_signatures(file_paths: List[str]) -> List[FileSignature]:
+    """(path, mtime_ns, size, inode) per file; files that do not exist are recorded too, so creating one invalidates."""
+    signatures: List[FileSignature] = []
+    for file_path in file_paths:
+        try:
+            stat_result: os.stat_result = os.stat(file_path)
+            signatures.append((file_path, stat_result.st_mtime_ns, stat_result.st_size, stat_result.st_ino))
+        except OSError:
+            signatures.append((file_path, -1, -1, -1))
+    return signatures
+
+
+def get_racy_mtime_ns() -> int:
+    """
+    The mtime after which a file may be modified again without changing its mtime or size, so what is derived from
+    it is not trusted later (the same "racily clean" problem git has with its index).
+    """
+    return time.time_ns() - CACHE_RACY_MTIME_SECONDS * 1_000_000_000
+
+
+def _is_racy(signatures: List[FileSignature]) -> bool:
+    # entries depending on a racy file are not stored
+    racy_after_ns: int = get_racy_mtime_ns()
+    return any(mtime_ns > racy_after_ns for _, mtime_ns, _, _ in signatures)
+
+
+class FileCache:
+    """
+    A directory of small marshal-encoded entries, each validated against the signatures of the files it was
+    derived from. Writes are atomic (write to a temporary file, then rename), so concurrent processes only ever
+    see complete entries, and the least recently used entries are evicted when the directory grows past max_size.
+    """
+
+    def __init__(self, namespace: str, cache_dir: Optional[str] = None, max_size: int = CACHE_MAX_SIZE_BYTES):
+        self.cache_dir: Optional[str] = cache_dir or get_cache_dir()
+        self.namespace_dir: Optional[str] = os.path.join(self.cache_dir, namespace) if self.cache_dir else None
+        self.max_size: int = max_size
+
+    def _get_entry_path(self, key: str) -> str:
+        # the key is stored in the entry and compared on load, so a cheap checksum is enough to name the file
+        key_bytes: bytes = key.encode("utf-8")
+        return os.path.join(self.namespace_dir, "{:08x}{:08x}.bin".format(zlib.crc32(key_bytes), zlib.adler32(key_bytes)))
+
+    def load(self, key: str) -> Optional[dict]:
+        """The entry for key, if all the files it was derived from are unchanged."""
+        if self.namespace_dir is None:
+            return None
+        value: Optional[dict] = self._load(key)
+        trace.instant("cache_hit" if value is not None else "cache_miss", namespace=self.namespace_dir, key=key)
+        return value
+
+    def _load(self, key: str) -> Optional[dict]:
+        entry_path: str = self._get_entry_path(key)
+        try:
+            with open(entry_path, "rb") as f:
+                data: bytes = f.read()
+            if not data.startswith(CACHE_MAGIC):
+                return None
+            entry_key, signatures, value = marshal.loads(data[len(CACHE_MAGIC):])
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+
+        if entry_key != key or get_file_signatures([s[0] for s in signatures]) != list(signatures):
+            return None
+
+        self._touch(entry_path)
+        return value
+
+    def store(self, key: str, file_paths: List[str], value: dict) -> bool:
+        if self.namespace_dir is None:
+            return False
+        signatures: List[FileSignature] = get_file_signatures(file_paths)
+        if _is_racy(signatures):
+            return False
+
+        try:
+            os.makedirs(self.namespace_dir, exist_ok=True)
+            data: bytes = CACHE_MAGIC + marshal.dumps((key, signatures, value))
+            import tempfile
+            file_descriptor, temp_path = tempfile.mkstemp(dir=self.namespace_dir, suffix=".tmp")
+            try:
+                with os.fdopen(file_descriptor, "wb") as f:
+                    f.write(data)
+                os.replace(temp_path, self._get_entry_path(key))
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+            self._evict()
+            return True
+        except OSError:
+            return False
+
+    def update(self, key: str, file_paths: List[str], **values) -> bool:
+        """Merge values into the current entry for key, if it is still valid, and store the result."""
+        value: dict = (self._load(key) if self.namespace_dir is not None else None) or {}
+        value.update(values)
+        return self.store(key, file_paths, value)
+
+    @staticmethod
+    def _touch(entry_path: str):
+        # the mtime of an entry is its last use; only refresh it once a minute to keep hits read-only
+        try:
+            if time.time() - os.stat(entry_path).st_mtime > 60:
+                os.utime(entry_path)
+        except OSError:
+            pass
+
+    def _evict(self):
+        entries: List[Tuple[float, int, str]] = []
+        total_size: int = 0
+        for entry in os.scandir(self.namespace_dir):
+            try:
+                stat_result: os.stat_result = entry.stat()
+            except OSError:
+                continue
+            if entry.name.endswith(".tmp") and time.time() - stat_result.st_mtime < 60:
+                continue  # another process is writing it
+            entries.append((stat_result.st_mtime, stat_result.st_size, entry.path))
+            total_size += stat_result.st_size
+
+        if total_size <= self.max_size:
+            return
+        for _, size, entry_path in sorted(entries):
+            try:
+                os.unlink(entry_path)
+            except OSError:
+                pass
+            total_size -= size
+            if total_size <= self.max_size * 3 // 4:
+                break
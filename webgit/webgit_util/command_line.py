@@ -1,33 +1,101 @@
-import getpass
 import os
 import re
-import subprocess
-from argparse import ArgumentParser, Namespace, RawTextHelpFormatter
-from typing import List, Tuple, Optional
+import sys
+import time
+from types import SimpleNamespace
+from typing import Any, BinaryIO, Deque, Dict, Iterator, List, Optional, TextIO, Tuple, TYPE_CHECKING
+
+# argparse, subprocess, json and the modules behind batch, scan and serve are imported where they are used, so the
+# common invocations only pay for what they run
+if TYPE_CHECKING:
+    from argparse import ArgumentParser, Namespace
+    from concurrent.futures import Future
+    from .verify import BackgroundVerifier
 
 from .constants import (
-    ENV_DEFAULT_ORIGIN_REPO_NAME,
-    ENV_DEFAULT_UPSTREAM_REPO_NAME,
-    ENV_DEFAULT_USER,
-    REGEX_COMMIT_HASH,
-    REGEX_PULL_REQUEST_HASH,
-    WEB_ADDRESS_TEMPLATES,
+    ANNOTATE_FORMATS,
+    BATCH_READ_SIZE,
+    BATCH_REPO_STATE_CACHE_SIZE,
+    ENV_TRACE,
+    SERVE_DEFAULT_PORT,
+    VERIFY_MAX_PENDING,
 )
-
-from .repository import (
-    get_branch_info,
-    GitException,
-    GitRemoteRepo,
-    get_remote_repos,
+from . import trace
+from .hosts import HostConfigException
+from .launcher import BrowserLauncher, Launcher, LauncherException
+
+from .repository import get_exception_message
+from .resolver import (
+    Command,
+    CommandException,
+    resolve,
+    RepoState,
+    split_targets,
+    UnrecognizedCommandException,
 )
 
 
-def _create_argument_parser() -> ArgumentParser:
+# the options the fast path parses, and the defaults of every option, which must match _create_argument_parser
+_FAST_PATH_FLAG_OPTIONS: Dict[str, str] = {
+    "-a": "print_address",
+    "--print-address": "print_address",
+    "--list": "list",
+    "--verify": "verify",
+}
+
+_FAST_PATH_VALUE_OPTIONS: Dict[str, str] = {
+    "-C": "path",
+    "--path": "path",
+    "-f": "file",
+    "--file": "file",
+    "-o": "org",
+    "--org": "org",
+    "-u": "git_user",
+    "--git-user": "git_user",
+    "-r": "remote",
+    "--remote": "remote",
+    "--trace": "trace",
+}
+
+_ARGUMENT_DEFAULTS: Dict[str, Any] = {
+    "command": "repo",
+    "print_address": False,
+    "list": False,
+    "verify": False,
+    "path": None,
+    "file": None,
+    "org": None,
+    "git_user": None,
+    "remote": None,
+    "batch": False,
+    "jobs": None,
+    "resume": None,
+    "bind": "127.0.0.1",
+    "port": SERVE_DEFAULT_PORT,
+    "json": False,
+    "null": False,
+    "trace": None,
+    "format": None,
+    "columnar": False,
+    "shared_hooks": False,
+}
+
+
+def _raise_command_exception(message: str):
+    raise CommandException(message)
+
+
+def _create_argument_parser(raise_errors: bool = False) -> "ArgumentParser":
+    from argparse import ArgumentParser, RawTextHelpFormatter
+
     parser: ArgumentParser = ArgumentParser(
         prog="webgit",
         description="Open Github and Gitlab web pages",
         formatter_class=RawTextHelpFormatter,
+        add_help=not raise_errors,
     )
+    if raise_errors:
+        parser.error = _raise_command_exception
 
     command_help: str = "\n".join([
         "commits - open webpage for commits",
@@ -40,8 +108,19 @@ def _create_argument_parser() -> ArgumentParser:
         "issue [number]      - open webpage for specified issue",
         "issues   - open webpage for all issue",
         "tree [commit | branch | tag] - open webpage for commit, branch or tag tree",
+        "compare base...head | base..head - open webpage comparing branches, since their merge base or directly",
+        "blob path[:line[-line]] ... - open webpage for files at the commit checked out, e.g. blob src/main.py:10-20",
         "[commit_hash] (e.g 76ac43b)  - open webpage for commit",
         "[pull_request_number] (e.g. 7, 3034, #1234567) - open webpage for pull request",
+        "scan root [command]  - print the address for command in every repository under root as JSON lines",
+        "serve [name=path ...] - serve redirects like /name/4501 to the web pages of the named repositories",
+        "annotate - copy stdin to stdout with commit hashes, #1234 references and paths turned into links",
+        "export-links [file] - write hash<TAB>url for every commit in the commit-graph to file or stdout",
+        "completion bash|zsh|fish - print the shell completion script, e.g. eval \"$(webgit completion bash)\"",
+        "install-hooks - add git hooks that keep webgit's caches warm after checkouts, merges and fetches",
+        "uninstall-hooks - remove webgit's git hooks, putting back the hooks they ran",
+        "lsp - answer editors' permalink requests for files and line ranges as JSON-RPC on stdin and stdout",
+        "Several targets, e.g. 4501 4502 issues 370, are opened with one browser launch",
     ])
 
     parser.add_argument(
@@ -53,223 +132,529 @@ def _create_argument_parser() -> ArgumentParser:
     )
 
     parser.add_argument("-a", "--print-address", help="print the web address", default=False, action="store_true")
+    parser.add_argument(
+        "--list",
+        help="with prs, myprs or issues, print the items from the GitHub or GitLab API as JSON lines",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--verify",
+        help="check that each web address exists and print it with ok, missing, redirected or error, also with --batch",
+        default=False,
+        action="store_true",
+    )
     parser.add_argument("-C", "--path", help="git repository directory")
     parser.add_argument("-f", "--file", help="full repository path for file or directory")
     parser.add_argument("-o", "--org", help="git web org or project name")
     parser.add_argument("-u", "--git-user", help="git web username, e.g. username for github")
     parser.add_argument("-r", "--remote", help="the git remote to use, e.g. main, upstream")
+    parser.add_argument(
+        "--batch",
+        help="read one command per line from stdin and print one web address per line",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument("-j", "--jobs", help="with scan, the number of repositories to resolve at once", type=int)
+    parser.add_argument(
+        "--resume",
+        help="with scan, skip repositories already resolved in this earlier scan output file",
+        metavar="FILE",
+    )
+    parser.add_argument("--bind", help="with serve, the address to listen on", default="127.0.0.1")
+    parser.add_argument("--port", help="with serve, the port to listen on", default=SERVE_DEFAULT_PORT, type=int)
+    parser.add_argument("--json", help="with --batch, print JSON records", default=False, action="store_true")
+    parser.add_argument(
+        "-z", "--null",
+        help="with --batch, separate input and output records with NUL instead of newline",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--format",
+        help="with annotate, write links as urls, osc8 terminal hyperlinks or markdown (osc8 on a terminal, else url)",
+        choices=ANNOTATE_FORMATS,
+    )
+    parser.add_argument(
+        "--columnar",
+        help="with export-links, write the compact binary columnar format instead of text lines",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--shared-hooks",
+        help="with install-hooks or uninstall-hooks, also change a core.hooksPath outside the git directory, "
+             "which other repositories may share",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--trace",
+        help="write a Chrome trace-event JSON timeline of this run to FILE (- for stderr), also set by WEBGIT_TRACE",
+        metavar="FILE",
+    )
 
     return parser
 
 
-def run_program(parameters: List[str]):
-    parser: ArgumentParser = _create_argument_parser()
-    args_namespace: Namespace = parser.parse_args(parameters)
-
-    if isinstance(args_namespace.command, list):
-        webgit_command: str = args_namespace.command[0]
-        webgit_commands: List[str] = args_namespace.command
-    else:
-        webgit_command = args_namespace.command
-        webgit_commands = [webgit_command]
+def _parse_fast_path(parameters: List[str]) -> Optional[SimpleNamespace]:
+    """
+    Parse the common invocations (commands plus -a, -C, -f, -o, -u and -r) without building the argparse parser.
+    Returns None for anything else, e.g. --help, other options or a missing option value, which argparse then
+    handles or reports.
+    """
+    values: Dict[str, Any] = dict(_ARGUMENT_DEFAULTS)
+    commands: List[str] = []
+    options_after_commands: bool = False
+    i: int = 0
+    while i < len(parameters):
+        parameter: str = parameters[i]
+        if parameter in _FAST_PATH_FLAG_OPTIONS:
+            values[_FAST_PATH_FLAG_OPTIONS[parameter]] = True
+        elif parameter in _FAST_PATH_VALUE_OPTIONS:
+            if i + 1 == len(parameters) or (parameters[i + 1].startswith("-") and parameters[i + 1] != "-"):
+                return None
+            values[_FAST_PATH_VALUE_OPTIONS[parameter]] = parameters[i + 1]
+            i += 1
+        elif parameter.startswith("--") and parameter.split("=", 1)[0] in _FAST_PATH_VALUE_OPTIONS:
+            option, value = parameter.split("=", 1)
+            values[_FAST_PATH_VALUE_OPTIONS[option]] = value
+        elif parameter.startswith("-"):
+            return None
+        elif options_after_commands:
+            return None  # argparse only accepts the commands as one group
+        else:
+            commands.append(parameter)
+            i += 1
+            continue
+        options_after_commands = len(commands) > 0
+        i += 1
+
+    if commands:
+        values["command"] = commands
+    return SimpleNamespace(**values)
+
+
+def run_program(parameters: List[str], launcher: Optional[Launcher] = None):
+    """Run webgit with the command line parameters, opening web pages with launcher, the browser by default."""
+    if parameters and parameters[0] == "__complete":
+        _run_complete(parameters[1:], sys.stdout)
+        return
+    if parameters and parameters[0] == "__hook":
+        _run_hook()
+        return
+    start_time: float = time.perf_counter()
+    args_namespace: Any = _parse_fast_path(parameters)
+    parser_name: str = "fast_path"
+    if args_namespace is None:
+        args_namespace = _create_argument_parser().parse_args(parameters)
+        parser_name = "argparse"
+
+    trace_path: Optional[str] = args_namespace.trace or os.environ.get(ENV_TRACE)
+    if trace_path:
+        trace.enable(trace_path, origin_time=start_time)
+        trace.add_span("parse_arguments", start_time, time.perf_counter(), parser=parser_name, argv=parameters)
+    try:
+        _run_command(args_namespace, launcher)
+    finally:
+        trace.write()
+
+
+def _run_command(args_namespace: Any, launcher: Optional[Launcher] = None):
+    if args_namespace.batch:
+        _run_batch(args_namespace, sys.stdin, sys.stdout)
+        return
+
+    if isinstance(args_namespace.command, list) and args_namespace.command[0] == "scan":
+        _run_scan(args_namespace, sys.stdout)
+        return
+
+    if isinstance(args_namespace.command, list) and args_namespace.command[0] == "serve":
+        _run_serve(args_namespace)
+        return
+
+    if isinstance(args_namespace.command, list) and args_namespace.command[0] == "annotate":
+        _run_annotate(args_namespace, sys.stdin.buffer, sys.stdout.buffer)
+        return
+
+    if isinstance(args_namespace.command, list) and args_namespace.command[0] == "completion":
+        _run_completion(args_namespace, sys.stdout)
+        return
+
+    if isinstance(args_namespace.command, list) and args_namespace.command[0] == "export-links":
+        _run_export_links(args_namespace, sys.stdout.buffer)
+        return
+
+    if isinstance(args_namespace.command, list) and args_namespace.command[0] in ["install-hooks", "uninstall-hooks"]:
+        _run_install_hooks(args_namespace, sys.stdout)
+        return
+
+    if isinstance(args_namespace.command, list) and args_namespace.command[0] == "lsp":
+        _run_lsp(args_namespace)
+        return
+
+    if isinstance(args_namespace.command, list) and args_namespace.command[0] == "blob":
+        _run_blob(args_namespace, launcher)
+        return
+
+    if args_namespace.list:
+        _run_list(args_namespace, sys.stdout)
+        return
 
-    web_address: str = ""
     git_dir: str = args_namespace.path or os.getcwd()
-    git_repos: List[GitRemoteRepo] = get_remote_repos(git_dir)
-    upstream_remote: GitRemoteRepo = _get_upstream_repo(
-        git_repos,
-        default_remote_name=args_namespace.remote,
-    )
-    web_host: str = upstream_remote.web_host
-    remote_url: str = upstream_remote.url
-
-    if webgit_command == "repo":
-        web_address = "https://{}".format(remote_url)
-
-    elif webgit_command == "org" or webgit_command == "user":
-        org_or_user: str = args_namespace.org or args_namespace.user
-        web_address = WEB_ADDRESS_TEMPLATES["org_or_user"][web_host].format(org_or_user)
-
-    elif webgit_command == "commits":
-        web_address = WEB_ADDRESS_TEMPLATES["commits"][web_host].format(remote_url)
-
-    elif webgit_command == "pr":
-        from_repo_name, from_branch_name = _split_repo_branch(webgit_commands[1] if len(webgit_commands) > 1 else None)
-        to_repo_name, to_branch_name = _split_repo_branch(webgit_commands[2] if len(webgit_commands) > 2 else None)
-
-        if not (from_branch_name and to_branch_name):
-            branch_info = get_branch_info(git_dir)
-            if not from_branch_name:
-                from_branch_name = branch_info.from_branch
-            if not to_repo_name:
-                to_repo_name = branch_info.to_repo
-            if not to_branch_name:
-                to_branch_name = branch_info.to_branch
-
-        if from_repo_name == upstream_remote.name:
-            from_repo = upstream_remote
-        else:
-            from_repo = _get_origin_repo(git_repos, from_repo_name)
+    try:
+        with trace.span("read_repository", git_dir=git_dir):
+            repo_state: RepoState = RepoState(git_dir)
+        web_addresses: List[str] = [
+            _get_web_address(args_namespace, target, repo_state) for target in split_targets(args_namespace.command)]
+    except UnrecognizedCommandException:
+        print("Unrecognized command")
+        _create_argument_parser().print_help()
+        exit(1)
+    except (CommandException, HostConfigException) as e:
+        print(e)
+        return
+    _open_web_addresses(args_namespace, web_addresses, launcher)
 
-        if to_repo_name == upstream_remote.name:
-            to_repo = upstream_remote
-        else:
-            to_repo = _get_upstream_repo(git_repos, to_repo_name)
 
-        if web_host == "gitlab":
-            web_address = WEB_ADDRESS_TEMPLATES["pr"][web_host].format(to_repo.url, from_branch_name, to_branch_name)
-        else:
-            web_address = WEB_ADDRESS_TEMPLATES["pr"][web_host].format(
-                to_repo.url, to_branch_name, from_repo.org_or_user, from_branch_name
-            )
-
-    elif webgit_command == "prs":
-        web_address = WEB_ADDRESS_TEMPLATES["view_prs"][web_host].format(remote_url)
-
-    elif webgit_command == "myprs":
-        git_user: str = (
-                args_namespace.git_user or
-                (webgit_commands[1] if len(webgit_commands) > 1 else None) or
-                os.environ.get(ENV_DEFAULT_USER) or
-                getpass.getuser() or
-                _get_origin_repo_user(git_repos)
-        )
-        web_address = WEB_ADDRESS_TEMPLATES["my_prs"][web_host].format(remote_url, git_user)
-
-    elif webgit_command in ["issue", "issues"]:
-        issue_number: str = webgit_commands[1] if len(webgit_commands) > 1 else None
-        if issue_number:
-            web_address = WEB_ADDRESS_TEMPLATES["issue"][web_host].format(remote_url, issue_number)
-        else:
-            web_address = WEB_ADDRESS_TEMPLATES["issues"][web_host].format(remote_url)
-
-    elif webgit_command == "tree":
-        git_object: str = webgit_commands[1] if len(webgit_commands) > 1 else None
-        if not git_object:
-            print("Git commit, branch or tag required after \"tree\"")
-            return
-        git_file_path: str = (
-            args_namespace.file or
-            (webgit_commands[2] if len(webgit_commands) > 2 else None)
-        )
-        if git_file_path:
-            web_address = WEB_ADDRESS_TEMPLATES["tree_file"][web_host].format(
-                remote_url, git_object, git_file_path)
-        else:
-            web_address = WEB_ADDRESS_TEMPLATES["tree"][web_host].format(remote_url, git_object)
-
-    elif re.match(REGEX_COMMIT_HASH, webgit_command):
-        git_file_path: str = (
-            args_namespace.file or
-            (webgit_commands[1] if len(webgit_commands) > 1 else None)
-        )
-        if git_file_path:
-            web_address = WEB_ADDRESS_TEMPLATES["tree_file"][web_host].format(
-                remote_url, webgit_command, git_file_path)
-        else:
-            web_address = WEB_ADDRESS_TEMPLATES["commit"][web_host].format(remote_url, webgit_command)
+def _open_web_addresses(args_namespace: Any, web_addresses: List[str], launcher: Optional[Launcher] = None):
+    """Verify, print or launch the web addresses, as the options ask."""
+    if args_namespace.verify:
+        _print_verified(web_addresses)
+        return
+
+    if args_namespace.print_address:
+        print("\n".join(web_addresses))
+        return
 
-    elif re.match(REGEX_PULL_REQUEST_HASH, webgit_command):
-        web_address = WEB_ADDRESS_TEMPLATES["view_pr"][web_host].format(
-            remote_url,
-            webgit_command.replace("#", "")
-        )
+    with trace.span("launch", urls=web_addresses):
+        try:
+            (launcher or BrowserLauncher()).launch(web_addresses)
+        except LauncherException as e:
+            print(e)
 
-    else:
-        print("Unrecognized command")
-        parser.print_help()
+
+def _print_verified(web_addresses: List[str]):
+    """Check the web addresses concurrently and print one result per line, failing when any is missing."""
+    from .verify import format_result, verify_urls, VerifyResult
+
+    with trace.span("verify", urls=web_addresses):
+        results: List[VerifyResult] = verify_urls(web_addresses)
+    for result in results:
+        print(format_result(result))
+    if any(result.status in ["missing", "error"] for result in results):
         exit(1)
 
-    if args_namespace.print_address:
-        print(web_address)
-    else:
-        subprocess.Popen(["open", web_address], stdout=subprocess.PIPE, encoding="utf-8")
 
+def _get_resolve_options(args_namespace: "Namespace") -> Dict[str, Optional[str]]:
+    return {
+        "remote": args_namespace.remote,
+        "org": args_namespace.org,
+        "git_user": args_namespace.git_user,
+        "file": args_namespace.file,
+    }
+
+
+def _get_web_address(args_namespace: "Namespace", command: Command, repo_state: RepoState) -> str:
+    with trace.span("resolve", command=command) as span_args:
+        web_address: str = resolve(command, repo_state, warn=_print_warning, **_get_resolve_options(args_namespace))
+        span_args["url"] = web_address
+        return web_address
+
+
+def _print_warning(message: str):
+    print("webgit: warning: {}".format(message), file=sys.stderr)
+
+
+def _read_batch_commands(input_stream: TextIO, separator: str) -> Iterator[str]:
+    if separator == "\n":
+        for line in input_stream:
+            yield line.rstrip("\r\n")
+        return
+
+    pending: str = ""
+    while True:
+        block: str = input_stream.read(BATCH_READ_SIZE)
+        if not block:
+            break
+        records: List[str] = (pending + block).split(separator)
+        pending = records.pop()
+        yield from records
+    if pending:
+        yield pending
+
+
+def _run_batch(args_namespace: "Namespace", input_stream: TextIO, output_stream: TextIO):
+    """
+    Resolve one command per input record and write one web address (or JSON record) per output record, reusing
+    the remotes and branch facts of each repository across records. Failing records are reported individually,
+    as an empty output record plus a message on stderr, or as a JSON record with an "error" key; so are records
+    naming several targets, e.g. "pr 4501 4502", which would need several output records. With --verify,
+    the addresses are checked in the background while later records are resolved, and written in input order.
+    """
+    import json
+    import shlex
+    from collections import deque, OrderedDict
+
+    parser: ArgumentParser = _create_argument_parser(raise_errors=True)
+    separator: str = "\0" if args_namespace.null else "\n"
+    default_git_dir: str = args_namespace.path or os.getcwd()
+    repo_states: "OrderedDict[str, RepoState]" = OrderedDict()
+    verifier: Optional["BackgroundVerifier"] = None
+    if args_namespace.verify:
+        from .verify import BackgroundVerifier, format_result, to_record
+        verifier = BackgroundVerifier()
+    # (command, web address, error, check) of the records not written yet, waiting for their checks
+    pending: Deque[Tuple[str, Optional[str], Optional[str], Optional["Future"]]] = deque()
+
+    def write_record(batch_command: str, web_address: Optional[str], error: Optional[str], check: Optional["Future"]):
+        if args_namespace.json:
+            record: dict = {"command": batch_command, "url": web_address} if error is None else {
+                "command": batch_command, "error": error}
+            if check is not None:
+                record["verify"] = to_record(check.result())
+            output_stream.write(json.dumps(record) + separator)
+        else:
+            if error is not None:
+                print("webgit: {}: {}".format(batch_command, error), file=sys.stderr)
+            output_stream.write((format_result(check.result()) if check is not None else web_address or "") + separator)
+
+    def write_ready(wait: bool):
+        while pending and (wait or pending[0][3] is None or pending[0][3].done()):
+            write_record(*pending.popleft())
+            wait = wait and len(pending) >= VERIFY_MAX_PENDING
+        output_stream.flush()
+
+    try:
+        for batch_command in _read_batch_commands(input_stream, separator):
+            if not batch_command.strip():
+                continue
+            web_address: Optional[str] = None
+            error: Optional[str] = None
+            try:
+                command_namespace: Namespace = parser.parse_args(shlex.split(batch_command))
+                for option in ["path", "file", "org", "git_user", "remote"]:
+                    if getattr(command_namespace, option) is None:
+                        setattr(command_namespace, option, getattr(args_namespace, option))
+
+                git_dir: str = command_namespace.path or default_git_dir
+                repo_state: RepoState = repo_states.pop(git_dir, None) or RepoState(git_dir)
+                repo_states[git_dir] = repo_state
+                if len(repo_states) > BATCH_REPO_STATE_CACHE_SIZE:
+                    repo_states.popitem(last=False)
+
+                # one output record per input record, so a record naming several targets cannot be resolved
+                targets: List[List[str]] = split_targets(command_namespace.command)
+                if len(targets) > 1:
+                    raise CommandException("One target per batch record, got {}: {}".format(
+                        len(targets), ", ".join(" ".join(target) for target in targets)))
+                web_address = _get_web_address(command_namespace, targets[0], repo_state)
+            except Exception as e:  # a failing record must not abort the stream
+                error = get_exception_message(e)
+
+            check: Optional["Future"] = verifier.submit(web_address) if verifier and web_address else None
+            pending.append((batch_command, web_address, error, check))
+            write_ready(len(pending) >= VERIFY_MAX_PENDING)
+        while pending:
+            write_ready(True)
+    finally:
+        if verifier is not None:
+            verifier.close()
+
+
+def _run_scan(args_namespace: "Namespace", output_stream: TextIO):
+    """Resolve the command after "scan ROOT" for every repository under ROOT, printing JSON lines as they finish."""
+    import json
+    from .scan import read_resolved_paths, scan_repositories
+
+    if len(args_namespace.command) < 2:
+        print("Directory required after \"scan\"")
+        return
+    root: str = args_namespace.command[1]
+    scan_commands: List[str] = args_namespace.command[2:] or ["repo"]
+
+    def resolve_repository(path: str) -> str:
+        with trace.span("resolve", command=scan_commands, path=path):
+            return resolve(scan_commands, RepoState(path), **_get_resolve_options(args_namespace))
+
+    for record in scan_repositories(
+            root,
+            resolve_repository,
+            max_workers=args_namespace.jobs,
+            skip_paths=read_resolved_paths(args_namespace.resume)):
+        output_stream.write(json.dumps(record) + "\n")
+        output_stream.flush()
+
+
+def _run_list(args_namespace: "Namespace", output_stream: TextIO):
+    """Print the pull requests or issues from the API as JSON lines, each page as soon as it arrives."""
+    import json
+    from .api import ApiException, list_items
+
+    command: List[str] = (
+        args_namespace.command if isinstance(args_namespace.command, list) else [args_namespace.command])
+    try:
+        repo_state: RepoState = RepoState(args_namespace.path or os.getcwd())
+        for record in list_items(command, repo_state, args_namespace.remote, args_namespace.git_user):
+            output_stream.write(json.dumps(record) + "\n")
+            output_stream.flush()
+    except (ApiException, CommandException, HostConfigException) as e:
+        print(e)
+
+
+def _run_annotate(args_namespace: "Namespace", input_stream: BinaryIO, output_stream: BinaryIO):
+    """Copy input_stream to output_stream with the references to the repository turned into links."""
+    from .annotate import Annotator
+
+    output_format: str = args_namespace.format or ("osc8" if output_stream.isatty() else "url")
+    try:
+        annotator: Annotator = Annotator(
+            RepoState(args_namespace.path or os.getcwd()), args_namespace.remote, output_format)
+    except (CommandException, HostConfigException) as e:
+        print(e, file=sys.stderr)
+        exit(1)
+    with trace.span("annotate", format=output_format):
+        annotator.annotate_stream(input_stream, output_stream)
 
-def _get_relevant_remote(git_repos: List[GitRemoteRepo], remote_name: str) -> GitRemoteRepo:
 
-    if len(git_repos) == 0:
-        raise GitException("")
+def _run_complete(words: List[str], output_stream: TextIO):
+    """Print the completions of the last of words, one per line, for the shell completion scripts."""
+    from .completion import complete
 
-    remote_repo_name: str = (
-            remote_name or
-            os.getenv(ENV_DEFAULT_UPSTREAM_REPO_NAME) or
-            "upstream"
-    )
+    try:
+        candidates: List[str] = complete(words or [""])
+    except Exception:  # completion must never print errors into the command line
+        return
+    if candidates:
+        output_stream.write("\n".join(candidates) + "\n")
 
-    git_repo: GitRemoteRepo
-    if remote_repo_name:
-        matching_git_repos = [r for r in git_repos if r.name == remote_repo_name]
-        if len(matching_git_repos) > 0:
-            return matching_git_repos[0]
 
-    return git_repos[0]
+def _run_completion(args_namespace: "Namespace", output_stream: TextIO):
+    """Print the completion script for the shell after "completion"."""
+    from .completion import COMPLETION_SCRIPTS
 
+    shell: Optional[str] = args_namespace.command[1] if len(args_namespace.command) == 2 else None
+    if shell not in COMPLETION_SCRIPTS:
+        print("Usage: webgit completion {}".format("|".join(sorted(COMPLETION_SCRIPTS))), file=sys.stderr)
+        exit(1)
+    output_stream.write(COMPLETION_SCRIPTS[shell])
 
-def _get_remote_repo(
-        git_repos: List[GitRemoteRepo],
-        remote_name: Optional[str] = None,
-        default_env_var_key: Optional[str] = None,
-        default_remote_name: Optional[str] = None,
-        no_match_default_first: bool = True,
-) -> Optional[GitRemoteRepo]:
 
-    if len(git_repos) == 0:
-        raise GitException("")
+def _run_hook():
+    """Warm the caches the changes reported by the hooks from install-hooks affect, started by the first of them."""
+    from .hooks import run_hook
 
-    remote_repo_name: str = (
-            remote_name or
-            (os.getenv(default_env_var_key) if default_env_var_key else None) or
-            default_remote_name
-    )
+    try:
+        run_hook()
+    except Exception:  # a failed warm-up only leaves the work to the next interactive call
+        pass
 
-    git_repo: GitRemoteRepo
-    if remote_repo_name:
-        matching_git_repos = [r for r in git_repos if r.name == remote_repo_name]
-        if len(matching_git_repos) > 0:
-            return matching_git_repos[0]
-
-    if no_match_default_first:
-        return git_repos[0]
-    else:
-        return None
-
-
-def _get_origin_repo(
-        git_repos: List[GitRemoteRepo],
-        default_remote_name: Optional[str] = None
-) -> Optional[GitRemoteRepo]:
-    return _get_remote_repo(
-        git_repos,
-        default_env_var_key=ENV_DEFAULT_ORIGIN_REPO_NAME,
-        default_remote_name=(default_remote_name if default_remote_name else "origin")
-    )
 
+def _run_install_hooks(args_namespace: "Namespace", output_stream: TextIO):
+    """Install (or with uninstall-hooks, remove) webgit's git hooks in the repository."""
+    from .hooks import HookException, install_hooks, uninstall_hooks
 
-def _get_upstream_repo(
-        git_repos: List[GitRemoteRepo],
-        default_remote_name: Optional[str] = None
-) -> Optional[GitRemoteRepo]:
-    return _get_remote_repo(
-        git_repos,
-        default_env_var_key=ENV_DEFAULT_UPSTREAM_REPO_NAME,
-        default_remote_name=(default_remote_name if default_remote_name else "upstream")
-    )
+    git_dir: str = args_namespace.path or os.getcwd()
+    try:
+        if args_namespace.command[0] == "install-hooks":
+            messages: List[str] = install_hooks(git_dir, shared=args_namespace.shared_hooks, warn=_print_warning)
+        else:
+            messages = uninstall_hooks(git_dir, shared=args_namespace.shared_hooks, warn=_print_warning)
+    except (HookException, OSError) as e:
+        print(e, file=sys.stderr)
+        exit(1)
+    for message in messages:
+        output_stream.write(message + "\n")
+
+
+def _run_lsp(args_namespace: "Namespace"):
+    """Answer permalink requests from an editor on stdin and stdout, until it exits."""
+    from .lsp import PermalinkServer
+
+    server: PermalinkServer = PermalinkServer(args_namespace.remote)
+    if args_namespace.path:
+        server.root_path = os.path.abspath(args_namespace.path)
+    status: int = server.serve(sys.stdin.buffer, sys.stdout.buffer)
+    if status:
+        exit(status)
+
+
+def _run_blob(args_namespace: "Namespace", launcher: Optional[Launcher] = None):
+    """Open (or with -a print) the permalinks of the files after "blob", at the commits checked out."""
+    from .permalink import LocalPermalinks
+    from .resolver import ResolveResult
 
+    targets: List[str] = args_namespace.command[1:]
+    if not targets:
+        print("Usage: webgit blob PATH[:LINE[-LINE]] ...", file=sys.stderr)
+        exit(1)
+    permalinks: LocalPermalinks = LocalPermalinks(args_namespace.remote, args_namespace.path)
+    with trace.span("blob", targets=len(targets)):
+        results: List[ResolveResult] = permalinks.resolve_many(targets)
+    for result in results:
+        if result.error is not None:
+            print("{}: {}".format(result.command[0], result.error), file=sys.stderr)
+    web_addresses: List[str] = [result.url for result in results if result.url is not None]
+    if web_addresses:
+        _open_web_addresses(args_namespace, web_addresses, launcher)
+    if len(web_addresses) < len(results):
+        exit(1)
 
-def _get_origin_repo_user(git_repos: List[GitRemoteRepo]) -> (GitRemoteRepo or None):
-    origin_repo: GitRemoteRepo = _get_origin_repo(git_repos)
-    if origin_repo is not None:
-        return origin_repo.org_or_user
-    else:
-        return None
 
+def _run_export_links(args_namespace: "Namespace", output_stream: BinaryIO):
+    """Write the commit links of the repository to the file after "export-links", or to output_stream."""
+    from .commit_graph import CommitGraphException
+    from .export_links import export_links
 
-def _split_repo_branch(repo_branch: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
-    if not repo_branch:
-        return None, None
-    if repo_branch.__contains__("/"):
-        repo_branch_split: List[str] = repo_branch.split("/")
-        return repo_branch_split[0], repo_branch_split[1]
-    else:
-        return None, repo_branch
+    if len(args_namespace.command) > 2:
+        print("export-links takes at most one output file", file=sys.stderr)
+        exit(1)
+    output_path: Optional[str] = args_namespace.command[1] if len(args_namespace.command) == 2 else None
+    try:
+        repo_state: RepoState = RepoState(args_namespace.path or os.getcwd())
+        with trace.span("export_links", columnar=args_namespace.columnar) as span_args:
+            if output_path is None:
+                span_args["commits"] = export_links(
+                    repo_state, output_stream, args_namespace.columnar, args_namespace.remote)
+                output_stream.flush()
+            else:
+                with open(output_path, "wb") as output_file:
+                    span_args["commits"] = export_links(
+                        repo_state, output_file, args_namespace.columnar, args_namespace.remote)
+    except (CommandException, CommitGraphException, HostConfigException, OSError) as e:
+        print(e, file=sys.stderr)
+        exit(1)
+
+
+def _run_serve(args_namespace: "Namespace"):
+    """Serve go-links for the NAME=PATH repositories after "serve", or the current repository under its name."""
+    import asyncio
+    from .server import GoLinkServer
+
+    repositories: Dict[str, str] = {}
+    for repository_arg in args_namespace.command[1:]:
+        if "=" not in repository_arg:
+            print("Repositories for \"serve\" must be given as NAME=PATH")
+            exit(1)
+        name, path = repository_arg.split("=", 1)
+        repositories[name] = os.path.abspath(os.path.expanduser(path))
+    if not repositories:
+        git_dir: str = os.path.abspath(args_namespace.path or os.getcwd())
+        repositories[os.path.basename(git_dir)] = git_dir
+
+    def resolve_link(commands: List[str], options: Dict[str, str], repo_state: RepoState) -> str:
+        return resolve(commands, repo_state, **dict(_get_resolve_options(args_namespace), **options))
+
+    def load_repo_state(path: str) -> RepoState:
+        # read everything a link may need when the repository is (re)loaded, off the event loop
+        return RepoState(path).load()
+
+    try:
+        server: GoLinkServer = GoLinkServer(repositories, load_repo_state, resolve_link)
+    except ValueError as e:
+        print(e)
+        exit(1)
+    try:
+        asyncio.run(server.serve_forever(args_namespace.bind, args_namespace.port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,237 @@
+import mmap
+import os
+import struct
+from typing import Dict, Iterator, List, Optional, Tuple
+
+COMMIT_GRAPH_MAGIC: bytes = b"CGPH"
+
+COMMIT_GRAPH_VERSION: int = 1
+
+# the hash sizes of the commit-graph hash versions
+COMMIT_GRAPH_HASH_SIZES: Dict[int, int] = {1: 20, 2: 32}
+
+CHUNK_OID_FANOUT: bytes = b"OIDF"
+
+CHUNK_OID_LOOKUP: bytes = b"OIDL"
+
+CHUNK_COMMIT_DATA: bytes = b"CDAT"
+
+CHUNK_EXTRA_EDGES: bytes = b"EDGE"
+
+CHUNK_TABLE_ENTRY_SIZE: int = 12
+
+COMMIT_GRAPH_HEADER_SIZE: int = 8
+
+FANOUT_SIZE: int = 256 * 4
+
+# a commit data entry after its tree: the positions of the first two parents, then the generation and commit time
+_COMMIT_DATA: struct.Struct = struct.Struct(">IIII")
+
+# a parent position meaning no parent, and the flag of a second parent pointing into the extra edges instead
+GRAPH_PARENT_NONE: int = 0x70000000
+
+GRAPH_EXTRA_EDGES_NEEDED: int = 0x80000000
+
+GRAPH_LAST_EDGE: int = 0x80000000
+
+
+class CommitGraphException(Exception):
+    pass
+
+
+class CommitGraphLayer:
+    """One commit-graph file: the whole graph, or one layer of a split commit-graph chain."""
+
+    def __init__(self, path: str, base_count: int = 0):
+        self.path: str = path
+        # the position of the layer's first commit in the whole chain, which parent positions are counted in
+        self.base_count: int = base_count
+        with open(path, "rb") as f:
+            self.data: mmap.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self.hash_size: int = self._read_header()
+            self.chunks: Dict[bytes, Tuple[int, int]] = self._read_chunk_table()
+            for chunk_id in [CHUNK_OID_FANOUT, CHUNK_OID_LOOKUP]:
+                if chunk_id not in self.chunks:
+                    raise CommitGraphException("{}: missing {} chunk".format(path, chunk_id.decode("ascii")))
+            fanout_start, fanout_end = self.chunks[CHUNK_OID_FANOUT]
+            if fanout_end - fanout_start != FANOUT_SIZE:
+                raise CommitGraphException("{}: invalid OID fanout chunk".format(path))
+            self.count: int = struct.unpack_from(">I", self.data, fanout_start + FANOUT_SIZE - 4)[0]
+            self.oid_lookup_start: int = self.chunks[CHUNK_OID_LOOKUP][0]
+            if self.chunks[CHUNK_OID_LOOKUP][1] - self.oid_lookup_start != self.count * self.hash_size:
+                raise CommitGraphException("{}: invalid OID lookup chunk".format(path))
+            self.fanout_start: int = fanout_start
+            self.commit_data_start: Optional[int] = None
+            if CHUNK_COMMIT_DATA in self.chunks:
+                commit_data_start, commit_data_end = self.chunks[CHUNK_COMMIT_DATA]
+                if commit_data_end - commit_data_start != self.count * (self.hash_size + _COMMIT_DATA.size):
+                    raise CommitGraphException("{}: invalid commit data chunk".format(path))
+                self.commit_data_start = commit_data_start
+        except (CommitGraphException, struct.error):
+            self.data.close()
+            raise
+
+    def _read_header(self) -> int:
+        if len(self.data) < COMMIT_GRAPH_HEADER_SIZE or self.data[:4] != COMMIT_GRAPH_MAGIC:
+            raise CommitGraphException("{}: not a commit-graph file".format(self.path))
+        version, hash_version = self.data[4], self.data[5]
+        if version != COMMIT_GRAPH_VERSION or hash_version not in COMMIT_GRAPH_HASH_SIZES:
+            raise CommitGraphException("{}: unsupported commit-graph version {}, hash version {}".format(
+                self.path, version, hash_version))
+        return COMMIT_GRAPH_HASH_SIZES[hash_version]
+
+    def _read_chunk_table(self) -> Dict[bytes, Tuple[int, int]]:
+        # (start, end) by chunk id; the table ends with a zero id whose offset is the end of the last chunk
+        chunk_count: int = self.data[6]
+        table_end: int = COMMIT_GRAPH_HEADER_SIZE + (chunk_count + 1) * CHUNK_TABLE_ENTRY_SIZE
+        entries: List[Tuple[bytes, int]] = [
+            (self.data[o:o + 4], struct.unpack_from(">Q", self.data, o + 4)[0])
+            for o in range(COMMIT_GRAPH_HEADER_SIZE, table_end, CHUNK_TABLE_ENTRY_SIZE)
+        ]
+        chunks: Dict[bytes, Tuple[int, int]] = {}
+        for (chunk_id, start), (_, end) in zip(entries, entries[1:]):
+            if not start <= end <= len(self.data):
+                raise CommitGraphException("{}: invalid chunk table".format(self.path))
+            chunks[chunk_id] = (start, end)
+        return chunks
+
+    def __len__(self) -> int:
+        return self.count
+
+    def iter_oid_blocks(self, block_commits: int) -> Iterator[bytes]:
+        """The raw object ids of the layer's commits in sorted order, block_commits of them at a time."""
+        block_size: int = block_commits * self.hash_size
+        end: int = self.oid_lookup_start + self.count * self.hash_size
+        for start in range(self.oid_lookup_start, end, block_size):
+            yield self.data[start:min(start + block_size, end)]
+
+    def find_position(self, oid: bytes) -> Optional[int]:
+        """The position of a commit in the layer, by binary search of its fanout range, or None when it is not in."""
+        first_byte: int = oid[0]
+        low: int = struct.unpack_from(">I", self.data, self.fanout_start + (first_byte - 1) * 4)[0] if first_byte else 0
+        high: int = struct.unpack_from(">I", self.data, self.fanout_start + first_byte * 4)[0]
+        while low < high:
+            middle: int = (low + high) // 2
+            start: int = self.oid_lookup_start + middle * self.hash_size
+            middle_oid: bytes = self.data[start:start + self.hash_size]
+            if middle_oid < oid:
+                low = middle + 1
+            elif middle_oid > oid:
+                high = middle
+            else:
+                return middle
+        return None
+
+    def get_oid(self, position: int) -> bytes:
+        start: int = self.oid_lookup_start + position * self.hash_size
+        return self.data[start:start + self.hash_size]
+
+    def get_commit(self, position: int) -> Tuple[int, int, List[int]]:
+        """
+        (generation, commit time, parent positions in the chain) of the commit at position in the layer. The
+        generation is the topological level: one more than the highest of the parents, or 0 if it was not computed.
+        """
+        parent1, parent2, generation_time, time = _COMMIT_DATA.unpack_from(
+            self.data, self.commit_data_start + position * (self.hash_size + _COMMIT_DATA.size) + self.hash_size)
+        parents: List[int] = [] if parent1 == GRAPH_PARENT_NONE else [parent1]
+        if parent2 & GRAPH_EXTRA_EDGES_NEEDED:
+            if CHUNK_EXTRA_EDGES not in self.chunks:
+                raise CommitGraphException("{}: missing EDGE chunk".format(self.path))
+            edges_start, edges_end = self.chunks[CHUNK_EXTRA_EDGES]
+            offset: int = edges_start + (parent2 & ~GRAPH_EXTRA_EDGES_NEEDED) * 4
+            while offset < edges_end:
+                edge: int = struct.unpack_from(">I", self.data, offset)[0]
+                parents.append(edge & ~GRAPH_LAST_EDGE)
+                if edge & GRAPH_LAST_EDGE:
+                    break
+                offset += 4
+        elif parent2 != GRAPH_PARENT_NONE:
+            parents.append(parent2)
+        return generation_time >> 2, (generation_time & 0x3) << 32 | time, parents
+
+    def close(self):
+        self.data.close()
+
+
+class CommitGraph:
+    """The commit-graph of a repository: one file, or the layers of a split chain from the base layer up."""
+
+    def __init__(self, layers: List[CommitGraphLayer]):
+        self.layers: List[CommitGraphLayer] = layers
+        self.hash_size: int = layers[0].hash_size if layers else 20
+
+    def __len__(self) -> int:
+        return sum(len(layer) for layer in self.layers)
+
+    @property
+    def has_commit_data(self) -> bool:
+        """Whether every layer has the parents and generations of its commits, as git always writes them."""
+        return bool(self.layers) and all(layer.commit_data_start is not None for layer in self.layers)
+
+    def _get_layer(self, position: int) -> CommitGraphLayer:
+        for layer in reversed(self.layers):
+            if position >= layer.base_count:
+                if position - layer.base_count >= layer.count:
+                    break
+                return layer
+        raise CommitGraphException("Commit position {} out of range".format(position))
+
+    def find_position(self, hex_name: str) -> Optional[int]:
+        """The position of a commit in the chain, or None when it is not in the commit-graph."""
+        oid: bytes = bytes.fromhex(hex_name)
+        for layer in self.layers:
+            position: Optional[int] = layer.find_position(oid)
+            if position is not None:
+                return layer.base_count + position
+        return None
+
+    def get_hex_name(self, position: int) -> str:
+        layer: CommitGraphLayer = self._get_layer(position)
+        return layer.get_oid(position - layer.base_count).hex()
+
+    def get_commit(self, position: int) -> Tuple[int, int, List[int]]:
+        """(generation, commit time, parent positions) of the commit at position in the chain."""
+        layer: CommitGraphLayer = self._get_layer(position)
+        return layer.get_commit(position - layer.base_count)
+
+    def iter_oid_blocks(self, block_commits: int) -> Iterator[bytes]:
+        """The raw object ids of every commit, layer by layer, in blocks of at most block_commits."""
+        for layer in self.layers:
+            yield from layer.iter_oid_blocks(block_commits)
+
+    def close(self):
+        for layer in self.layers:
+            layer.close()
+        self.layers = []
+
+
+def read_commit_graph(objects_dir: str) -> Optional[CommitGraph]:
+    """
+    The commit-graph in objects_dir/info, read as git does: the single commit-graph file if there is one, otherwise
+    the chain of split commit-graph files. None when the repository has no commit-graph.
+    """
+    info_dir: str = os.path.join(objects_dir, "info")
+    graph_path: str = os.path.join(info_dir, "commit-graph")
+    graphs_dir: str = os.path.join(info_dir, "commit-graphs")
+    if os.path.isfile(graph_path):
+        layer_paths: List[str] = [graph_path]
+    else:
+        try:
+            with open(os.path.join(graphs_dir, "commit-graph-chain"), encoding="ascii") as f:
+                layer_paths = [
+                    os.path.join(graphs_dir, "graph-{}.graph".format(line.strip())) for line in f if line.strip()]
+        except (OSError, UnicodeDecodeError):
+            return None
+    layers: List[CommitGraphLayer] = []
+    try:
+        for layer_path in layer_paths:
+            try:
+                layers.append(CommitGraphLayer(layer_path, sum(len(layer) for layer in layers)))
+            except (OSError, ValueError) as e:  # mmap raises ValueError for an empty file
+                raise CommitGraphException("{}: {}".format(layer_path, e))
+    except CommitGraphException:
+        for layer in layers:
+            layer.close()
+        raise
+    return CommitGraph(layers)
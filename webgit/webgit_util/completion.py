@@ -0,0 +1,269 @@
+import os
+from typing import Dict, List, Optional, Tuple
+
+from . import trace
+from .cache import FileCache, get_file_signatures, get_racy_mtime_ns
+from .constants import ANNOTATE_FORMATS, COMPLETION_CACHE_NAMESPACE
+
+# the refs offered for completion, by the name of their list in the index
+REF_NAMESPACES: Dict[str, str] = {
+    "heads": "refs/heads/",
+    "tags": "refs/tags/",
+    "remotes": "refs/remotes/",
+}
+
+COMPLETION_COMMANDS: List[str] = [
+    "annotate", "blob", "commits", "compare", "completion", "export-links", "install-hooks", "issue", "issues", "lsp",
+    "myprs", "org", "pr", "prs", "repo", "scan", "serve", "tree", "uninstall-hooks", "user",
+]
+
+COMPLETION_OPTIONS: List[str] = [
+    "--batch", "--bind", "--columnar", "--file", "--format", "--git-user", "--help", "--jobs", "--json", "--list",
+    "--null", "--org", "--path", "--port", "--print-address", "--remote", "--resume", "--shared-hooks", "--trace",
+    "--verify", "-C", "-a", "-f", "-h", "-j", "-o", "-r", "-u", "-z",
+]
+
+# the options followed by a value, which is completed by the shell (e.g. as a file name) unless listed here
+COMPLETION_VALUE_OPTIONS: List[str] = [
+    "--bind", "--file", "--format", "--git-user", "--jobs", "--org", "--path", "--port", "--remote", "--resume",
+    "--trace", "-C", "-f", "-j", "-o", "-r", "-u",
+]
+
+COMPLETION_SCRIPTS: Dict[str, str] = {
+    "bash": """_webgit() {
+    local IFS=$'\\n'
+    COMPREPLY=($(webgit __complete "${COMP_WORDS[@]:1:COMP_CWORD}" 2>/dev/null))
+}
+complete -o default -F _webgit webgit
+""",
+    "zsh": """_webgit() {
+    local -a candidates
+    candidates=("${(@f)$(webgit __complete "${(@)words[2,CURRENT]}" 2>/dev/null)}")
+    if [[ -n "${candidates[1]}" ]]; then
+        compadd -Q -S '' -a candidates
+    else
+        _files
+    fi
+}
+compdef _webgit webgit
+""",
+    "fish": """complete -c webgit -f -a '(webgit __complete (commandline -opc)[2..-1] (commandline -ct) 2>/dev/null)'
+complete -c webgit -s C -l path -r -F
+complete -c webgit -s f -l file -r -F
+""",
+}
+
+
+def _find_prefix(names: bytes, prefix: bytes) -> List[bytes]:
+    """The lines of names, sorted and each ending with a newline, that start with prefix, found by binary search."""
+    low: int = 0
+    high: int = len(names)
+    while low < high:
+        middle: int = (low + high) // 2
+        line_start: int = names.rfind(b"\n", 0, middle) + 1
+        line_end: int = names.find(b"\n", line_start)
+        if names[line_start:line_end] < prefix:
+            low = line_end + 1
+        else:
+            high = line_start
+    matches: List[bytes] = []
+    while low < len(names) and names.startswith(prefix, low):
+        line_end = names.find(b"\n", low)
+        matches.append(names[low:line_end])
+        low = line_end + 1
+    return matches
+
+
+class RefsIndex:
+    """The branch, tag and remote-tracking branch names of a repository, each kind sorted in one newline-joined blob."""
+
+    def __init__(self, names: Dict[str, bytes]):
+        self.names: Dict[str, bytes] = names
+
+    def __len__(self) -> int:
+        return sum(names.count(b"\n") for names in self.names.values())
+
+    def find(self, namespace: str, prefix: str) -> List[str]:
+        return [
+            name.decode("utf-8", "surrogateescape")
+            for name in _find_prefix(self.names.get(namespace, b""), prefix.encode("utf-8", "surrogateescape"))
+        ]
+
+
+def _read_packed_ref_names(path: str) -> Dict[str, bytes]:
+    # the names in each namespace, newline-joined, as blobs load from the cache much faster than lists of names
+    names: Dict[str, List[bytes]] = {namespace: [] for namespace in REF_NAMESPACES}
+    try:
+        with open(path, "rb") as f:
+            data: bytes = f.read()
+    except OSError:
+        data = b""
+    prefixes: List[Tuple[str, bytes]] = [
+        (namespace, prefix.encode("ascii")) for namespace, prefix in REF_NAMESPACES.items()]
+    for line in data.splitlines():
+        ref: bytes = line.partition(b" ")[2]
+        for namespace, prefix in prefixes:
+            if ref.startswith(prefix):
+                names[namespace].append(ref[len(prefix):])
+                break
+    return {namespace: b"\n".join(namespace_names) for namespace, namespace_names in names.items()}
+
+
+def _scan_loose_ref_directories(common_dir: str, known: Dict[str, list]) -> Tuple[Dict[str, list], int]:
+    """
+    The directories under the completed ref namespaces as {directory: [mtime_ns, file names joined by newlines,
+    subdirectories]}, listing only the directories that are new or changed since known, and the number of listings
+    that differ from known. Adding or deleting a loose ref changes the mtime of its directory, so unchanged
+    directories keep their listing. Recently modified directories are recorded with an mtime of -1, to be listed
+    again.
+    """
+    directories: Dict[str, list] = {}
+    racy_mtime_ns: int = get_racy_mtime_ns()
+    directories_changed: int = 0
+    pending: List[str] = [prefix.rstrip("/") for prefix in REF_NAMESPACES.values()]
+    while pending:
+        directory: str = pending.pop()
+        path: str = os.path.join(common_dir, directory)
+        try:
+            mtime_ns: int = os.stat(path).st_mtime_ns
+        except OSError:
+            continue
+        entry: Optional[list] = known.get(directory)
+        if entry is None or entry[0] != mtime_ns:
+            file_names: List[str] = []
+            subdirectories: List[str] = []
+            try:
+                with os.scandir(path) as entries:
+                    for dir_entry in entries:
+                        (subdirectories if dir_entry.is_dir() else file_names).append(dir_entry.name)
+            except OSError:
+                continue
+            listing: list = ["\n".join(sorted(file_names)), sorted(subdirectories)]
+            if entry is None or entry[1:] != listing:
+                directories_changed += 1
+            entry = [mtime_ns if mtime_ns < racy_mtime_ns else -1] + listing
+        directories[directory] = entry
+        pending.extend("{}/{}".format(directory, name) for name in entry[2])
+    return directories, directories_changed
+
+
+def _build_names(packed: Dict[str, bytes], directories: Dict[str, list]) -> Dict[str, bytes]:
+    names: Dict[str, set] = {namespace: set(packed.get(namespace, b"").split(b"\n")) for namespace in REF_NAMESPACES}
+    for directory, (_, file_names, _) in directories.items():
+        for namespace, prefix in REF_NAMESPACES.items():
+            if (directory + "/").startswith(prefix):
+                name_prefix: str = directory[len(prefix):] + "/" if len(directory) >= len(prefix) else ""
+                names[namespace].update(
+                    (name_prefix + file_name).encode("utf-8", "surrogateescape") for file_name in file_names.split("\n")
+                    if file_name and not file_name.endswith(".lock"))
+                break
+    names["remotes"] = {name for name in names["remotes"] if not name.endswith(b"/HEAD")}
+    for namespace_names in names.values():
+        namespace_names.discard(b"")
+    return {namespace: b"".join(name + b"\n" for name in sorted(namespace_names))
+            for namespace, namespace_names in names.items()}
+
+
+def get_refs_index(common_dir: str) -> RefsIndex:
+    """
+    The index of the repository's branches, tags and remote-tracking branches. It is kept in the cache and checked
+    with a stat of packed-refs and of each ref directory: packed-refs is read again only when it changed, and only
+    new or changed ref directories are listed.
+    """
+    packed_refs_path: str = os.path.join(common_dir, "packed-refs")
+    cache: FileCache = FileCache(COMPLETION_CACHE_NAMESPACE)
+    with trace.span("refs_index", common_dir=common_dir) as span_args:
+        cached: dict = cache.load(common_dir) or {}
+        packed_signature: Optional[list] = list(get_file_signatures([packed_refs_path])[0])
+        packed: Dict[str, bytes] = cached.get("packed", {})
+        packed_read: bool = cached.get("packed_signature") != packed_signature
+        if packed_read:
+            packed = _read_packed_ref_names(packed_refs_path)
+            if packed_signature[1] >= get_racy_mtime_ns():
+                packed_signature = None
+        directories, directories_changed = _scan_loose_ref_directories(common_dir, cached.get("directories", {}))
+        span_args["packed_refs_read"] = packed_read
+        span_args["directories_changed"] = directories_changed
+
+        names: Dict[str, bytes] = cached.get("names", {})
+        if (packed_read and packed != cached.get("packed")) or directories_changed or \
+                len(directories) != len(cached.get("directories", {})):
+            names = _build_names(packed, directories)
+        if packed_read or directories_changed or directories != cached.get("directories"):
+            cache.store(common_dir, [], {
+                "packed_signature": packed_signature,
+                "packed": packed,
+                "directories": directories,
+                "names": names,
+            })
+    return RefsIndex(names)
+
+
+def _get_positionals(words: List[str]) -> Tuple[List[str], Dict[str, str]]:
+    # the command words before the word being completed, and the values of the options among them
+    positionals: List[str] = []
+    options: Dict[str, str] = {}
+    i: int = 0
+    while i < len(words):
+        word: str = words[i]
+        if word.startswith("--") and "=" in word:
+            option, value = word.split("=", 1)
+            options[option] = value
+        elif word in COMPLETION_VALUE_OPTIONS:
+            options[word] = words[i + 1] if i + 1 < len(words) else ""
+            i += 1
+        elif not word.startswith("-") or word == "-":
+            positionals.append(word)
+        i += 1
+    return positionals, options
+
+
+def complete(words: List[str], git_dir: Optional[str] = None) -> List[str]:
+    """
+    The completions of the last of words, the arguments typed after "webgit" so far: commands, options, remotes
+    after -r, and branch and tag names after tree, pr and compare. An empty list leaves completion to the shell.
+    """
+    current: str = words[-1] if words else ""
+    previous: Optional[str] = words[-2] if len(words) > 1 else None
+    if previous in COMPLETION_VALUE_OPTIONS and not current.startswith("-"):
+        if previous in ["-r", "--remote"]:
+            return [name for name in _get_remote_names(git_dir, words) if name.startswith(current)]
+        if previous == "--format":
+            return [name for name in ANNOTATE_FORMATS if name.startswith(current)]
+        return []
+    if current.startswith("-"):
+        return [option for option in COMPLETION_OPTIONS if option.startswith(current)]
+
+    positionals, options = _get_positionals(words[:-1])
+    if not positionals:
+        return [command for command in COMPLETION_COMMANDS if command.startswith(current)]
+    if positionals[0] == "completion" and len(positionals) == 1:
+        return [shell for shell in sorted(COMPLETION_SCRIPTS) if shell.startswith(current)]
+    # tree takes one ref, pr a source and a target branch, compare a range of two refs
+    if len(positionals) > {"tree": 1, "pr": 2, "compare": 1}.get(positionals[0], 0):
+        return []
+    common_dir: Optional[str] = _get_common_dir(options.get("-C") or options.get("--path") or git_dir)
+    if common_dir is None:
+        return []
+    index: RefsIndex = get_refs_index(common_dir)
+    namespaces: List[str] = ["heads", "tags", "remotes"] if positionals[0] != "pr" else ["remotes", "heads"]
+    # the second ref of a range is completed after the first, as in main...fea
+    head_start: int = current.rfind("..") + 2 if positionals[0] == "compare" and ".." in current else 0
+    prefix: str = current[:head_start]
+    return [prefix + name for namespace in namespaces for name in index.find(namespace, current[head_start:])]
+
+
+def _get_common_dir(git_dir: Optional[str]) -> Optional[str]:
+    from .repository import get_git_directories
+    git_directories = get_git_directories(git_dir or os.getcwd())
+    return git_directories.common_dir if git_directories is not None else None
+
+
+def _get_remote_names(git_dir: Optional[str], words: List[str]) -> List[str]:
+    from .repository import get_remotes
+    _, options = _get_positionals(words[:-2])
+    try:
+        remotes = get_remotes(options.get("-C") or options.get("--path") or git_dir or os.getcwd())
+    except Exception:  # completion must never print errors into the command line
+        return []
+    return sorted({remote.name for remote in remotes})
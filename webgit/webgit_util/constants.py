@@ -1,4 +1,4 @@
-from typing import List
+from typing import Dict, List, Tuple
 
 ENV_DEFAULT_REMOTE: str = "WEBGIT_DEFAULT_REMOTE"
 
@@ -8,6 +8,89 @@ ENV_DEFAULT_UPSTREAM_REPO_NAME: str = "WEBGIT_DEFAULT_UPSTREAM_REPO_NAME"
 
 ENV_DEFAULT_ORIGIN_REPO_NAME: str = "WEBGIT_DEFAULT_ORIGIN_REPO_NAME"
 
+ENV_NO_CACHE: str = "WEBGIT_NO_CACHE"
+
+ENV_TRACE: str = "WEBGIT_TRACE"
+
+ENV_HOSTS_FILE: str = "WEBGIT_HOSTS_FILE"
+
+ENV_API_URL: str = "WEBGIT_API_URL"
+
+# the tokens sent to the REST APIs, by dialect
+ENV_API_TOKENS: Dict[str, str] = {
+    "github": "GITHUB_TOKEN",
+    "gitlab": "GITLAB_TOKEN",
+}
+
+CACHE_MAX_SIZE_BYTES: int = 8 * 1024 * 1024
+
+CACHE_RACY_MTIME_SECONDS: int = 2
+
+REPOSITORY_CACHE_NAMESPACE: str = "repositories"
+
+HOSTS_CACHE_NAMESPACE: str = "hosts"
+
+API_CACHE_NAMESPACE: str = "api"
+
+PULL_REQUEST_CACHE_NAMESPACE: str = "pull_requests"
+
+VERIFY_CACHE_NAMESPACE: str = "verify"
+
+COMPLETION_CACHE_NAMESPACE: str = "completion"
+
+API_MAX_CONNECTIONS: int = 4
+
+API_PAGE_SIZE: int = 100
+
+API_TIMEOUT_SECONDS: float = 30.0
+
+# how long a checked url is trusted before it is checked again
+VERIFY_CACHE_TTL_SECONDS: float = 600.0
+
+VERIFY_MAX_CONNECTIONS_PER_HOST: int = 4
+
+VERIFY_MAX_REDIRECTS: int = 5
+
+# the batch records kept waiting for their check before the next record is read
+VERIFY_MAX_PENDING: int = 256
+
+VERIFY_TIMEOUT_SECONDS: float = 10.0
+
+SERVE_DEFAULT_PORT: int = 8080
+
+SERVE_MAX_HEADER_BYTES: int = 16 * 1024
+
+SERVE_REFRESH_INTERVAL_SECONDS: float = 1.0
+
+SERVE_STATS_MAX_SAMPLES: int = 10000
+
+BATCH_READ_SIZE: int = 64 * 1024
+
+BATCH_REPO_STATE_CACHE_SIZE: int = 16
+
+ANNOTATE_BLOCK_SIZE: int = 256 * 1024
+
+# a line longer than this is annotated in pieces cut at whitespace, so memory stays bounded without newlines
+ANNOTATE_MAX_LINE_BYTES: int = 4 * 1024 * 1024
+
+ANNOTATE_LINK_CACHE_SIZE: int = 64 * 1024
+
+ANNOTATE_FORMATS: List[str] = ["url", "osc8", "markdown"]
+
+# how long a warm-up started by a git hook waits after the last change, so the refs it reads are past the racy
+# window and every cache entry it builds can be stored, and so a burst of hooks (e.g. a rebase) is one warm-up
+HOOK_SETTLE_SECONDS: float = CACHE_RACY_MTIME_SECONDS + 0.5
+
+# the threads of lsp that read repositories not yet in memory, while requests for the others are answered
+LSP_MAX_WORKERS: int = 4
+
+# the commits export-links formats and writes at a time
+EXPORT_LINKS_BLOCK_COMMITS: int = 64 * 1024
+
+MAX_AMBIGUOUS_OBJECTS: int = 16
+
+TREE_CACHE_SIZE: int = 4096
+
 REGEX_BRANCH = r'\*\s+(\S+)\s+([0-9a-f]{7,40})\s+(\[(\S+)\/(\S+)?.*\])?.*'
 
 REGEX_REMOTE_REPO: str = r'(\w+)\s+(https\:\/\/|git@)(\S+)\s+\((\w+)\)'
@@ -18,62 +101,156 @@ REGEX_COMMIT_HASH: str = r'^[0-9a-f]{7,40}$'
 
 REGEX_PULL_REQUEST_HASH: str = r'^(#?)(\d+)$'
 
+# the web hosts recognised by name anywhere in a remote url, when the host registry has no entry for its hostname
 SUPPORTED_WEB_HOSTS: List[str] = ["github", "gitlab"]
 
-WEB_ADDRESS_TEMPLATES: dict = {
+# the URL dialects a hostname can be mapped to in the hosts file
+WEB_HOST_DIALECTS: List[str] = ["github", "gitlab", "gitea", "bitbucket"]
+
+# Every template is formatted with the fields of the remote it addresses: url ("host/org/repo"), host, org and
+# repo, plus the fields of its command. Dialects without a page for a command leave the command out.
+WEB_ADDRESS_TEMPLATES: Dict[str, Dict[str, str]] = {
+    "repo": {
+        "github": "https://{url}",
+        "gitlab": "https://{url}",
+        "gitea": "https://{url}",
+        "bitbucket": "https://{host}/projects/{org}/repos/{repo}",
+    },
+
     "org_or_user": {
-        "github": "https://github.com/{}",
-        "gitlab": "https://gitlab.com/{}",
+        "github": "https://github.com/{org_or_user}",
+        "gitlab": "https://gitlab.com/{org_or_user}",
+        "gitea": "https://{host}/{org_or_user}",
+        "bitbucket": "https://{host}/projects/{org_or_user}",
     },
 
     "commit": {
-        "github": "https://{}/commit/{}",
-        "gitlab": "https://{}/-/commit/{}",
+        "github": "https://{url}/commit/{commit}",
+        "gitlab": "https://{url}/-/commit/{commit}",
+        "gitea": "https://{url}/commit/{commit}",
+        "bitbucket": "https://{host}/projects/{org}/repos/{repo}/commits/{commit}",
     },
 
     "commits": {
-        "github": "https://{}/commits",
-        "gitlab": "https://{}/-/commits",
+        "github": "https://{url}/commits",
+        "gitlab": "https://{url}/-/commits",
+        "gitea": "https://{url}/commits",
+        "bitbucket": "https://{host}/projects/{org}/repos/{repo}/commits",
     },
 
     "issue": {
-        "github": "https://{}/issues/{}",
-        "gitlab": "https://{}/-/issues/{}",
+        "github": "https://{url}/issues/{number}",
+        "gitlab": "https://{url}/-/issues/{number}",
+        "gitea": "https://{url}/issues/{number}",
     },
 
     "issues": {
-        "github": "https://{}/issues",
-        "gitlab": "https://{}/-/issues",
+        "github": "https://{url}/issues",
+        "gitlab": "https://{url}/-/issues",
+        "gitea": "https://{url}/issues",
     },
 
     "pr": {
-        "github": "https://{}/compare/{}...{}:{}?expand=1",
-        "gitlab": "https://{}/-/compare?from={}&to={}",
+        "github": "https://{url}/compare/{to_branch}...{from_user}:{from_branch}?expand=1",
+        "gitlab": "https://{url}/-/compare?from={from_branch}&to={to_branch}",
+        "gitea": "https://{url}/compare/{to_branch}...{from_user}:{from_branch}",
+        "bitbucket": "https://{host}/projects/{org}/repos/{repo}/pull-requests?create"
+                     "&sourceBranch=refs/heads/{from_branch}&targetBranch=refs/heads/{to_branch}",
+    },
+
+    "compare": {
+        "github": "https://{url}/compare/{base}...{head}",
+        "gitlab": "https://{url}/-/compare/{base}...{head}",
+        "gitea": "https://{url}/compare/{base}...{head}",
+        "bitbucket": "https://{host}/projects/{org}/repos/{repo}/compare/commits"
+                     "?targetBranch={base}&sourceBranch={head}",
+    },
+
+    # the changes between the two trees rather than since the merge base, for base..head
+    "compare_direct": {
+        "github": "https://{url}/compare/{base}..{head}",
+        "gitlab": "https://{url}/-/compare/{base}...{head}?straight=true",
+        "gitea": "https://{url}/compare/{base}..{head}",
     },
 
     "view_pr": {
-        "github": "https://{}/pull/{}",
-        "gitlab": "https://{}/-/merge_requests/{}",
+        "github": "https://{url}/pull/{number}",
+        "gitlab": "https://{url}/-/merge_requests/{number}",
+        "gitea": "https://{url}/pulls/{number}",
+        "bitbucket": "https://{host}/projects/{org}/repos/{repo}/pull-requests/{number}",
     },
 
     "view_prs": {
-        "github": "https://{}/pulls",
-        "gitlab": "https://{}/-/merge_requests",
+        "github": "https://{url}/pulls",
+        "gitlab": "https://{url}/-/merge_requests",
+        "gitea": "https://{url}/pulls",
+        "bitbucket": "https://{host}/projects/{org}/repos/{repo}/pull-requests",
     },
 
     "my_prs": {
-        "github": "https://{}/pulls?q=is%3Apr+author%3A{}",
-        "gitlab": "https://{}/-/merge_requests?scope=all&state=all&author_username={}",
+        "github": "https://{url}/pulls?q=is%3Apr+author%3A{user}",
+        "gitlab": "https://{url}/-/merge_requests?scope=all&state=all&author_username={user}",
     },
 
     "tree": {
-        "github": "https://{}/tree/{}",
-        "gitlab": "https://{}/-/tree/{}",
+        "github": "https://{url}/tree/{ref}",
+        "gitlab": "https://{url}/-/tree/{ref}",
+        "gitea": "https://{url}/src/{ref}",
+        "bitbucket": "https://{host}/projects/{org}/repos/{repo}/browse?at={ref}",
     },
 
     "tree_file": {
-        "github": "https://{}/blob/{}/{}",
-        "gitlab": "https://{}/-/blob/{}/{}",
+        "github": "https://{url}/blob/{ref}/{path}",
+        "gitlab": "https://{url}/-/blob/{ref}/{path}",
+        "gitea": "https://{url}/src/{ref}/{path}",
+        "bitbucket": "https://{host}/projects/{org}/repos/{repo}/browse/{path}?at={ref}",
+    },
+
+    "tree_directory": {
+        "github": "https://{url}/tree/{ref}/{path}",
+        "gitlab": "https://{url}/-/tree/{ref}/{path}",
+        "gitea": "https://{url}/src/{ref}/{path}",
+        "bitbucket": "https://{host}/projects/{org}/repos/{repo}/browse/{path}?at={ref}",
+    },
+
+}
+
+
+# the anchor of a line and of a range of lines in a tree_file address, formatted with start and end
+LINE_ANCHOR_TEMPLATES: Dict[str, Tuple[str, str]] = {
+    "github": ("#L{start}", "#L{start}-L{end}"),
+    "gitlab": ("#L{start}", "#L{start}-{end}"),
+    "gitea": ("#L{start}", "#L{start}-L{end}"),
+    "bitbucket": ("#{start}", "#{start}-{end}"),
+}
+
+# the REST API root of each dialect, formatted with the remote's host, unless WEBGIT_API_URL is set
+API_BASE_URLS: Dict[str, str] = {
+    "github": "https://{host}/api/v3",
+    "gitlab": "https://{host}/api/v4",
+}
+
+# API roots that do not follow API_BASE_URLS, by host
+API_HOST_BASE_URLS: Dict[str, str] = {
+    "github.com": "https://api.github.com",
+}
+
+# The API path listing the items of each command, formatted with path ("org/repo"), project (path, url-encoded) and
+# user. Pages are requested by appending per_page and page.
+API_LIST_PATHS: Dict[str, Dict[str, str]] = {
+    "prs": {
+        "github": "/repos/{path}/pulls?state=open",
+        "gitlab": "/projects/{project}/merge_requests?state=opened",
+    },
+
+    "myprs": {
+        "github": "/search/issues?q=is%3Apr+repo%3A{path}+author%3A{user}",
+        "gitlab": "/projects/{project}/merge_requests?state=all&author_username={user}",
+    },
+
+    "issues": {
+        "github": "/repos/{path}/issues?state=open",
+        "gitlab": "/projects/{project}/issues?state=opened",
     },
 
 }
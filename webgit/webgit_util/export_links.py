@@ -0,0 +1,119 @@
+import struct
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+from .commit_graph import CommitGraph, read_commit_graph
+from .constants import EXPORT_LINKS_BLOCK_COMMITS
+from .resolver import CommandException, get_url_formatter, RepoState
+
+LINK_EXPORT_MAGIC: bytes = b"WGLX"
+
+LINK_EXPORT_VERSION: int = 1
+
+# magic, version, hash size, two reserved bytes and the number of commits
+_LINK_EXPORT_HEADER: struct.Struct = struct.Struct(">4sBBxxQ")
+
+_LENGTH: struct.Struct = struct.Struct(">I")
+
+
+class LinkExportException(Exception):
+    pass
+
+
+def get_commit_url_parts(repo_state: RepoState, remote: Optional[str] = None) -> Tuple[str, str]:
+    """The text before and after the hash in the commit urls of the remote, so each link is one concatenation."""
+    prefix, suffix = get_url_formatter(repo_state, remote).format("commit", commit="\0").split("\0")
+    return prefix, suffix
+
+
+def open_commit_graph(repo_state: RepoState) -> CommitGraph:
+    """The commit-graph of the repository, raising CommandException when there is none."""
+    object_database = repo_state.object_database
+    commit_graph: Optional[CommitGraph] = (
+        read_commit_graph(object_database.objects_dirs[0]) if object_database is not None else None)
+    if commit_graph is None:
+        raise CommandException(
+            "No commit-graph in {}, write one with: git commit-graph write --reachable".format(repo_state.git_dir))
+    return commit_graph
+
+
+def write_text_links(
+        commit_graph: CommitGraph, prefix: str, suffix: str, output_stream: BinaryIO,
+        block_commits: int = EXPORT_LINKS_BLOCK_COMMITS) -> int:
+    """Write a hash<TAB>url line for every commit in the graph, a block at a time. Returns the number of commits."""
+    hex_size: int = commit_graph.hash_size * 2
+    separator: bytes = b"\t" + prefix.encode("utf-8")
+    line_end: bytes = suffix.encode("utf-8") + b"\n"
+    count: int = 0
+    for oids in commit_graph.iter_oid_blocks(block_commits):
+        hex_names: bytes = oids.hex().encode("ascii")
+        names: List[bytes] = [hex_names[i:i + hex_size] for i in range(0, len(hex_names), hex_size)]
+        # the lines' parts side by side, so the block is built with a single join
+        parts: List[bytes] = [separator] * (4 * len(names))
+        parts[0::4] = names
+        parts[2::4] = names
+        parts[3::4] = [line_end] * len(names)
+        output_stream.write(b"".join(parts))
+        count += len(names)
+    return count
+
+
+def write_columnar_links(
+        commit_graph: CommitGraph, prefix: str, suffix: str, output_stream: BinaryIO,
+        block_commits: int = EXPORT_LINKS_BLOCK_COMMITS) -> int:
+    """
+    Write the links in the columnar format: a header with the hash size, the number of commits and the url prefix and
+    suffix, then the raw hashes back to back. Returns the number of commits.
+    """
+    count: int = len(commit_graph)
+    output_stream.write(_LINK_EXPORT_HEADER.pack(LINK_EXPORT_MAGIC, LINK_EXPORT_VERSION, commit_graph.hash_size, count))
+    for text in [prefix, suffix]:
+        encoded: bytes = text.encode("utf-8")
+        output_stream.write(_LENGTH.pack(len(encoded)) + encoded)
+    for oids in commit_graph.iter_oid_blocks(block_commits):
+        output_stream.write(oids)
+    return count
+
+
+def _read_exactly(input_stream: BinaryIO, size: int) -> bytes:
+    data: bytes = input_stream.read(size)
+    if len(data) != size:
+        raise LinkExportException("Truncated link export")
+    return data
+
+
+def read_columnar_links(
+        input_stream: BinaryIO, block_commits: int = EXPORT_LINKS_BLOCK_COMMITS) -> Iterator[Tuple[str, str]]:
+    """The (hash, url) pairs of a file written by write_columnar_links, read a block at a time."""
+    magic, version, hash_size, count = _LINK_EXPORT_HEADER.unpack(
+        _read_exactly(input_stream, _LINK_EXPORT_HEADER.size))
+    if magic != LINK_EXPORT_MAGIC or version != LINK_EXPORT_VERSION:
+        raise LinkExportException("Not a link export file")
+    parts: List[str] = []
+    for _ in range(2):
+        length: int = _LENGTH.unpack(_read_exactly(input_stream, _LENGTH.size))[0]
+        parts.append(_read_exactly(input_stream, length).decode("utf-8"))
+    prefix, suffix = parts
+    hex_size: int = hash_size * 2
+    while count:
+        block: int = min(count, block_commits)
+        hex_names: str = _read_exactly(input_stream, block * hash_size).hex()
+        for i in range(0, len(hex_names), hex_size):
+            hex_name: str = hex_names[i:i + hex_size]
+            yield hex_name, prefix + hex_name + suffix
+        count -= block
+
+
+def export_links(
+        repo_state: RepoState, output_stream: BinaryIO, columnar: bool = False, remote: Optional[str] = None) -> int:
+    """
+    Write the commit url of every commit in the repository's commit-graph to output_stream, as text lines or in the
+    columnar format. The hashes are read straight from the commit-graph files, layer by layer, so memory use does not
+    grow with the history. Returns the number of commits.
+    """
+    prefix, suffix = get_commit_url_parts(repo_state, remote)
+    commit_graph: CommitGraph = open_commit_graph(repo_state)
+    try:
+        write = write_columnar_links if columnar else write_text_links
+        return write(commit_graph, prefix, suffix, output_stream)
+    finally:
+        commit_graph.close()
@@ -0,0 +1,490 @@
+import os
+import re
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+MAX_INCLUDE_DEPTH: int = 10
+
+UNSUPPORTED_ENV_VARS: List[str] = [
+    "GIT_DIR",
+    "GIT_COMMON_DIR",
+    "GIT_WORK_TREE",
+    "GIT_CEILING_DIRECTORIES",
+    "GIT_CONFIG_PARAMETERS",
+    "GIT_CONFIG_COUNT",
+]
+
+
+class GitConfigException(Exception):
+    """Raised for repository layouts or config features the native reader does not handle."""
+
+
+class GitDirectories(NamedTuple):
+    work_tree: Optional[str]
+    git_dir: str
+    common_dir: str
+
+
+def _is_git_dir(path: str) -> bool:
+    return (
+        os.path.isfile(os.path.join(path, "HEAD")) and
+        os.path.isdir(os.path.join(path, "objects")) and
+        os.path.isdir(os.path.join(path, "refs"))
+    )
+
+
+def read_gitdir_file(dot_git_file: str) -> str:
+    with open(dot_git_file, encoding="utf-8") as f:
+        content: str = f.read().strip()
+    if not content.startswith("gitdir:"):
+        raise GitConfigException("Invalid gitdir file: {}".format(dot_git_file))
+    git_dir: str = content[len("gitdir:"):].strip()
+    return os.path.normpath(os.path.join(os.path.dirname(dot_git_file), git_dir))
+
+
+def find_git_directories(path: str) -> Optional[GitDirectories]:
+    """
+    Walk up from path the way git does to find the work tree, the git directory and the common directory
+    (which differs from the git directory for linked worktrees). Returns None if no repository is found.
+    """
+    for env_var in UNSUPPORTED_ENV_VARS:
+        if os.environ.get(env_var):
+            raise GitConfigException("{} is set".format(env_var))
+
+    current_dir: str = os.path.abspath(path)
+    if not os.path.isdir(current_dir):
+        return None
+
+    while True:
+        dot_git: str = os.path.join(current_dir, ".git")
+        work_tree: Optional[str] = current_dir
+        git_dir: Optional[str] = None
+        if os.path.isdir(dot_git):
+            git_dir = dot_git
+        elif os.path.isfile(dot_git):
+            git_dir = read_gitdir_file(dot_git)
+        elif _is_git_dir(current_dir):
+            work_tree, git_dir = None, current_dir
+
+        if git_dir is not None:
+            common_dir: str = git_dir
+            commondir_file: str = os.path.join(git_dir, "commondir")
+            if os.path.isfile(commondir_file):
+                with open(commondir_file, encoding="utf-8") as f:
+                    common_dir = os.path.normpath(os.path.join(git_dir, f.read().strip()))
+            return GitDirectories(work_tree=work_tree, git_dir=git_dir, common_dir=common_dir)
+
+        parent_dir: str = os.path.dirname(current_dir)
+        if parent_dir == current_dir:
+            return None
+        current_dir = parent_dir
+
+
+def _normalize_key(key: str) -> str:
+    """Section and variable names are case-insensitive, subsection names are not."""
+    first_dot: int = key.find(".")
+    last_dot: int = key.rfind(".")
+    if first_dot == last_dot:
+        return key.lower()
+    return key[:first_dot].lower() + key[first_dot:last_dot] + key[last_dot:].lower()
+
+
+class GitConfig:
+
+    def __init__(self):
+        self.entries: List[Tuple[str, str]] = []
+        self.file_paths: List[str] = []  # every file read, or looked for, while loading the config
+        # the values of each key, in order, so lookups do not scan a config with thousands of sections
+        self._values_by_key: Dict[str, List[str]] = {}
+        self._url_rules: Dict[str, List[Tuple[str, str]]] = {}
+
+    def add(self, key: str, value: str):
+        self.entries.append((key, value))
+        self._url_rules.clear()
+        values: Optional[List[str]] = self._values_by_key.get(key)
+        if values is None:
+            self._values_by_key[key] = [value]
+        else:
+            values.append(value)
+
+    def get(self, key: str) -> Optional[str]:
+        values: List[str] = self.get_all(key)
+        return values[-1] if values else None
+
+    def get_all(self, key: str) -> List[str]:
+        return list(self._values_by_key.get(_normalize_key(key), ()))
+
+    def get_bool(self, key: str, default: bool = False) -> bool:
+        value: Optional[str] = self.get(key)
+        if value is None:
+            return default
+        return value.lower() in ["true", "yes", "on", "1"]
+
+    def subsections(self, section: str) -> List[str]:
+        """Subsection names of section, in the order they first appear."""
+        prefix: str = section.lower() + "."
+        names: Dict[str, None] = {}
+        for key in self._values_by_key:
+            if key.startswith(prefix) and key.count(".") >= 2:
+                names[key[len(prefix):key.rfind(".")]] = None
+        return list(names)
+
+    def _get_url_rules(self, variable: str) -> List[Tuple[str, str]]:
+        # (prefix, base) for every url.<base>.insteadOf (or pushInsteadOf) value, in config order
+        rules: Optional[List[Tuple[str, str]]] = self._url_rules.get(variable)
+        if rules is None:
+            rules = [
+                (value, key[len("url."):-len(variable)])
+                for key, value in self.entries if key.startswith("url.") and key.endswith(variable)
+            ]
+            self._url_rules[variable] = rules
+        return rules
+
+    def rewrite_url(self, url: str, push: bool = False) -> str:
+        """Apply the longest matching url.<base>.insteadOf (or pushInsteadOf) rule, as git does."""
+        best_prefix: str = ""
+        best_base: Optional[str] = None
+        for prefix, base in self._get_url_rules(".pushinsteadof" if push else ".insteadof"):
+            if url.startswith(prefix) and (len(prefix) > len(best_prefix) or best_base is None):
+                best_prefix, best_base = prefix, base
+        if best_base is None:
+            return url
+        return best_base + url[len(best_prefix):]
+
+
+_REGEX_BLANK_OR_COMMENT: re.Pattern = re.compile(r'(?:[ \t\r\n]+|[;#][^\n]*)*')
+
+# "[section]" or "[section "subsection"]" without escapes in the subsection name
+_REGEX_SIMPLE_SECTION: re.Pattern = re.compile(r'\[([A-Za-z0-9-]+)(?:[ \t]+"([^"\\\n]*)")?\]')
+
+# a variable name followed by an optional "="
+_REGEX_VARIABLE: re.Pattern = re.compile(r'([A-Za-z][A-Za-z0-9-]*)[ \t]*(=?)')
+
+# the common case of a value without quotes, escapes or line continuations, with an optional trailing comment
+_REGEX_SIMPLE_VALUE: re.Pattern = re.compile(r'[ \t]*([^"\\;#\n]*?)[ \t\r]*(?:[;#][^\n]*)?(?:\n|$)')
+
+
+class _ConfigParser:
+
+    def __init__(self, text: str, file_path: str):
+        self.text: str = text
+        self.file_path: str = file_path
+        self.position: int = 0
+
+    def _error(self, message: str) -> GitConfigException:
+        line: int = self.text.count("\n", 0, self.position) + 1
+        return GitConfigException("{} in {} line {}".format(message, self.file_path, line))
+
+    def _peek(self) -> str:
+        return self.text[self.position] if self.position < len(self.text) else ""
+
+    def _skip_to_end_of_line(self):
+        end: int = self.text.find("\n", self.position)
+        self.position = len(self.text) if end < 0 else end + 1
+
+    def _parse_section_header(self) -> str:
+        section_match: Optional[re.Match] = _REGEX_SIMPLE_SECTION.match(self.text, self.position)
+        if section_match:
+            self.position = section_match.end()
+            if section_match.group(2) is None:
+                return section_match.group(1).lower()
+            return section_match.group(1).lower() + "." + section_match.group(2)
+
+        self.position += 1  # skip "["
+        start: int = self.position
+        while self._peek() and (self._peek().isalnum() or self._peek() in "-."):
+            self.position += 1
+        name: str = self.text[start:self.position].lower()
+        if not name:
+            raise self._error("Bad section header")
+
+        if self._peek() == "]":
+            self.position += 1
+            return name  # "[section]" or the legacy "[section.subsection]"
+
+        while self._peek() in [" ", "\t"]:
+            self.position += 1
+        if self._peek() != "\"" or "." in name:
+            raise self._error("Bad section header")
+        self.position += 1
+        subsection: List[str] = []
+        while True:
+            c: str = self._peek()
+            if not c or c == "\n":
+                raise self._error("Unterminated subsection")
+            self.position += 1
+            if c == "\"":
+                break
+            if c == "\\":
+                c = self._peek()
+                self.position += 1
+            subsection.append(c)
+        if self._peek() != "]":
+            raise self._error("Bad section header")
+        self.position += 1
+        return name + "." + "".join(subsection)
+
+    def _parse_value(self) -> str:
+        value: List[str] = []
+        in_quotes: bool = False
+        pending_spaces: int = 0
+        while True:
+            c: str = self._peek()
+            if not c:
+                break
+            self.position += 1
+            if c == "\n":
+                if in_quotes:
+                    raise self._error("Unterminated quoted value")
+                break
+            if not in_quotes and c in ";#":
+                self._skip_to_end_of_line()
+                break
+            if not in_quotes and c in " \t\r":
+                if value:
+                    pending_spaces += 1
+                continue
+            value.append(" " * pending_spaces)
+            pending_spaces = 0
+            if c == "\\":
+                escaped: str = self._peek()
+                self.position += 1
+                if escaped == "\n":
+                    continue
+                if escaped == "\r" and self._peek() == "\n":
+                    self.position += 1
+                    continue
+                escapes: Dict[str, str] = {"n": "\n", "t": "\t", "b": "\b", "\\": "\\", "\"": "\""}
+                if escaped not in escapes:
+                    raise self._error("Bad escape sequence")
+                value.append(escapes[escaped])
+            elif c == "\"":
+                in_quotes = not in_quotes
+            else:
+                value.append(c)
+        return "".join(value)
+
+    def parse(self):
+        """Yield (key, value) pairs in file order. Variables without "=" get the value "true"."""
+        section: Optional[str] = None
+        while True:
+            self.position = _REGEX_BLANK_OR_COMMENT.match(self.text, self.position).end()
+            c: str = self._peek()
+            if not c:
+                break
+            elif c == "[":
+                section = self._parse_section_header()
+            elif c.isalpha():
+                if section is None:
+                    raise self._error("Variable outside of a section")
+                variable_match: re.Match = _REGEX_VARIABLE.match(self.text, self.position)
+                name: str = variable_match.group(1).lower()
+                self.position = variable_match.end()
+                if variable_match.group(2):
+                    simple_value_match: re.Match = _REGEX_SIMPLE_VALUE.match(self.text, self.position)
+                    if simple_value_match:
+                        value: str = simple_value_match.group(1).replace("\t", " ")
+                        self.position = simple_value_match.end()
+                    else:
+                        value = self._parse_value()
+                elif self._peek() in ["", "\n", "\r", ";", "#"]:
+                    self._skip_to_end_of_line()
+                    value = "true"
+                else:
+                    raise self._error("Bad variable")
+                yield section + "." + name, value
+            else:
+                raise self._error("Bad config line")
+
+
+def _glob_to_regex(pattern: str, ignore_case: bool) -> re.Pattern:
+    """Translate a wildmatch pattern (as used by includeIf conditions) to a compiled regex."""
+    regex: List[str] = []
+    i: int = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            regex.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            regex.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            regex.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            regex.append("[^/]")
+            i += 1
+        elif pattern[i] == "[":
+            raise GitConfigException("Bracket expressions in includeIf are not supported")
+        else:
+            regex.append(re.escape(pattern[i]))
+            i += 1
+    return re.compile("".join(regex) + "$", re.IGNORECASE if ignore_case else 0)
+
+
+def get_head_branch(git_directories: GitDirectories) -> Optional[str]:
+    """The branch HEAD points to, or None for a detached (or unreadable) HEAD."""
+    try:
+        with open(os.path.join(git_directories.git_dir, "HEAD"), encoding="utf-8") as f:
+            head: str = f.read().strip()
+    except (OSError, UnicodeDecodeError):
+        return None
+    if head.startswith("ref: refs/heads/"):
+        return head[len("ref: refs/heads/"):]
+    return None
+
+
+def _include_condition_matches(
+        condition: str,
+        including_file: str,
+        git_directories: Optional[GitDirectories]) -> bool:
+
+    if git_directories is None:
+        return False
+
+    for prefix, ignore_case in [("gitdir:", False), ("gitdir/i:", True)]:
+        if condition.startswith(prefix):
+            pattern: str = condition[len(prefix):]
+            if pattern.startswith("~/"):
+                pattern = os.path.expanduser("~") + pattern[1:]
+            elif pattern.startswith("./"):
+                pattern = os.path.dirname(os.path.realpath(including_file)) + pattern[1:]
+            elif not os.path.isabs(pattern):
+                pattern = "**/" + pattern
+            if pattern.endswith("/"):
+                pattern += "**"
+            git_dir: str = os.path.realpath(git_directories.git_dir)
+            return bool(_glob_to_regex(pattern, ignore_case).match(git_dir))
+
+    if condition.startswith("onbranch:"):
+        pattern = condition[len("onbranch:"):]
+        if pattern.endswith("/"):
+            pattern += "**"
+        branch: Optional[str] = get_head_branch(git_directories)
+        return branch is not None and bool(_glob_to_regex(pattern, False).match(branch))
+
+    raise GitConfigException("Unsupported includeIf condition: {}".format(condition))
+
+
+def _read_config_file(
+        config: GitConfig,
+        file_path: str,
+        git_directories: Optional[GitDirectories],
+        depth: int = 0):
+
+    if depth > MAX_INCLUDE_DEPTH:
+        raise GitConfigException("Exceeded maximum include depth")
+    config.file_paths.append(file_path)
+    try:
+        with open(file_path, encoding="utf-8") as f:
+            text: str = f.read()
+    except (FileNotFoundError, NotADirectoryError):
+        return
+
+    for key, value in _ConfigParser(text, file_path).parse():
+        config.add(key, value)
+
+        include_path: Optional[str] = None
+        if key == "include.path":
+            include_path = value
+        elif key.startswith("includeif.") and key.endswith(".path"):
+            condition: str = key[len("includeif."):-len(".path")]
+            if _include_condition_matches(condition, file_path, git_directories):
+                include_path = value
+
+        if include_path:
+            include_path = os.path.expanduser(include_path)
+            if not os.path.isabs(include_path):
+                include_path = os.path.join(os.path.dirname(file_path), include_path)
+            _read_config_file(config, include_path, git_directories, depth + 1)
+
+
+def _get_system_config_path() -> Optional[str]:
+    if os.environ.get("GIT_CONFIG_NOSYSTEM"):
+        return None
+    if os.environ.get("GIT_CONFIG_SYSTEM"):
+        return os.environ["GIT_CONFIG_SYSTEM"]
+    return _get_default_system_config_path()
+
+
+def find_executable(name: str) -> Optional[str]:
+    """shutil.which, without importing shutil and its dependencies on every run."""
+    for directory in os.environ.get("PATH", os.defpath).split(os.pathsep):
+        path: str = os.path.join(directory or os.curdir, name)
+        if os.path.isfile(path) and os.access(path, os.X_OK):
+            return path
+    return None
+
+
+@lru_cache(maxsize=1)
+def _get_default_system_config_path() -> str:
+    # git looks for $(prefix)/etc/gitconfig, where distributions installing to /usr use /etc
+    git_executable: Optional[str] = find_executable("git")
+    if git_executable:
+        prefix: str = os.path.dirname(os.path.dirname(os.path.realpath(git_executable)))
+        if prefix != "/usr":
+            return os.path.join(prefix, "etc", "gitconfig")
+    return "/etc/gitconfig"
+
+
+def _get_global_config_paths() -> List[str]:
+    if os.environ.get("GIT_CONFIG_GLOBAL"):
+        return [os.environ["GIT_CONFIG_GLOBAL"]]
+    xdg_config_home: str = os.environ.get("XDG_CONFIG_HOME") or os.path.join(os.path.expanduser("~"), ".config")
+    return [os.path.join(xdg_config_home, "git", "config"), os.path.join(os.path.expanduser("~"), ".gitconfig")]
+
+
+def get_user_config_paths() -> List[str]:
+    """The system and global config files, which depend on the environment rather than the repository."""
+    system_config_path: Optional[str] = _get_system_config_path()
+    return ([system_config_path] if system_config_path else []) + _get_global_config_paths()
+
+
+def read_git_config(git_directories: GitDirectories) -> GitConfig:
+    """Read the system, global, repository and worktree config files, in git's order of precedence."""
+    config: GitConfig = GitConfig()
+    for user_config_path in get_user_config_paths():
+        _read_config_file(config, user_config_path, git_directories)
+    _read_config_file(config, os.path.join(git_directories.common_dir, "config"), git_directories)
+    if config.get_bool("extensions.worktreeConfig"):
+        _read_config_file(config, os.path.join(git_directories.git_dir, "config.worktree"), git_directories)
+
+    return config
+
+
+def get_object_format(git_directories: GitDirectories) -> str:
+    """extensions.objectFormat ("sha1" or "sha256"), which git only reads from the repository's own config."""
+    try:
+        with open(os.path.join(git_directories.common_dir, "config"), encoding="utf-8") as f:
+            text: str = f.read()
+    except (FileNotFoundError, NotADirectoryError):
+        return "sha1"
+    if "objectformat" not in text.lower():
+        return "sha1"  # skip parsing large configs in the common case
+    object_format: str = "sha1"
+    for key, value in _ConfigParser(text, f.name).parse():
+        if key == "extensions.objectformat":
+            object_format = value.lower()
+    return object_format
+
+
+def get_remote_urls(config: GitConfig) -> List[Tuple[str, str, str]]:
+    """
+    Return (remote_name, url, "fetch" | "push") triples matching the lines that "git remote -v" prints:
+    remotes sorted by name, the first url for fetch, then every push url.
+    """
+    remote_urls: List[Tuple[str, str, str]] = []
+    for remote_name in sorted(config.subsections("remote")):
+        urls: List[str] = config.get_all("remote.{}.url".format(remote_name))
+        if not urls:
+            continue
+        push_urls: List[str] = [config.rewrite_url(u) for u in config.get_all("remote.{}.pushurl".format(remote_name))]
+        if not push_urls:
+            # like git, pushInsteadOf only produces push urls for the urls it actually rewrites
+            push_urls = [p for u, p in zip(urls, [config.rewrite_url(u, push=True) for u in urls]) if p != u]
+        if not push_urls:
+            push_urls = [config.rewrite_url(u) for u in urls]
+
+        remote_urls.append((remote_name, config.rewrite_url(urls[0]), "fetch"))
+        remote_urls.extend((remote_name, push_url, "push") for push_url in push_urls)
+    return remote_urls
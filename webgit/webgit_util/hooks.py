@@ -0,0 +1,324 @@
+import os
+import shlex
+import sys
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from . import trace
+from .cache import get_cache_dir
+from .completion import get_refs_index, REF_NAMESPACES
+from .constants import HOOK_SETTLE_SECONDS
+from .git_config import (
+    find_git_directories,
+    GitConfig,
+    GitConfigException,
+    GitDirectories,
+    read_git_config,
+    UNSUPPORTED_ENV_VARS,
+)
+from .pull_refs import get_pull_request_index, PULL_REQUEST_REF_PREFIXES
+from .repository import get_branch_info, get_git_directories, get_remotes, GitException
+
+# the hooks install-hooks adds, after each of which git has changed refs, HEAD or both
+HOOK_NAMES: List[str] = ["post-checkout", "post-merge", "post-rewrite", "reference-transaction"]
+
+# the hooks git gives input on stdin, which is passed on to the chained hook
+STDIN_HOOK_NAMES: List[str] = ["post-rewrite", "reference-transaction"]
+
+# when each hook has something to report: a branch checkout (not of files), and a committed transaction (not one
+# being prepared or aborted)
+_HOOK_CONDITIONS: Dict[str, str] = {
+    "post-checkout": '[ "$3" = 1 ]',
+    "reference-transaction": '[ "$1" = committed ]',
+}
+
+# the second line of every hook webgit installs, so installing again or uninstalling only touches webgit's own
+HOOK_MARKER: str = "# installed by webgit install-hooks"
+
+# a hook that was in place before webgit's is kept under this suffix and run first
+CHAINED_HOOK_SUFFIX: str = ".webgit-chained"
+
+# the file in the git directory the hooks append their reports to, until a warm-up takes them
+HOOK_PENDING_FILE_NAME: str = "webgit-hooks.pending"
+
+HOOK_LOCK_FILE_NAME: str = "webgit-hooks.lock"
+
+# Only the first hook of a burst (e.g. a rebase) starts a warm-up, at a low priority; the others only append their
+# report, so a hook costs the shell and a write. The warm-up has none of git's file descriptors, so nothing reading
+# git's output waits for it.
+_HOOK_SCRIPT: str = """#!/bin/sh
+{marker}
+# Reports what git changed to webgit, which warms its caches in the background. The hook that was here before, if
+# any, runs first as {name}{suffix}, and its exit status is this hook's.
+status=0
+{read_input}if [ -x "$0{suffix}" ]; then
+    {chain_input}"$0{suffix}" "$@" || status=$?
+fi
+if {condition}; then
+    if [ -n "$GIT_DIR" ]; then
+        git_dir=$GIT_DIR
+    elif [ -f .git ]; then
+        git_dir=$(sed -n 's/^gitdir: //p' .git)
+    elif [ -d .git ]; then
+        git_dir=.git
+    else
+        git_dir=.
+    fi
+    pending="$git_dir/{pending}"
+    # a warm-up is on its way while earlier reports wait, unless they are a minute old: then it died, e.g. with
+    # the interpreter gone, and the reports are dropped so they cannot pile up
+    start=
+    if [ ! -e "$pending" ]; then
+        start=1
+    elif [ -z "$(find "$pending" -mmin -1)" ]; then
+        start=1
+        : > "$pending"
+    fi
+    {{ echo "# {name} $*"; {report_input}}} >> "$pending"
+    if [ -n "$start" ]; then
+        nice {command} </dev/null >/dev/null 2>&1 &
+    fi
+fi
+exit $status
+"""
+
+_READ_INPUT: str = """input=
+if [ -x "$0{suffix}" ] || {condition}; then
+    input=$(cat)
+fi
+"""
+
+_INPUT: str = """{ [ -z "$input" ] || printf '%s\\n' "$input"; }"""
+
+
+class HookException(Exception):
+    pass
+
+
+def get_webgit_command() -> List[str]:
+    """The interpreter and script that run this webgit, for the hooks to call back."""
+    return [sys.executable, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "webgit.py")]
+
+
+def get_hook_script(name: str, command: Optional[List[str]] = None) -> str:
+    """The shell script of the hook, which reports the change and starts `webgit __hook` in the background."""
+    stdin_hook: bool = name in STDIN_HOOK_NAMES
+    condition: str = _HOOK_CONDITIONS.get(name, "true")
+    return _HOOK_SCRIPT.format(
+        marker=HOOK_MARKER,
+        name=name,
+        suffix=CHAINED_HOOK_SUFFIX,
+        # git does not mind a hook leaving its input unread, which saves a process for most transactions
+        read_input=_READ_INPUT.format(suffix=CHAINED_HOOK_SUFFIX, condition=condition) if stdin_hook else "",
+        chain_input=_INPUT + " | " if stdin_hook else "",
+        condition=condition,
+        pending=HOOK_PENDING_FILE_NAME,
+        # only the refs of a reference-transaction tell which caches changed
+        report_input=_INPUT + "; " if name == "reference-transaction" else "",
+        command=" ".join(shlex.quote(word) for word in (command or get_webgit_command()) + ["__hook"]),
+    )
+
+
+def _get_git_directories(git_dir: str) -> GitDirectories:
+    try:
+        git_directories: Optional[GitDirectories] = find_git_directories(git_dir)
+    except (GitConfigException, OSError) as e:
+        raise HookException(str(e))
+    if git_directories is None:
+        raise HookException("Not a git repository: {}".format(git_dir))
+    return git_directories
+
+
+def get_hooks_dir(git_directories: GitDirectories) -> str:
+    """core.hooksPath, relative to the work tree as git takes it, or the hooks directory of the repository."""
+    try:
+        config: GitConfig = read_git_config(git_directories)
+    except (GitConfigException, OSError, UnicodeDecodeError) as e:
+        raise HookException(str(e))
+    hooks_path: Optional[str] = config.get("core.hooksPath")
+    if not hooks_path:
+        return os.path.join(git_directories.common_dir, "hooks")
+    return os.path.join(git_directories.work_tree or git_directories.git_dir, os.path.expanduser(hooks_path))
+
+
+def _get_own_hooks_dir(git_directories: GitDirectories, shared: bool, warn: Optional[Callable[[str], None]]) -> str:
+    """
+    The hooks directory, refusing one outside the git directory unless shared: a core.hooksPath such as a global
+    ~/.githooks is shared by other repositories, whose hooks would all be rewritten and chained too.
+    """
+    hooks_dir: str = os.path.realpath(get_hooks_dir(git_directories))
+    own_dirs: List[str] = [os.path.realpath(git_directories.git_dir), os.path.realpath(git_directories.common_dir)]
+    if any(os.path.commonpath([hooks_dir, own_dir]) == own_dir for own_dir in own_dirs):
+        return hooks_dir
+    if not shared:
+        raise HookException(
+            "Not changing {}: core.hooksPath is outside the git directory, and other repositories may use it. "
+            "Use --shared-hooks to change it anyway".format(hooks_dir))
+    if warn:
+        warn("changing the hooks in {}, outside the git directory, for every repository using it".format(hooks_dir))
+    return hooks_dir
+
+
+def is_webgit_hook(path: str) -> bool:
+    try:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            return f.read(256).split("\n")[1:2] == [HOOK_MARKER]
+    except OSError:
+        return False
+
+
+def _write_hook(path: str, script: str):
+    temp_path: str = path + ".webgit-tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(script)
+    os.chmod(temp_path, 0o755)
+    os.replace(temp_path, path)
+
+
+def install_hooks(
+    git_dir: str,
+    command: Optional[List[str]] = None,
+    shared: bool = False,
+    warn: Optional[Callable[[str], None]] = None,
+) -> List[str]:
+    """
+    Install webgit's hooks in the repository at git_dir. A hook already in place is renamed with
+    CHAINED_HOOK_SUFFIX and run first by webgit's, and installing again only refreshes webgit's hooks.
+    A core.hooksPath outside the git directory is only changed when shared, with a warning through warn.
+    Returns a line per hook describing what was done.
+    """
+    hooks_dir: str = _get_own_hooks_dir(_get_git_directories(git_dir), shared, warn)
+    os.makedirs(hooks_dir, exist_ok=True)
+    messages: List[str] = []
+    for name in HOOK_NAMES:
+        path: str = os.path.join(hooks_dir, name)
+        if is_webgit_hook(path):
+            action: str = "updated"
+        elif os.path.lexists(path):
+            if os.path.lexists(path + CHAINED_HOOK_SUFFIX):
+                raise HookException("Not replacing {}, {} exists".format(path, path + CHAINED_HOOK_SUFFIX))
+            os.replace(path, path + CHAINED_HOOK_SUFFIX)
+            action = "installed, running the existing hook first"
+        else:
+            action = "installed"
+        _write_hook(path, get_hook_script(name, command))
+        messages.append("{}: {}".format(path, action))
+    return messages
+
+
+def uninstall_hooks(git_dir: str, shared: bool = False, warn: Optional[Callable[[str], None]] = None) -> List[str]:
+    """
+    Remove webgit's hooks from the repository at git_dir, putting back the hooks they chained. As with install_hooks,
+    a core.hooksPath outside the git directory is only changed when shared.
+    """
+    hooks_dir: str = _get_own_hooks_dir(_get_git_directories(git_dir), shared, warn)
+    messages: List[str] = []
+    for name in HOOK_NAMES:
+        path: str = os.path.join(hooks_dir, name)
+        if not is_webgit_hook(path):
+            continue
+        if os.path.lexists(path + CHAINED_HOOK_SUFFIX):
+            os.replace(path + CHAINED_HOOK_SUFFIX, path)
+            messages.append("{}: restored the chained hook".format(path))
+        else:
+            os.unlink(path)
+            messages.append("{}: removed".format(path))
+    return messages
+
+
+def get_warm_targets(reports: Iterable[str]) -> Set[str]:
+    """
+    The caches, as named by warm_caches, that the changes in the hooks' reports affect. Each report is a line
+    "# hook arguments", followed for a reference-transaction by its "old new ref" lines, so only the indexes of the
+    changed refs are brought up to date; the other hooks moved HEAD.
+    """
+    targets: Set[str] = set()
+    for line in reports:
+        if line.startswith("# "):
+            if line.split(" ", 2)[1].strip() != "reference-transaction":
+                targets.add("repository")
+            continue
+        ref: str = line.rstrip("\n").split(" ", 2)[-1]
+        if ref == "HEAD":
+            targets.add("repository")
+        elif any(ref.startswith(prefix) for prefix in REF_NAMESPACES.values()):
+            targets.add("refs")
+        elif any(ref.startswith(prefix) for prefix in PULL_REQUEST_REF_PREFIXES):
+            targets.add("pull_requests")
+    return targets
+
+
+def warm_caches(git_dir: str, targets: Iterable[str]):
+    """
+    Bring the caches of the repository at git_dir named in targets up to date, as the next interactive call would:
+    "repository" for remotes and branch info, "refs" for the refs index of completion and "pull_requests" for the
+    pull request index. Each is incremental, so only what changed is read again.
+    """
+    git_directories: Optional[GitDirectories] = get_git_directories(git_dir)
+    if git_directories is None:
+        return
+    with trace.span("warm_caches", git_dir=git_dir, targets=sorted(targets)):
+        if "repository" in targets:
+            try:
+                get_remotes(git_dir)
+                get_branch_info(git_dir)
+            except GitException:
+                pass  # e.g. no remotes yet, nothing to keep warm
+        if "refs" in targets:
+            get_refs_index(git_directories.common_dir)
+        if "pull_requests" in targets:
+            get_pull_request_index(git_directories.common_dir)
+
+
+def _take_pending(pending_path: str) -> Optional[Set[str]]:
+    """
+    The targets of the reports waiting in pending_path, taken once the last of them is HOOK_SETTLE_SECONDS old, so
+    the refs they changed are past the racy window of the cache. None when no reports wait.
+    """
+    while True:
+        try:
+            remaining: float = os.stat(pending_path).st_mtime + HOOK_SETTLE_SECONDS - time.time()
+        except FileNotFoundError:
+            return None
+        if remaining <= 0:
+            break
+        time.sleep(remaining)
+    taken_path: str = pending_path + ".taken"
+    os.replace(pending_path, taken_path)
+    with open(taken_path, encoding="utf-8", errors="replace") as f:
+        targets: Set[str] = get_warm_targets(f)
+    os.unlink(taken_path)
+    return targets
+
+
+def run_hook():
+    """
+    The background half of the hooks: take the reports the hooks left in the git directory and warm the caches they
+    affect, until no more reports come. When a warm-up of the repository is already running, it takes the reports
+    instead, at the latest when it lets go of its lock.
+    """
+    # git runs hooks in the work tree (or the git directory of a bare repository) and may set GIT_DIR
+    git_dir: str = os.path.abspath(os.environ.get("GIT_DIR") or os.getcwd())
+    for env_var in UNSUPPORTED_ENV_VARS:
+        os.environ.pop(env_var, None)
+    git_directories: GitDirectories = _get_git_directories(git_dir)
+    pending_path: str = os.path.join(git_directories.git_dir, HOOK_PENDING_FILE_NAME)
+    try:
+        import fcntl
+    except ImportError:
+        fcntl = None
+    while True:
+        with open(os.path.join(git_directories.git_dir, HOOK_LOCK_FILE_NAME), "a") as lock_file:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    return
+            targets: Optional[Set[str]] = _take_pending(pending_path)
+            while targets is not None:
+                if targets and get_cache_dir() is not None:
+                    warm_caches(git_dir, targets)
+                targets = _take_pending(pending_path)
+        # reports left while the lock was being let go of, by a hook whose warm-up found it still held
+        if fcntl is None or not os.path.exists(pending_path):
+            return
@@ -0,0 +1,112 @@
+import os
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from .cache import FileCache, FileSignature, get_file_signatures
+from .constants import ENV_HOSTS_FILE, HOSTS_CACHE_NAMESPACE, SUPPORTED_WEB_HOSTS, WEB_HOST_DIALECTS
+
+# the key of a suffix trie node's own dialect; labels never contain dots, so it cannot clash with a child label
+_DIALECT_KEY: str = "."
+
+
+class HostConfigException(Exception):
+    pass
+
+
+class HostRegistry:
+    """
+    Maps hostnames to URL dialects. Hostnames are looked up in a dictionary of exact names, then in a trie of
+    domain suffixes keyed by label from the right, so a lookup costs one pass over the hostname however many hosts
+    are configured. The longest matching suffix wins.
+    """
+
+    def __init__(self, exact: Optional[Dict[str, str]] = None, suffixes: Optional[Dict[str, Any]] = None):
+        self.exact: Dict[str, str] = exact or {}
+        self.suffixes: Dict[str, Any] = suffixes or {}
+
+    def add(self, pattern: str, dialect: str):
+        """Map a hostname, or every host under a domain for patterns starting with "." or "*."."""
+        pattern = pattern.lower()
+        if pattern.startswith("*."):
+            pattern = pattern[1:]
+        if not pattern.startswith("."):
+            self.exact[pattern] = dialect
+            return
+        node: Dict[str, Any] = self.suffixes
+        for label in reversed(pattern[1:].split(".")):
+            node = node.setdefault(label, {})
+        node[_DIALECT_KEY] = dialect
+
+    def get_dialect(self, host: str) -> Optional[str]:
+        dialect: Optional[str] = self.exact.get(host)
+        if dialect is not None:
+            return dialect
+        node: Optional[Dict[str, Any]] = self.suffixes
+        labels: List[str] = host.split(".")
+        # a suffix pattern matches hosts below the domain, not the domain itself
+        for label in reversed(labels[1:]):
+            node = node.get(label)
+            if node is None:
+                break
+            dialect = node.get(_DIALECT_KEY, dialect)
+        return dialect
+
+
+def parse_hosts(text: str, path: str = "hosts") -> HostRegistry:
+    """
+    Parse lines of "<hostname or .domain> <dialect>", where the dialect is one of WEB_HOST_DIALECTS, e.g.
+    "git.example.com gitlab" or ".scm.example.com bitbucket". Blank lines and lines starting with # are ignored.
+    """
+    registry: HostRegistry = HostRegistry()
+    for line_number, line in enumerate(text.splitlines(), 1):
+        fields: List[str] = line.split("#", 1)[0].split()
+        if not fields:
+            continue
+        if len(fields) != 2 or fields[1].lower() not in WEB_HOST_DIALECTS:
+            raise HostConfigException("{}:{}: expected a hostname and one of {}, got: {}".format(
+                path, line_number, ", ".join(WEB_HOST_DIALECTS), line.strip()))
+        registry.add(fields[0], fields[1].lower())
+    return registry
+
+
+def get_hosts_path() -> str:
+    """$WEBGIT_HOSTS_FILE, or $XDG_CONFIG_HOME/webgit/hosts."""
+    if os.environ.get(ENV_HOSTS_FILE):
+        return os.environ[ENV_HOSTS_FILE]
+    config_home: str = os.environ.get("XDG_CONFIG_HOME") or os.path.join(os.path.expanduser("~"), ".config")
+    return os.path.join(config_home, "webgit", "hosts")
+
+
+@lru_cache(maxsize=1)
+def _load_host_registry(path: str, signature: FileSignature) -> HostRegistry:
+    if signature[1] < 0:
+        return HostRegistry()  # no hosts file
+    cache: FileCache = FileCache(HOSTS_CACHE_NAMESPACE)
+    cached: Optional[dict] = cache.load(path)
+    if cached is not None:
+        return HostRegistry(cached["exact"], cached["suffixes"])
+    try:
+        with open(path, encoding="utf-8") as f:
+            registry: HostRegistry = parse_hosts(f.read(), path)
+    except (OSError, UnicodeDecodeError) as e:
+        raise HostConfigException("Cannot read {}: {}".format(path, e))
+    cache.store(path, [path], {"exact": registry.exact, "suffixes": registry.suffixes})
+    return registry
+
+
+def get_host_registry() -> HostRegistry:
+    """The registry from the hosts file, parsed again only when the file changes, and cached between runs."""
+    path: str = get_hosts_path()
+    return _load_host_registry(path, get_file_signatures([path])[0])
+
+
+def get_web_host(url: str, registry: Optional[HostRegistry] = None) -> str:
+    """
+    The dialect of a sanitized remote url ("host/org/repo"): the host registry's entry for the hostname, or else
+    the first of SUPPORTED_WEB_HOSTS named in the url, or "" when neither matches.
+    """
+    host: str = url.split("/", 1)[0].rsplit("@", 1)[-1]
+    dialect: Optional[str] = (registry or get_host_registry()).get_dialect(host)
+    if dialect is not None:
+        return dialect
+    return next((h for h in SUPPORTED_WEB_HOSTS if h in url), "")
@@ -0,0 +1,87 @@
+import os
+import sys
+from abc import ABC, abstractmethod
+from typing import List, Optional
+
+from .git_config import find_executable
+
+# runs the launcher once per address for launchers that take a single address, as xdg-open does
+_LAUNCH_EACH_SCRIPT: str = "for url; do {}; done"
+
+
+class LauncherException(Exception):
+    pass
+
+
+class Launcher(ABC):
+    """Opens web addresses, all of them with one launch."""
+
+    @abstractmethod
+    def launch(self, urls: List[str]):
+        pass
+
+
+class DryRunLauncher(Launcher):
+    """Records the addresses it is asked to open instead of opening them, e.g. for tests."""
+
+    def __init__(self):
+        self.launches: List[List[str]] = []
+
+    def launch(self, urls: List[str]):
+        self.launches.append(list(urls))
+
+
+def _get_browser_argv(browser: str, urls: List[str]) -> Optional[List[str]]:
+    # $BROWSER is a list of commands, as for Python's webbrowser module, where %s stands for the address
+    for command in browser.split(os.pathsep):
+        command_argv: List[str] = command.split()
+        if not command_argv or not find_executable(command_argv[0]):
+            continue
+        if "%s" not in command:
+            return command_argv + urls
+        if len(urls) == 1:
+            return [a.replace("%s", urls[0]) for a in command_argv]
+        return ["sh", "-c", _LAUNCH_EACH_SCRIPT.format(command.replace("%s", '"$url"')), "webgit"] + urls
+    return None
+
+
+def get_launch_argv(urls: List[str]) -> List[str]:
+    """The one command that opens urls on this platform: $BROWSER, open on macOS, or xdg-open."""
+    browser: Optional[str] = os.environ.get("BROWSER")
+    browser_argv: Optional[List[str]] = _get_browser_argv(browser, urls) if browser else None
+    if browser_argv:
+        return browser_argv
+    if sys.platform == "darwin":
+        return ["open"] + urls
+    if find_executable("xdg-open"):
+        if len(urls) == 1:
+            return ["xdg-open"] + urls
+        return ["sh", "-c", _LAUNCH_EACH_SCRIPT.format('xdg-open "$url"'), "webgit"] + urls
+    raise LauncherException("No browser launcher found, set BROWSER or use --print-address")
+
+
+class BrowserLauncher(Launcher):
+    """
+    Opens the addresses in the default browser with one detached launcher process, which webgit neither waits for
+    nor holds a pipe to, so it can exit while the browser starts.
+    """
+
+    def launch(self, urls: List[str]):
+        if sys.platform == "win32":
+            # the shell opens one document per call and has no command line to batch them on; startfile runs in
+            # this process and returns as soon as the shell has the address, so no process is started per address
+            for url in urls:
+                os.startfile(url)
+            return
+
+        import subprocess
+        try:
+            subprocess.Popen(
+                get_launch_argv(urls),
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                start_new_session=True,
+            )
+        except OSError as e:
+            raise LauncherException("Cannot launch the browser: {}".format(e))
@@ -0,0 +1,335 @@
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+from .constants import LSP_MAX_WORKERS
+from .git_config import GitDirectories
+from .permalink import find_work_tree, get_head_commit, get_head_permalink, get_repository_path
+from .repository import get_exception_message, get_repository_state_files
+from .resolver import CommandException, RepoState
+from .server import LatencyStats
+from .watch import create_file_watcher, FileWatcher
+
+# JSON-RPC 2.0 error codes
+PARSE_ERROR: int = -32700
+INVALID_REQUEST: int = -32600
+METHOD_NOT_FOUND: int = -32601
+INVALID_PARAMS: int = -32602
+REQUEST_FAILED: int = -32000
+
+# a Content-Length header, also found at the end of a line, where it follows the unread body of a message whose
+# Content-Length was malformed
+_REGEX_CONTENT_LENGTH: re.Pattern = re.compile(rb"content-length\s*:(.*)$", re.IGNORECASE)
+
+# the command offered through workspace/executeCommand, taking the params of webgit/permalink as its one argument
+PERMALINK_COMMAND: str = "webgit.permalink"
+
+
+class LspException(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code: int = code
+
+
+class _LoadRequired(Exception):
+    """Raised by a request that was to be answered without reading a repository, when the repository is stale."""
+
+
+def read_message(input_stream: BinaryIO) -> Optional[bytes]:
+    """
+    The body of the next message framed with a Content-Length header, or None at the end of input_stream. Raises
+    LspException with PARSE_ERROR, after the headers, for a Content-Length that is not a length.
+    """
+    content_length: Optional[int] = None
+    malformed: Optional[bytes] = None
+    while True:
+        line: bytes = input_stream.readline()
+        if not line:
+            return None
+        line = line.strip()
+        if not line:
+            if content_length is not None or malformed is not None:
+                break
+            continue  # stray blank lines between messages
+        match: Optional[re.Match] = _REGEX_CONTENT_LENGTH.search(line)
+        if match is not None:
+            value: bytes = match.group(1).strip()
+            if value.isdigit():
+                content_length, malformed = int(value), None
+            else:
+                content_length, malformed = None, value
+    if malformed is not None:
+        raise LspException(PARSE_ERROR, "Invalid Content-Length: {}".format(malformed.decode("utf-8", "replace")))
+    body: bytes = input_stream.read(content_length)
+    return body if len(body) == content_length else None
+
+
+def write_message(output_stream: BinaryIO, message: Dict[str, Any]):
+    body: bytes = json.dumps(message, separators=(",", ":")).encode("utf-8")
+    output_stream.write(b"Content-Length: " + str(len(body)).encode("ascii") + b"\r\n\r\n" + body)
+    output_stream.flush()
+
+
+def _uri_to_path(uri: str) -> str:
+    if uri.startswith("file:"):
+        return unquote(urlsplit(uri).path)
+    return uri
+
+
+def get_line_range(params: Dict[str, Any]) -> Tuple[Optional[int], Optional[int]]:
+    """
+    The 1-based, inclusive lines of a request, from startLine and endLine or from an LSP selection, whose lines are
+    0-based and whose end is exclusive: a selection ending at the start of a line does not select that line.
+    """
+    selection: Optional[Dict[str, Any]] = params.get("selection")
+    if selection is None:
+        start_line: Optional[int] = params.get("startLine")
+        end_line: Optional[int] = params.get("endLine")
+        if (start_line is not None and not isinstance(start_line, int)) or \
+                (end_line is not None and not isinstance(end_line, int)):
+            raise LspException(INVALID_PARAMS, "startLine and endLine must be line numbers")
+        if start_line is None and end_line is not None:
+            raise LspException(INVALID_PARAMS, "endLine requires startLine")
+        return start_line, end_line
+    try:
+        start: Dict[str, int] = selection["start"]
+        end: Dict[str, int] = selection.get("end", start)
+        end_line = end["line"] if end["line"] > start["line"] and end.get("character", 0) == 0 else end["line"] + 1
+        return start["line"] + 1, end_line
+    except (KeyError, TypeError, AttributeError):
+        raise LspException(INVALID_PARAMS, "selection must be a range of {line, character} positions")
+
+
+class WatchedRepository:
+    """
+    A repository's remotes and HEAD commit kept in memory until one of the files they were read from changes. The
+    object database outlives reloads, so its pack indexes stay mapped.
+    """
+
+    def __init__(self, git_directories: GitDirectories, watch: Callable[[str, List[str]], None]):
+        self.git_directories: GitDirectories = git_directories
+        self.watch: Callable[[str, List[str]], None] = watch
+        self.lock: threading.Lock = threading.Lock()
+        self.stale: bool = True
+        self.repo_state: Optional[RepoState] = None
+        self.head_commit: Optional[str] = None
+        self.error: Optional[str] = None
+
+    def get_watched_files(self) -> List[str]:
+        """The files of the remotes and branch info, and the loose ref of the branch at HEAD, which moves with it."""
+        file_paths: List[str] = get_repository_state_files(self.git_directories.git_dir)
+        try:
+            with open(os.path.join(self.git_directories.git_dir, "HEAD"), encoding="utf-8") as f:
+                head: str = f.read().strip()
+        except OSError:
+            return file_paths
+        if head.startswith("ref: refs/"):
+            file_paths.append(os.path.join(self.git_directories.common_dir, *head[len("ref: "):].split("/")))
+        return file_paths
+
+    def load(self):
+        """Read the repository again if it changed since it was last read."""
+        with self.lock:
+            if not self.stale:
+                return
+            # watched before reading, so a change while reading marks the repository stale again
+            self.stale = False
+            self.watch(self.git_directories.git_dir, self.get_watched_files())
+            git_dir: str = self.git_directories.work_tree or self.git_directories.git_dir
+            try:
+                object_database = self.repo_state.object_database if self.repo_state is not None else None
+                repo_state: RepoState = RepoState(git_dir, object_database=object_database)
+                self.head_commit = get_head_commit(repo_state)
+                self.repo_state = repo_state
+                self.error = None
+            except Exception as e:  # reported with every request until the repository changes
+                self.error = get_exception_message(e)
+
+
+class PermalinkServer:
+    """
+    Answer JSON-RPC requests, framed as in the Language Server Protocol, for the permalinks of files and line
+    ranges: webgit/permalink (or workspace/executeCommand with webgit.permalink) with a file path or file:// URI,
+    optional startLine and endLine (1-based) or an LSP selection, and an optional remote. The result holds the url,
+    the commit and the path in the repository.
+
+    Repositories stay in memory and are read again only when a watched file changes, so requests for them are
+    answered on the reading thread; requests for repositories not read yet wait on worker threads instead, so they
+    do not hold up the others.
+    """
+
+    def __init__(self, remote: Optional[str] = None, watcher: Optional[FileWatcher] = None):
+        self.remote: Optional[str] = remote
+        self.watcher: FileWatcher = watcher or create_file_watcher()
+        self.stats: LatencyStats = LatencyStats()
+        self.repositories: Dict[str, WatchedRepository] = {}
+        self.directories: Dict[str, WatchedRepository] = {}
+        self.lock: threading.Lock = threading.Lock()
+        self.root_path: Optional[str] = None
+        self.shutdown: bool = False
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.methods: Dict[str, Callable[[Dict[str, Any], bool], Any]] = {
+            "initialize": self._initialize,
+            "shutdown": self._shutdown,
+            "webgit/permalink": self._permalink,
+            "webgit/stats": lambda params, load: self.stats.to_dict(),
+            "workspace/executeCommand": self._execute_command,
+        }
+
+    def _watch(self, key: str, file_paths: List[str]):
+        with self.lock:
+            self.watcher.watch(key, file_paths)
+
+    def _poll_changes(self):
+        with self.lock:
+            for key in self.watcher.poll():
+                repository: Optional[WatchedRepository] = self.repositories.get(key)
+                if repository is not None and not repository.stale:
+                    repository.stale = True
+                    self.stats.refreshes += 1
+
+    def find_repository(self, file_path: str) -> WatchedRepository:
+        """The repository of file_path, found once for each directory."""
+        repository: Optional[WatchedRepository] = self.directories.get(os.path.dirname(file_path))
+        if repository is not None:
+            return repository
+        git_directories: GitDirectories = find_work_tree(file_path)
+        with self.lock:
+            repository = self.repositories.setdefault(
+                git_directories.git_dir, WatchedRepository(git_directories, self._watch))
+            self.directories[os.path.dirname(file_path)] = repository
+        return repository
+
+    def get_permalink(self, params: Dict[str, Any], load: bool = True) -> Dict[str, str]:
+        file_param: Any = params.get("file") or params.get("uri")
+        if not isinstance(file_param, str):
+            raise LspException(INVALID_PARAMS, "file required")
+        start_line, end_line = get_line_range(params)
+        file_path: str = os.path.normpath(os.path.join(self.root_path or os.getcwd(), _uri_to_path(file_param)))
+        repository: WatchedRepository = self.find_repository(file_path)
+        self._poll_changes()
+        if load:
+            repository.load()
+        elif repository.stale or repository.lock.locked():
+            raise _LoadRequired()  # not read yet, or being read by a worker
+        repo_state: Optional[RepoState] = repository.repo_state
+        commit: Optional[str] = repository.head_commit
+        if repository.error is not None or repo_state is None or commit is None:
+            raise CommandException(repository.error)
+        path: str = get_repository_path(repository.git_directories.work_tree, file_path)
+        return {
+            "url": get_head_permalink(
+                repo_state, commit, path, start_line, end_line, params.get("remote") or self.remote),
+            "commit": commit,
+            "path": path,
+        }
+
+    def _initialize(self, params: Dict[str, Any], load: bool) -> Dict[str, Any]:
+        root: Optional[str] = params.get("rootUri") or params.get("rootPath")
+        if isinstance(root, str):
+            self.root_path = _uri_to_path(root)
+            if self.executor is not None:
+                # read the workspace's repository while the editor starts up
+                self.executor.submit(self._preload, self.root_path)
+        return {
+            "capabilities": {"executeCommandProvider": {"commands": [PERMALINK_COMMAND]}},
+            "serverInfo": {"name": "webgit"},
+        }
+
+    def _preload(self, directory: str):
+        try:
+            self.find_repository(os.path.join(directory, "")).load()  # found for the directory, not its parent
+        except Exception:  # reported when a request for the repository comes
+            pass
+
+    def _shutdown(self, params: Dict[str, Any], load: bool) -> None:
+        self.shutdown = True
+        return None
+
+    def _permalink(self, params: Dict[str, Any], load: bool) -> Dict[str, str]:
+        return self.get_permalink(params, load)
+
+    def _execute_command(self, params: Dict[str, Any], load: bool) -> Dict[str, str]:
+        arguments: Any = params.get("arguments")
+        if params.get("command") != PERMALINK_COMMAND:
+            raise LspException(INVALID_PARAMS, "Unknown command: {}".format(params.get("command")))
+        if not isinstance(arguments, list) or len(arguments) != 1 or not isinstance(arguments[0], dict):
+            raise LspException(INVALID_PARAMS, "{} takes one argument, the permalink params".format(PERMALINK_COMMAND))
+        return self.get_permalink(arguments[0], load)
+
+    def handle_message(self, message: Any, load: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        The response to a JSON-RPC message, None for a notification. Unless load, raises _LoadRequired for a request
+        that has to read a repository first.
+        """
+        if not isinstance(message, dict) or not isinstance(message.get("method"), str):
+            return _error_response(message.get("id") if isinstance(message, dict) else None,
+                                   INVALID_REQUEST, "Invalid request")
+        request_id: Any = message.get("id")
+        method: Callable[[Dict[str, Any], bool], Any] = self.methods.get(message["method"])
+        if "id" not in message:
+            return None  # notifications, e.g. initialized and $/cancelRequest, need no answer
+        if method is None:
+            return _error_response(request_id, METHOD_NOT_FOUND, "Method not found: {}".format(message["method"]))
+        params: Any = message.get("params") or {}
+        if not isinstance(params, dict):
+            return _error_response(request_id, INVALID_PARAMS, "params must be an object")
+
+        start_time: float = time.perf_counter()
+        try:
+            response: Dict[str, Any] = {"jsonrpc": "2.0", "id": request_id, "result": method(params, load)}
+        except _LoadRequired:
+            raise
+        except LspException as e:
+            response = _error_response(request_id, e.code, str(e))
+        except Exception as e:  # report the failing request, keep serving
+            response = _error_response(request_id, REQUEST_FAILED, get_exception_message(e))
+        if message["method"] in ["webgit/permalink", "workspace/executeCommand"]:
+            self.stats.add(time.perf_counter() - start_time, "error" in response)
+        return response
+
+    def serve(self, input_stream: BinaryIO, output_stream: BinaryIO) -> int:
+        """Answer the messages on input_stream until exit or its end. Returns the exit status the protocol asks for."""
+        write_lock: threading.Lock = threading.Lock()
+
+        def respond(response: Optional[Dict[str, Any]]):
+            if response is not None:
+                with write_lock:
+                    write_message(output_stream, response)
+
+        try:
+            # leaving the block waits for the requests still being answered by the workers
+            with ThreadPoolExecutor(max_workers=LSP_MAX_WORKERS) as executor:
+                self.executor = executor
+                while True:
+                    try:
+                        body: Optional[bytes] = read_message(input_stream)
+                    except LspException as e:  # the body cannot be skipped, the next headers are searched for
+                        respond(_error_response(None, e.code, str(e)))
+                        continue
+                    if body is None:
+                        break
+                    try:
+                        message: Any = json.loads(body)
+                    except ValueError:
+                        respond(_error_response(None, PARSE_ERROR, "Parse error"))
+                        continue
+                    if isinstance(message, dict) and message.get("method") == "exit":
+                        break
+                    try:
+                        respond(self.handle_message(message, load=False))
+                    except _LoadRequired:
+                        executor.submit(lambda m: respond(self.handle_message(m)), message)
+        finally:
+            self.executor = None
+            self.watcher.close()
+        return 0 if self.shutdown else 1
+
+
+def _error_response(request_id: Any, code: int, message: str) -> Dict[str, Any]:
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
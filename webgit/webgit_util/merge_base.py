@@ -0,0 +1,172 @@
+import heapq
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING, Union
+
+from .commit_graph import CommitGraph, CommitGraphException, read_commit_graph
+from .objects import ObjectDatabaseException
+
+if TYPE_CHECKING:
+    from .objects import ObjectDatabase
+
+# the generation of a commit that is not in the commit-graph, which sorts it before every commit that is
+GENERATION_NUMBER_INFINITY: int = 1 << 63
+
+# the paint flags of the walk: reachable from the first side, from the second side, already below a merge base,
+# and recorded as a merge base
+_PARENT1: int = 1
+_PARENT2: int = 2
+_STALE: int = 4
+_RESULT: int = 8
+
+# a commit in a walk: its position in the commit-graph, or its hash when it is not in the commit-graph
+_CommitKey = Union[int, str]
+
+
+class CommitWalker:
+    """
+    Walks of the commit history without git, for merge bases and ancestry. Commits in the commit-graph are read
+    from it, so a walk visits commits by generation and stops as soon as the rest of the history cannot change the
+    answer: its cost follows the commits on either side of the merge base, not the length of the history. Commits
+    written since the commit-graph, or every commit when there is none, are parsed from the object database.
+    """
+
+    def __init__(self, object_database: "ObjectDatabase", commit_graph: Optional[CommitGraph] = None):
+        self.object_database: "ObjectDatabase" = object_database
+        self.commit_graph: Optional[CommitGraph] = (
+            commit_graph if commit_graph is not None and commit_graph.has_commit_data else None)
+        self._commits: Dict[_CommitKey, Tuple[int, int, List[_CommitKey]]] = {}
+        self.commits_read: int = 0
+
+    def _get_key(self, hex_name: str) -> _CommitKey:
+        position: Optional[int] = self.commit_graph.find_position(hex_name) if self.commit_graph is not None else None
+        return hex_name if position is None else position
+
+    def _get_hex_name(self, key: _CommitKey) -> str:
+        return key if isinstance(key, str) else self.commit_graph.get_hex_name(key)
+
+    def _get_commit(self, key: _CommitKey) -> Tuple[int, int, List[_CommitKey]]:
+        """(generation, commit time, parents) of a commit."""
+        commit: Optional[Tuple[int, int, List[_CommitKey]]] = self._commits.get(key)
+        if commit is None:
+            self.commits_read += 1
+            if isinstance(key, int):
+                generation, time, parents = self.commit_graph.get_commit(key)
+                # commit-graphs from before generation numbers have none, so nothing below them can be pruned
+                commit = (generation or GENERATION_NUMBER_INFINITY, time, parents)
+            else:
+                commit = self._parse_commit(key)
+            self._commits[key] = commit
+        return commit
+
+    def _parse_commit(self, hex_name: str) -> Tuple[int, int, List[_CommitKey]]:
+        object_type, data = self.object_database.read_object(hex_name)
+        if object_type != "commit":
+            raise ObjectDatabaseException("Not a commit: {}".format(hex_name))
+        parents: List[_CommitKey] = []
+        time: int = 0
+        for line in data[:data.find(b"\n\n")].split(b"\n"):
+            if line.startswith(b"parent "):
+                parents.append(self._get_key(line[len(b"parent "):].decode("ascii")))
+            elif line.startswith(b"committer "):
+                time = int(line.rsplit(b" ", 2)[1])
+        return GENERATION_NUMBER_INFINITY, time, parents
+
+    def _paint_down_to_common(self, one: _CommitKey, twos: List[_CommitKey], min_generation: int = 0) -> Tuple[
+            Dict[_CommitKey, int], List[_CommitKey]]:
+        """
+        Paint the ancestors of one and of twos, newest generation first, until only commits below a common ancestor
+        are left, as git's paint_down_to_common does. Returns the flags of the commits painted and the common
+        ancestors not found below another, which include the merge bases but may include ancestors of them still.
+        Commits with a generation below min_generation are not walked.
+        """
+        flags: Dict[_CommitKey, int] = {one: _PARENT1}
+        # the queue holds (-generation, -time, order, commit), and the commits queued but not stale are counted, so
+        # the walk ends without scanning the queue
+        queue: List[Tuple[int, int, int, _CommitKey]] = []
+        queued: Dict[_CommitKey, int] = {}
+        nonstale: int = 0
+        order: int = 0
+
+        def push(key: _CommitKey):
+            nonlocal nonstale, order
+            generation, time, _ = self._get_commit(key)
+            heapq.heappush(queue, (-generation, -time, order, key))
+            order += 1
+            queued[key] = queued.get(key, 0) + 1
+            if not flags[key] & _STALE:
+                nonstale += 1
+
+        push(one)
+        for two in twos:
+            flags[two] = flags.get(two, 0) | _PARENT2
+            push(two)
+
+        results: List[_CommitKey] = []
+        while nonstale:
+            negative_generation, _, _, key = heapq.heappop(queue)
+            queued[key] -= 1
+            commit_flags: int = flags[key]
+            if not commit_flags & _STALE:
+                nonstale -= 1
+            if -negative_generation < min_generation:
+                break
+            paint: int = commit_flags & (_PARENT1 | _PARENT2 | _STALE)
+            if paint == _PARENT1 | _PARENT2:
+                if not commit_flags & _RESULT:
+                    flags[key] = commit_flags | _RESULT
+                    results.append(key)
+                paint |= _STALE
+            for parent in self._get_commit(key)[2]:
+                parent_flags: int = flags.get(parent, 0)
+                if parent_flags & paint == paint:
+                    continue
+                if paint & _STALE and not parent_flags & _STALE:
+                    nonstale -= queued.get(parent, 0)  # its queued entries are stale now
+                flags[parent] = parent_flags | paint
+                push(parent)
+        return flags, [key for key in results if not flags[key] & _STALE]
+
+    def _merge_bases(self, one: _CommitKey, two: _CommitKey) -> List[_CommitKey]:
+        if one == two:
+            return [one]
+        _, candidates = self._paint_down_to_common(one, [two])
+        # a common ancestor reachable from another is not a merge base; usually there is one candidate
+        return [
+            candidate for candidate in candidates
+            if not any(other != candidate and self._is_ancestor(candidate, other) for other in candidates)
+        ]
+
+    def _is_ancestor(self, ancestor: _CommitKey, descendant: _CommitKey) -> bool:
+        if ancestor == descendant:
+            return True
+        # nothing below the generation of ancestor can reach it, so the walk stops there
+        flags, _ = self._paint_down_to_common(ancestor, [descendant], self._get_commit(ancestor)[0])
+        return bool(flags[ancestor] & _PARENT2)
+
+    def merge_bases(self, one: str, two: str) -> List[str]:
+        """
+        The best common ancestors of two commits, as `git merge-base --all` gives them: usually one, none for
+        unrelated histories and several after criss-cross merges. Raises ObjectDatabaseException or
+        CommitGraphException when a commit cannot be read.
+        """
+        return [self._get_hex_name(key) for key in self._merge_bases(self._get_key(one), self._get_key(two))]
+
+    def is_ancestor(self, ancestor: str, descendant: str) -> bool:
+        """Whether ancestor is reachable from descendant, e.g. whether a branch is merged into another."""
+        return self._is_ancestor(self._get_key(ancestor), self._get_key(descendant))
+
+    def close(self):
+        if self.commit_graph is not None:
+            self.commit_graph.close()
+            self.commit_graph = None
+
+
+def open_commit_walker(object_database: "ObjectDatabase") -> CommitWalker:
+    """A CommitWalker over the repository's commit-graph, or over its objects alone when it has no usable one."""
+    try:
+        commit_graph: Optional[CommitGraph] = read_commit_graph(object_database.objects_dirs[0])
+    except CommitGraphException:
+        commit_graph = None
+    if commit_graph is not None and not commit_graph.has_commit_data:
+        commit_graph.close()
+        commit_graph = None
+    return CommitWalker(object_database, commit_graph)
@@ -0,0 +1,645 @@
+import mmap
+import os
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .constants import TREE_CACHE_SIZE
+from .git_config import GitConfigException, GitDirectories, find_git_directories, get_object_format
+
+PACK_INDEX_MAGIC: bytes = b"\xfftOc"
+
+PACK_MAGIC: bytes = b"PACK"
+
+OBJECT_TYPES: Dict[int, str] = {1: "commit", 2: "tree", 3: "blob", 4: "tag"}
+
+OFS_DELTA: int = 6
+
+REF_DELTA: int = 7
+
+MAX_DELTA_CHAIN: int = 10000
+
+MAX_SYMBOLIC_REFS: int = 5
+
+INFLATE_CHUNK_SIZE: int = 64 * 1024
+
+# the longest "<type> <size>\0" header of a loose object read before it is taken as corrupt
+MAX_LOOSE_HEADER_SIZE: int = 64
+
+TREE_MODE_DIRECTORY: str = "40000"
+
+TREE_MODE_SUBMODULE: str = "160000"
+
+# the refs a revision name is looked up as, in git's order of precedence
+REVISION_REF_FORMATS: List[str] = [
+    "{}", "refs/{}", "refs/tags/{}", "refs/heads/{}", "refs/remotes/{}", "refs/remotes/{}/HEAD"]
+
+OBJECT_FORMAT_HASH_SIZES: Dict[str, int] = {"sha1": 20, "sha256": 32}
+
+# environment variables that move or extend the object store, which is then left to git
+UNSUPPORTED_OBJECT_ENV_VARS: List[str] = ["GIT_OBJECT_DIRECTORY", "GIT_ALTERNATE_OBJECT_DIRECTORIES"]
+
+
+class ObjectDatabaseException(Exception):
+    pass
+
+
+class TreeEntry(NamedTuple):
+    mode: str
+    hex_name: str
+
+    @property
+    def object_type(self) -> str:
+        if self.mode == TREE_MODE_DIRECTORY:
+            return "tree"
+        if self.mode == TREE_MODE_SUBMODULE:
+            return "commit"
+        return "blob"
+
+
+class PathLookup(NamedTuple):
+    """The type of the object at a path ("tree", "blob" or "commit" for a submodule), or None and the closest path."""
+    object_type: Optional[str]
+    closest_path: Optional[str]
+    closest_object_type: Optional[str]
+
+
+def _is_hex(text: str) -> bool:
+    return all(c in "0123456789abcdef" for c in text)
+
+
+def _map_file(path: str) -> mmap.mmap:
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class PackIndex:
+    """
+    A memory-mapped version 2 pack index: a 256-entry fanout table of cumulative counts by first byte, the sorted
+    object names, their CRC32s, 4-byte offsets and, for packs over 2 GiB, 8-byte offsets.
+    """
+
+    def __init__(self, path: str, hash_size: int = 20):
+        self.path: str = path
+        self.hash_size: int = hash_size
+        self.data: mmap.mmap = _map_file(path)
+        if self.data[:4] != PACK_INDEX_MAGIC or int.from_bytes(self.data[4:8], "big") != 2:
+            self.data.close()
+            raise ObjectDatabaseException("Unsupported pack index: {}".format(path))
+        self.fanout: List[int] = [int.from_bytes(self.data[8 + 4 * i:12 + 4 * i], "big") for i in range(256)]
+        self.count: int = self.fanout[255]
+        self.names_offset: int = 8 + 256 * 4
+        self.offsets_offset: int = self.names_offset + self.count * (hash_size + 4)
+        self.large_offsets_offset: int = self.offsets_offset + self.count * 4
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _get_name(self, index: int) -> bytes:
+        start: int = self.names_offset + index * self.hash_size
+        return self.data[start:start + self.hash_size]
+
+    def _lower_bound(self, name: bytes) -> int:
+        # binary search within the objects sharing the first byte, as given by the fanout table
+        low: int = self.fanout[name[0] - 1] if name[0] > 0 else 0
+        high: int = self.fanout[name[0]]
+        while low < high:
+            middle: int = (low + high) // 2
+            if self._get_name(middle) < name:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def find_prefix(self, hex_prefix: str, limit: int) -> List[bytes]:
+        """The names starting with hex_prefix (at least two hex digits), at most limit of them."""
+        prefix_bytes: bytes = bytes.fromhex(hex_prefix[:len(hex_prefix) // 2 * 2])
+        odd_nibble: Optional[int] = int(hex_prefix[-1], 16) if len(hex_prefix) % 2 else None
+        names: List[bytes] = []
+        index: int = self._lower_bound(prefix_bytes + (bytes([odd_nibble << 4]) if odd_nibble is not None else b""))
+        while index < self.count and len(names) < limit:
+            name: bytes = self._get_name(index)
+            if not name.startswith(prefix_bytes):
+                break
+            if odd_nibble is not None and name[len(prefix_bytes)] >> 4 != odd_nibble:
+                break
+            names.append(name)
+            index += 1
+        return names
+
+    def get_offset(self, name: bytes) -> Optional[int]:
+        """The offset of the object in the pack, or None when it is not in this pack."""
+        index: int = self._lower_bound(name)
+        if index >= self.count or self._get_name(index) != name:
+            return None
+        start: int = self.offsets_offset + index * 4
+        offset: int = int.from_bytes(self.data[start:start + 4], "big")
+        if offset & 0x80000000:
+            start = self.large_offsets_offset + (offset & 0x7fffffff) * 8
+            offset = int.from_bytes(self.data[start:start + 8], "big")
+        return offset
+
+    def close(self):
+        self.data.close()
+
+
+class Pack:
+    """A pack index, and the pack data it describes, mapped when an object header is first read."""
+
+    def __init__(self, index_path: str, hash_size: int = 20):
+        self.index: PackIndex = PackIndex(index_path, hash_size)
+        self.pack_path: str = index_path[:-len(".idx")] + ".pack"
+        self._data: Optional[mmap.mmap] = None
+
+    @property
+    def data(self) -> mmap.mmap:
+        if self._data is None:
+            self._data = _map_file(self.pack_path)
+            if self._data[:4] != PACK_MAGIC:
+                raise ObjectDatabaseException("Not a pack file: {}".format(self.pack_path))
+        return self._data
+
+    def read_entry_header(self, offset: int) -> Tuple[int, int, int]:
+        """(type, size, offset of the data) of the entry at offset; the data follows the delta base for deltas."""
+        data: mmap.mmap = self.data
+        byte: int = data[offset]
+        object_type: int = (byte >> 4) & 7
+        size: int = byte & 0x0f
+        shift: int = 4
+        offset += 1
+        while byte & 0x80:
+            byte = data[offset]
+            size |= (byte & 0x7f) << shift
+            shift += 7
+            offset += 1
+        return object_type, size, offset
+
+    def read_ofs_delta_base(self, entry_offset: int, offset: int) -> Tuple[int, int]:
+        """(offset of the base entry, offset after the encoded distance) for an OFS_DELTA entry."""
+        data: mmap.mmap = self.data
+        byte: int = data[offset]
+        distance: int = byte & 0x7f
+        offset += 1
+        while byte & 0x80:
+            byte = data[offset]
+            distance = ((distance + 1) << 7) | (byte & 0x7f)
+            offset += 1
+        return entry_offset - distance, offset
+
+    def close(self):
+        self.index.close()
+        if self._data is not None:
+            self._data.close()
+
+
+def _inflate(data: mmap.mmap, offset: int, size: int) -> bytes:
+    # the compressed length is not stored, so inflate until the stream ends
+    decompressor = zlib.decompressobj()
+    chunks: List[bytes] = []
+    chunk_size: int = size + 64
+    while not decompressor.eof:
+        compressed: bytes = data[offset:offset + chunk_size]
+        if not compressed:
+            raise ObjectDatabaseException("Truncated pack entry")
+        chunks.append(decompressor.decompress(compressed))
+        offset += len(compressed)
+        chunk_size = INFLATE_CHUNK_SIZE
+    return b"".join(chunks)
+
+
+def _read_delta_size(delta: bytes, offset: int) -> Tuple[int, int]:
+    size: int = 0
+    shift: int = 0
+    while True:
+        byte: int = delta[offset]
+        size |= (byte & 0x7f) << shift
+        shift += 7
+        offset += 1
+        if not byte & 0x80:
+            return size, offset
+
+
+def _apply_delta(base: bytes, delta: bytes) -> bytes:
+    """Rebuild an object from its base and a delta of copy-from-base and insert instructions."""
+    base_size, offset = _read_delta_size(delta, 0)
+    result_size, offset = _read_delta_size(delta, offset)
+    if base_size != len(base):
+        raise ObjectDatabaseException("Delta base size mismatch")
+    result: List[bytes] = []
+    while offset < len(delta):
+        command: int = delta[offset]
+        offset += 1
+        if command & 0x80:
+            copy_offset: int = 0
+            copy_size: int = 0
+            for i in range(4):
+                if command & (1 << i):
+                    copy_offset |= delta[offset] << (8 * i)
+                    offset += 1
+            for i in range(3):
+                if command & (0x10 << i):
+                    copy_size |= delta[offset] << (8 * i)
+                    offset += 1
+            result.append(base[copy_offset:copy_offset + (copy_size or 0x10000)])
+        elif command:
+            result.append(delta[offset:offset + command])
+            offset += command
+        else:
+            raise ObjectDatabaseException("Invalid delta instruction")
+    data: bytes = b"".join(result)
+    if len(data) != result_size:
+        raise ObjectDatabaseException("Delta result size mismatch")
+    return data
+
+
+def _parse_tree(data: bytes, hash_size: int) -> Dict[str, TreeEntry]:
+    # entries are "<octal mode> <name>\0<binary hash>"
+    entries: Dict[str, TreeEntry] = {}
+    offset: int = 0
+    while offset < len(data):
+        space: int = data.index(b" ", offset)
+        nul: int = data.index(b"\0", space)
+        name: str = data[space + 1:nul].decode("utf-8", "surrogateescape")
+        entries[name] = TreeEntry(data[offset:space].decode("ascii"), data[nul + 1:nul + 1 + hash_size].hex())
+        offset = nul + 1 + hash_size
+    return entries
+
+
+def _read_alternates(objects_dir: str, seen: List[str]) -> List[str]:
+    # objects/info/alternates lists other object directories, absolute or relative to objects_dir, recursively
+    alternates: List[str] = []
+    try:
+        with open(os.path.join(objects_dir, "info", "alternates"), encoding="utf-8") as f:
+            lines: List[str] = f.read().splitlines()
+    except OSError:
+        return alternates
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        alternate: str = os.path.normpath(os.path.join(objects_dir, line))
+        if alternate not in seen and os.path.isdir(alternate):
+            seen.append(alternate)
+            alternates.append(alternate)
+            alternates.extend(_read_alternates(alternate, seen))
+    return alternates
+
+
+class ObjectDatabase:
+    """
+    Object lookups against the loose objects and pack indexes of a repository and its alternates, without running
+    git. Packs are rescanned when a lookup misses and a pack directory has changed, e.g. after a fetch or gc.
+    """
+
+    def __init__(self, objects_dir: str, hash_size: int = 20, git_directories: Optional[GitDirectories] = None):
+        self.objects_dirs: List[str] = [objects_dir] + _read_alternates(objects_dir, [objects_dir])
+        self.hash_size: int = hash_size
+        self.git_directories: Optional[GitDirectories] = git_directories
+        self.packs: Dict[str, Pack] = {}
+        self._pack_dir_mtimes: Dict[str, int] = {}
+        self._trees: "OrderedDict[str, Dict[str, TreeEntry]]" = OrderedDict()
+        self._commit_trees: "OrderedDict[str, str]" = OrderedDict()
+        self._packed_refs: Dict[str, str] = {}
+        self._packed_refs_stat: Optional[Tuple[int, int]] = None
+        self._scan_packs()
+
+    def _scan_packs(self) -> bool:
+        """Open new packs and close removed ones; returns whether anything changed."""
+        changed: bool = False
+        index_paths: List[str] = []
+        for objects_dir in self.objects_dirs:
+            pack_dir: str = os.path.join(objects_dir, "pack")
+            try:
+                mtime_ns: int = os.stat(pack_dir).st_mtime_ns
+                names: List[str] = sorted(os.listdir(pack_dir))
+            except OSError:
+                continue
+            changed = changed or self._pack_dir_mtimes.get(pack_dir) != mtime_ns
+            self._pack_dir_mtimes[pack_dir] = mtime_ns
+            index_paths.extend(os.path.join(pack_dir, n) for n in names if n.endswith(".idx"))
+
+        for index_path in set(self.packs) - set(index_paths):
+            self.packs.pop(index_path).close()
+        for index_path in index_paths:
+            if index_path not in self.packs:
+                try:
+                    self.packs[index_path] = Pack(index_path, self.hash_size)
+                except (OSError, ValueError, ObjectDatabaseException):
+                    continue  # e.g. a pack being written
+        return changed
+
+    def _find_loose(self, hex_prefix: str, limit: int) -> List[str]:
+        names: List[str] = []
+        for objects_dir in self.objects_dirs:
+            try:
+                file_names: List[str] = os.listdir(os.path.join(objects_dir, hex_prefix[:2]))
+            except OSError:
+                continue
+            names.extend(hex_prefix[:2] + n for n in file_names if n.startswith(hex_prefix[2:]) and len(n) > 30)
+        return sorted(set(names))[:limit]
+
+    def _find(self, hex_prefix: str, limit: int) -> List[str]:
+        names: Dict[str, None] = {n: None for n in self._find_loose(hex_prefix, limit)}
+        for pack in self.packs.values():
+            for name in pack.index.find_prefix(hex_prefix, limit):
+                names[name.hex()] = None
+        return sorted(names)[:limit]
+
+    def find_objects(self, hex_prefix: str, limit: int = 16) -> List[str]:
+        """The full names of the objects whose names start with hex_prefix, at most limit of them."""
+        hex_prefix = hex_prefix.lower()
+        if len(hex_prefix) < 2 or not _is_hex(hex_prefix):
+            return []
+        names: List[str] = self._find(hex_prefix, limit)
+        if not names and self._scan_packs():
+            names = self._find(hex_prefix, limit)
+        return names
+
+    def _get_packed_type(self, name: bytes, depth: int = 0) -> Optional[str]:
+        for pack in self.packs.values():
+            offset: Optional[int] = pack.index.get_offset(name)
+            if offset is None:
+                continue
+            for _ in range(MAX_DELTA_CHAIN):
+                object_type, _, data_offset = pack.read_entry_header(offset)
+                if object_type == OFS_DELTA:
+                    offset, _ = pack.read_ofs_delta_base(offset, data_offset)
+                elif object_type == REF_DELTA and depth < MAX_DELTA_CHAIN:
+                    # a delta's type is its base's, which may be in another pack
+                    return self._get_packed_type(pack.data[data_offset:data_offset + self.hash_size], depth + 1)
+                else:
+                    return OBJECT_TYPES.get(object_type)
+        return None
+
+    def _get_loose_type(self, hex_name: str) -> Optional[str]:
+        for objects_dir in self.objects_dirs:
+            try:
+                f = open(os.path.join(objects_dir, hex_name[:2], hex_name[2:]), "rb")
+            except OSError:
+                continue
+            with f:
+                # the header is "<type> <size>\0"; zlib may need more than one block of input to produce it, and
+                # input it held back to keep within the output limit must be passed again before reading more
+                decompressor = zlib.decompressobj()
+                header: bytes = b""
+                compressed: bytes = b""
+                try:
+                    while b"\0" not in header:
+                        if len(header) > MAX_LOOSE_HEADER_SIZE:
+                            return None
+                        if not compressed:
+                            compressed = f.read(256)
+                            if not compressed:
+                                return None
+                        header += decompressor.decompress(compressed, 32)
+                        compressed = decompressor.unconsumed_tail
+                except zlib.error:
+                    return None
+            object_type, _, size = header[:header.index(b"\0")].partition(b" ")
+            return object_type.decode("ascii", "replace") if size.isdigit() else None
+        return None
+
+    def get_object_type(self, hex_name: str) -> Optional[str]:
+        """"commit", "tree", "blob" or "tag", or None when the object is not in the repository."""
+        try:
+            object_type: Optional[str] = (
+                self._get_loose_type(hex_name) or self._get_packed_type(bytes.fromhex(hex_name)))
+            if object_type is None and self._scan_packs():
+                object_type = self._get_packed_type(bytes.fromhex(hex_name))  # e.g. packed by a gc since
+            return object_type
+        except (OSError, ValueError, IndexError, ObjectDatabaseException):
+            return None
+
+    def _read_loose(self, hex_name: str) -> Optional[Tuple[str, bytes]]:
+        for objects_dir in self.objects_dirs:
+            try:
+                with open(os.path.join(objects_dir, hex_name[:2], hex_name[2:]), "rb") as f:
+                    data: bytes = zlib.decompress(f.read())
+            except OSError:
+                continue
+            header, _, body = data.partition(b"\0")
+            return header.split(b" ", 1)[0].decode("ascii"), body
+        return None
+
+    def _read_packed(self, pack: Pack, offset: int, depth: int) -> Tuple[str, bytes]:
+        deltas: List[bytes] = []
+        for _ in range(MAX_DELTA_CHAIN):
+            object_type, size, data_offset = pack.read_entry_header(offset)
+            if object_type == OFS_DELTA:
+                base_offset, data_offset = pack.read_ofs_delta_base(offset, data_offset)
+                deltas.append(_inflate(pack.data, data_offset, size))
+                offset = base_offset
+            elif object_type == REF_DELTA:
+                base_name: bytes = pack.data[data_offset:data_offset + self.hash_size]
+                deltas.append(_inflate(pack.data, data_offset + self.hash_size, size))
+                type_name, data = self._read_object(base_name.hex(), depth + 1)
+                break
+            elif object_type in OBJECT_TYPES:
+                type_name, data = OBJECT_TYPES[object_type], _inflate(pack.data, data_offset, size)
+                break
+            else:
+                raise ObjectDatabaseException("Invalid pack entry type {}".format(object_type))
+        else:
+            raise ObjectDatabaseException("Delta chain too long")
+        for delta in reversed(deltas):
+            data = _apply_delta(data, delta)
+        return type_name, data
+
+    def _read_object(self, hex_name: str, depth: int = 0) -> Tuple[str, bytes]:
+        if depth > MAX_DELTA_CHAIN:
+            raise ObjectDatabaseException("Delta chain too long")
+        loose: Optional[Tuple[str, bytes]] = self._read_loose(hex_name)
+        if loose is not None:
+            return loose
+        name: bytes = bytes.fromhex(hex_name)
+        packed: Optional[Tuple[Pack, int]] = self._find_packed(name)
+        if packed is None and self._scan_packs():
+            packed = self._find_packed(name)  # e.g. repacked by a gc since the packs were scanned
+        if packed is None:
+            raise ObjectDatabaseException("Object not found: {}".format(hex_name))
+        return self._read_packed(packed[0], packed[1], depth)
+
+    def _find_packed(self, name: bytes) -> Optional[Tuple[Pack, int]]:
+        for pack in self.packs.values():
+            offset: Optional[int] = pack.index.get_offset(name)
+            if offset is not None:
+                return pack, offset
+        return None
+
+    def read_object(self, hex_name: str) -> Tuple[str, bytes]:
+        """(type, content) of an object, inflated from loose or packed storage with deltas applied."""
+        try:
+            return self._read_object(hex_name.lower())
+        except (OSError, ValueError, IndexError, zlib.error) as e:
+            raise ObjectDatabaseException("Cannot read object {}: {}".format(hex_name, e))
+
+    def read_tree(self, hex_name: str) -> Dict[str, TreeEntry]:
+        """The entries of a tree by name; the most recently used trees are kept decoded."""
+        entries: Optional[Dict[str, TreeEntry]] = self._trees.get(hex_name)
+        if entries is not None:
+            self._trees.move_to_end(hex_name)
+            return entries
+        object_type, data = self.read_object(hex_name)
+        if object_type != "tree":
+            raise ObjectDatabaseException("Not a tree: {}".format(hex_name))
+        entries = _parse_tree(data, self.hash_size)
+        self._trees[hex_name] = entries
+        if len(self._trees) > TREE_CACHE_SIZE:
+            self._trees.popitem(last=False)
+        return entries
+
+    def _get_commit_tree(self, commit: str) -> str:
+        """The root tree of a commit, kept for the most recently used commits, as commits never change."""
+        tree: Optional[str] = self._commit_trees.get(commit)
+        if tree is not None:
+            self._commit_trees.move_to_end(commit)
+            return tree
+        _, data = self.read_object(commit)
+        tree = data[len(b"tree "):data.index(b"\n")].decode("ascii")
+        self._commit_trees[commit] = tree
+        if len(self._commit_trees) > TREE_CACHE_SIZE:
+            self._commit_trees.popitem(last=False)
+        return tree
+
+    def _get_packed_refs(self) -> Dict[str, str]:
+        path: str = os.path.join(self.git_directories.common_dir, "packed-refs")
+        try:
+            stat: os.stat_result = os.stat(path)
+        except OSError:
+            return {}
+        if self._packed_refs_stat != (stat.st_mtime_ns, stat.st_size):
+            packed_refs: Dict[str, str] = {}
+            with open(path, encoding="utf-8", errors="surrogateescape") as f:
+                for line in f:
+                    if line[0] not in "#^":
+                        hex_name, _, ref = line.rstrip("\n").partition(" ")
+                        packed_refs[ref] = hex_name
+            self._packed_refs = packed_refs
+            self._packed_refs_stat = (stat.st_mtime_ns, stat.st_size)
+        return self._packed_refs
+
+    def _read_ref(self, ref: str) -> Optional[str]:
+        for _ in range(MAX_SYMBOLIC_REFS):
+            if ".." in ref or ref.startswith("/") or ref.endswith("/"):
+                return None
+            value: Optional[str] = None
+            for directory in [self.git_directories.git_dir, self.git_directories.common_dir]:
+                try:
+                    with open(os.path.join(directory, ref), encoding="utf-8") as f:
+                        value = f.read().strip()
+                    break
+                except (OSError, UnicodeDecodeError):
+                    continue
+            if value is None:
+                return self._get_packed_refs().get(ref)
+            if not value.startswith("ref: "):
+                hex_name: str = value.split(maxsplit=1)[0] if value else ""
+                return hex_name if len(hex_name) == self.hash_size * 2 and _is_hex(hex_name) else None
+            ref = value[len("ref: "):]
+        return None
+
+    def _peel_to_commit(self, hex_name: str) -> Optional[str]:
+        # the type is read from the object's header, so only tags are inflated, never a blob that may be large
+        for _ in range(MAX_SYMBOLIC_REFS):
+            object_type: Optional[str] = self.get_object_type(hex_name)
+            if object_type == "commit":
+                return hex_name
+            if object_type != "tag":
+                return None
+            _, data = self.read_object(hex_name)
+            if not data.startswith(b"object "):
+                return None
+            hex_name = data[len(b"object "):data.index(b"\n")].decode("ascii")
+        return None
+
+    def resolve_revision(self, revision: str) -> Optional[str]:
+        """
+        The commit a branch, tag, remote branch, HEAD or (short) hash names, or None when it is not in the repository
+        or cannot be read. Raises ObjectDatabaseException for an ambiguous short hash.
+        """
+        try:
+            if self.git_directories is not None and revision:
+                for ref_format in REVISION_REF_FORMATS:
+                    if ref_format == "{}" and not (revision.isupper() or revision.startswith("refs/")):
+                        continue  # only names like HEAD and FETCH_HEAD are looked up outside refs/
+                    hex_name: Optional[str] = self._read_ref(ref_format.format(revision))
+                    if hex_name:
+                        return self._peel_to_commit(hex_name)
+            # the candidates that name a commit, each peeled once: commits as they are, tags to their commits
+            commits: List[str] = [
+                commit for commit in (self._peel_to_commit(h) for h in self.find_objects(revision)) if commit]
+        except (OSError, ObjectDatabaseException):
+            return None
+        if len(commits) > 1:
+            raise ObjectDatabaseException("Ambiguous revision {}".format(revision))
+        return commits[0] if commits else None
+
+    def lookup_path(self, revision: str, path: str) -> Optional[PathLookup]:
+        """
+        Walk the trees of revision down path. Returns None when the revision cannot be resolved locally, and the
+        closest existing path when path is missing.
+        """
+        commit: Optional[str] = self.resolve_revision(revision)
+        if commit is None:
+            return None
+        try:
+            entry: TreeEntry = TreeEntry(TREE_MODE_DIRECTORY, self._get_commit_tree(commit))
+            names: List[str] = [n for n in path.split("/") if n and n != "."]
+            closest_names: List[str] = []
+            missing: bool = False
+            for name in names:
+                entries: Dict[str, TreeEntry] = self.read_tree(entry.hex_name) if entry.object_type == "tree" else {}
+                if name not in entries:
+                    import difflib
+                    matches: List[str] = difflib.get_close_matches(name, entries, n=1)
+                    if not matches:
+                        break
+                    name = matches[0]
+                    missing = True
+                closest_names.append(name)
+                entry = entries[name]
+            else:
+                if not missing:
+                    return PathLookup(entry.object_type, None, None)
+                return PathLookup(None, "/".join(closest_names), entry.object_type)
+        except (ValueError, ObjectDatabaseException):
+            return None
+        return PathLookup(None, None, None)
+
+    def get_path_type(self, commit: str, path: str) -> Optional[str]:
+        """The type of the object at path in the tree of commit, or None when the path or commit is missing."""
+        try:
+            entry: TreeEntry = TreeEntry(TREE_MODE_DIRECTORY, self._get_commit_tree(commit))
+            for name in path.split("/"):
+                if not name or name == ".":
+                    continue
+                entry = (self.read_tree(entry.hex_name) if entry.object_type == "tree" else {}).get(name)
+                if entry is None:
+                    return None
+        except (ValueError, ObjectDatabaseException):
+            return None
+        return entry.object_type
+
+    def close(self):
+        for pack in self.packs.values():
+            pack.close()
+        self.packs = {}
+        self._trees.clear()
+        self._commit_trees.clear()
+
+
+def get_object_database(git_dir: str) -> Optional[ObjectDatabase]:
+    """The object database of the repository at git_dir, or None when it cannot be read without git."""
+    if any(os.environ.get(v) for v in UNSUPPORTED_OBJECT_ENV_VARS):
+        return None
+    try:
+        git_directories: Optional[GitDirectories] = find_git_directories(git_dir)
+        object_format: str = get_object_format(git_directories) if git_directories else "sha1"
+    except (GitConfigException, OSError, UnicodeDecodeError):
+        return None
+    if git_directories is None or object_format not in OBJECT_FORMAT_HASH_SIZES:
+        return None
+    objects_dir: str = os.path.join(git_directories.common_dir, "objects")
+    if not os.path.isdir(objects_dir):
+        return None
+    return ObjectDatabase(objects_dir, OBJECT_FORMAT_HASH_SIZES[object_format], git_directories)
@@ -0,0 +1,180 @@
+import os
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from urllib.parse import quote
+
+from .constants import LINE_ANCHOR_TEMPLATES
+from .git_config import find_git_directories, GitDirectories
+from .repository import get_exception_message, get_head_commit_output
+from .resolver import CommandException, get_url_formatter, RepoState, ResolveResult, UrlFormatter
+
+# the lines after a path, as in README.md:10 or README.md:10-20
+_REGEX_LINE_SUFFIX: re.Pattern = re.compile(r":(\d+)(?:-(\d+))?$")
+
+
+def format_line_anchor(web_host: str, start_line: Optional[int], end_line: Optional[int] = None) -> str:
+    """The anchor selecting lines start_line to end_line (1-based, inclusive) in the dialect of web_host."""
+    if start_line is None or web_host not in LINE_ANCHOR_TEMPLATES:
+        return ""
+    if end_line is not None and end_line < start_line:
+        raise CommandException("Line range {}-{} ends before it starts".format(start_line, end_line))
+    if start_line < 1:
+        raise CommandException("Line numbers start at 1, not {}".format(start_line))
+    start_template, range_template = LINE_ANCHOR_TEMPLATES[web_host]
+    if end_line is None or end_line == start_line:
+        return start_template.format(start=start_line)
+    return range_template.format(start=start_line, end=end_line)
+
+
+def get_head_commit(repo_state: RepoState) -> str:
+    """
+    The full hash of the commit at HEAD, read without git when the objects can be read. git is only run when they
+    cannot: HEAD not resolving in the object database means there is no commit at HEAD, e.g. before the first one.
+    """
+    object_database = repo_state.object_database
+    commit: Optional[str] = None
+    if object_database is not None:
+        commit = object_database.resolve_revision("HEAD")
+    elif repo_state.git_dir is not None:
+        commit = get_head_commit_output(repo_state.git_dir).strip()
+    if not commit:
+        raise CommandException("No commit at HEAD in {}".format(repo_state.git_dir))
+    return commit
+
+
+def _get_relative_path(root: str, path: str) -> Optional[str]:
+    if path == root:
+        return ""
+    root = root.rstrip(os.sep) + os.sep
+    return path[len(root):].replace(os.sep, "/") if path.startswith(root) else None
+
+
+def get_repository_path(work_tree: str, file_path: str) -> str:
+    """
+    The path of file_path in the repository at work_tree, with forward slashes, as addresses take it. Symbolic links
+    are only resolved when file_path is not under work_tree as given, e.g. when it is reached through a link to it.
+    """
+    relative_path: Optional[str] = _get_relative_path(os.path.abspath(work_tree), os.path.abspath(file_path))
+    if relative_path is None:
+        relative_path = _get_relative_path(os.path.realpath(work_tree), os.path.realpath(file_path))
+    if relative_path is None:
+        raise CommandException("{} is outside the repository at {}".format(file_path, work_tree))
+    return relative_path
+
+
+def get_permalink(
+        repo_state: RepoState,
+        commit: str,
+        path: str,
+        start_line: Optional[int] = None,
+        end_line: Optional[int] = None,
+        remote: Optional[str] = None,
+        object_type: str = "blob") -> str:
+    """
+    The address of the file at path as of commit, which stays valid as branches move, with the lines from
+    start_line to end_line selected, e.g. https://github.com/org/repo/blob/76ac43b.../README.md#L10-L20. A "tree"
+    object_type gives the address of the directory instead. The path is percent-encoded, so names with spaces or #
+    stay whole.
+    """
+    url_formatter: UrlFormatter = get_url_formatter(repo_state, remote)
+    url_path: str = quote(path, safe="/")
+    if object_type == "tree":
+        if start_line is not None:
+            raise CommandException("{} is a directory, it has no lines".format(path or "The repository root"))
+        return url_formatter.format("tree_directory", ref=commit, path=url_path)
+    return url_formatter.format("tree_file", ref=commit, path=url_path) + format_line_anchor(
+        url_formatter.upstream_remote.web_host, start_line, end_line)
+
+
+def get_head_permalink(
+        repo_state: RepoState,
+        commit: str,
+        path: str,
+        start_line: Optional[int] = None,
+        end_line: Optional[int] = None,
+        remote: Optional[str] = None) -> str:
+    """
+    The permalink of the file or directory at path in commit, the commit checked out, after checking that its tree
+    has path: a new or ignored file in the work tree has no address yet.
+    """
+    object_database = repo_state.object_database
+    object_type: Optional[str] = object_database.get_path_type(commit, path) if object_database is not None else "blob"
+    if object_type is None:
+        raise CommandException("{} is not in the commit at HEAD, {}".format(path, commit))
+    return get_permalink(repo_state, commit, path, start_line, end_line, remote, object_type)
+
+
+def split_line_range(target: str) -> Tuple[str, Optional[int], Optional[int]]:
+    """The path and lines of README.md, README.md:10 or README.md:10-20."""
+    match: Optional[re.Match] = _REGEX_LINE_SUFFIX.search(target)
+    if match is None or match.start() == 0:
+        return target, None, None
+    return target[:match.start()], int(match.group(1)), int(match.group(2)) if match.group(2) else None
+
+
+def find_work_tree(file_path: str) -> GitDirectories:
+    """The repository whose work tree holds file_path, which may not exist yet, e.g. a new file in a new directory."""
+    directory: str = file_path
+    while not os.path.isdir(directory) and os.path.dirname(directory) != directory:
+        directory = os.path.dirname(directory)
+    try:
+        git_directories: Optional[GitDirectories] = find_git_directories(directory)
+    except Exception as e:
+        raise CommandException(get_exception_message(e))
+    if git_directories is None:
+        raise CommandException("Not in a git repository: {}".format(directory))
+    if git_directories.work_tree is None:
+        raise CommandException("No work tree in the repository at {}".format(git_directories.git_dir))
+    return git_directories
+
+
+class _LocalRepository(NamedTuple):
+    git_directories: GitDirectories
+    repo_state: RepoState
+    head_commit: str
+
+
+class LocalPermalinks:
+    """
+    Permalinks of files in work trees at the commits checked out, for any number of files in any number of
+    repositories. Each repository is found from the directories of its files and read once, with HEAD resolved
+    through the loose and packed refs rather than by git, and each file is checked against the tree of the commit.
+    """
+
+    def __init__(self, remote: Optional[str] = None, base_dir: Optional[str] = None):
+        self.remote: Optional[str] = remote
+        self.base_dir: str = base_dir or os.getcwd()
+        self.repositories: Dict[str, _LocalRepository] = {}
+        self.directories: Dict[str, _LocalRepository] = {}
+
+    def _get_repository(self, file_path: str) -> _LocalRepository:
+        directory: str = os.path.dirname(file_path)
+        repository: Optional[_LocalRepository] = self.directories.get(directory)
+        if repository is None:
+            git_directories: GitDirectories = find_work_tree(file_path)
+            repository = self.repositories.get(git_directories.git_dir)
+            if repository is None:
+                repo_state: RepoState = RepoState(git_directories.work_tree)
+                repository = _LocalRepository(git_directories, repo_state, get_head_commit(repo_state))
+                self.repositories[git_directories.git_dir] = repository
+            self.directories[directory] = repository
+        return repository
+
+    def get_permalink(self, target: str) -> str:
+        """The permalink of a target such as src/main.py, src/main.py:10 or src/main.py:10-20."""
+        path, start_line, end_line = split_line_range(target)
+        file_path: str = os.path.normpath(os.path.join(self.base_dir, os.path.expanduser(path)))
+        repository: _LocalRepository = self._get_repository(file_path)
+        repository_path: str = get_repository_path(repository.git_directories.work_tree, file_path)
+        return get_head_permalink(
+            repository.repo_state, repository.head_commit, repository_path, start_line, end_line, self.remote)
+
+    def resolve_many(self, targets: Iterable[str]) -> List[ResolveResult]:
+        """The permalinks of targets, a failing target getting a result with an error rather than ending the rest."""
+        results: List[ResolveResult] = []
+        for target in targets:
+            try:
+                results.append(ResolveResult([target], self.get_permalink(target), None))
+            except Exception as e:  # one failing target must not end the others
+                results.append(ResolveResult([target], None, get_exception_message(e)))
+        return results
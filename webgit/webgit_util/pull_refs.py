@@ -0,0 +1,176 @@
+import mmap
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from . import trace
+from .cache import FileCache, get_file_signatures, get_racy_mtime_ns
+from .constants import PULL_REQUEST_CACHE_NAMESPACE
+
+# the namespaces GitHub (refs/pull/N/head) and GitLab (refs/merge-requests/N/head) fetch request heads into
+PULL_REQUEST_REF_PREFIXES: List[str] = ["refs/pull/", "refs/merge-requests/"]
+
+PACKED_REFS_SORTED_TRAIT: bytes = b"sorted"
+
+
+def _get_number(ref: str) -> Optional[int]:
+    # "refs/pull/4501/head" -> 4501, None for other refs under the prefixes, e.g. refs/pull/4501/merge
+    parts: List[str] = ref.split("/")
+    if len(parts) == 4 and parts[3] == "head" and parts[2].isdigit():
+        return int(parts[2])
+    return None
+
+
+class PullRequestIndex:
+    """The pull or merge requests whose head is each commit."""
+
+    def __init__(self, heads: Dict[str, str]):
+        self.numbers_by_commit: Dict[str, List[int]] = {}
+        for ref, hex_name in heads.items():
+            number: Optional[int] = _get_number(ref)
+            if number is not None:
+                self.numbers_by_commit.setdefault(hex_name, []).append(number)
+
+    def __len__(self) -> int:
+        return sum(len(numbers) for numbers in self.numbers_by_commit.values())
+
+    def find(self, hex_name: str) -> Optional[int]:
+        """The newest request whose head is the commit, or None."""
+        numbers: Optional[List[int]] = self.numbers_by_commit.get(hex_name)
+        return max(numbers) if numbers else None
+
+
+def _get_line(data: mmap.mmap, start: int, end: int) -> Tuple[bytes, int]:
+    # the line at start without its newline, and the offset of the next line
+    line_end: int = data.find(b"\n", start, end)
+    if line_end < 0:
+        return data[start:end], end
+    return data[start:line_end], line_end + 1
+
+
+def _lower_bound(data: mmap.mmap, low: int, high: int, prefix: bytes) -> int:
+    """
+    The offset of the first line between low and high whose ref name is not less than prefix, in sorted packed-refs.
+    Peeled lines ("^<hash>") belong to the ref before them, so they are passed over to the next ref line.
+    """
+    while low < high:
+        middle: int = (low + high) // 2
+        line_start: int = max(low, data.rfind(b"\n", low, middle) + 1)
+        ref_start: int = line_start
+        line, next_start = _get_line(data, ref_start, high)
+        while line.startswith(b"^") and next_start < high:
+            ref_start = next_start
+            line, next_start = _get_line(data, ref_start, high)
+        if line.startswith(b"^"):
+            high = line_start
+        elif line.partition(b" ")[2] < prefix:
+            low = next_start
+        else:
+            high = line_start
+    return low
+
+
+def _iter_packed_refs(data: mmap.mmap, start: int, prefix: bytes, is_sorted: bool) -> Iterator[Tuple[bytes, bytes]]:
+    # (hash, ref) of the lines from start whose ref starts with prefix, stopping at the first other ref when sorted
+    end: int = len(data)
+    while start < end:
+        line, start = _get_line(data, start, end)
+        if line.startswith(b"^") or line.startswith(b"#"):
+            continue
+        hex_name, _, ref = line.partition(b" ")
+        if ref.startswith(prefix):
+            yield hex_name, ref
+        elif is_sorted and ref > prefix:
+            return
+
+
+def read_packed_pull_refs(path: str) -> Dict[str, str]:
+    """The request heads in a packed-refs file, found by binary search when git recorded the file as sorted."""
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return {}
+            data: mmap.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except OSError:
+        return {}
+    heads: Dict[str, str] = {}
+    try:
+        header_end: int = 0
+        is_sorted: bool = False
+        if data[:1] == b"#":
+            header, header_end = _get_line(data, 0, len(data))
+            is_sorted = PACKED_REFS_SORTED_TRAIT in header.split(b":", 1)[-1].split()
+        for prefix in PULL_REQUEST_REF_PREFIXES:
+            prefix_bytes: bytes = prefix.encode("ascii")
+            start: int = _lower_bound(data, header_end, len(data), prefix_bytes) if is_sorted else header_end
+            for hex_name, ref in _iter_packed_refs(data, start, prefix_bytes, is_sorted):
+                heads[ref.decode("utf-8", "surrogateescape")] = hex_name.decode("ascii", "replace")
+    finally:
+        data.close()
+    return heads
+
+
+def _scan_loose_pull_refs(common_dir: str, known: Dict[str, list]) -> Tuple[Dict[str, list], int]:
+    """
+    The loose request heads as {ref: [mtime_ns, size, hash]}, reading only the refs that are new or changed since
+    known, and the number of refs read. Recently modified refs are recorded with an mtime of -1, to be read again.
+    """
+    loose: Dict[str, list] = {}
+    racy_mtime_ns: int = get_racy_mtime_ns()
+    refs_read: int = 0
+    for prefix in PULL_REQUEST_REF_PREFIXES:
+        try:
+            numbers: List[str] = os.listdir(os.path.join(common_dir, prefix))
+        except OSError:
+            continue
+        for number in numbers:
+            ref: str = "{}{}/head".format(prefix, number)
+            try:
+                stat_result: os.stat_result = os.stat(os.path.join(common_dir, ref))
+            except OSError:
+                continue
+            entry: Optional[list] = known.get(ref)
+            if entry is not None and entry[0] == stat_result.st_mtime_ns and entry[1] == stat_result.st_size:
+                loose[ref] = entry
+                continue
+            try:
+                with open(os.path.join(common_dir, ref), encoding="utf-8") as f:
+                    value: str = f.read().strip()
+            except (OSError, UnicodeDecodeError):
+                continue
+            refs_read += 1
+            if value and not value.startswith("ref: "):
+                mtime_ns: int = stat_result.st_mtime_ns if stat_result.st_mtime_ns < racy_mtime_ns else -1
+                loose[ref] = [mtime_ns, stat_result.st_size, value]
+    return loose, refs_read
+
+
+def get_pull_request_index(common_dir: str) -> PullRequestIndex:
+    """
+    The index of the request heads fetched into the repository. The index is kept in the cache and brought up to
+    date on each use: packed-refs is searched again only when it changed, and only new or changed loose refs are read.
+    """
+    packed_refs_path: str = os.path.join(common_dir, "packed-refs")
+    cache: FileCache = FileCache(PULL_REQUEST_CACHE_NAMESPACE)
+    with trace.span("pull_request_index", common_dir=common_dir) as span_args:
+        cached: dict = cache.load(common_dir) or {}
+        packed_signature: Optional[list] = list(get_file_signatures([packed_refs_path])[0])
+        packed_heads: Dict[str, str] = cached.get("packed_heads", {})
+        packed_changed: bool = cached.get("packed_signature") != packed_signature
+        if packed_changed:
+            packed_heads = read_packed_pull_refs(packed_refs_path)
+            if packed_signature[1] >= get_racy_mtime_ns():
+                packed_signature = None
+        loose, refs_read = _scan_loose_pull_refs(common_dir, cached.get("loose", {}))
+        span_args["packed_refs_read"] = packed_changed
+        span_args["loose_refs_read"] = refs_read
+
+        if packed_changed or refs_read or len(loose) != len(cached.get("loose", {})):
+            cache.store(common_dir, [], {
+                "packed_signature": packed_signature,
+                "packed_heads": packed_heads,
+                "loose": loose,
+            })
+
+    heads: Dict[str, str] = dict(packed_heads)
+    heads.update((ref, entry[2]) for ref, entry in loose.items())  # loose refs take precedence over packed ones
+    return PullRequestIndex(heads)
@@ -1,15 +1,28 @@
+import os
 import re
-import subprocess
-from dataclasses import dataclass
+import sys
 
+from . import trace
+from .cache import FileCache
 from .constants import (
     REGEX_BRANCH,
     REGEX_REMOTE_REPO,
-    SUPPORTED_WEB_HOSTS,
+    REPOSITORY_CACHE_NAMESPACE,
     REGEX_URL,
 )
+from .hosts import get_host_registry, get_hosts_path, get_web_host, HostRegistry
+from .git_config import (
+    find_git_directories,
+    get_head_branch,
+    get_remote_urls,
+    get_user_config_paths,
+    read_git_config,
+    GitConfig,
+    GitConfigException,
+    GitDirectories,
+)
 from enum import IntEnum
-from typing import List
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
 
 
 class GitRemoteRepoActionType(IntEnum):
@@ -27,8 +40,12 @@ class GitException(Exception):
         super().__init__(self, *args, **kwargs)
 
 
-@dataclass
-class BranchInfo:
+def get_exception_message(exception: Exception) -> str:
+    # GitException passes itself as its first argument
+    return " ".join(str(a) for a in exception.args if a is not exception) or type(exception).__name__
+
+
+class BranchInfo(NamedTuple):
     from_branch: str
     to_repo: str
     to_branch: str
@@ -66,19 +83,166 @@ class GitRemoteRepo:
             self.url = sanitize_url(remote_repo_regex_match.group(3))
 
             self.repo_action_type = GitRemoteRepoActionType.__members__.get(remote_repo_regex_match.group(4).upper())
-            for s in SUPPORTED_WEB_HOSTS:
-                if self.url.__contains__(s):
-                    self.web_host = s
-                    break
+            self.web_host = get_web_host(self.url)
 
             url_regex_match: re.Match = re.search(REGEX_URL, self.url)
             self.org_or_user = url_regex_match.group(2)
             self.repo = url_regex_match.group(3)
 
 
+_REGEX_REMOTE_REPO: re.Pattern = re.compile(REGEX_REMOTE_REPO)
+
+
+class GitRemote:
+    """
+    One remote with its fetch and push urls, as "git remote -v" lists it on two or more lines. The parsed strings
+    are interned, as forks of one project share their host, org and repository names.
+    """
+
+    __slots__ = ("name", "url", "push_urls", "repo_connection_type", "web_host", "org_or_user", "repo")
+
+    def __init__(
+            self,
+            name: str,
+            url: str,
+            push_urls: Tuple[str, ...] = (),
+            repo_connection_type: Optional[GitRemoteRepoConnectionType] = None,
+            web_host: str = "",
+            org_or_user: str = "",
+            repo: str = ""):
+
+        self.name: str = name
+        self.url: str = url
+        self.push_urls: Tuple[str, ...] = push_urls
+        self.repo_connection_type: Optional[GitRemoteRepoConnectionType] = repo_connection_type
+        self.web_host: str = web_host
+        self.org_or_user: str = org_or_user
+        self.repo: str = repo
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, GitRemote) and _remote_to_tuple(self) == _remote_to_tuple(other)
+
+    def __repr__(self) -> str:
+        return "GitRemote(name={!r}, url={!r}, push_urls={!r})".format(self.name, self.url, self.push_urls)
+
+
+class GitRemotes:
+    """The remotes of a repository in "git remote -v" order, indexed by name."""
+
+    def __init__(self, remotes: Iterable[GitRemote]):
+        self._remotes: List[GitRemote] = list(remotes)
+        self._remotes_by_name: Dict[str, GitRemote] = {}
+        for remote in self._remotes:
+            self._remotes_by_name.setdefault(remote.name, remote)
+
+    def __iter__(self) -> Iterator[GitRemote]:
+        return iter(self._remotes)
+
+    def __len__(self) -> int:
+        return len(self._remotes)
+
+    def __getitem__(self, index: int) -> GitRemote:
+        return self._remotes[index]
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, GitRemotes) and self._remotes == other._remotes
+
+    def get(self, name: Optional[str]) -> Optional[GitRemote]:
+        return self._remotes_by_name.get(name)
+
+    @staticmethod
+    def from_remote_repos(remote_repos: Iterable["GitRemoteRepo"]) -> "GitRemotes":
+        """Merge the fetch and push entries of a GitRemoteRepo list into one record per remote."""
+        remotes: Dict[str, GitRemote] = {}
+        for remote_repo in remote_repos:
+            remote: Optional[GitRemote] = remotes.get(remote_repo.name)
+            if remote is None:
+                remote = remotes[remote_repo.name] = GitRemote(
+                    remote_repo.name,
+                    remote_repo.url,
+                    (),
+                    remote_repo.repo_connection_type,
+                    remote_repo.web_host,
+                    remote_repo.org_or_user,
+                    remote_repo.repo,
+                )
+            if remote_repo.repo_action_type == GitRemoteRepoActionType.PUSH:
+                remote.push_urls += (remote_repo.url,)
+        return GitRemotes(remotes.values())
+
+
+def _make_remote(name: str, scheme: str, url: str, registry: HostRegistry) -> GitRemote:
+    # the fields match those GitRemoteRepo parses from the same line, without its second regex
+    intern = sys.intern
+    org_or_user, repo = url.rsplit("/", 2)[-2:] if url.count("/") >= 2 else ("", "")
+    return GitRemote(
+        intern(name),
+        url,
+        (),
+        GitRemoteRepoConnectionType.HTTPS if scheme.startswith("http") else GitRemoteRepoConnectionType.SSH,
+        intern(get_web_host(url, registry)),
+        intern(org_or_user),
+        intern(repo),
+    )
+
+
+def _get_remotes_from_lines(remote_lines: Iterable[str]) -> GitRemotes:
+    # one regex search per line; the push line usually repeats the fetch url, so urls are sanitized once each
+    remotes: Dict[str, GitRemote] = {}
+    sanitized_urls: Dict[str, str] = {}
+    search = _REGEX_REMOTE_REPO.search
+    registry: HostRegistry = get_host_registry()
+    for remote_line in remote_lines:
+        remote_match: Optional[re.Match] = search(remote_line)
+        if remote_match is None:
+            continue
+        name, scheme, raw_url, action = remote_match.groups()
+        url: Optional[str] = sanitized_urls.get(raw_url)
+        if url is None:
+            url = sanitized_urls[raw_url] = sanitize_url(raw_url)
+        remote: Optional[GitRemote] = remotes.get(name)
+        if remote is None:
+            remote = remotes[name] = _make_remote(name, scheme, url, registry)
+            if action == "fetch":
+                continue
+        if action == "push":
+            remote.push_urls += (url,)
+    return GitRemotes(remotes.values())
+
+
+def get_remotes_from_git_remote_output(remote_output: str) -> GitRemotes:
+    """Parse "git remote -v" output in one pass into one record per remote."""
+    if not remote_output:
+        raise GitException("Git repository not available")
+
+    fatal_outputs: List[str] = ["fatal: cannot change to", "fatal: not a git repository"]
+    if any(remote_output.startswith(fatal_output) for fatal_output in fatal_outputs):
+        raise GitException(remote_output)
+
+    with trace.span("parse_remote_output", bytes=len(remote_output)):
+        return _get_remotes_from_lines(remote_output.lower().split("\n"))
+
+
+def get_remotes_from_git_config(config: GitConfig) -> GitRemotes:
+    # through the same pattern as "git remote -v" lines, so both sources agree on odd names and urls
+    remotes: GitRemotes = _get_remotes_from_lines(
+        "{}\t{} ({})".format(remote_name, url, action).lower() for remote_name, url, action in get_remote_urls(config))
+    if not remotes:
+        raise GitException("Git repository not available")
+    return remotes
+
+
+def _run_git(argv: List[str]) -> str:
+    with trace.span("git", argv=argv) as span_args:
+        import subprocess
+        p_open = subprocess.Popen(argv, stdout=subprocess.PIPE, encoding="utf-8")
+        output: str = p_open.stdout.read()
+        span_args["bytes"] = len(output)
+        return output
+
+
 def get_remote_output(git_dir: str) -> str:
-    p_open = subprocess.Popen(["git", "-C", git_dir, "remote", "-v"], stdout=subprocess.PIPE, encoding="utf-8")
-    return p_open.stdout.read()
+    return _run_git(["git", "-C", git_dir, "remote", "-v"])
 
 
 def get_repos_from_git_remote_output(remote_output: str) -> List[GitRemoteRepo]:
@@ -89,24 +253,159 @@ def get_repos_from_git_remote_output(remote_output: str) -> List[GitRemoteRepo]:
     if any(remote_output.startswith(fatal_output) for fatal_output in fatal_outputs):
         raise GitException(remote_output)
 
-    remote_repos = []
-    for remote_line in remote_output.strip().split("\n"):
-        remote_repos.append(GitRemoteRepo(
-            name=None,
-            url=None,
-            git_repo_action_type=None,
-            git_repo_connection_type=None,
-            command_line_str=remote_line, ))
-    return remote_repos
+    with trace.span("parse_remote_output", bytes=len(remote_output)):
+        remote_repos = []
+        for remote_line in remote_output.strip().split("\n"):
+            remote_repos.append(GitRemoteRepo(
+                name=None,
+                url=None,
+                git_repo_action_type=None,
+                git_repo_connection_type=None,
+                command_line_str=remote_line, ))
+        return remote_repos
+
+
+def get_git_directories(git_dir: str) -> Optional[GitDirectories]:
+    """
+    Locate the repository for git_dir without running git. Returns None when the layout is not one the native
+    reader handles (or no repository is found), in which case callers fall back to running git.
+    """
+    try:
+        git_directories: Optional[GitDirectories] = find_git_directories(git_dir)
+    except (GitConfigException, OSError):
+        return None
+    if git_directories is None:
+        return None
+    for legacy_remotes_dir in ["remotes", "branches"]:
+        legacy_remotes_path: str = os.path.join(git_directories.common_dir, legacy_remotes_dir)
+        if os.path.isdir(legacy_remotes_path) and os.listdir(legacy_remotes_path):
+            return None
+    return git_directories
+
+
+def get_git_config(git_dir: str) -> Optional[GitConfig]:
+    git_directories: Optional[GitDirectories] = get_git_directories(git_dir)
+    if git_directories is None:
+        return None
+    return _read_git_config(git_directories)
+
+
+def _read_git_config(git_directories: GitDirectories) -> Optional[GitConfig]:
+    with trace.span("read_git_config", git_dir=git_directories.git_dir) as span_args:
+        try:
+            config: GitConfig = read_git_config(git_directories)
+        except (GitConfigException, OSError, UnicodeDecodeError) as e:
+            span_args["fallback"] = get_exception_message(e)
+            return None
+        span_args["files"] = config.file_paths
+        span_args["entries"] = len(config.entries)
+        return config
+
+
+def _get_cache_key(git_directories: GitDirectories) -> str:
+    return "\0".join([os.path.realpath(git_directories.git_dir)] + get_user_config_paths())
+
+
+def _get_cache_file_paths(git_directories: GitDirectories, config: GitConfig) -> List[str]:
+    return config.file_paths + [
+        os.path.join(git_directories.git_dir, "HEAD"),
+        os.path.join(git_directories.common_dir, "packed-refs"),
+        get_hosts_path(),
+    ]
+
+
+def get_ref_and_pack_directories(git_dir: str) -> List[str]:
+    """
+    The directories of the loose refs and of the packs, for watching a repository for fetches: writing a loose ref
+    or a pack renames a file into its directory, which changes the directory's mtime. The directories of fetched
+    pull and merge requests are left out, as there can be thousands and their refs are read without a cache.
+    """
+    git_directories: Optional[GitDirectories] = get_git_directories(git_dir)
+    if git_directories is None:
+        return []
+    from .pull_refs import PULL_REQUEST_REF_PREFIXES
+
+    refs_dir: str = os.path.join(git_directories.common_dir, "refs")
+    # refs/pull itself is watched, for new requests, but not the directory of each request below it
+    pull_request_directories: List[str] = [prefix.split("/")[1] for prefix in PULL_REQUEST_REF_PREFIXES]
+    directories: List[str] = [os.path.join(refs_dir, d) for d in pull_request_directories]
+    for directory, subdirectories, _ in os.walk(refs_dir):
+        directories.append(directory)
+        if directory == refs_dir:
+            subdirectories[:] = [d for d in subdirectories if d not in pull_request_directories]
+    return sorted(directories) + [os.path.join(git_directories.common_dir, "objects", "pack")]
+
+
+def get_repository_state_files(git_dir: str) -> List[str]:
+    """The files remotes and branch info are derived from, for watching a repository for changes."""
+    git_directories: Optional[GitDirectories] = get_git_directories(git_dir)
+    if git_directories is None:
+        return []
+    return get_user_config_paths() + [
+        os.path.join(git_directories.common_dir, "config"),
+        os.path.join(git_directories.git_dir, "config.worktree"),
+        os.path.join(git_directories.git_dir, "HEAD"),
+        os.path.join(git_directories.common_dir, "packed-refs"),
+        get_hosts_path(),
+    ]
+
+
+def _remote_to_tuple(remote: GitRemote) -> tuple:
+    return (
+        remote.name,
+        remote.url,
+        list(remote.push_urls),
+        int(remote.repo_connection_type or 0),
+        remote.web_host,
+        remote.org_or_user,
+        remote.repo,
+    )
+
+
+def _remote_from_tuple(remote_tuple: tuple) -> GitRemote:
+    name, url, push_urls, connection_type, web_host, org_or_user, repo = remote_tuple
+    intern = sys.intern
+    return GitRemote(
+        intern(name),
+        url,
+        tuple(push_urls),
+        GitRemoteRepoConnectionType(connection_type) if connection_type else None,
+        intern(web_host),
+        intern(org_or_user),
+        intern(repo),
+    )
+
+
+def get_remotes(git_dir: str) -> GitRemotes:
+    """The remotes of the repository at git_dir, from the cache, the git config, or "git remote -v"."""
+    git_directories: Optional[GitDirectories] = get_git_directories(git_dir)
+    if git_directories is not None:
+        cache: FileCache = FileCache(REPOSITORY_CACHE_NAMESPACE)
+        cache_key: str = _get_cache_key(git_directories)
+        cached: Optional[dict] = cache.load(cache_key)
+        if cached and "git_remotes" in cached:
+            return GitRemotes(_remote_from_tuple(t) for t in cached["git_remotes"])
+
+        config: Optional[GitConfig] = _read_git_config(git_directories)
+        if config is not None:
+            remotes: GitRemotes = get_remotes_from_git_config(config)
+            cache.update(
+                cache_key,
+                _get_cache_file_paths(git_directories, config),
+                git_remotes=[_remote_to_tuple(r) for r in remotes],
+            )
+            return remotes
+
+    return get_remotes_from_git_remote_output(get_remote_output(git_dir))
 
 
-def get_remote_repos(git_dir: str) -> List[GitRemoteRepo]:
-    return get_repos_from_git_remote_output(get_remote_output(git_dir))
+def get_branch_output(git_dir: str) -> str:
+    return _run_git(["git", "-C", git_dir, "branch", "-vv"])
 
 
-def get_branch_output(git_dir: str) -> str:
-    p_open = subprocess.Popen(["git", "-C", git_dir, "branch", "-vv"], stdout=subprocess.PIPE, encoding="utf-8")
-    return p_open.stdout.read()
+def get_head_commit_output(git_dir: str) -> str:
+    """The hash of the commit at HEAD as git prints it, or nothing when there is none, e.g. before the first commit."""
+    return _run_git(["git", "-C", git_dir, "rev-parse", "--verify", "-q", "HEAD^{commit}"])
 
 
 def get_branch_info_from_line(branch_output_line: str) -> BranchInfo:
@@ -127,13 +426,44 @@ def get_branch_info_from_line(branch_output_line: str) -> BranchInfo:
 
 
 def get_branch_info_from_output(branch_output: str) -> BranchInfo:
-    for remote_line in branch_output.split("\n"):
-        remote_line = remote_line.strip()
-        if remote_line.startswith("*"):
-            return get_branch_info_from_line(remote_line)
+    with trace.span("parse_branch_output", bytes=len(branch_output)):
+        for remote_line in branch_output.split("\n"):
+            remote_line = remote_line.strip()
+            if remote_line.startswith("*"):
+                return get_branch_info_from_line(remote_line)
+
+
+def get_branch_info_from_config(from_branch: str, config: GitConfig) -> BranchInfo:
+    to_repo: Optional[str] = config.get("branch.{}.remote".format(from_branch))
+    to_branch: Optional[str] = config.get("branch.{}.merge".format(from_branch))
+    if not (to_repo and to_branch) or to_repo == ".":
+        return BranchInfo(from_branch=from_branch, to_repo="upstream", to_branch=from_branch)
+
+    if to_branch.startswith("refs/heads/"):
+        to_branch = to_branch[len("refs/heads/"):]
+    return BranchInfo(from_branch=from_branch, to_repo=to_repo, to_branch=to_branch)
 
 
 def get_branch_info(git_dir: str) -> BranchInfo:
+    git_directories: Optional[GitDirectories] = get_git_directories(git_dir)
+    if git_directories is not None:
+        cache: FileCache = FileCache(REPOSITORY_CACHE_NAMESPACE)
+        cache_key: str = _get_cache_key(git_directories)
+        cached: Optional[dict] = cache.load(cache_key)
+        if cached and "branch_info" in cached:
+            return BranchInfo(*cached["branch_info"])
+
+        from_branch: Optional[str] = get_head_branch(git_directories)
+        config: Optional[GitConfig] = _read_git_config(git_directories) if from_branch else None
+        if config is not None:
+            branch_info: BranchInfo = get_branch_info_from_config(from_branch, config)
+            cache.update(
+                cache_key,
+                _get_cache_file_paths(git_directories, config),
+                branch_info=(branch_info.from_branch, branch_info.to_repo, branch_info.to_branch),
+            )
+            return branch_info
+
     return get_branch_info_from_output(get_branch_output(git_dir))
 
 
@@ -0,0 +1,636 @@
+import os
+import re
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple, TYPE_CHECKING, Union
+
+from .constants import (
+    ENV_DEFAULT_ORIGIN_REPO_NAME,
+    ENV_DEFAULT_UPSTREAM_REPO_NAME,
+    ENV_DEFAULT_USER,
+    MAX_AMBIGUOUS_OBJECTS,
+    REGEX_COMMIT_HASH,
+    REGEX_PULL_REQUEST_HASH,
+    WEB_ADDRESS_TEMPLATES,
+)
+from .repository import (
+    BranchInfo,
+    get_branch_info,
+    get_exception_message,
+    get_remotes,
+    GitException,
+    GitRemote,
+    GitRemoteRepo,
+    GitRemotes,
+)
+
+if TYPE_CHECKING:
+    from .merge_base import CommitWalker
+    from .objects import ObjectDatabase, PathLookup
+
+_REGEX_COMMIT_HASH: re.Pattern = re.compile(REGEX_COMMIT_HASH)
+
+_REGEX_PULL_REQUEST_HASH: re.Pattern = re.compile(REGEX_PULL_REQUEST_HASH)
+
+# a range of "compare", as in main...feature or v1.0..v2.0, either side of which may be left out for the current branch
+_REGEX_REVISION_RANGE: re.Pattern = re.compile(r"^(.*?)(\.\.\.?)(.*)$")
+
+Command = Union[str, List[str]]
+
+Warn = Callable[[str], None]
+
+# the (required, optional) arguments of each command, for splitting a command line into targets
+_COMMAND_ARGUMENT_COUNTS: Dict[str, Tuple[int, int]] = {
+    "repo": (0, 0),
+    "org": (0, 1),
+    "user": (0, 1),
+    "commits": (0, 0),
+    "pr": (0, 2),
+    "prs": (0, 0),
+    "myprs": (0, 1),
+    "issue": (0, 1),
+    "issues": (0, 1),
+    "tree": (1, 1),
+    "compare": (1, 0),
+}
+
+
+def _get_formatters_by_host() -> Dict[str, Dict[str, Callable[..., str]]]:
+    # the bound format method of every template, by web host and then template name, so resolving a command is one
+    # dictionary lookup and one call
+    formatters_by_host: Dict[str, Dict[str, Callable[..., str]]] = {}
+    for template_name, templates in WEB_ADDRESS_TEMPLATES.items():
+        for web_host, template in templates.items():
+            formatters_by_host.setdefault(web_host, {})[template_name] = template.format
+    return formatters_by_host
+
+
+_FORMATTERS_BY_HOST: Dict[str, Dict[str, Callable[..., str]]] = _get_formatters_by_host()
+
+
+class CommandException(Exception):
+    pass
+
+
+class UnrecognizedCommandException(CommandException):
+    pass
+
+
+class RepoState:
+    """
+    The remotes, branch facts and objects of one repository. They are read from git_dir on first use unless they
+    are given, so a RepoState built from known remotes and branch info resolves without any I/O.
+    """
+
+    def __init__(
+            self,
+            git_dir: Optional[str] = None,
+            git_repos: Union[GitRemotes, List[GitRemoteRepo], None] = None,
+            branch_info: Optional[BranchInfo] = None,
+            object_database: Optional["ObjectDatabase"] = None):
+
+        if git_dir is None and git_repos is None:
+            raise ValueError("git_dir or git_repos required")
+        self.git_dir: Optional[str] = git_dir
+        if git_repos is None:
+            git_repos = get_remotes(git_dir)
+        elif not isinstance(git_repos, GitRemotes):
+            git_repos = GitRemotes.from_remote_repos(git_repos)
+        self.git_repos: GitRemotes = git_repos
+        self._branch_info: Optional[BranchInfo] = branch_info
+        self._branch_info_error: Optional[Exception] = None
+        self._object_database: Optional["ObjectDatabase"] = object_database
+        self._object_database_read: bool = object_database is not None or git_dir is None
+
+    @property
+    def branch_info(self) -> BranchInfo:
+        if self._branch_info is None:
+            if self.git_dir is None:
+                raise CommandException("Branch information not available")
+            if self._branch_info_error is not None:
+                raise self._branch_info_error  # reading it again would only fail again, maybe running git
+            try:
+                self._branch_info = get_branch_info(self.git_dir)
+            except Exception as e:
+                self._branch_info_error = e
+                raise
+        return self._branch_info
+
+    @property
+    def object_database(self) -> Optional["ObjectDatabase"]:
+        """The repository's objects, or None when they cannot be read without git."""
+        if not self._object_database_read:
+            # imported here, as most commands never read objects
+            from .objects import get_object_database
+            self._object_database = get_object_database(self.git_dir)
+            self._object_database_read = True
+        return self._object_database
+
+    def load(self) -> "RepoState":
+        """
+        Read the branch info and objects now rather than on first use, e.g. on a worker thread, so that resolving
+        later does no I/O. A failure to read the branch info is kept for the commands that need it.
+        """
+        try:
+            self.branch_info
+        except Exception:  # e.g. no current branch; "pr" reports it
+            pass
+        self.object_database
+        return self
+
+
+class ResolveResult(NamedTuple):
+    command: List[str]
+    url: Optional[str]
+    error: Optional[str]
+
+
+class UrlFormatter:
+    """Fills in the address templates for the web host of the upstream remote, chosen as the commands choose it."""
+
+    def __init__(self, git_repos: GitRemotes, remote: Optional[str] = None):
+        self.upstream_remote: GitRemote = get_upstream_repo(git_repos, default_remote_name=remote)
+        self.remote_url: str = self.upstream_remote.url
+        self.formatters: Optional[Dict[str, Callable[..., str]]] = _FORMATTERS_BY_HOST.get(
+            self.upstream_remote.web_host)
+
+    def format(self, template_name: str, remote: Optional[GitRemote] = None, **fields: str) -> str:
+        """The address from the named template for the dialect of the upstream remote, filled in from remote."""
+        if self.formatters is None:
+            raise CommandException("Unsupported web host: {}".format(self.remote_url))
+        formatter: Optional[Callable[..., str]] = self.formatters.get(template_name)
+        if formatter is None:
+            raise CommandException("Command not supported for {} remotes: {}".format(
+                self.upstream_remote.web_host, template_name))
+        remote = remote or self.upstream_remote
+        return formatter(
+            url=remote.url, host=remote.url.split("/", 1)[0], org=remote.org_or_user, repo=remote.repo, **fields)
+
+
+def get_url_formatter(repo_state: RepoState, remote: Optional[str] = None) -> UrlFormatter:
+    """The UrlFormatter for the upstream remote of repo_state, raising CommandException for an unsupported web host."""
+    url_formatter: UrlFormatter = UrlFormatter(repo_state.git_repos, remote)
+    if url_formatter.formatters is None:
+        raise CommandException("Unsupported web host: {}".format(url_formatter.remote_url))
+    return url_formatter
+
+
+class _ResolveContext(UrlFormatter):
+    """The facts shared by every command resolved against one repository with the same options."""
+
+    def __init__(
+            self,
+            repo_state: RepoState,
+            remote: Optional[str],
+            org: Optional[str],
+            git_user: Optional[str],
+            file: Optional[str],
+            warn: Optional[Warn] = None):
+
+        super().__init__(repo_state.git_repos, remote)
+        self.repo_state: RepoState = repo_state
+        self.org: Optional[str] = org
+        self.git_user: Optional[str] = git_user
+        self.file: Optional[str] = file
+        self.warn: Optional[Warn] = warn
+
+
+def _split_command(command: Command) -> List[str]:
+    webgit_commands: List[str] = command.split() if isinstance(command, str) else list(command)
+    return webgit_commands or ["repo"]
+
+
+def _is_target_start(word: str) -> bool:
+    return (
+            word in _COMMAND_ARGUMENT_COUNTS or
+            bool(_REGEX_PULL_REQUEST_HASH.match(word)) or
+            bool(_REGEX_COMMIT_HASH.match(word))
+    )
+
+
+def split_targets(command: Command) -> List[List[str]]:
+    """
+    Split a command line naming several targets, e.g. "4501 4502 issues 370 tree 2.8.1-rc1 README.md", into one
+    command per target. An optional argument that looks like the start of a target starts a new one, except for
+    the numbers of "issue" and "issues".
+    """
+    words: List[str] = _split_command(command)
+    targets: List[List[str]] = []
+    i: int = 0
+    while i < len(words):
+        target: List[str] = [words[i]]
+        i += 1
+        required, optional = _COMMAND_ARGUMENT_COUNTS.get(target[0], (0, 0))
+        if _REGEX_COMMIT_HASH.match(target[0]):
+            optional = 1  # the file path
+        while required and i < len(words):
+            target.append(words[i])
+            i += 1
+            required -= 1
+        while optional and i < len(words):
+            if target[0] in ["issue", "issues"]:
+                if not _REGEX_PULL_REQUEST_HASH.match(words[i]):
+                    break
+            elif _is_target_start(words[i]):
+                break
+            target.append(words[i])
+            i += 1
+            optional -= 1
+        targets.append(target)
+    return targets
+
+
+def _resolve_commands(webgit_commands: List[str], context: _ResolveContext) -> str:
+    webgit_command: str = webgit_commands[0]
+
+    if webgit_command == "repo":
+        if context.formatters is None:
+            return "https://{}".format(context.remote_url)
+        return context.format("repo")
+
+    elif webgit_command == "org" or webgit_command == "user":
+        org_or_user: Optional[str] = (
+                context.org or
+                context.git_user or
+                (webgit_commands[1] if len(webgit_commands) > 1 else None)
+        )
+        if not org_or_user:
+            raise CommandException("Organization or user required after \"{}\"".format(webgit_command))
+        return context.format("org_or_user", org_or_user=org_or_user)
+
+    elif webgit_command == "commits":
+        return context.format("commits")
+
+    elif webgit_command == "pr":
+        return _resolve_pr(webgit_commands, context)
+
+    elif webgit_command == "prs":
+        return context.format("view_prs")
+
+    elif webgit_command == "myprs":
+        git_user: str = get_my_prs_user(
+            context.git_user or (webgit_commands[1] if len(webgit_commands) > 1 else None),
+            context.repo_state.git_repos)
+        return context.format("my_prs", user=git_user)
+
+    elif webgit_command in ["issue", "issues"]:
+        issue_number: Optional[str] = webgit_commands[1] if len(webgit_commands) > 1 else None
+        if issue_number:
+            return context.format("issue", number=issue_number)
+        return context.format("issues")
+
+    elif webgit_command == "tree":
+        git_object: Optional[str] = webgit_commands[1] if len(webgit_commands) > 1 else None
+        if not git_object:
+            raise CommandException("Git commit, branch or tag required after \"tree\"")
+        git_file_path: Optional[str] = context.file or (webgit_commands[2] if len(webgit_commands) > 2 else None)
+        if git_file_path:
+            return _format_path(context, git_object, git_file_path)
+        return context.format("tree", ref=git_object)
+
+    elif webgit_command == "compare":
+        return _resolve_compare(webgit_commands, context)
+
+    commit_hash: Optional[str] = _get_commit_hash(webgit_command, context.repo_state)
+    if commit_hash:
+        git_file_path = context.file or (webgit_commands[1] if len(webgit_commands) > 1 else None)
+        if git_file_path:
+            return _format_path(context, commit_hash, git_file_path)
+        return context.format("commit", commit=commit_hash)
+
+    elif _REGEX_PULL_REQUEST_HASH.match(webgit_command):
+        return context.format("view_pr", number=webgit_command.replace("#", ""))
+
+    raise UnrecognizedCommandException("Unrecognized command: {}".format(webgit_command))
+
+
+def _get_commit_hash(webgit_command: str, repo_state: RepoState) -> Optional[str]:
+    """
+    The full hash of the commit that webgit_command abbreviates, or webgit_command itself when the repository's
+    objects cannot be read or the commit is not in them, e.g. before a fetch. All-digit commands that abbreviate no
+    local commit are pull request numbers. Raises CommandException when several commits match.
+    """
+    if not _REGEX_COMMIT_HASH.match(webgit_command):
+        return None
+    object_database: Optional["ObjectDatabase"] = repo_state.object_database
+    if object_database is None:
+        return webgit_command
+
+    commit_hashes: List[str] = [
+        h for h in object_database.find_objects(webgit_command, MAX_AMBIGUOUS_OBJECTS)
+        if object_database.get_object_type(h) == "commit"
+    ]
+    if len(commit_hashes) == 1:
+        return commit_hashes[0]
+    if len(commit_hashes) > 1:
+        raise CommandException("Ambiguous commit hash {}, candidates: {}".format(
+            webgit_command, ", ".join(commit_hashes)))
+    if webgit_command.isdigit():
+        return None
+    return webgit_command
+
+
+def _format_path(context: _ResolveContext, git_object: str, git_file_path: str) -> str:
+    """
+    The address of a file or directory at git_object. The path is checked against the local trees when git_object
+    can be resolved without git; a missing path raises CommandException naming the closest existing one.
+    """
+    from .objects import ObjectDatabaseException
+
+    object_database: Optional["ObjectDatabase"] = context.repo_state.object_database
+    try:
+        path_lookup: Optional["PathLookup"] = (
+            object_database.lookup_path(git_object, git_file_path) if object_database is not None else None)
+    except ObjectDatabaseException as e:
+        raise CommandException(str(e))
+
+    if path_lookup is None or path_lookup.object_type == "blob":
+        return context.format("tree_file", ref=git_object, path=git_file_path)
+    if path_lookup.object_type is not None:
+        return context.format("tree_directory", ref=git_object, path=git_file_path.strip("/"))
+    message: str = "Path {} not found in {}".format(git_file_path, git_object)
+    if path_lookup.closest_path:
+        message += ", did you mean the {} {}?".format(
+            "file" if path_lookup.closest_object_type == "blob" else "directory", path_lookup.closest_path)
+    raise CommandException(message)
+
+
+def _resolve_pr(webgit_commands: List[str], context: _ResolveContext) -> str:
+    git_repos: GitRemotes = context.repo_state.git_repos
+    upstream_remote: GitRemote = context.upstream_remote
+    from_repo_name, from_branch_name = _split_repo_branch(webgit_commands[1] if len(webgit_commands) > 1 else None)
+    to_repo_name, to_branch_name = _split_repo_branch(webgit_commands[2] if len(webgit_commands) > 2 else None)
+
+    if not (from_branch_name and to_branch_name):
+        branch_info: BranchInfo = context.repo_state.branch_info
+        if not from_branch_name:
+            from_branch_name = branch_info.from_branch
+        if not to_repo_name:
+            to_repo_name = branch_info.to_repo
+        if not to_branch_name:
+            to_branch_name = branch_info.to_branch
+
+    if from_repo_name == upstream_remote.name:
+        from_repo: GitRemote = upstream_remote
+    else:
+        from_repo = _get_origin_repo(git_repos, from_repo_name)
+
+    if to_repo_name == upstream_remote.name:
+        to_repo: GitRemote = upstream_remote
+    else:
+        to_repo = get_upstream_repo(git_repos, to_repo_name)
+
+    to_branch_ref: Optional[str] = "refs/remotes/{}/{}".format(to_repo.name, to_branch_name) if to_branch_name else None
+    pull_request: Optional[int] = _find_pull_request(context.repo_state, from_repo, from_branch_name, to_branch_ref)
+    if pull_request is not None:
+        return context.format("view_pr", remote=to_repo, number=str(pull_request))
+
+    def check_merged(walker: "CommitWalker", commits: List[str]) -> Optional[str]:
+        if not walker.is_ancestor(*commits):
+            return None
+        return "{} has no commits that are not in {}/{}, it may already be merged".format(
+            from_branch_name, to_repo.name, to_branch_name)
+
+    if from_branch_name and to_branch_name:
+        # the branch as pushed or else as committed, against the target branch as last fetched
+        _check_history(context, [
+            ["refs/remotes/{}/{}".format(from_repo.name, from_branch_name), "refs/heads/" + from_branch_name],
+            [to_branch_ref],
+        ], check_merged)
+    return context.format(
+        "pr", remote=to_repo, to_branch=to_branch_name, from_user=from_repo.org_or_user, from_branch=from_branch_name)
+
+
+def _resolve_compare(webgit_commands: List[str], context: _ResolveContext) -> str:
+    match: Optional[re.Match] = _REGEX_REVISION_RANGE.match(webgit_commands[1]) if len(webgit_commands) > 1 else None
+    if match is None or not (match.group(1) or match.group(3)):
+        raise CommandException("Range such as main...feature or v1.0..v2.0 required after \"compare\"")
+    base, dots, head = match.groups()
+    if not (base and head):
+        current_branch: str = context.repo_state.branch_info.from_branch
+        base, head = base or current_branch, head or current_branch
+    if dots == "..":
+        return context.format("compare_direct", base=base, head=head)
+
+    def check_merge_base(walker: "CommitWalker", commits: List[str]) -> Optional[str]:
+        # the three-dot view shows the changes of head since its merge base with base
+        merge_bases: List[str] = walker.merge_bases(*commits)
+        if not merge_bases:
+            return "{} and {} have no history in common".format(base, head)
+        if commits[1] in merge_bases:
+            return "{} has no commits that are not in {}, there is nothing to compare".format(head, base)
+        return None
+
+    # the branches as last fetched from the upstream remote, or else as named locally, e.g. tags and commits
+    _check_history(context, [
+        ["refs/remotes/{}/{}".format(context.upstream_remote.name, revision), revision] for revision in [base, head]
+    ], check_merge_base)
+    return context.format("compare", base=base, head=head)
+
+
+def _resolve_first(object_database: "ObjectDatabase", revisions: List[str]) -> Optional[str]:
+    for revision in revisions:
+        commit: Optional[str] = object_database.resolve_revision(revision)
+        if commit is not None:
+            return commit
+    return None
+
+
+def _check_history(
+        context: _ResolveContext,
+        branches: List[List[str]],
+        check: Callable[["CommitWalker", List[str]], Optional[str]]):
+    """
+    Warn with the message check gives for the commits of branches, each the first of its revisions found, walking
+    the local history without git. Nothing is checked when nobody is warned, and a branch missing from the local
+    history or a history that cannot be read leaves the warning out rather than holding up the address.
+    """
+    from .commit_graph import CommitGraphException
+    from .merge_base import open_commit_walker
+    from .objects import ObjectDatabaseException
+
+    if context.warn is None or context.repo_state.object_database is None:
+        return
+    try:
+        commits: List[Optional[str]] = [
+            _resolve_first(context.repo_state.object_database, revisions) for revisions in branches]
+        if None in commits:
+            return
+        walker: "CommitWalker" = open_commit_walker(context.repo_state.object_database)
+        try:
+            message: Optional[str] = check(walker, commits)
+        finally:
+            walker.close()
+    except (CommitGraphException, ObjectDatabaseException, OSError):
+        return
+    if message:
+        context.warn(message)
+
+
+def _find_pull_request(
+        repo_state: RepoState,
+        from_repo: GitRemote,
+        from_branch_name: str,
+        to_branch_ref: Optional[str]) -> Optional[int]:
+    """
+    The fetched pull or merge request whose head is the tip of the branch, as pushed to from_repo or else as
+    committed locally, or None when there is none or the refs cannot be read without git. A request whose head is
+    already in the target branch as last fetched is not taken: it was merged, or the branch is a new one started
+    where an old request ended.
+    """
+    object_database: Optional["ObjectDatabase"] = repo_state.object_database
+    if object_database is None or object_database.git_directories is None or not from_branch_name:
+        return None
+    from .pull_refs import get_pull_request_index
+
+    for ref in ["refs/remotes/{}/{}".format(from_repo.name, from_branch_name), "refs/heads/" + from_branch_name]:
+        head: Optional[str] = object_database.resolve_revision(ref)
+        if head is not None:
+            pull_request: Optional[int] = get_pull_request_index(object_database.git_directories.common_dir).find(head)
+            if pull_request is None or _is_in_branch(object_database, head, to_branch_ref):
+                return None
+            return pull_request
+    return None
+
+
+def _is_in_branch(object_database: "ObjectDatabase", commit: str, branch_ref: Optional[str]) -> bool:
+    """Whether commit is reachable from branch_ref; False when the branch is not fetched or cannot be read."""
+    from .commit_graph import CommitGraphException
+    from .merge_base import open_commit_walker
+    from .objects import ObjectDatabaseException
+
+    try:
+        branch_commit: Optional[str] = object_database.resolve_revision(branch_ref) if branch_ref else None
+        if branch_commit is None:
+            return False
+        walker: "CommitWalker" = open_commit_walker(object_database)
+        try:
+            return walker.is_ancestor(commit, branch_commit)
+        finally:
+            walker.close()
+    except (CommitGraphException, ObjectDatabaseException, OSError):
+        return False
+
+
+def resolve(
+        command: Command,
+        repo_state: RepoState,
+        remote: Optional[str] = None,
+        org: Optional[str] = None,
+        git_user: Optional[str] = None,
+        file: Optional[str] = None,
+        warn: Optional[Warn] = None) -> str:
+    """
+    The web address for a webgit command, e.g. "4501", ["tree", "2.8.1-rc1", "README.md"] or "issues 370", in the
+    repository described by repo_state. Nothing is launched and no git command runs unless repo_state has to read
+    the branch info for "pr". Raises CommandException for commands that cannot be resolved. With warn, "pr" and
+    "compare" also check the local history and pass it a message when the page would show no changes, e.g. for
+    a branch that is already merged.
+    """
+    return _resolve_commands(
+        _split_command(command), _ResolveContext(repo_state, remote, org, git_user, file, warn))
+
+
+def resolve_many(
+        commands: Iterable[Command],
+        repo_state: RepoState,
+        remote: Optional[str] = None,
+        org: Optional[str] = None,
+        git_user: Optional[str] = None,
+        file: Optional[str] = None,
+        warn: Optional[Warn] = None) -> List[ResolveResult]:
+    """
+    Resolve many commands against one repository, choosing the remote and templates once for all of them. A
+    failing command gets a result with an error rather than ending the batch.
+    """
+    context: _ResolveContext = _ResolveContext(repo_state, remote, org, git_user, file, warn)
+    results: List[ResolveResult] = []
+    for command in commands:
+        webgit_commands: List[str] = _split_command(command)
+        try:
+            results.append(ResolveResult(webgit_commands, _resolve_commands(webgit_commands, context), None))
+        except Exception as e:  # one failing command must not end the batch
+            results.append(ResolveResult(webgit_commands, None, get_exception_message(e)))
+    return results
+
+
+def get_my_prs_user(git_user: Optional[str], git_repos: GitRemotes) -> str:
+    """The user whose pull requests myprs lists: git_user, the default user setting, the login user or the origin's."""
+    return (
+            git_user or
+            os.environ.get(ENV_DEFAULT_USER) or
+            _get_login_user() or
+            _get_origin_repo_user(git_repos)
+    )
+
+
+def _get_login_user() -> str:
+    import getpass
+    return getpass.getuser()
+
+
+def _get_remote_repo(
+        git_repos: GitRemotes,
+        remote_name: Optional[str] = None,
+        default_env_var_key: Optional[str] = None,
+        default_remote_name: Optional[str] = None,
+        no_match_default_first: bool = True,
+) -> Optional[GitRemote]:
+
+    if len(git_repos) == 0:
+        raise GitException("")
+
+    remote_repo_name: str = (
+            remote_name or
+            (os.getenv(default_env_var_key) if default_env_var_key else None) or
+            default_remote_name
+    )
+
+    if remote_repo_name:
+        git_repo: Optional[GitRemote] = git_repos.get(remote_repo_name)
+        if git_repo is not None:
+            return git_repo
+
+    if no_match_default_first:
+        return git_repos[0]
+    else:
+        return None
+
+
+def _get_origin_repo(
+        git_repos: GitRemotes,
+        default_remote_name: Optional[str] = None
+) -> Optional[GitRemote]:
+    return _get_remote_repo(
+        git_repos,
+        default_env_var_key=ENV_DEFAULT_ORIGIN_REPO_NAME,
+        default_remote_name=(default_remote_name if default_remote_name else "origin")
+    )
+
+
+def get_upstream_repo(
+        git_repos: GitRemotes,
+        default_remote_name: Optional[str] = None
+) -> Optional[GitRemote]:
+    """The remote that pull requests go to: the default upstream setting, default_remote_name, upstream or the first."""
+    return _get_remote_repo(
+        git_repos,
+        default_env_var_key=ENV_DEFAULT_UPSTREAM_REPO_NAME,
+        default_remote_name=(default_remote_name if default_remote_name else "upstream")
+    )
+
+
+def _get_origin_repo_user(git_repos: GitRemotes) -> Optional[str]:
+    origin_repo: GitRemote = _get_origin_repo(git_repos)
+    if origin_repo is not None:
+        return origin_repo.org_or_user
+    else:
+        return None
+
+
+def _split_repo_branch(repo_branch: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    if not repo_branch:
+        return None, None
+    if repo_branch.__contains__("/"):
+        repo_branch_split: List[str] = repo_branch.split("/")
+        return repo_branch_split[0], repo_branch_split[1]
+    else:
+        return None, repo_branch
@@ -0,0 +1,108 @@
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterator, Optional, Set
+
+from .git_config import GitConfigException, read_gitdir_file
+from .repository import get_exception_message
+
+
+def _get_linked_worktrees(git_dir: str) -> Iterator[str]:
+    """Work trees registered in .git/worktrees, which may live outside the scanned tree."""
+    worktrees_dir: str = os.path.join(git_dir, "worktrees")
+    try:
+        worktree_entries = list(os.scandir(worktrees_dir))
+    except OSError:
+        return
+    for worktree_entry in worktree_entries:
+        try:
+            with open(os.path.join(worktree_entry.path, "gitdir"), encoding="utf-8") as f:
+                dot_git_path: str = f.read().strip()
+        except OSError:
+            continue
+        worktree_path: str = os.path.dirname(os.path.normpath(os.path.join(worktree_entry.path, dot_git_path)))
+        if os.path.isdir(worktree_path):
+            yield worktree_path
+
+
+def find_repositories(root: str) -> Iterator[str]:
+    """
+    Yield the work tree of every repository under root, including nested repositories, submodules (whose .git is
+    a file) and linked worktrees. Symbolic links are not followed and .git directories are not descended into.
+    """
+    pending_dirs = [os.path.abspath(root)]
+    while pending_dirs:
+        current_dir: str = pending_dirs.pop()
+        try:
+            entries = sorted(os.scandir(current_dir), key=lambda e: e.name, reverse=True)
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.name == ".git":
+                    if entry.is_dir(follow_symlinks=False):
+                        yield current_dir
+                        yield from _get_linked_worktrees(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        read_gitdir_file(entry.path)
+                        yield current_dir
+                elif entry.is_dir(follow_symlinks=False):
+                    pending_dirs.append(entry.path)
+            except (GitConfigException, OSError, UnicodeDecodeError):
+                continue
+
+
+def read_resolved_paths(results_file: Optional[str]) -> Set[str]:
+    """The repository paths that were resolved successfully in an earlier scan's JSON lines output."""
+    resolved_paths: Set[str] = set()
+    if not results_file or not os.path.exists(results_file):
+        return resolved_paths
+    with open(results_file, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record: dict = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict) and record.get("url") and record.get("path"):
+                resolved_paths.add(os.path.realpath(record["path"]))
+    return resolved_paths
+
+
+def _resolve_repository(path: str, resolve: Callable[[str], str]) -> Dict[str, str]:
+    try:
+        return {"path": path, "url": resolve(path)}
+    except Exception as e:  # one broken repository must not end the scan
+        return {"path": path, "error": get_exception_message(e)}
+
+
+def scan_repositories(
+        root: str,
+        resolve: Callable[[str], str],
+        max_workers: Optional[int] = None,
+        skip_paths: Optional[Set[str]] = None) -> Iterator[Dict[str, str]]:
+    """
+    Resolve every repository under root with a bounded thread pool, yielding {"path", "url"} or {"path", "error"}
+    records in completion order. Discovery runs while earlier repositories resolve, and at most a few tasks per
+    worker are outstanding, so memory stays bounded however many repositories there are.
+    """
+    max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+    max_pending: int = max_workers * 4
+    seen_paths: Set[str] = set(skip_paths or ())
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending: Set[Future] = set()
+        for path in find_repositories(root):
+            real_path: str = os.path.realpath(path)
+            if real_path in seen_paths:
+                continue
+            seen_paths.add(real_path)
+
+            pending.add(executor.submit(_resolve_repository, path, resolve))
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
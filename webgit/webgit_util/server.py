@@ -0,0 +1,250 @@
+import asyncio
+import json
+import re
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from .cache import FileSignature, get_file_signatures
+from .constants import (
+    REGEX_COMMIT_HASH,
+    SERVE_MAX_HEADER_BYTES,
+    SERVE_REFRESH_INTERVAL_SECONDS,
+    SERVE_STATS_MAX_SAMPLES,
+)
+from .repository import get_exception_message, get_ref_and_pack_directories, get_repository_state_files
+
+HTTP_REASONS: Dict[int, str] = {
+    200: "OK",
+    302: "Found",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+}
+
+QUERY_OPTIONS: List[str] = ["remote", "org", "git_user", "file"]
+
+# the paths the server answers itself, which no repository may be named
+STATS_PATH: str = "_stats"
+
+
+class LatencyStats:
+    """Request counts and resolution latency percentiles over the most recent requests."""
+
+    def __init__(self, max_samples: int = SERVE_STATS_MAX_SAMPLES):
+        self.samples: Deque[float] = deque(maxlen=max_samples)
+        self.requests: int = 0
+        self.errors: int = 0
+        self.refreshes: int = 0
+
+    def add(self, seconds: float, error: bool):
+        self.samples.append(seconds)
+        self.requests += 1
+        if error:
+            self.errors += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {"requests": self.requests, "errors": self.errors, "refreshes": self.refreshes}
+        if self.samples:
+            samples: List[float] = sorted(self.samples)
+            for name, fraction in [("p50_us", 0.5), ("p90_us", 0.9), ("p99_us", 0.99), ("max_us", 1.0)]:
+                stats[name] = round(samples[min(len(samples) - 1, int(len(samples) * fraction))] * 1e6, 1)
+            stats["mean_us"] = round(sum(samples) / len(samples) * 1e6, 1)
+        return stats
+
+
+class ServedRepository:
+    """
+    A repository's state kept in memory, rebuilt when the git files it was derived from change or a fetch writes
+    refs or packs.
+    """
+
+    def __init__(self, name: str, path: str, create_repo_state: Callable[[str], Any]):
+        self.name: str = name
+        self.path: str = path
+        self.create_repo_state: Callable[[str], Any] = create_repo_state
+        self.file_paths: List[str] = []
+        self.signatures: Optional[List[FileSignature]] = None
+        self.repo_state: Any = None
+        self.error: Optional[str] = None
+        self.refresh()
+
+    def _get_watched_paths(self) -> List[str]:
+        return get_repository_state_files(self.path) + get_ref_and_pack_directories(self.path)
+
+    def refresh(self) -> bool:
+        if self.signatures is None or not self.file_paths:
+            self.file_paths = self._get_watched_paths()
+        signatures: List[FileSignature] = get_file_signatures(self.file_paths)
+        if signatures == self.signatures:
+            return False
+        # a new ref directory only shows in the mtime of its parent, so the directories are listed again
+        self.file_paths = self._get_watched_paths()
+        self.signatures = get_file_signatures(self.file_paths)
+        # requests read repo_state and then error from the event loop while this runs on a worker thread, so each
+        # outcome is assigned in the order that never pairs a missing state with a stale error
+        try:
+            self.repo_state = self.create_repo_state(self.path)
+            self.error = None
+        except Exception as e:  # keep serving the other repositories
+            self.error = get_exception_message(e)
+            self.repo_state = None
+        return True
+
+
+def split_link_path(segments: List[str]) -> List[str]:
+    """
+    Turn /tree/2.8.1-rc1/config/zookeeper.properties into ["tree", "2.8.1-rc1", "config/zookeeper.properties"] and
+    /642da2f/README.md into ["642da2f", "README.md"]: file paths keep their slashes, other segments are commands.
+    """
+    if segments and segments[0] == "tree" and len(segments) > 3:
+        return segments[:2] + ["/".join(segments[2:])]
+    if segments and re.match(REGEX_COMMIT_HASH, segments[0]) and len(segments) > 2:
+        return segments[:1] + ["/".join(segments[1:])]
+    return segments
+
+
+class GoLinkServer:
+    """
+    Answer GET /<repository>/<command...> with a redirect to the web address webgit would open, e.g.
+    /kafka/4501, /kafka/642da2f or /kafka/tree/2.8.1-rc1/README.md. GET /_stats returns latency statistics, so no
+    repository may be named _stats. Links are resolved on one worker thread, as resolving may read refs and inflate
+    objects, and the object databases are not shared between threads.
+    """
+
+    def __init__(
+            self,
+            repositories: Dict[str, str],
+            create_repo_state: Callable[[str], Any],
+            resolve: Callable[[List[str], Dict[str, str], Any], str],
+            refresh_interval: float = SERVE_REFRESH_INTERVAL_SECONDS):
+        if STATS_PATH in repositories:
+            raise ValueError("The repository name {} is reserved".format(STATS_PATH))
+        self.repositories: Dict[str, ServedRepository] = {
+            name: ServedRepository(name, path, create_repo_state) for name, path in repositories.items()
+        }
+        self.resolve: Callable[[List[str], Dict[str, str], Any], str] = resolve
+        self.refresh_interval: float = refresh_interval
+        self.stats: LatencyStats = LatencyStats()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._resolve_executor: ThreadPoolExecutor = ThreadPoolExecutor(1, thread_name_prefix="webgit-resolve")
+
+    def handle_request(self, target: str) -> Tuple[int, Dict[str, str], bytes]:
+        url_parts = urlsplit(target)
+        segments: List[str] = [unquote(s) for s in url_parts.path.split("/") if s]
+        if not segments:
+            return self._json_response(200, {name: r.path for name, r in self.repositories.items()})
+        if segments == [STATS_PATH]:
+            return self._json_response(200, self.stats.to_dict())
+
+        start_time: float = time.perf_counter()
+        status: int
+        headers: Dict[str, str] = {}
+        body: bytes
+        served_repository: Optional[ServedRepository] = self.repositories.get(segments[0])
+        if served_repository is None:
+            status, body = 404, "Unknown repository: {}\n".format(segments[0]).encode("utf-8")
+        elif served_repository.repo_state is None:
+            status, body = 404, "{}\n".format(served_repository.error).encode("utf-8")
+        else:
+            options: Dict[str, str] = {k: v for k, v in parse_qsl(url_parts.query) if k in QUERY_OPTIONS}
+            try:
+                web_address: str = self.resolve(
+                    split_link_path(segments[1:]) or ["repo"], options, served_repository.repo_state)
+                status, body = 302, b""
+                headers["Location"] = web_address
+            except Exception as e:  # report the failing link, keep serving
+                status, body = 404, "{}\n".format(get_exception_message(e)).encode("utf-8")
+        self.stats.add(time.perf_counter() - start_time, status != 302)
+        return status, headers, body
+
+    @staticmethod
+    def _json_response(status: int, value: Any) -> Tuple[int, Dict[str, str], bytes]:
+        return status, {"Content-Type": "application/json"}, (json.dumps(value) + "\n").encode("utf-8")
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request_head: bytes = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.LimitOverrunError:
+                    await self._write_response(writer, 400, {}, b"Request header too large\n", False)
+                    break
+                except asyncio.IncompleteReadError:
+                    break
+
+                lines: List[str] = request_head.decode("latin-1").split("\r\n")
+                request_line: List[str] = lines[0].split(" ")
+                if len(request_line) != 3:
+                    await self._write_response(writer, 400, {}, b"Bad request line\n", False)
+                    break
+                method, target, version = request_line
+                request_headers: Dict[str, str] = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        key, value = line.split(":", 1)
+                        request_headers[key.strip().lower()] = value.strip()
+                if int(request_headers.get("content-length", "0") or "0") > 0:
+                    await reader.readexactly(int(request_headers["content-length"]))
+
+                connection: str = request_headers.get("connection", "").lower()
+                keep_alive: bool = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+
+                if method not in ["GET", "HEAD"]:
+                    status, headers, body = 405, {"Allow": "GET, HEAD"}, b"Method not allowed\n"
+                else:
+                    status, headers, body = await asyncio.get_running_loop().run_in_executor(
+                        self._resolve_executor, self.handle_request, target)
+                await self._write_response(writer, status, headers, b"" if method == "HEAD" else body, keep_alive,
+                                           content_length=len(body))
+                if not keep_alive:
+                    break
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _write_response(
+            writer: asyncio.StreamWriter,
+            status: int,
+            headers: Dict[str, str],
+            body: bytes,
+            keep_alive: bool,
+            content_length: Optional[int] = None):
+
+        head: List[str] = ["HTTP/1.1 {} {}".format(status, HTTP_REASONS.get(status, ""))]
+        head.extend("{}: {}".format(k, v) for k, v in headers.items())
+        head.append("Content-Length: {}".format(len(body) if content_length is None else content_length))
+        head.append("Connection: {}".format("keep-alive" if keep_alive else "close"))
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    async def refresh_repositories(self):
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            # a refresh stats the git files and may read the config and refs again or run git, so it runs on a
+            # worker thread and the requests in flight are answered meanwhile
+            for served_repository in self.repositories.values():
+                if await loop.run_in_executor(None, served_repository.refresh):
+                    self.stats.refreshes += 1
+
+    async def start(self, host: str, port: int) -> asyncio.AbstractServer:
+        server: asyncio.AbstractServer = await asyncio.start_server(
+            self.handle_connection, host, port, limit=SERVE_MAX_HEADER_BYTES)
+        self._refresh_task = asyncio.get_running_loop().create_task(self.refresh_repositories())
+        return server
+
+    async def serve_forever(self, host: str, port: int):
+        server: asyncio.AbstractServer = await self.start(host, port)
+        for socket in server.sockets:
+            print("Serving {} on http://{}:{}".format(
+                ", ".join(self.repositories), *socket.getsockname()[:2]), flush=True)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self._resolve_executor.shutdown(wait=False)
@@ -0,0 +1,134 @@
+import os
+import sys
+import time
+from _thread import get_ident
+from typing import Any, Dict, List, Optional
+
+# Events are recorded in the Chrome trace-event format, which chrome://tracing, Perfetto and speedscope load.
+# Everything is a no-op until enable() is called.
+
+_events: Optional[List[Dict[str, Any]]] = None
+_output_path: Optional[str] = None
+_origin_time: float = 0.0
+
+
+class _NullArgs(dict):
+    """Span arguments that are dropped, so callers can set them without checking whether tracing is on."""
+
+    def __setitem__(self, key: str, value: Any):
+        pass
+
+
+class _NullSpan:
+
+    def __enter__(self) -> Dict[str, Any]:
+        return _NULL_ARGS
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_ARGS: _NullArgs = _NullArgs()
+
+_NULL_SPAN: _NullSpan = _NullSpan()
+
+
+class _Span:
+
+    def __init__(self, name: str, category: str, args: Dict[str, Any]):
+        self.name: str = name
+        self.category: str = category
+        self.args: Dict[str, Any] = args
+        self.start_time: float = 0.0
+
+    def __enter__(self) -> Dict[str, Any]:
+        self.start_time = time.perf_counter()
+        return self.args
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_value is not None:
+            self.args["error"] = "{}: {}".format(exc_type.__name__, exc_value)
+        add_span(self.name, self.start_time, time.perf_counter(), self.category, **self.args)
+        return False
+
+
+def enable(output_path: str, origin_time: Optional[float] = None):
+    """Record events from now on (and spans from origin_time on), to be written to output_path, or stderr for "-"."""
+    global _events, _output_path, _origin_time
+    _events = []
+    _output_path = output_path
+    _origin_time = time.perf_counter() if origin_time is None else origin_time
+
+
+def is_enabled() -> bool:
+    return _events is not None
+
+
+def _to_microseconds(perf_counter_time: float) -> float:
+    return round((perf_counter_time - _origin_time) * 1e6, 1)
+
+
+def add_span(name: str, start_time: float, end_time: float, category: str = "webgit", **args):
+    """Record a phase measured with time.perf_counter, e.g. one that ran before tracing was enabled."""
+    if _events is None:
+        return
+    _events.append({
+        "name": name,
+        "cat": category,
+        "ph": "X",
+        "ts": _to_microseconds(start_time),
+        "dur": round((end_time - start_time) * 1e6, 1),
+        "pid": os.getpid(),
+        "tid": get_ident(),
+        "args": args,
+    })
+
+
+def span(name: str, category: str = "webgit", **args):
+    """
+    A context manager timing its block as one event. It returns the event's arguments, to which results such as
+    byte counts can be added inside the block.
+    """
+    if _events is None:
+        return _NULL_SPAN
+    return _Span(name, category, args)
+
+
+def instant(name: str, category: str = "webgit", **args):
+    """Record a point in time, e.g. a cache hit or miss."""
+    if _events is None:
+        return
+    _events.append({
+        "name": name,
+        "cat": category,
+        "ph": "i",
+        "s": "t",
+        "ts": _to_microseconds(time.perf_counter()),
+        "pid": os.getpid(),
+        "tid": get_ident(),
+        "args": args,
+    })
+
+
+def get_trace() -> Dict[str, Any]:
+    return {
+        "traceEvents": sorted(_events or [], key=lambda e: e["ts"]),
+        "displayTimeUnit": "ms",
+        "otherData": {"argv": sys.argv},
+    }
+
+
+def write():
+    """Write the recorded events as a Chrome trace-event JSON object, and stop tracing."""
+    global _events
+    if _events is None:
+        return
+    import json
+
+    trace_json: str = json.dumps(get_trace(), indent=1)
+    _events = None
+    if _output_path == "-":
+        print(trace_json, file=sys.stderr)
+    else:
+        with open(_output_path, "w", encoding="utf-8") as f:
+            f.write(trace_json + "\n")
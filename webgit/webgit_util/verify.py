@@ -0,0 +1,268 @@
+import asyncio
+import concurrent.futures
+import ssl
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+from .cache import FileCache
+from .constants import (
+    VERIFY_CACHE_NAMESPACE,
+    VERIFY_CACHE_TTL_SECONDS,
+    VERIFY_MAX_CONNECTIONS_PER_HOST,
+    VERIFY_MAX_REDIRECTS,
+    VERIFY_TIMEOUT_SECONDS,
+)
+
+REDIRECT_CODES: List[int] = [301, 302, 303, 307, 308]
+
+MISSING_CODES: List[int] = [404, 410]
+
+# answers to HEAD from servers that only implement GET
+HEAD_NOT_ALLOWED_CODES: List[int] = [405, 501]
+
+_BODY_READ_SIZE: int = 64 * 1024
+
+ConnectionKey = Tuple[str, str, int]
+
+Connection = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+class VerifyResult(NamedTuple):
+    url: str
+    # ok, missing, redirected (to a page that exists) or error
+    status: str
+    # the HTTP status of the last response, None when there was none
+    code: Optional[int] = None
+    # the url the redirects ended at
+    location: Optional[str] = None
+    error: Optional[str] = None
+
+
+def format_result(result: VerifyResult) -> str:
+    """url<TAB>status, followed by the final location of a redirect, the HTTP status of a missing page or the error."""
+    detail: Optional[str] = result.location if result.status == "redirected" else result.error
+    if result.status == "missing":
+        detail = str(result.code)
+    return "\t".join([result.url, result.status] + ([detail] if detail else []))
+
+
+def to_record(result: VerifyResult) -> Dict[str, object]:
+    """The result's fields other than the url, for a JSON record."""
+    return {name: value for name, value in result._asdict().items() if value is not None and name != "url"}
+
+
+class _HttpError(Exception):
+    pass
+
+
+async def _discard_body(reader: asyncio.StreamReader, headers: Dict[str, str]) -> bool:
+    """Read the body of a response to GET without keeping it. Returns whether the connection can be reused."""
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        while True:
+            size: int = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+            if size == 0:
+                while (await reader.readuntil(b"\r\n")) != b"\r\n":
+                    pass  # trailer fields
+                return True
+            await reader.readexactly(size + 2)
+    if "content-length" in headers:
+        remaining: int = int(headers["content-length"])
+        while remaining > 0:
+            remaining -= len(await reader.readexactly(min(remaining, _BODY_READ_SIZE)))
+        return True
+    while await reader.read(_BODY_READ_SIZE):
+        pass  # the body ends when the server closes the connection
+    return False
+
+
+async def _read_response(reader: asyncio.StreamReader, method: str) -> Tuple[int, Dict[str, str], bool]:
+    """(status, headers with lowercase names, whether the connection can be reused) of the next response."""
+    head: bytes = await reader.readuntil(b"\r\n\r\n")
+    lines: List[str] = head.decode("latin-1").split("\r\n")
+    status_line: List[str] = lines[0].split(" ", 2)
+    if len(status_line) < 2 or not status_line[0].startswith("HTTP/") or not status_line[1].isdigit():
+        raise _HttpError("Bad status line: {}".format(lines[0]))
+    code: int = int(status_line[1])
+    headers: Dict[str, str] = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    connection: str = headers.get("connection", "").lower()
+    keep_alive: bool = connection == "keep-alive" if status_line[0] == "HTTP/1.0" else connection != "close"
+    if method != "HEAD" and code not in [204, 304] and code >= 200:
+        keep_alive = await _discard_body(reader, headers) and keep_alive
+    return code, headers, keep_alive
+
+
+class UrlVerifier:
+    """
+    Checks that web addresses exist with HEAD requests (GET when HEAD is not allowed), following redirects. Requests
+    to one host share keep-alive connections and at most max_connections of them are in flight at once. Results are
+    kept in the on-disk cache for ttl seconds, and concurrent checks of one url share a single request.
+    """
+
+    def __init__(
+            self,
+            max_connections: int = VERIFY_MAX_CONNECTIONS_PER_HOST,
+            timeout: float = VERIFY_TIMEOUT_SECONDS,
+            ttl: float = VERIFY_CACHE_TTL_SECONDS):
+        self.max_connections: int = max_connections
+        self.timeout: float = timeout
+        self.ttl: float = ttl
+        self.cache: FileCache = FileCache(VERIFY_CACHE_NAMESPACE)
+        self.semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.idle_connections: Dict[ConnectionKey, List[Connection]] = {}
+        self.pending: Dict[str, "asyncio.Task[VerifyResult]"] = {}
+        self.connections_opened: int = 0
+        self._ssl_context: Optional[ssl.SSLContext] = None
+
+    def _get_ssl_context(self) -> ssl.SSLContext:
+        if self._ssl_context is None:
+            self._ssl_context = ssl.create_default_context()
+        return self._ssl_context
+
+    async def _acquire(self, key: ConnectionKey) -> Tuple[Connection, bool]:
+        idle_connections: List[Connection] = self.idle_connections.get(key, [])
+        while idle_connections:
+            connection: Connection = idle_connections.pop()
+            if not connection[0].at_eof():
+                return connection, True
+            connection[1].close()
+        scheme, host, port = key
+        self.connections_opened += 1
+        connection = await asyncio.open_connection(
+            host, port, ssl=self._get_ssl_context() if scheme == "https" else None)
+        return connection, False
+
+    def _release(self, key: ConnectionKey, connection: Connection):
+        idle_connections: List[Connection] = self.idle_connections.setdefault(key, [])
+        if len(idle_connections) < self.max_connections:
+            idle_connections.append(connection)
+        else:
+            connection[1].close()
+
+    async def _request(self, method: str, url: str) -> Tuple[int, Dict[str, str]]:
+        url_parts = urlsplit(url)
+        if url_parts.scheme not in ["http", "https"] or not url_parts.hostname:
+            raise _HttpError("Unsupported url")
+        key: ConnectionKey = (
+            url_parts.scheme, url_parts.hostname, url_parts.port or (443 if url_parts.scheme == "https" else 80))
+        target: str = (url_parts.path or "/") + ("?" + url_parts.query if url_parts.query else "")
+        request: bytes = "{} {} HTTP/1.1\r\nHost: {}\r\nUser-Agent: webgit\r\nAccept: */*\r\n\r\n".format(
+            method, target, url_parts.netloc).encode("latin-1")
+
+        if url_parts.hostname not in self.semaphores:
+            self.semaphores[url_parts.hostname] = asyncio.Semaphore(self.max_connections)
+        async with self.semaphores[url_parts.hostname]:
+            while True:
+                connection, reused = await self._acquire(key)
+                reader, writer = connection
+                try:
+                    writer.write(request)
+                    await writer.drain()
+                    code, headers, keep_alive = await _read_response(reader, method)
+                except (ConnectionError, asyncio.IncompleteReadError) as e:
+                    writer.close()
+                    if reused:
+                        continue  # the server closed an idle keep-alive connection, open a new one
+                    raise _HttpError(str(e) or type(e).__name__)
+                except BaseException:
+                    writer.close()  # e.g. cancelled by the timeout, with the response half read
+                    raise
+                if keep_alive:
+                    self._release(key, connection)
+                else:
+                    writer.close()
+                return code, headers
+
+    async def _check(self, url: str) -> VerifyResult:
+        location: str = url
+        method: str = "HEAD"
+        redirects: int = 0
+        while True:
+            code, headers = await self._request(method, location)
+            if method == "HEAD" and code in HEAD_NOT_ALLOWED_CODES:
+                method = "GET"
+            elif code in REDIRECT_CODES and "location" in headers:
+                if redirects == VERIFY_MAX_REDIRECTS:
+                    return VerifyResult(url, "error", code, location, "Too many redirects")
+                redirects += 1
+                location = urljoin(location, headers["location"])
+            else:
+                break
+        if 200 <= code < 300:
+            return VerifyResult(url, "redirected" if location != url else "ok", code, location)
+        if code in MISSING_CODES:
+            return VerifyResult(url, "missing", code, location)
+        return VerifyResult(url, "error", code, location, "HTTP {}".format(code))
+
+    async def _verify(self, url: str) -> VerifyResult:
+        cached: Optional[dict] = self.cache.load(url)
+        if cached is not None and time.time() - cached["time"] < self.ttl:
+            return VerifyResult(url, cached["status"], cached["code"], cached["location"])
+        try:
+            result: VerifyResult = await asyncio.wait_for(self._check(url), self.timeout)
+        except asyncio.TimeoutError:
+            return VerifyResult(url, "error", error="Timed out after {:g}s".format(self.timeout))
+        except (_HttpError, OSError, ValueError, asyncio.LimitOverrunError) as e:
+            return VerifyResult(url, "error", error=str(e) or type(e).__name__)
+        if result.status != "error":
+            self.cache.store(url, [], {
+                "time": time.time(),
+                "status": result.status,
+                "code": result.code,
+                "location": result.location,
+            })
+        return result
+
+    async def verify(self, url: str) -> VerifyResult:
+        task: Optional["asyncio.Task[VerifyResult]"] = self.pending.get(url)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._verify(url))
+            self.pending[url] = task
+            task.add_done_callback(lambda _: self.pending.pop(url, None))
+        return await task
+
+    async def verify_many(self, urls: List[str]) -> List[VerifyResult]:
+        return list(await asyncio.gather(*[self.verify(url) for url in urls]))
+
+    async def close(self):
+        for idle_connections in self.idle_connections.values():
+            for _, writer in idle_connections:
+                writer.close()
+        self.idle_connections = {}
+
+
+def verify_urls(urls: List[str]) -> List[VerifyResult]:
+    """Check the urls concurrently, in the order given."""
+
+    async def run() -> List[VerifyResult]:
+        verifier: UrlVerifier = UrlVerifier()
+        try:
+            return await verifier.verify_many(urls)
+        finally:
+            await verifier.close()
+
+    return asyncio.run(run())
+
+
+class BackgroundVerifier:
+    """A UrlVerifier on an event loop of its own thread, for checking urls as a synchronous reader produces them."""
+
+    def __init__(self, verifier: Optional[UrlVerifier] = None):
+        self.loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        self.verifier: UrlVerifier = verifier or UrlVerifier()
+        self.thread: threading.Thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def submit(self, url: str) -> "concurrent.futures.Future[VerifyResult]":
+        return asyncio.run_coroutine_threadsafe(self.verifier.verify(url), self.loop)
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self.verifier.close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
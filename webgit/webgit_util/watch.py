@@ -0,0 +1,173 @@
+import os
+import struct
+import sys
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Set, Tuple
+
+from .cache import FileSignature, get_file_signatures
+
+# inotify(7) event masks and flags
+IN_MODIFY: int = 0x2
+IN_ATTRIB: int = 0x4
+IN_CLOSE_WRITE: int = 0x8
+IN_MOVED_FROM: int = 0x40
+IN_MOVED_TO: int = 0x80
+IN_CREATE: int = 0x100
+IN_DELETE: int = 0x200
+IN_DELETE_SELF: int = 0x400
+IN_MOVE_SELF: int = 0x800
+IN_Q_OVERFLOW: int = 0x4000
+IN_IGNORED: int = 0x8000
+IN_ONLYDIR: int = 0x1000000
+IN_NONBLOCK: int = 0o4000
+IN_CLOEXEC: int = 0o2000000
+
+# git replaces files by renaming a .lock file over them, editors may write in place
+_DIRECTORY_EVENTS: int = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF |
+    IN_MOVE_SELF | IN_ONLYDIR)
+
+# wd, mask, cookie and the length of the name that follows
+_EVENT: struct.Struct = struct.Struct("iIII")
+
+_READ_SIZE: int = 64 * 1024
+
+
+class FileWatcher(ABC):
+    """
+    Tells which groups of files, each watched under a key, changed since the last poll. Files that do not exist yet
+    are watched for their creation.
+    """
+
+    @abstractmethod
+    def watch(self, key: str, file_paths: List[str]):
+        """Watch file_paths under key, in place of the files watched under it before."""
+        pass
+
+    @abstractmethod
+    def unwatch(self, key: str):
+        pass
+
+    @abstractmethod
+    def poll(self) -> Set[str]:
+        """The keys with a file changed since the last poll, without waiting."""
+        pass
+
+    def close(self):
+        pass
+
+
+class StatWatcher(FileWatcher):
+    """Compares the signatures of the files on each poll, where inotify is not available."""
+
+    def __init__(self):
+        self.signatures: Dict[str, List[FileSignature]] = {}
+
+    def watch(self, key: str, file_paths: List[str]):
+        self.signatures[key] = get_file_signatures(file_paths)
+
+    def unwatch(self, key: str):
+        self.signatures.pop(key, None)
+
+    def poll(self) -> Set[str]:
+        return {
+            key for key, signatures in self.signatures.items()
+            if get_file_signatures([signature[0] for signature in signatures]) != signatures
+        }
+
+
+class InotifyWatcher(FileWatcher):
+    """
+    Watches the directories of the files with inotify, through ctypes, so a poll is one read of a non-blocking file
+    descriptor. Only events for the names of watched files count.
+    """
+
+    def __init__(self):
+        import ctypes
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        self._get_errno = ctypes.get_errno
+        self.fd: int = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(self._get_errno(), "inotify_init1 failed")
+        # the keys of each watched name, by watch descriptor
+        self.names: Dict[int, Dict[str, Set[str]]] = {}
+        self.watch_descriptors: Dict[str, int] = {}
+        self.key_names: Dict[str, List[Tuple[int, str]]] = {}
+
+    def _add_watch(self, directory: str) -> Optional[int]:
+        wd: Optional[int] = self.watch_descriptors.get(directory)
+        if wd is None:
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), _DIRECTORY_EVENTS)
+            if wd < 0:
+                return None
+            self.watch_descriptors[directory] = wd
+        return wd
+
+    def watch(self, key: str, file_paths: List[str]):
+        self.unwatch(key)
+        key_names: List[Tuple[int, str]] = []
+        for file_path in file_paths:
+            directory, name = os.path.split(os.path.abspath(file_path))
+            wd: Optional[int] = self._add_watch(directory)
+            # a missing directory is watched for in the closest directory that exists
+            while wd is None and os.path.dirname(directory) != directory:
+                directory, name = os.path.split(directory)
+                wd = self._add_watch(directory)
+            if wd is not None:
+                self.names.setdefault(wd, {}).setdefault(name, set()).add(key)
+                key_names.append((wd, name))
+        self.key_names[key] = key_names
+
+    def unwatch(self, key: str):
+        for wd, name in self.key_names.pop(key, []):
+            names: Dict[str, Set[str]] = self.names.get(wd, {})
+            names.get(name, set()).discard(key)
+            if not names.get(name, True):
+                del names[name]
+            if not names and wd in self.names:
+                self._remove_watch(wd)
+
+    def _remove_watch(self, wd: int):
+        self.names.pop(wd, None)
+        for directory, directory_wd in list(self.watch_descriptors.items()):
+            if directory_wd == wd:
+                del self.watch_descriptors[directory]
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def poll(self) -> Set[str]:
+        changed: Set[str] = set()
+        while True:
+            try:
+                data: bytes = os.read(self.fd, _READ_SIZE)
+            except BlockingIOError:
+                return changed
+            offset: int = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                name: str = os.fsdecode(data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b"\0"))
+                offset += _EVENT.size + length
+                if mask & IN_Q_OVERFLOW:
+                    changed.update(self.key_names)  # events were lost
+                elif mask & (IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF):
+                    # the directory is gone or elsewhere, so its keys are watched again when rebuilt
+                    for keys in self.names.get(wd, {}).values():
+                        changed.update(keys)
+                    if wd in self.names:
+                        self._remove_watch(wd)
+                else:
+                    changed.update(self.names.get(wd, {}).get(name, ()))
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def create_file_watcher() -> FileWatcher:
+    """An InotifyWatcher on Linux, a StatWatcher elsewhere or when inotify is out of watches."""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher()
+        except (OSError, AttributeError):
+            pass
+    return StatWatcher()